@@ -5,17 +5,26 @@
 This script systematically adds security checks to all server actions
 that need societe membership verification.
 
-Usage: python3 security_patcher.py
+Functions are located through the ts_codemod index (scripts/ts_codemod.py),
+so the report follows them across the src/lib/actions/ modules.
+
+Usage: python3 docs/security_patcher.py
 """
 
-import re
+import sys
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "scripts"))
+
+from ts_codemod import REPO_ROOT, load_index
+from final_security_patch import access_check_status
 
 # Security check template
 SECURITY_CHECK = """        // 🔒 SECURITY: Verify membership
         const userRes = await getCurrentUser();
         if (!userRes.success || !userRes.data) return { success: false, error: "Non authentifié" };
-        const hasAccess = await prisma.societe.findFirst({ where: { id: societeId, members: { some: { id: userRes.data.id } } } });
-        if (!hasAccess) return { success: false, error: "Accès refusé" };
+        const authorized = await canAccessSociete(userRes.data.id, societeId, MembershipRole.VIEWER);
+        if (!authorized) return { success: false, error: "Accès refusé" };
 
 """
 
@@ -52,21 +61,38 @@ RESOURCE_SCOPED_FUNCTIONS = {
     "permanentlyDeleteRecord": "generic",
 }
 
+# Single index pass over src/lib/actions/
+EXPORTED = {}
+for module in load_index().values():
+    for fn in module.functions:
+        EXPORTED.setdefault(fn.name, (fn, module))
+STATUS_ICONS = {"secured": "✅", "delegated": "↪️ ", "auth-only": "⚠️ ", "unsecured": "❌"}
+
+
+def locate(func):
+    if func not in EXPORTED:
+        return "⏭️  not found"
+    fn, module = EXPORTED[func]
+    status = access_check_status(fn, {name: f for name, (f, _) in EXPORTED.items()})
+    where = f"{module.path.relative_to(REPO_ROOT)}:{fn.line(module)}"
+    return f"{STATUS_ICONS[status]} {status} ({where})"
+
+
 print("🔒 Security Patcher - Manual Instructions")
 print("=" * 60)
-print("\n⚠️  Due to file complexity, apply these patterns manually:\n")
+print("\n⚠️  Use scripts/apply_security_fixes.py --dry-run to patch automatically; manual patterns below:\n")
 
 print("## 1. SOCIETE-SCOPED FUNCTIONS")
 print("Add this check after 'try {' in these functions:\n")
 for func in SOCIETE_SCOPED_FUNCTIONS:
-    print(f"   - {func}(societeId, ...)")
+    print(f"   - {func}(societeId, ...)  {locate(func)}")
 print("\nPattern:")
 print(SECURITY_CHECK)
 
 print("\n## 2. RESOURCE-SCOPED FUNCTIONS")  
 print("Add check after fetching the resource:\n")
 for func, resource_type in RESOURCE_SCOPED_FUNCTIONS.items():
-    print(f"   - {func} (checks {resource_type}.societeId)")
+    print(f"   - {func} (checks {resource_type}.societeId)  {locate(func)}")
 
 print("""
 Pattern for resource checks:
@@ -80,10 +106,8 @@ export async function updateInvoice(invoice: Facture) {
     if (!existing) return { success: false, error: "Introuvable" };
     
     // Verify membership
-    const hasAccess = await prisma.societe.findFirst({ 
-        where: { id: existing.societeId, members: { some: { id: userRes.data.id } } } 
-    });
-    if (!hasAccess) return { success: false, error: "Accès refusé" };
+    const authorized = await canAccessSociete(userRes.data.id, existing.societeId, MembershipRole.EDITOR);
+    if (!authorized) return { success: false, error: "Accès refusé" };
     
     // Proceed with update...
 }
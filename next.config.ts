@@ -30,6 +30,15 @@ const nextConfig: NextConfig = {
     } : false,
   },
   compress: true,
+  // Uploaded files get a unique (content hash / timestamp) name per upload
+  async headers() {
+    return [
+      {
+        source: '/uploads/:path*',
+        headers: [{ key: 'Cache-Control', value: 'public, max-age=31536000, immutable' }],
+      },
+    ];
+  },
   images: {
     localPatterns: [
       {
@@ -0,0 +1,70 @@
+-- CreateTable
+CREATE TABLE "InvoiceMonthlyRollup" (
+    "societeId" TEXT NOT NULL,
+    "month" DATE NOT NULL,
+    "statut" TEXT NOT NULL,
+    "invoiceCount" INTEGER NOT NULL DEFAULT 0,
+    "totalTTC" DOUBLE PRECISION NOT NULL DEFAULT 0,
+
+    CONSTRAINT "InvoiceMonthlyRollup_pkey" PRIMARY KEY ("societeId","month","statut")
+);
+
+-- AddForeignKey
+ALTER TABLE "InvoiceMonthlyRollup" ADD CONSTRAINT "InvoiceMonthlyRollup_societeId_fkey" FOREIGN KEY ("societeId") REFERENCES "Societe"("id") ON DELETE CASCADE ON UPDATE CASCADE;
+
+-- Incremental maintenance: every write to "Facture" (actions, cron updateMany,
+-- trash/restore, template migration) moves its contribution from the old
+-- (societe, month, statut) bucket to the new one. Soft-deleted invoices are
+-- not counted.
+CREATE OR REPLACE FUNCTION invoice_monthly_rollup_apply() RETURNS trigger AS $$
+BEGIN
+    IF TG_OP IN ('UPDATE', 'DELETE') AND OLD."deletedAt" IS NULL THEN
+        UPDATE "InvoiceMonthlyRollup"
+        SET "invoiceCount" = "invoiceCount" - 1,
+            "totalTTC" = "totalTTC" - OLD."totalTTC"
+        WHERE "societeId" = OLD."societeId"
+          AND "month" = date_trunc('month', OLD."dateEmission")::date
+          AND "statut" = OLD."statut";
+
+        DELETE FROM "InvoiceMonthlyRollup"
+        WHERE "societeId" = OLD."societeId"
+          AND "month" = date_trunc('month', OLD."dateEmission")::date
+          AND "statut" = OLD."statut"
+          AND "invoiceCount" <= 0;
+    END IF;
+
+    IF TG_OP IN ('INSERT', 'UPDATE') AND NEW."deletedAt" IS NULL THEN
+        INSERT INTO "InvoiceMonthlyRollup" ("societeId", "month", "statut", "invoiceCount", "totalTTC")
+        VALUES (NEW."societeId", date_trunc('month', NEW."dateEmission")::date, NEW."statut", 1, NEW."totalTTC")
+        ON CONFLICT ("societeId", "month", "statut") DO UPDATE
+        SET "invoiceCount" = "InvoiceMonthlyRollup"."invoiceCount" + 1,
+            "totalTTC" = "InvoiceMonthlyRollup"."totalTTC" + EXCLUDED."totalTTC";
+    END IF;
+
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+
+CREATE TRIGGER "Facture_rollup_insert_delete"
+AFTER INSERT OR DELETE ON "Facture"
+FOR EACH ROW EXECUTE FUNCTION invoice_monthly_rollup_apply();
+
+-- Only when a rolled-up column actually changes (lock toggles, emails, items... are ignored)
+CREATE TRIGGER "Facture_rollup_update"
+AFTER UPDATE OF "societeId", "statut", "totalTTC", "dateEmission", "deletedAt" ON "Facture"
+FOR EACH ROW
+WHEN (
+    OLD."societeId" IS DISTINCT FROM NEW."societeId"
+    OR OLD."statut" IS DISTINCT FROM NEW."statut"
+    OR OLD."totalTTC" IS DISTINCT FROM NEW."totalTTC"
+    OR OLD."dateEmission" IS DISTINCT FROM NEW."dateEmission"
+    OR OLD."deletedAt" IS DISTINCT FROM NEW."deletedAt"
+)
+EXECUTE FUNCTION invoice_monthly_rollup_apply();
+
+-- Backfill
+INSERT INTO "InvoiceMonthlyRollup" ("societeId", "month", "statut", "invoiceCount", "totalTTC")
+SELECT "societeId", date_trunc('month', "dateEmission")::date, "statut", COUNT(*), COALESCE(SUM("totalTTC"), 0)
+FROM "Facture"
+WHERE "deletedAt" IS NULL
+GROUP BY 1, 2, 3;
@@ -0,0 +1,21 @@
+-- AlterTable
+ALTER TABLE "FactureItem" ADD COLUMN "position" INTEGER NOT NULL DEFAULT 0,
+ADD COLUMN "date" TEXT,
+ADD COLUMN "type" TEXT;
+
+-- AlterTable
+ALTER TABLE "DevisItem" ADD COLUMN "position" INTEGER NOT NULL DEFAULT 0,
+ADD COLUMN "date" TEXT,
+ADD COLUMN "type" TEXT;
+
+-- DropIndex
+DROP INDEX "FactureItem_factureId_idx";
+
+-- DropIndex
+DROP INDEX "DevisItem_devisId_idx";
+
+-- CreateIndex
+CREATE INDEX "FactureItem_factureId_position_idx" ON "FactureItem"("factureId", "position");
+
+-- CreateIndex
+CREATE INDEX "DevisItem_devisId_position_idx" ON "DevisItem"("devisId", "position");
@@ -0,0 +1,72 @@
+-- CreateTable
+CREATE TABLE "ScheduledEmail" (
+    "id" TEXT NOT NULL,
+    "emailLogId" TEXT NOT NULL,
+    "societeId" TEXT NOT NULL,
+    "documentType" TEXT NOT NULL,
+    "documentId" TEXT NOT NULL,
+    "to" TEXT NOT NULL,
+    "subject" TEXT NOT NULL,
+    "message" TEXT NOT NULL,
+    "attachmentsJSON" TEXT NOT NULL DEFAULT '[]',
+    "scheduledAt" TIMESTAMP(3) NOT NULL,
+    "status" TEXT NOT NULL DEFAULT 'scheduled',
+    "attempts" INTEGER NOT NULL DEFAULT 0,
+    "lockedUntil" TIMESTAMP(3),
+    "sentAt" TIMESTAMP(3),
+    "messageId" TEXT,
+    "error" TEXT,
+    "createdAt" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+    "updatedAt" TIMESTAMP(3) NOT NULL,
+
+    CONSTRAINT "ScheduledEmail_pkey" PRIMARY KEY ("id")
+);
+
+-- CreateIndex
+CREATE UNIQUE INDEX "ScheduledEmail_emailLogId_key" ON "ScheduledEmail"("emailLogId");
+
+-- CreateIndex
+CREATE INDEX "ScheduledEmail_status_scheduledAt_idx" ON "ScheduledEmail"("status", "scheduledAt");
+
+-- CreateIndex
+CREATE INDEX "ScheduledEmail_documentId_idx" ON "ScheduledEmail"("documentId");
+
+-- AddForeignKey
+ALTER TABLE "ScheduledEmail" ADD CONSTRAINT "ScheduledEmail_societeId_fkey" FOREIGN KEY ("societeId") REFERENCES "Societe"("id") ON DELETE CASCADE ON UPDATE CASCADE;
+
+-- Backfill: move the pending entries of emailsJSON into the queue (one-time
+-- scan). A document whose JSON cannot be read is skipped with a warning.
+DO $$
+DECLARE
+    doc RECORD;
+    email JSONB;
+BEGIN
+    FOR doc IN
+        SELECT 'facture' AS kind, "id", "societeId", "emailsJSON" FROM "Facture"
+        WHERE "deletedAt" IS NULL AND "emailsJSON" LIKE '%"status":"scheduled"%'
+        UNION ALL
+        SELECT 'devis' AS kind, "id", "societeId", "emailsJSON" FROM "Devis"
+        WHERE "deletedAt" IS NULL AND "emailsJSON" LIKE '%"status":"scheduled"%'
+    LOOP
+        BEGIN
+            FOR email IN SELECT * FROM jsonb_array_elements(doc."emailsJSON"::jsonb) LOOP
+                IF email->>'status' = 'scheduled' AND email->>'id' IS NOT NULL AND email->>'scheduledAt' IS NOT NULL THEN
+                    INSERT INTO "ScheduledEmail" (
+                        "id", "emailLogId", "societeId", "documentType", "documentId",
+                        "to", "subject", "message", "attachmentsJSON", "scheduledAt", "updatedAt"
+                    )
+                    VALUES (
+                        gen_random_uuid()::text, email->>'id', doc."societeId", doc.kind, doc."id",
+                        COALESCE(email->>'to', ''), COALESCE(email->>'subject', ''), COALESCE(email->>'message', ''),
+                        COALESCE(email->'attachments', '[]'::jsonb)::text,
+                        (email->>'scheduledAt')::timestamptz AT TIME ZONE 'UTC',
+                        CURRENT_TIMESTAMP
+                    )
+                    ON CONFLICT ("emailLogId") DO NOTHING;
+                END IF;
+            END LOOP;
+        EXCEPTION WHEN others THEN
+            RAISE WARNING 'ScheduledEmail backfill: % % skipped (%)', doc.kind, doc."id", SQLERRM;
+        END;
+    END LOOP;
+END $$;
@@ -0,0 +1,15 @@
+-- CreateTable
+CREATE TABLE "RateLimitBucket" (
+    "key" TEXT NOT NULL,
+    "windowStart" BIGINT NOT NULL,
+    "current" INTEGER NOT NULL DEFAULT 0,
+    "previous" INTEGER NOT NULL DEFAULT 0,
+    "maxHits" INTEGER NOT NULL,
+    "windowMs" INTEGER NOT NULL,
+    "expiresAt" TIMESTAMP(3) NOT NULL,
+
+    CONSTRAINT "RateLimitBucket_pkey" PRIMARY KEY ("key")
+);
+
+-- CreateIndex
+CREATE INDEX "RateLimitBucket_expiresAt_idx" ON "RateLimitBucket"("expiresAt");
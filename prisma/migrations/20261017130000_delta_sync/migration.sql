@@ -0,0 +1,28 @@
+-- CreateTable
+CREATE TABLE "SyncTombstone" (
+    "id" TEXT NOT NULL,
+    "societeId" TEXT NOT NULL,
+    "entityType" TEXT NOT NULL,
+    "entityId" TEXT,
+    "deletedAt" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+
+    CONSTRAINT "SyncTombstone_pkey" PRIMARY KEY ("id")
+);
+
+-- CreateIndex
+CREATE INDEX "SyncTombstone_societeId_deletedAt_idx" ON "SyncTombstone"("societeId", "deletedAt");
+
+-- CreateIndex
+CREATE INDEX "Client_societeId_updatedAt_idx" ON "Client"("societeId", "updatedAt");
+
+-- CreateIndex
+CREATE INDEX "Produit_societeId_updatedAt_idx" ON "Produit"("societeId", "updatedAt");
+
+-- CreateIndex
+CREATE INDEX "Facture_societeId_updatedAt_idx" ON "Facture"("societeId", "updatedAt");
+
+-- CreateIndex
+CREATE INDEX "Devis_societeId_updatedAt_idx" ON "Devis"("societeId", "updatedAt");
+
+-- AddForeignKey
+ALTER TABLE "SyncTombstone" ADD CONSTRAINT "SyncTombstone_societeId_fkey" FOREIGN KEY ("societeId") REFERENCES "Societe"("id") ON DELETE CASCADE ON UPDATE CASCADE;
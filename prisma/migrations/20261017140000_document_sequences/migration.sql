@@ -0,0 +1,37 @@
+-- CreateTable
+CREATE TABLE "DocumentSequence" (
+    "societeId" TEXT NOT NULL,
+    "documentType" TEXT NOT NULL,
+    "lastValue" INTEGER NOT NULL,
+    "updatedAt" TIMESTAMP(3) NOT NULL,
+
+    CONSTRAINT "DocumentSequence_pkey" PRIMARY KEY ("societeId","documentType")
+);
+
+-- Issued numbers are never rewritten here: duplicates abort the migration and
+-- must be resolved first (scripts/fix-duplicate-numbers.ts)
+DO $$
+DECLARE
+    duplicate RECORD;
+BEGIN
+    SELECT kind, "societeId", "numero", n INTO duplicate FROM (
+        SELECT 'Facture' AS kind, "societeId", "numero", COUNT(*) AS n FROM "Facture" GROUP BY "societeId", "numero" HAVING COUNT(*) > 1
+        UNION ALL
+        SELECT 'Devis' AS kind, "societeId", "numero", COUNT(*) AS n FROM "Devis" GROUP BY "societeId", "numero" HAVING COUNT(*) > 1
+    ) d
+    LIMIT 1;
+
+    IF FOUND THEN
+        RAISE EXCEPTION 'Duplicate document numbers: % % used % times in societe %', duplicate.kind, duplicate."numero", duplicate.n, duplicate."societeId"
+            USING HINT = 'Run scripts/fix-duplicate-numbers.ts, then prisma migrate resolve --rolled-back 20261017140000_document_sequences and deploy again';
+    END IF;
+END $$;
+
+-- CreateIndex
+CREATE UNIQUE INDEX "Facture_societeId_numero_key" ON "Facture"("societeId", "numero");
+
+-- CreateIndex
+CREATE UNIQUE INDEX "Devis_societeId_numero_key" ON "Devis"("societeId", "numero");
+
+-- AddForeignKey
+ALTER TABLE "DocumentSequence" ADD CONSTRAINT "DocumentSequence_societeId_fkey" FOREIGN KEY ("societeId") REFERENCES "Societe"("id") ON DELETE CASCADE ON UPDATE CASCADE;
@@ -0,0 +1,14 @@
+-- AlterTable
+ALTER TABLE "User" ADD COLUMN     "avatarHash" TEXT;
+
+-- CreateTable
+CREATE TABLE "UserAvatarVariant" (
+    "userId" TEXT NOT NULL,
+    "size" INTEGER NOT NULL,
+    "bytes" BYTEA NOT NULL,
+
+    CONSTRAINT "UserAvatarVariant_pkey" PRIMARY KEY ("userId","size")
+);
+
+-- AddForeignKey
+ALTER TABLE "UserAvatarVariant" ADD CONSTRAINT "UserAvatarVariant_userId_fkey" FOREIGN KEY ("userId") REFERENCES "User"("id") ON DELETE CASCADE ON UPDATE CASCADE;
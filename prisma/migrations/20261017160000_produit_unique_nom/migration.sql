@@ -0,0 +1,12 @@
+-- Existing duplicates: the oldest product keeps its name, the others are renamed
+-- (nothing is deleted, invoice / quote lines keep pointing at their product)
+UPDATE "Produit" p
+SET "nom" = p."nom" || ' (doublon ' || d.rn || ')'
+FROM (
+    SELECT "id", ROW_NUMBER() OVER (PARTITION BY "societeId", "nom" ORDER BY "createdAt", "id") AS rn
+    FROM "Produit"
+) d
+WHERE p."id" = d."id" AND d.rn > 1;
+
+-- CreateIndex
+CREATE UNIQUE INDEX "Produit_societeId_nom_key" ON "Produit"("societeId", "nom");
@@ -0,0 +1,11 @@
+-- CreateTable
+CREATE TABLE "JobWatermark" (
+    "name" TEXT NOT NULL,
+    "watermark" TIMESTAMP(3) NOT NULL,
+    "updatedAt" TIMESTAMP(3) NOT NULL,
+
+    CONSTRAINT "JobWatermark_pkey" PRIMARY KEY ("name")
+);
+
+-- CreateIndex
+CREATE INDEX "Facture_statut_dateEcheance_idx" ON "Facture"("statut", "dateEcheance");
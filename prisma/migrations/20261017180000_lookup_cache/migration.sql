@@ -0,0 +1,14 @@
+-- CreateTable
+CREATE TABLE "LookupCache" (
+    "namespace" TEXT NOT NULL,
+    "key" TEXT NOT NULL,
+    "value" TEXT,
+    "found" BOOLEAN NOT NULL,
+    "expiresAt" TIMESTAMP(3) NOT NULL,
+    "createdAt" TIMESTAMP(3) NOT NULL DEFAULT CURRENT_TIMESTAMP,
+
+    CONSTRAINT "LookupCache_pkey" PRIMARY KEY ("namespace","key")
+);
+
+-- CreateIndex
+CREATE INDEX "LookupCache_expiresAt_idx" ON "LookupCache"("expiresAt");
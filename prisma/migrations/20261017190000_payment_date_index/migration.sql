@@ -0,0 +1,2 @@
+-- CreateIndex
+CREATE INDEX "Paiement_datePaiement_idx" ON "Paiement"("datePaiement");
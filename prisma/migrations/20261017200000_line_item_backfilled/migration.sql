@@ -0,0 +1,12 @@
+-- Rows written before 20261017100000_line_item_columns have position 0 and
+-- no date / type: they are flagged, and reads keep using itemsJSON for their
+-- documents until scripts/migrate-json-to-relations.ts rebuilds them.
+-- New rows get the default (true).
+
+-- AlterTable
+ALTER TABLE "FactureItem" ADD COLUMN "backfilled" BOOLEAN NOT NULL DEFAULT false;
+ALTER TABLE "FactureItem" ALTER COLUMN "backfilled" SET DEFAULT true;
+
+-- AlterTable
+ALTER TABLE "DevisItem" ADD COLUMN "backfilled" BOOLEAN NOT NULL DEFAULT false;
+ALTER TABLE "DevisItem" ALTER COLUMN "backfilled" SET DEFAULT true;
@@ -29,6 +29,39 @@ ON "Client"("societeId", "deletedAt");
 CREATE INDEX IF NOT EXISTS "idx_produit_societe_deleted" 
 ON "Produit"("societeId", "deletedAt");
 
+-- Dashboard overdue / due-soon aggregates (lib/invoice-metrics): open invoices only
+CREATE INDEX IF NOT EXISTS "idx_facture_open_echeance"
+ON "Facture"("societeId", "dateEcheance")
+WHERE "deletedAt" IS NULL AND "statut" NOT IN ('Payée', 'Annulée');
+
+-- Keyset pagination (listInvoices / listQuotes / listHistory, lib/keyset.ts):
+-- one index range scan per page, in the ORDER BY of the listing
+CREATE INDEX IF NOT EXISTS "idx_facture_listing"
+ON "Facture"("societeId", "dateEmission" DESC, "numero" DESC, "id" DESC)
+WHERE "deletedAt" IS NULL;
+
+CREATE INDEX IF NOT EXISTS "idx_devis_listing"
+ON "Devis"("societeId", "dateEmission" DESC, "numero" DESC, "id" DESC)
+WHERE "deletedAt" IS NULL;
+
+CREATE INDEX IF NOT EXISTS "idx_history_listing"
+ON "HistoryEntry"("societeId", "timestamp" DESC, "id" DESC);
+
+-- Listing search: ILIKE '%term%' on numero / client nom / history description
+CREATE EXTENSION IF NOT EXISTS pg_trgm;
+
+CREATE INDEX IF NOT EXISTS "idx_facture_numero_trgm"
+ON "Facture" USING GIN ("numero" gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS "idx_devis_numero_trgm"
+ON "Devis" USING GIN ("numero" gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS "idx_client_nom_trgm"
+ON "Client" USING GIN ("nom" gin_trgm_ops);
+
+CREATE INDEX IF NOT EXISTS "idx_history_description_trgm"
+ON "HistoryEntry" USING GIN ("description" gin_trgm_ops);
+
 -- Performance improvement expected:
 -- - fetchInvoicesLite: 400ms → 100ms (-75%)
 -- - fetchQuotesLite: 400ms → 100ms (-75%)
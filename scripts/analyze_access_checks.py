@@ -0,0 +1,498 @@
+#!/usr/bin/env python3
+"""
+📊 ACCESS-CHECK ANALYZER - Prisma round-trips per server action
+
+For every exported action in src/lib/actions/*.ts, lists the Prisma calls it
+makes (following getCurrentUser, canAccessSociete, checkInvoiceMutability,
+withSocieteAccessWrapper and any other indexed helper), marks the ones made
+before its real work (the access-check prelude), flags lookups of the same
+model/id done more than once, and ranks actions by estimated serial
+round-trips.
+
+Static estimate only:
+- every Prisma call is one round-trip; calls inside one Promise.all count once;
+- $transaction adds BEGIN/COMMIT; calls in loops are counted once (flagged);
+- if/else, switch cases and early returns are alternatives: only the
+  heaviest branch is counted (and listed);
+- functions wrapped in React cache() (getSessionUser, loadUser,
+  loadMembership) run once per action for the same arguments; the
+  session-cache LRU is assumed cold.
+
+Builds on the ts_codemod index and the classification of
+final_security_patch.access_check_status.
+
+Usage:
+    python3 scripts/analyze_access_checks.py              # ranked report
+    python3 scripts/analyze_access_checks.py --json       # JSON on stdout
+    python3 scripts/analyze_access_checks.py --output report.json --rtt-ms 25
+"""
+
+import argparse
+import json
+import sys
+
+from ts_codemod import REPO_ROOT, load_index
+from final_security_patch import ACCESS_HELPERS, AUTH_HELPERS, access_check_status
+
+ACTION_ROOTS = [REPO_ROOT / "src" / "lib" / "actions"]
+HELPER_ROOTS = [
+    REPO_ROOT / "src" / "lib" / "security-wrapper.ts",
+    REPO_ROOT / "src" / "lib" / "session-cache.ts",
+]
+
+# Calls that make up the access-check prelude
+GUARD_HELPERS = set(ACCESS_HELPERS) | set(AUTH_HELPERS) | {"checkInvoiceMutability"}
+
+PRISMA_CLIENTS = {"prisma", "tx"}
+PRISMA_METHODS = {
+    "findUnique", "findUniqueOrThrow", "findFirst", "findFirstOrThrow", "findMany",
+    "create", "createMany", "update", "updateMany", "upsert", "delete", "deleteMany",
+    "count", "aggregate", "groupBy",
+}
+RAW_METHODS = {"$queryRaw", "$executeRaw", "$queryRawUnsafe", "$executeRawUnsafe"}
+READ_METHODS = {"findUnique", "findUniqueOrThrow", "findFirst", "findFirstOrThrow"}
+LOOP_KEYWORDS = {"for", "while"}
+LOOP_CALLBACKS = {"map", "forEach", "flatMap", "reduce", "filter"}
+
+DEFAULT_RTT_MS = 20
+
+
+class PrismaCall:
+    def __init__(self, model, method, key, path, line, via, guard, group=None, loop=False):
+        self.model = model      # 'facture', or '$transaction' / '$queryRaw'
+        self.method = method
+        self.key = key          # normalized `where` (after argument substitution) or None
+        self.path = path
+        self.line = line
+        self.via = via          # helper chain, e.g. ['getCurrentUser', 'fetchUserById']
+        self.guard = guard      # made from inside an access-check helper
+        self.group = group      # Promise.all group id (parallel calls)
+        self.loop = loop        # inside a loop body or array callback
+        self.prelude = False
+
+    def round_trips(self):
+        return 2 if self.model == "$transaction" else 1
+
+    def as_dict(self):
+        return {
+            "call": f"{self.model}.{self.method}" if self.method else self.model,
+            "where": self.key,
+            "location": f"{self.path.relative_to(REPO_ROOT)}:{self.line}",
+            "via": self.via,
+            "prelude": self.prelude,
+            "parallel_group": self.group,
+            "in_loop": self.loop,
+        }
+
+
+# --- Token helpers ----------------------------------------------------------
+
+def significant(tokens):
+    return [t for t in tokens if t.kind != "comment"]
+
+
+def match(toks, k):
+    pairs = {"(": ")", "{": "}", "[": "]"}
+    opener, closer = toks[k].value, pairs[toks[k].value]
+    depth = 0
+    for j in range(k, len(toks)):
+        if toks[j].kind != "punct":
+            continue
+        if toks[j].value == opener:
+            depth += 1
+        elif toks[j].value == closer:
+            depth -= 1
+            if depth == 0:
+                return j
+    return len(toks) - 1
+
+
+def split_top_level(toks):
+    """Split a token run on depth-0 commas."""
+    parts, current, depth = [], [], 0
+    for tok in toks:
+        if tok.kind == "punct" and tok.value in "({[":
+            depth += 1
+        elif tok.kind == "punct" and tok.value in ")}]":
+            depth -= 1
+        if depth == 0 and tok.value == ",":
+            if current:
+                parts.append(current)
+            current = []
+            continue
+        current.append(tok)
+    if current:
+        parts.append(current)
+    return parts
+
+
+def render(toks, subst):
+    """Compact text of an expression, replacing free identifiers with `subst` values."""
+    out, prev = [], None
+    for k, tok in enumerate(toks):
+        value = tok.value
+        is_free = tok.kind == "ident" and (prev is None or prev.value not in (".", "?."))
+        is_key = k + 1 < len(toks) and toks[k + 1].value == ":"
+        if is_free and not is_key and value in subst:
+            value = subst[value]
+        if prev is not None and prev.kind in ("ident", "number") and tok.kind in ("ident", "number"):
+            out.append(" ")
+        out.append(value)
+        prev = tok
+    return "".join(out)
+
+
+def where_key(args, subst):
+    """Normalized `where` clause of a Prisma call, e.g. 'id=invoice.id'."""
+    for k in range(len(args) - 2):
+        if args[k].value == "where" and args[k + 1].value == ":" and args[k + 2].value == "{":
+            body = args[k + 3:match(args, k + 2)]
+            entries = []
+            for entry in split_top_level(body):
+                if len(entry) == 1:
+                    name = entry[0].value
+                    entries.append(f"{name}={subst.get(name, name)}")
+                elif len(entry) > 2 and entry[1].value == ":":
+                    entries.append(f"{entry[0].value}={render(entry[2:], subst)}")
+                else:
+                    entries.append(render(entry, subst))
+            return ", ".join(sorted(entries))
+    return None
+
+
+# --- Analyzer ---------------------------------------------------------------
+
+def serial(calls):
+    """Estimated serial round-trips (one per Promise.all group)."""
+    seen_groups, total = set(), 0
+    for call in calls:
+        if call.group is not None:
+            if call.group in seen_groups:
+                continue
+            seen_groups.add(call.group)
+        total += call.round_trips()
+    return total
+
+
+class _Scan:
+    """One pass over a function body. if/else chains, switch cases and early
+    returns are alternatives: only the branch with the most round-trips is kept."""
+
+    def __init__(self, analyzer, fn, module, subst, via, guard):
+        self.analyzer = analyzer
+        self.fn = fn
+        self.module = module
+        self.subst = subst
+        self.via = via
+        self.guard = guard
+        self.toks = significant(fn.body_tokens())
+        self.groups = []    # (close index, group id) of enclosing Promise.all calls
+        self.loops = []     # close index of enclosing loop bodies / array callbacks
+
+    def line_of(self, tok):
+        return self.module.source.count("\n", 0, tok.start) + 1
+
+    def statement_end(self, k, hi):
+        """Index just past the statement starting at k (a block or up to ';')."""
+        toks = self.toks
+        if toks[k].value == "{":
+            return match(toks, k) + 1
+        if toks[k].value == "if":
+            return self.if_chain(k, hi)[2]
+        depth = 0
+        while k < hi:
+            v = toks[k].value if toks[k].kind == "punct" else None
+            if v in ("(", "{", "["):
+                depth += 1
+            elif v in (")", "}", "]"):
+                if depth == 0:
+                    return k
+                depth -= 1
+            elif v == ";" and depth == 0:
+                return k + 1
+            k += 1
+        return hi
+
+    def if_chain(self, k, hi):
+        """(condition range, [branch ranges], end, has_else) of the if/else chain at k."""
+        toks = self.toks
+        cond_close = match(toks, k + 1)
+        body_start = cond_close + 1
+        end = self.statement_end(body_start, hi)
+        branches = [(body_start, end)]
+        has_else = False
+        if end < hi and toks[end].value == "else":
+            has_else = True
+            else_end = self.statement_end(end + 1, hi)
+            branches.append((end + 1, else_end))
+            end = else_end
+        return (k + 2, cond_close), branches, end, has_else
+
+    def exits(self, lo, hi):
+        """True if the range contains a return/throw at its own nesting level."""
+        toks = self.toks
+        if lo < hi and toks[lo].value == "{":
+            lo, hi = lo + 1, hi - 1
+        depth = 0
+        for k in range(lo, hi):
+            tok = toks[k]
+            if tok.kind == "punct" and tok.value in "({[":
+                depth += 1
+            elif tok.kind == "punct" and tok.value in ")}]":
+                depth -= 1
+            elif depth == 0 and tok.kind == "ident" and tok.value in ("return", "throw"):
+                return True
+        return False
+
+    def heaviest(self, ranges):
+        # Every branch starts from the same memoized calls; keep the winner's
+        memo = self.analyzer.memo
+        options = []
+        for lo, hi in ranges:
+            self.analyzer.memo = set(memo)
+            options.append((self.run(lo, hi), self.analyzer.memo))
+        if not options:
+            return []
+        calls, self.analyzer.memo = max(options, key=lambda option: serial(option[0]))
+        return calls
+
+    def run(self, lo, hi):
+        toks = self.toks
+        result = []
+        k = lo
+        while k < hi:
+            self.groups[:] = [g for g in self.groups if g[0] > k]
+            self.loops[:] = [end for end in self.loops if end > k]
+            tok = toks[k]
+            nxt = toks[k + 1] if k + 1 < len(toks) else None
+            prev = toks[k - 1] if k > 0 else None
+
+            # if (...) ... else ...: keep the heaviest branch; an early-exit branch
+            # without else is an alternative to the rest of the enclosing block
+            if tok.kind == "ident" and tok.value == "if" and nxt is not None and nxt.value == "(":
+                (c_lo, c_hi), branches, end, has_else = self.if_chain(k, hi)
+                result += self.run(c_lo, c_hi)
+                if not has_else and self.exits(*branches[0]):
+                    return result + self.heaviest([branches[0], (end, hi)])
+                if not has_else:
+                    branches.append((end, end))
+                result += self.heaviest(branches)
+                k = end
+                continue
+
+            # switch (...) { case ...: ... }: one case runs
+            if tok.kind == "ident" and tok.value == "switch" and nxt is not None and nxt.value == "(":
+                cond_close = match(toks, k + 1)
+                result += self.run(k + 2, cond_close)
+                body_open = cond_close + 1
+                body_close = match(toks, body_open)
+                starts, depth = [], 0
+                for j in range(body_open + 1, body_close):
+                    v = toks[j].value if toks[j].kind == "punct" else None
+                    if v in ("(", "{", "["):
+                        depth += 1
+                    elif v in (")", "}", "]"):
+                        depth -= 1
+                    elif depth == 0 and toks[j].kind == "ident" and toks[j].value in ("case", "default"):
+                        starts.append(j)
+                cases = list(zip(starts, starts[1:] + [body_close]))
+                result += self.heaviest(cases)
+                k = body_close + 1
+                continue
+
+            # for (...) { ... } / while (...) { ... }
+            if tok.kind == "ident" and tok.value in LOOP_KEYWORDS and nxt is not None and nxt.value == "(":
+                close = match(toks, k + 1)
+                self.loops.append(self.statement_end(close + 1, hi))
+
+            # items.map(async (...) => ...)
+            elif tok.kind == "ident" and tok.value in LOOP_CALLBACKS and prev is not None \
+                    and prev.value in (".", "?.") and nxt is not None and nxt.value == "(":
+                self.loops.append(match(toks, k + 1))
+
+            # Promise.all([...])
+            elif tok.value == "Promise" and k + 3 < len(toks) and toks[k + 2].value in ("all", "allSettled") \
+                    and toks[k + 3].value == "(":
+                self.groups.append((match(toks, k + 3), f"{self.fn.name}:{self.line_of(tok)}"))
+                k += 4
+                continue
+
+            # prisma.model.method(...) / tx.model.method(...) / prisma.$transaction(...) / prisma.$queryRaw`...`
+            elif tok.kind == "ident" and tok.value in PRISMA_CLIENTS and nxt is not None and nxt.value == "." \
+                    and (prev is None or prev.value not in (".", "?.")) and k + 2 < len(toks):
+                member = toks[k + 2].value
+                if member == "$transaction" or member in RAW_METHODS:
+                    result.append(self.call(member, None, None, tok))
+                    k += 3
+                    continue
+                if k + 5 < len(toks) and toks[k + 3].value == "." and toks[k + 4].value in PRISMA_METHODS \
+                        and toks[k + 5].value == "(":
+                    key = where_key(toks[k + 6:match(toks, k + 5)], self.subst)
+                    result.append(self.call(member, toks[k + 4].value, key, tok))
+                    k += 6
+                    continue
+
+            # Call to an indexed function: expand it in place
+            elif tok.kind == "ident" and nxt is not None and nxt.value == "(" \
+                    and (prev is None or prev.value not in (".", "?.", "function")) \
+                    and tok.value != self.fn.name and tok.value not in self.via:
+                target = self.analyzer.resolve(tok.value, self.module)
+                if target is not None:
+                    callee, callee_module = target
+                    close = match(toks, k + 1)
+                    args = [render(a, self.subst) for a in split_top_level(toks[k + 2:close])]
+                    if callee.memoized:
+                        memo_key = (callee_module.path, callee.name, tuple(args))
+                        if memo_key in self.analyzer.memo:
+                            k += 1
+                            continue
+                        self.analyzer.memo.add(memo_key)
+                    callee_subst = {
+                        p.name: arg for p, arg in zip(callee.params, args) if p.name.isidentifier()
+                    }
+                    inner = self.analyzer.calls(
+                        callee, callee_module, callee_subst, self.via + (tok.value,),
+                        self.guard or tok.value in GUARD_HELPERS,
+                    )
+                    group = self.groups[-1][1] if self.groups else None
+                    for call in inner:
+                        call.group = call.group or group
+                        call.loop = call.loop or bool(self.loops)
+                    result.extend(inner)
+            k += 1
+        return result
+
+    def call(self, model, method, key, tok):
+        return PrismaCall(
+            model, method, key, self.module.path, self.line_of(tok), list(self.via), self.guard,
+            self.groups[-1][1] if self.groups else None, bool(self.loops),
+        )
+
+
+class Analyzer:
+    def __init__(self, action_roots=None, helper_roots=None):
+        self.actions = load_index(action_roots or ACTION_ROOTS)
+        self.modules = dict(self.actions)
+        self.modules.update(load_index(helper_roots or HELPER_ROOTS))
+        self.exported = {}
+        self.helpers = {}
+        for module in self.modules.values():
+            for fn in module.functions:
+                self.exported.setdefault(fn.name, (fn, module))
+            for fn in module.helpers:
+                self.helpers[(module.path, fn.name)] = (fn, module)
+        self.memo = set()   # React cache() calls already made by the action being analyzed
+
+    def resolve(self, name, module):
+        return self.helpers.get((module.path, name)) or self.exported.get(name)
+
+    def calls(self, fn, module, subst=None, via=(), guard=False):
+        """Prisma calls along the heaviest path through `fn`, helpers expanded in source order."""
+        scan = _Scan(self, fn, module, subst or {}, via, guard)
+        return scan.run(0, len(scan.toks))
+
+    def analyze(self, fn, module, rtt_ms=DEFAULT_RTT_MS):
+        self.memo = set()
+        calls = self.calls(fn, module)
+
+        # Prelude: everything up to the last call made by an access-check helper
+        last_guard = max((i for i, c in enumerate(calls) if c.guard), default=-1)
+        for call in calls[:last_guard + 1]:
+            call.prelude = True
+
+        duplicates = []
+        by_key = {}
+        for call in calls:
+            if call.method in READ_METHODS and call.key:
+                by_key.setdefault((call.model, call.key), []).append(call)
+        for (model, key), same in by_key.items():
+            if len(same) > 1:
+                duplicates.append({
+                    "kind": "same-record",
+                    "model": model,
+                    "where": key,
+                    "count": len(same),
+                    "locations": [c.as_dict()["location"] for c in same],
+                })
+
+        # Legacy societe.findFirst({ members }) next to canAccessSociete's membership lookup
+        membership = [c for c in calls if c.model == "membership" and c.method in READ_METHODS]
+        legacy = [c for c in calls if c.model == "societe" and c.method == "findFirst" and c.key and "members=" in c.key]
+        if membership and legacy:
+            duplicates.append({
+                "kind": "membership-check",
+                "model": "membership/societe",
+                "where": legacy[0].key,
+                "count": len(membership) + len(legacy),
+                "locations": [c.as_dict()["location"] for c in membership + legacy],
+            })
+
+        prelude = [c for c in calls if c.prelude]
+        redundant = sum(d["count"] - 1 for d in duplicates)
+        total_rtt = serial(calls)
+        return {
+            "action": fn.name,
+            "location": f"{module.path.relative_to(REPO_ROOT)}:{fn.line(module)}",
+            "access_check": access_check_status(fn, {name: f for name, (f, _) in self.exported.items()}),
+            "prelude_round_trips": serial(prelude),
+            "serial_round_trips": total_rtt,
+            "redundant_lookups": redundant,
+            "estimated_ms": total_rtt * rtt_ms,
+            "avoidable_ms": redundant * rtt_ms,
+            "calls_in_loops": sum(1 for c in calls if c.loop),
+            "duplicates": duplicates,
+            "calls": [c.as_dict() for c in calls],
+        }
+
+    def report(self, rtt_ms=DEFAULT_RTT_MS):
+        rows = [
+            self.analyze(fn, module, rtt_ms)
+            for module in self.actions.values()
+            for fn in module.functions
+            if fn.is_async
+        ]
+        rows.sort(key=lambda r: (-r["serial_round_trips"], -r["redundant_lookups"], r["action"]))
+        for rank, row in enumerate(rows, 1):
+            row["rank"] = rank
+        return {
+            "rtt_ms": rtt_ms,
+            "actions": len(rows),
+            "with_redundant_lookups": sum(1 for r in rows if r["redundant_lookups"]),
+            "ranking": rows,
+        }
+
+
+def print_report(report, limit):
+    print(f"📊 {report['actions']} actions, {report['with_redundant_lookups']} with redundant lookups "
+          f"(≈{report['rtt_ms']} ms per round-trip)\n")
+    print(f"{'#':>3}  {'action':<32} {'serial':>6} {'prelude':>7} {'dup':>4} {'≈ms':>5}  access")
+    for row in report["ranking"][:limit]:
+        print(f"{row['rank']:>3}  {row['action']:<32} {row['serial_round_trips']:>6} "
+              f"{row['prelude_round_trips']:>7} {row['redundant_lookups']:>4} {row['estimated_ms']:>5}  "
+              f"{row['access_check']}")
+        for dup in row["duplicates"]:
+            print(f"       ⚠️  {dup['model']} [{dup['where']}] x{dup['count']}: {', '.join(dup['locations'])}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Rank server actions by Prisma round-trips")
+    parser.add_argument("--json", action="store_true", help="print the full report as JSON")
+    parser.add_argument("--output", help="also write the JSON report to this file")
+    parser.add_argument("--rtt-ms", type=int, default=DEFAULT_RTT_MS, help="cost of one round-trip (ms)")
+    parser.add_argument("--limit", type=int, default=25, help="rows in the text report")
+    args = parser.parse_args(argv)
+
+    report = Analyzer().report(args.rtt_ms)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    if args.json:
+        json.dump(report, sys.stdout, indent=2, ensure_ascii=False)
+        print()
+    else:
+        print_report(report, args.limit)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
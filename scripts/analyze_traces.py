@@ -0,0 +1,114 @@
+#!/usr/bin/env python3
+"""
+⏱️ ANALYZE TRACES - Per-action latency tables from the action trace log
+
+Reads the JSON lines written when the app runs with ACTION_TRACE_LOG=<file>
+(src/lib/tracing.ts: one line per server action call, with wall time, Prisma
+query count and DB time) and prints, per action: calls, error rate,
+p50/p95/p99, queries and DB time per call, and the share of the wall time
+spent in the database. Actions are sorted by total time, so the first rows
+are the ones worth optimizing.
+
+Nested calls (getCurrentUser or canAccessSociete inside another action) are
+listed separately; --top-level keeps only the calls made by the client.
+
+Usage:
+    python3 scripts/analyze_traces.py traces.jsonl
+    python3 scripts/analyze_traces.py traces.jsonl --top-level --since 2026-10-17T08:00
+    python3 scripts/analyze_traces.py traces.jsonl --action listInvoices --json
+"""
+
+import argparse
+import json
+import sys
+from collections import defaultdict
+
+from bench_report import percentile
+
+
+def read_traces(paths, since=None, top_level=False, actions=None):
+    """Yields trace records, skipping malformed lines (a log cut mid-write)."""
+    for path in paths:
+        with open(path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue
+                if since and record.get("at", "") < since:
+                    continue
+                if top_level and record.get("parent"):
+                    continue
+                if actions and record.get("action") not in actions:
+                    continue
+                yield record
+
+
+def summarize_actions(records):
+    """{action: summary}, sorted by total wall time (descending)."""
+    grouped = defaultdict(list)
+    for record in records:
+        grouped[record["action"]].append(record)
+
+    summaries = {}
+    for name, calls in grouped.items():
+        latencies = sorted(c["durationMs"] for c in calls)
+        total_ms = sum(latencies)
+        db_ms = sum(c.get("dbMs", 0) for c in calls)
+        summaries[name] = {
+            "calls": len(calls),
+            "errors": sum(1 for c in calls if not c.get("ok", True)),
+            "total_ms": round(total_ms, 1),
+            "mean_ms": round(total_ms / len(calls), 1),
+            "p50_ms": round(percentile(latencies, 50), 1),
+            "p95_ms": round(percentile(latencies, 95), 1),
+            "p99_ms": round(percentile(latencies, 99), 1),
+            "max_ms": round(latencies[-1], 1),
+            "queries_per_call": round(sum(c.get("queries", 0) for c in calls) / len(calls), 1),
+            "db_ms_per_call": round(db_ms / len(calls), 1),
+            # DB time of parallel queries can exceed the wall time
+            "db_share": round(min(db_ms / total_ms, 1.0), 3) if total_ms else 0.0,
+        }
+    return dict(sorted(summaries.items(), key=lambda item: -item[1]["total_ms"]))
+
+
+def print_table(summaries, limit):
+    print(f"{'action':<30} {'calls':>7} {'err%':>6} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8} "
+          f"{'q/call':>7} {'db ms':>8} {'db%':>5}")
+    for name, s in list(summaries.items())[:limit]:
+        error_rate = s["errors"] / s["calls"] * 100
+        print(f"{name:<30} {s['calls']:>7} {error_rate:>5.1f}% {s['p50_ms']:>8.1f} {s['p95_ms']:>8.1f} "
+              f"{s['p99_ms']:>8.1f} {s['max_ms']:>8.1f} {s['queries_per_call']:>7.1f} "
+              f"{s['db_ms_per_call']:>8.1f} {s['db_share'] * 100:>4.0f}%")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize ACTION_TRACE_LOG files into per-action latency tables")
+    parser.add_argument("traces", nargs="+", help="JSONL trace file(s)")
+    parser.add_argument("--since", help="ISO timestamp: ignore older calls")
+    parser.add_argument("--top-level", action="store_true", help="only calls not nested in another action")
+    parser.add_argument("--action", action="append", help="only this action (repeatable)")
+    parser.add_argument("--limit", type=int, default=30, help="rows printed (default: 30)")
+    parser.add_argument("--json", action="store_true", help="print the summaries as JSON")
+    args = parser.parse_args(argv)
+
+    records = list(read_traces(args.traces, args.since, args.top_level, set(args.action or [])))
+    if not records:
+        print("❌ No trace matches (is ACTION_TRACE_LOG set on the app?)", file=sys.stderr)
+        return 1
+
+    summaries = summarize_actions(records)
+    if args.json:
+        json.dump(summaries, sys.stdout, indent=2)
+        print()
+        return 0
+
+    first = min(r.get("at", "") for r in records)
+    last = max(r.get("at", "") for r in records)
+    print(f"📊 {len(records)} calls, {len(summaries)} actions ({first} → {last})\n")
+    print_table(summaries, args.limit)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,65 @@
+#!/usr/bin/env python3
+"""
+⏱️ ACTION TRACING PATCHER - Trace every exported server action
+
+Replaces the console.time/[PERF] logs that remove_timers.py and
+safe_cleanup.py had to strip. Each exported async function under
+src/lib/actions/ is traced where it is exported, its body left untouched
+(one renamed line per action, git blame stays on the original author):
+
+    async function <name>Impl(...) {
+        ...original body...
+    }
+    ...
+    export const <name> = traced('<name>', <name>Impl);
+
+traced() records wall time, Prisma query count and DB time per call in a
+per-call span (src/lib/tracing.ts). ModuleIndex indexes traced actions
+under their exported name (traced_impl set) and they are skipped, so the
+patcher can be re-run after new actions are added.
+
+Usage:
+    python3 scripts/apply_action_tracing.py            # write changes
+    python3 scripts/apply_action_tracing.py --dry-run  # print a unified diff
+"""
+
+import sys
+
+from ts_codemod import Edit, main, register_patch
+
+TRACING_MODULE = "@/lib/tracing"
+IMPL_SUFFIX = "Impl"
+
+
+def needs_tracing(fn):
+    return fn.is_async and not fn.memoized and fn.traced_impl is None
+
+
+@register_patch("trace-actions")
+def trace_action(fn, module):
+    if not needs_tracing(fn):
+        return []
+
+    # `export async function name` -> `async function nameImpl`
+    start = fn._tokens[fn.export_index].start
+    name_tok = next(t for t in fn._tokens[fn.export_index:fn.params_open] if t.kind == "ident" and t.value == fn.name)
+    return [Edit(start, name_tok.end, f"async function {fn.name}{IMPL_SUFFIX}")]
+
+
+@register_patch("trace-actions-exports", scope="module")
+def trace_exports(module):
+    names = [fn.name for fn in module.functions if needs_tracing(fn)]
+    if not names:
+        return []
+
+    end = len(module.source.rstrip("\n"))
+    exports = "\n".join(f"export const {name} = traced('{name}', {name}{IMPL_SUFFIX});" for name in names)
+    return [
+        module.ensure_import("traced", TRACING_MODULE),
+        Edit(end, len(module.source), f"\n\n{exports}\n"),
+    ]
+
+
+if __name__ == "__main__":
+    print("⏱️ Tracing server actions in src/lib/actions/...", file=sys.stderr)
+    sys.exit(main(description="Trace exported server actions with traced()"))
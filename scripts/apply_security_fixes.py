@@ -2,135 +2,142 @@
 """
 🔒 COMPREHENSIVE SECURITY PATCHER
 Automatically adds security checks to all unprotected server actions
+
+Runs on the ts_codemod engine: every module under src/lib/actions/ is
+tokenized once and all patches below are applied in a single pass, wherever
+the function lives now. Parameter names come from the function index, so the
+inserted checks always reference the real argument.
+
+Usage:
+    python3 scripts/apply_security_fixes.py            # write changes
+    python3 scripts/apply_security_fixes.py --dry-run  # print a unified diff
 """
 
-import re
 import sys
 
-def add_security_check_societe_scoped(content, func_name, param_name='societeId'):
-    """Add security check for functions with societeId parameter"""
-    
-    security_block = f"""        // 🔒 SECURITY: Verify membership
-        const userRes = await getCurrentUser();
-        if (!userRes.success || !userRes.data) return {{ success: false, error: "Non authentifié" }};
-        const hasAccess = await prisma.societe.findFirst({{ 
-            where: {{ id: {param_name}, members: {{ some: {{ id: userRes.data.id }} }} }} 
-        }});
-        if (!hasAccess) return {{ success: false, error: "Accès refusé" }};
+from ts_codemod import main, register_patch
+
+# Already-secured markers (legacy blocks and current canAccessSociete checks)
+SECURED_MARKERS = ("🔒 SECURITY", "getCurrentUser", "canAccessSociete", "withSocieteAccessWrapper")
 
+SOCIETE_BLOCK = """
+// 🔒 SECURITY: Verify membership
+const userRes = await getCurrentUser();
+if (!userRes.success || !userRes.data) return {{ success: false, error: "Non authentifié" }};
+
+const authorized = await canAccessSociete(userRes.data.id, {societe_expr}, MembershipRole.{role});
+if (!authorized) return {{ success: false, error: "Accès refusé" }};
 """
-    
-    # Pattern: export async function funcName(...) {\n    try {
-    pattern = rf'(export async function {func_name}\([^{{]+\{{\s*try \{{)'
-    
-    def replacement(match):
-        # Check if already has security check
-        next_200_chars = content[match.end():match.end()+200]
-        if '🔒 SECURITY' in next_200_chars or 'getCurrentUser()' in next_200_chars:
-            return match.group(0)  # Already secured
-        return match.group(1) + '\n' + security_block
-    
-    return re.sub(pattern, replacement, content, count=1)
-
-def add_security_check_resource_scoped(content, func_name, table_name, id_param, resource_label):
-    """Add security check for functions that fetch by ID then verify societe"""
-    
-    security_block = f"""        // 🔒 SECURITY: Verify access
-        const userRes = await getCurrentUser();
-        if (!userRes.success || !userRes.data) return {{ success: false, error: "Non authentifié" }};
-        
-        const existing = await prisma.{table_name}.findUnique({{ 
-            where: {{ id: {id_param} }},
-            select: {{ societeId: true }}
-        }});
-        if (!existing) return {{ success: false, error: "{resource_label} introuvable" }};
-        
-        const hasAccess = await prisma.societe.findFirst({{ 
-            where: {{ id: existing.societeId, members: {{ some: {{ id: userRes.data.id }} }} }} 
-        }});
-        if (!hasAccess) return {{ success: false, error: "Accès refusé" }};
 
+RESOURCE_BLOCK = """
+// 🔒 SECURITY: Verify access
+const userRes = await getCurrentUser();
+if (!userRes.success || !userRes.data) return {{ success: false, error: "Non authentifié" }};
+
+const existing = {lookup};
+if (!existing) return {{ success: false, error: "{label} introuvable" }};
+
+const authorized = await canAccessSociete(userRes.data.id, existing.societeId, MembershipRole.{role});
+if (!authorized) return {{ success: false, error: "Accès refusé" }};
 """
-    
-    pattern = rf'(export async function {func_name}\([^{{]+\{{\s*(?:if[^{{]+\{{\s*return[^}}]+\}}\s*)?try \{{)'
-    
-    def replacement(match):
-        next_200_chars = content[match.end():match.end()+200]
-        if '🔒 SECURITY' in next_200_chars or 'getCurrentUser()' in next_200_chars:
-            return match.group(0)
-        return match.group(1) + '\n' + security_block
-    
-    return re.sub(pattern, replacement, content, count=1)
-
-# Read file
-print("📖 Reading src/app/actions.ts...")
-with open('src/app/actions.ts', 'r', encoding='utf-8') as f:
-    content = f.read()
-
-original_length = len(content)
-patch_count = 0
-
-# Define all patches
-patches = [
+
+# Which table a generic (tableName, id) action reads from
+GENERIC_LOOKUP = (
+    "tableName === 'Factures'\n"
+    "    ? await prisma.facture.findUnique({{ where: {{ id: {id} }}, select: {{ societeId: true }} }})\n"
+    "    : await prisma.devis.findUnique({{ where: {{ id: {id} }}, select: {{ societeId: true }} }})"
+)
+
+# (function, kind, table, expression over params, label, minimum role)
+# Expressions use {0}, {1}... for the function's own parameter names.
+PATCHES = [
     # Fetch operations (societeId scoped)
-    ('fetchDashboardMetrics', 'societe', None, None, None),
-    ('fetchDeletedInvoices', 'societe', None, None, None),
-    ('fetchDeletedQuotes', 'societe', None, None, None),
-    ('fetchArchivedInvoices', 'societe', None, None, None),
-    ('fetchArchivedQuotes', 'societe', None, None, None),
-    ('emptyTrash', 'societe', None, None, None),
-    
+    ('fetchDashboardMetrics', 'societe', None, '{0}', None, 'VIEWER'),
+    ('fetchDeletedInvoices', 'societe', None, '{0}', None, 'VIEWER'),
+    ('fetchDeletedQuotes', 'societe', None, '{0}', None, 'VIEWER'),
+    ('fetchArchivedInvoices', 'societe', None, '{0}', None, 'VIEWER'),
+    ('fetchArchivedQuotes', 'societe', None, '{0}', None, 'VIEWER'),
+    ('emptyTrash', 'societe', None, '{0}', None, 'ADMIN'),
+
+    # Create operations (target societe comes from the payload)
+    ('createProduct', 'societe', None, '{0}.societeId', None, 'EDITOR'),
+    ('createInvoice', 'societe', None, '{0}.societeId', None, 'EDITOR'),
+    ('createQuote', 'societe', None, '{0}.societeId', None, 'EDITOR'),
+
     # CRUD operations (resource scoped)
-    ('createProduct', 'resource', 'produit', 'product.societeId', 'Produit'),
-    ('updateProduct', 'resource', 'produit', 'product.id', 'Produit'),
-    ('createInvoice', 'resource', 'facture', 'invoice.societeId', 'Facture'),
-    ('updateInvoice', 'resource', 'facture', 'invoice.id', 'Facture'),
-    ('createQuote', 'resource', 'devis', 'quote.societeId', 'Devis'),
-    ('updateQuote', 'resource', 'devis', 'quote.id', 'Devis'),
-    
+    ('updateProduct', 'resource', 'produit', '{0}.id', 'Produit', 'EDITOR'),
+    ('updateInvoice', 'resource', 'facture', '{0}.id', 'Facture', 'EDITOR'),
+    ('updateQuote', 'resource', 'devis', '{0}.id', 'Devis', 'EDITOR'),
+
     # Status mutations (resource scoped - ID only)
-    ('markInvoiceAsSent', 'resource', 'facture', 'invoiceId', 'Facture'),
-    ('markInvoiceAsDownloaded', 'resource', 'facture', 'invoiceId', 'Facture'),
-    ('toggleInvoiceLock', 'resource', 'facture', 'invoiceId', 'Facture'),
-    ('toggleQuoteLock', 'resource', 'devis', 'quoteId', 'Devis'),
-    ('convertQuoteToInvoice', 'resource', 'devis', 'quoteId', 'Devis'),
-    ('updateQuoteStatus', 'resource', 'devis', 'quoteId', 'Devis'),
-    
-    # Archive operations (resource scoped)
-    ('archiveRecord', 'resource', None, 'id', 'Enregistrement'),
-    ('unarchiveRecord', 'resource', None, 'id', 'Enregistrement'),
-    ('restoreRecord', 'resource', None, 'id', 'Enregistrement'),
-    ('permanentlyDeleteRecord', 'resource', None, 'id', 'Enregistrement'),
+    ('markInvoiceAsSent', 'resource', 'facture', '{0}', 'Facture', 'EDITOR'),
+    ('markInvoiceAsDownloaded', 'resource', 'facture', '{0}', 'Facture', 'VIEWER'),
+    ('toggleInvoiceLock', 'resource', 'facture', '{0}', 'Facture', 'EDITOR'),
+    ('toggleQuoteLock', 'resource', 'devis', '{0}', 'Devis', 'EDITOR'),
+    ('convertQuoteToInvoice', 'resource', 'devis', '{0}', 'Devis', 'EDITOR'),
+    ('updateQuoteStatus', 'resource', 'devis', '{0}', 'Devis', 'EDITOR'),
+
+    # Archive operations (tableName, id)
+    ('archiveRecord', 'resource', None, '{1}', 'Enregistrement', 'EDITOR'),
+    ('unarchiveRecord', 'resource', None, '{1}', 'Enregistrement', 'EDITOR'),
+    ('restoreRecord', 'resource', None, '{1}', 'Enregistrement', 'EDITOR'),
+    ('permanentlyDeleteRecord', 'resource', None, '{1}', 'Enregistrement', 'ADMIN'),
 ]
 
-# Apply patches
-for patch in patches:
-    func_name, patch_type, table, id_param, label = patch
-    
+
+def param_expr(fn, template):
+    """Format an expression template with the function's parameter names."""
+    names = [p.name for p in fn.params]
     try:
-        if patch_type == 'societe':
-            new_content = add_security_check_societe_scoped(content, func_name)
-        elif patch_type == 'resource':
-            new_content = add_security_check_resource_scoped(content, func_name, table or 'TABLE', id_param, label)
-        
-        if len(new_content) > len(content):
-            content = new_content
-            patch_count += 1
-            print(f"  ✅ {func_name}")
+        return template.format(*names)
+    except IndexError:
+        return None
+
+
+def security_imports(module):
+    """Edits adding whatever the inserted blocks reference but the module does not import."""
+    wanted = [
+        ('getCurrentUser', './auth'),
+        ('canAccessSociete', './members'),
+        ('MembershipRole', '@prisma/client'),
+        ('prisma', '@/lib/prisma'),
+    ]
+    own = module.path.stem
+    return [
+        module.ensure_import(name, source)
+        for name, source in wanted
+        if not source.endswith(f"/{own}")
+    ]
+
+
+def make_patch(func_name, kind, table, expr, label, role):
+    @register_patch(f"security:{kind}", functions=[func_name])
+    def apply(fn, module):
+        if fn.body_contains(*SECURED_MARKERS):
+            return None  # Already secured
+
+        target = param_expr(fn, expr)
+        if target is None:
+            print(f"  ⚠️  {func_name}: signature changed ({len(fn.params)} params), skipped", file=sys.stderr)
+            return None
+
+        if kind == 'societe':
+            block = SOCIETE_BLOCK.format(societe_expr=target, role=role)
         else:
-            print(f"  ⏭️  {func_name} (already secured or not found)")
-    except Exception as e:
-        print(f"  ❌ {func_name}: {e}")
-
-# Write back
-if patch_count > 0:
-    print(f"\n💾 Writing {patch_count} patches...")
-    with open('src/app/actions.ts', 'w', encoding='utf-8') as f:
-        f.write(content)
-    
-    print(f"✅ Done! Patched {patch_count} functions")
-    print(f"📊 File size: {original_length} → {len(content)} (+{len(content)-original_length} bytes)")
-else:
-    print("\n⚠️  No patches applied (all functions already secured)")
-
-sys.exit(0)
+            if table:
+                lookup = f"await prisma.{table}.findUnique({{ where: {{ id: {target} }}, select: {{ societeId: true }} }})"
+            else:
+                lookup = GENERIC_LOOKUP.format(id=target)
+            block = RESOURCE_BLOCK.format(lookup=lookup, label=label, role=role)
+
+        return [fn.insert_at_body_start(module, block)] + security_imports(module)
+    return apply
+
+
+for patch in PATCHES:
+    make_patch(*patch)
+
+
+if __name__ == "__main__":
+    print("🔒 Securing server actions in src/lib/actions/...", file=sys.stderr)
+    sys.exit(main(description="Add membership checks to unprotected server actions"))
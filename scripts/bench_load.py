@@ -0,0 +1,312 @@
+#!/usr/bin/env python3
+"""
+🚦 BENCH LOAD - Concurrent scenario drivers against a running app
+
+Replays the main user paths with N concurrent virtual users against an app
+started on data seeded by bench_seed.py (`npm run build && npm start`), and
+writes p50/p95/p99 + throughput per scenario (see bench_report.py):
+
+    dashboard   fetchDashboardData (server action)
+    list        listInvoices, walking the keyset pages (+ 1 search in 5)
+    detail      fetchInvoiceDetails of a random invoice
+    pdf         GET /api/pdf/factures/:id (server-rendered PDF)
+    create      createInvoice with 3 lines (numbering, auto-created products)
+    cron        GET /api/cron/process-scheduled-emails
+
+Server actions are called like the browser does (POST + Next-Action header).
+Their ids are read from the build's server-reference-manifest.json, or from
+--action-ids (JSON {"listInvoices": "<id>", ...}) when the manifest has no
+export names.
+
+Usage:
+    python3 scripts/bench_load.py --label 100k --output results-100k.json
+    python3 scripts/bench_load.py --scenarios list,detail --concurrency 50 --duration 60
+    python3 scripts/bench_report.py results-10k.json results-100k.json
+"""
+
+import argparse
+import datetime
+import http.client
+import json
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from urllib.parse import urlsplit
+
+from bench_report import print_run, summarize
+from bench_seed import DEFAULT_MANIFEST, ID_PREFIX
+from ts_codemod import REPO_ROOT
+
+DEFAULT_ACTION_MANIFEST = REPO_ROOT / ".next" / "server" / "server-reference-manifest.json"
+SCENARIOS = ("dashboard", "list", "detail", "pdf", "create", "cron")
+ACTIONS = {"dashboard": "fetchDashboardData", "list": "listInvoices",
+           "detail": "fetchInvoiceDetails", "create": "createInvoice"}
+REQUEST_TIMEOUT_S = 60
+
+
+def route_for_worker(worker):
+    """'app/(dashboard)/factures/page' -> '/factures' (None for dynamic routes)."""
+    parts = [p for p in worker.split("/")[1:-1] if not (p.startswith("(") and p.endswith(")"))]
+    if any(p.startswith("[") for p in parts):
+        return None
+    return "/" + "/".join(parts)
+
+
+def load_action_ids(manifest_path, overrides_path, names=None):
+    """{exportedName: (actionId, page route)} for the given actions (default: the scenarios' ones)."""
+    wanted = set(names or ACTIONS.values())
+    found = {}
+    if overrides_path:
+        with open(overrides_path, encoding="utf-8") as f:
+            for name, action_id in json.load(f).items():
+                found[name] = (action_id, "/")
+    if os.path.exists(manifest_path):
+        with open(manifest_path, encoding="utf-8") as f:
+            manifest = json.load(f)
+        for action_id, entry in manifest.get("node", {}).items():
+            workers = entry.get("workers", {})
+            name = entry.get("exportedName") or next(
+                (w.get("exportedName") for w in workers.values() if isinstance(w, dict) and w.get("exportedName")), None)
+            if name not in wanted or name in found:
+                continue
+            routes = [r for r in map(route_for_worker, workers) if r]
+            found[name] = (action_id, routes[0] if routes else "/")
+    return found
+
+
+class Client:
+    """One keep-alive connection per virtual user."""
+
+    def __init__(self, base_url, cookie):
+        parts = urlsplit(base_url)
+        self.https = parts.scheme == "https"
+        self.host = parts.netloc
+        self.cookie = cookie
+        self.conn = None
+
+    def _connection(self):
+        if self.conn is None:
+            cls = http.client.HTTPSConnection if self.https else http.client.HTTPConnection
+            self.conn = cls(self.host, timeout=REQUEST_TIMEOUT_S)
+        return self.conn
+
+    def request(self, method, path, body=None, headers=None):
+        """(status, body bytes); reconnects once on a dropped keep-alive."""
+        all_headers = {"Cookie": self.cookie, **(headers or {})}
+        for attempt in (1, 2):
+            try:
+                conn = self._connection()
+                conn.request(method, path, body=body, headers=all_headers)
+                response = conn.getresponse()
+                return response.status, response.read()
+            except (http.client.HTTPException, ConnectionError, OSError):
+                self.conn = None
+                if attempt == 2:
+                    raise
+
+    def action(self, action, *args):
+        action_id, route = action
+        status, body = self.request("POST", route, body=json.dumps(args), headers={
+            "Next-Action": action_id,
+            "Content-Type": "text/plain;charset=UTF-8",
+            "Accept": "text/x-component",
+        })
+        return status, parse_action_result(body)
+
+
+def parse_action_result(body):
+    """Return value of a server action from its RSC payload (`<row>:<json>` lines)."""
+    result = None
+    for line in body.decode("utf-8", "replace").splitlines():
+        _, _, payload = line.partition(":")
+        if payload.startswith("{"):
+            try:
+                value = json.loads(payload)
+            except ValueError:
+                continue
+            if isinstance(value, dict) and "success" in value:
+                result = value
+    return result
+
+
+class Scenarios:
+    """Builds one request per call; state (cursors) lives in the virtual user."""
+
+    def __init__(self, data, actions, cron_secret):
+        self.data = data
+        self.actions = actions
+        self.cron_secret = cron_secret
+        self.scale = data["scale"]
+
+    def societe(self, rng):
+        return rng.choice(self.data["societes"])
+
+    def invoice_id(self, rng):
+        s = rng.randrange(self.scale["societes"])
+        return f"{ID_PREFIX}fac_{s}_{rng.randrange(self.scale['invoices'])}"
+
+    def action_ok(self, status, result):
+        return status == 200 and bool(result and result.get("success"))
+
+    def dashboard(self, client, rng, state):
+        return self.action_ok(*client.action(self.actions["fetchDashboardData"], self.data["user_id"], self.societe(rng)))
+
+    def list(self, client, rng, state):
+        if not state.get("cursor"):
+            state["societe"] = self.societe(rng)
+            state["search"] = f"Client 0{rng.randint(0, 9)}" if rng.random() < 0.2 else None
+        filters = {"search": state["search"]} if state["search"] else {}
+        status, result = client.action(self.actions["listInvoices"], state["societe"],
+                                       {"filters": filters, "cursor": state.get("cursor"), "limit": 50})
+        ok = self.action_ok(status, result)
+        state["cursor"] = result["data"]["nextCursor"] if ok else None
+        return ok
+
+    def detail(self, client, rng, state):
+        return self.action_ok(*client.action(self.actions["fetchInvoiceDetails"], self.invoice_id(rng)))
+
+    def pdf(self, client, rng, state):
+        status, _ = client.request("GET", f"/api/pdf/factures/{self.invoice_id(rng)}")
+        return status == 200
+
+    def create(self, client, rng, state):
+        s = rng.randrange(self.scale["societes"])
+        lines = [{
+            "nom": f"Bench line {rng.randint(1, 500)}",
+            "description": "Prestation",
+            "quantite": rng.randint(1, 5),
+            "prixUnitaire": round(rng.uniform(50, 500), 2),
+            "tva": 20,
+        } for _ in range(3)]
+        total_ht = sum(l["quantite"] * l["prixUnitaire"] for l in lines)
+        now = datetime.datetime.now(datetime.timezone.utc)
+        invoice = {
+            "numero": "",
+            "societeId": f"{ID_PREFIX}soc_{s}",
+            "clientId": f"{ID_PREFIX}cli_{s}_{rng.randrange(self.scale['clients'])}",
+            "dateEmission": now.isoformat(),
+            "echeance": (now + datetime.timedelta(days=30)).isoformat(),
+            "statut": "Brouillon",
+            "items": lines,
+            "totalHT": round(total_ht, 2),
+            "totalTTC": round(total_ht * 1.2, 2),
+        }
+        return self.action_ok(*client.action(self.actions["createInvoice"], invoice))
+
+    def cron(self, client, rng, state):
+        headers = {"Authorization": f"Bearer {self.cron_secret}"} if self.cron_secret else None
+        status, _ = client.request("GET", "/api/cron/process-scheduled-emails", headers=headers)
+        return status == 200
+
+
+def run_scenario(name, scenarios, args, cookie):
+    """Warm-up, then `concurrency` virtual users for `duration` seconds."""
+    step = getattr(scenarios, name)
+    samples = []
+    lock = threading.Lock()
+
+    def virtual_user(index, deadline, record):
+        client = Client(args.base_url, cookie)
+        rng = random.Random(f"{args.seed}:{name}:{index}")
+        state = {}
+        while time.monotonic() < deadline:
+            start = time.perf_counter()
+            try:
+                ok = step(client, rng, state)
+            except Exception:
+                ok = False
+            elapsed_ms = (time.perf_counter() - start) * 1000
+            if record:
+                with lock:
+                    samples.append((elapsed_ms, ok))
+
+    for phase, seconds, record in (("warm-up", args.warmup, False), ("measure", args.duration, True)):
+        if seconds <= 0:
+            continue
+        print(f"   {name}: {phase} {seconds}s × {args.concurrency} users", file=sys.stderr)
+        deadline = time.monotonic() + seconds
+        started = time.monotonic()
+        with ThreadPoolExecutor(max_workers=args.concurrency) as pool:
+            for i in range(args.concurrency):
+                pool.submit(virtual_user, i, deadline, record)
+        elapsed = time.monotonic() - started
+
+    return summarize(samples, elapsed)
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT,
+                              capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Run concurrent load scenarios against the app")
+    parser.add_argument("--base-url", default="http://localhost:3000")
+    parser.add_argument("--manifest", default=str(DEFAULT_MANIFEST), help="written by bench_seed.py")
+    parser.add_argument("--action-manifest", default=str(DEFAULT_ACTION_MANIFEST))
+    parser.add_argument("--action-ids", help='JSON file {"listInvoices": "<action id>", ...}')
+    parser.add_argument("--scenarios", default="dashboard,list,detail,create",
+                        help=f"comma-separated, among: {', '.join(SCENARIOS)}")
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--duration", type=int, default=30, help="measured seconds per scenario")
+    parser.add_argument("--warmup", type=int, default=5, help="unmeasured seconds per scenario")
+    parser.add_argument("--seed", default="bench")
+    parser.add_argument("--label", help="name of the run in reports")
+    parser.add_argument("--output", default="bench-results.json")
+    args = parser.parse_args(argv)
+
+    if args.duration < 1 or args.concurrency < 1:
+        parser.error("--duration and --concurrency must be at least 1")
+
+    names = [n.strip() for n in args.scenarios.split(",") if n.strip()]
+    unknown = [n for n in names if n not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenario(s): {', '.join(unknown)}")
+
+    with open(args.manifest, encoding="utf-8") as f:
+        data = json.load(f)
+
+    actions = load_action_ids(args.action_manifest, args.action_ids)
+    needed = {ACTIONS[n] for n in names if n in ACTIONS}
+    missing = sorted(needed - set(actions))
+    if missing:
+        print(f"❌ No action id for {', '.join(missing)}: build the app (npm run build) "
+              f"or pass --action-ids", file=sys.stderr)
+        return 1
+
+    scenarios = Scenarios(data, actions, os.environ.get("CRON_SECRET"))
+    cookie = f"session_userid={data['user_id']}"
+
+    print(f"🚦 {args.base_url} — {', '.join(names)} ({args.concurrency} users, {args.duration}s each)", file=sys.stderr)
+    run = {
+        "meta": {
+            "label": args.label,
+            "started_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+            "commit": git_commit(),
+            "base_url": args.base_url,
+            "concurrency": args.concurrency,
+            "duration_s": args.duration,
+            "scale": data["scale"],
+        },
+        "scenarios": {},
+    }
+    for name in names:
+        run["scenarios"][name] = run_scenario(name, scenarios, args, cookie)
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(run, f, indent=2, ensure_ascii=False)
+
+    print_run(run)
+    print(f"\n💾 {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
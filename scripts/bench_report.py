@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+📈 BENCH REPORT - Latency percentiles and run-to-run diffs
+
+Reads the JSON written by bench_load.py and prints, per scenario, request
+count, error rate, throughput and p50/p95/p99 latencies. Given two result
+files, prints the relative change of every metric and flags regressions
+above a threshold, so two runs (before / after a change, or 10k vs 100k
+invoices) can be compared.
+
+Usage:
+    python3 scripts/bench_report.py bench-results.json
+    python3 scripts/bench_report.py baseline.json candidate.json --threshold 10
+    python3 scripts/bench_report.py baseline.json candidate.json --fail-on-regression
+"""
+
+import argparse
+import json
+import math
+import sys
+
+PERCENTILES = (50, 95, 99)
+# Metrics where a higher value is worse
+LATENCY_METRICS = ("p50_ms", "p95_ms", "p99_ms", "max_ms", "error_rate")
+DEFAULT_THRESHOLD = 10.0
+
+
+def percentile(sorted_values, q):
+    """Linear interpolation between closest ranks (q in 0..100)."""
+    if not sorted_values:
+        return 0.0
+    if len(sorted_values) == 1:
+        return float(sorted_values[0])
+    rank = (len(sorted_values) - 1) * q / 100
+    low = math.floor(rank)
+    high = math.ceil(rank)
+    if low == high:
+        return float(sorted_values[low])
+    return sorted_values[low] + (sorted_values[high] - sorted_values[low]) * (rank - low)
+
+
+def summarize(samples, elapsed_s):
+    """
+    samples: list of (latency_ms, ok) for one scenario, elapsed_s: wall time of
+    the measured phase. Percentiles are over successful requests only.
+    """
+    latencies = sorted(ms for ms, ok in samples if ok)
+    errors = sum(1 for _, ok in samples if not ok)
+    count = len(samples)
+    summary = {
+        "requests": count,
+        "errors": errors,
+        "error_rate": round(errors / count, 4) if count else 0.0,
+        "throughput_rps": round(count / elapsed_s, 2) if elapsed_s > 0 else 0.0,
+        "mean_ms": round(sum(latencies) / len(latencies), 1) if latencies else 0.0,
+        "max_ms": round(latencies[-1], 1) if latencies else 0.0,
+    }
+    for q in PERCENTILES:
+        summary[f"p{q}_ms"] = round(percentile(latencies, q), 1)
+    return summary
+
+
+def load(path):
+    with open(path, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def print_run(run):
+    meta = run.get("meta", {})
+    print(f"📊 {meta.get('label') or 'run'} — {meta.get('started_at', '?')} "
+          f"(commit {meta.get('commit') or '?'}, concurrency {meta.get('concurrency', '?')}, "
+          f"scale {meta.get('scale') or '?'})\n")
+    print(f"{'scenario':<12} {'req':>7} {'err%':>6} {'rps':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'max':>8}")
+    for name, s in run["scenarios"].items():
+        print(f"{name:<12} {s['requests']:>7} {s['error_rate'] * 100:>5.1f}% {s['throughput_rps']:>8.1f} "
+              f"{s['p50_ms']:>8.1f} {s['p95_ms']:>8.1f} {s['p99_ms']:>8.1f} {s['max_ms']:>8.1f}")
+
+
+def relative_change(before, after):
+    if before == 0:
+        return 0.0 if after == 0 else math.inf
+    return (after - before) / before * 100
+
+
+def diff_runs(baseline, candidate, threshold):
+    """Rows of (scenario, metric, before, after, change %, regression)."""
+    rows = []
+    for name, after in candidate["scenarios"].items():
+        before = baseline["scenarios"].get(name)
+        if before is None:
+            continue
+        for metric in LATENCY_METRICS + ("throughput_rps",):
+            change = relative_change(before[metric], after[metric])
+            worse = change > threshold if metric in LATENCY_METRICS else change < -threshold
+            # Error rates: only flag an increase of at least one point
+            if metric == "error_rate":
+                worse = after[metric] - before[metric] >= 0.01
+            rows.append((name, metric, before[metric], after[metric], change, worse))
+    return rows
+
+
+def print_diff(baseline, candidate, rows):
+    print(f"🔍 {baseline['meta'].get('label') or 'baseline'} ➜ {candidate['meta'].get('label') or 'candidate'}\n")
+    print(f"{'scenario':<12} {'metric':<15} {'before':>10} {'after':>10} {'change':>9}")
+    for name, metric, before, after, change, worse in rows:
+        flag = "  ⚠️" if worse else ""
+        change_text = "new" if math.isinf(change) else f"{change:+.1f}%"
+        print(f"{name:<12} {metric:<15} {before:>10} {after:>10} {change_text:>9}{flag}")
+    missing = sorted(set(baseline["scenarios"]) ^ set(candidate["scenarios"]))
+    if missing:
+        print(f"\nOnly in one run: {', '.join(missing)}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Summarize or compare bench_load.py results")
+    parser.add_argument("results", nargs="+", help="one result file, or baseline + candidate")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="relative change (%%) reported as a regression")
+    parser.add_argument("--fail-on-regression", action="store_true", help="exit 1 when a regression is found")
+    args = parser.parse_args(argv)
+
+    if len(args.results) > 2:
+        parser.error("expected one result file, or a baseline and a candidate")
+
+    if len(args.results) == 1:
+        print_run(load(args.results[0]))
+        return 0
+
+    baseline, candidate = load(args.results[0]), load(args.results[1])
+    rows = diff_runs(baseline, candidate, args.threshold)
+    print_diff(baseline, candidate, rows)
+
+    regressions = [row for row in rows if row[5]]
+    if regressions:
+        print(f"\n⚠️  {len(regressions)} metric(s) regressed by more than {args.threshold:g}%")
+        return 1 if args.fail_on_regression else 0
+    print("\n✅ No regression")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+🌱 BENCH SEED - Synthetic data for load tests on a local Postgres
+
+Generates sociétés × clients × invoices × line items (plus products and
+quotes) with realistic distributions and streams them to `psql` with COPY,
+so 100k invoices load in seconds with flat memory:
+- invoice dates spread over --months, denser in recent months (growth);
+- statuses weighted like a live account (mostly Payée / Envoyée, some
+  Retard, Brouillon, Annulée...), payment dates for paid invoices;
+- a few clients carry most of the revenue (Zipf weights);
+- line counts around --items per document, 80% linked to a product.
+
+Every row id starts with `bench_`, so --reset removes exactly the seeded data.
+The bench user logs in with the `session_userid` cookie (see bench_load.py);
+its id and the seeded scale are written to --manifest.
+
+Refuses a non-local database unless --allow-remote is given.
+
+Usage:
+    python3 scripts/bench_seed.py --societes 2 --clients 500 --invoices 50000
+    python3 scripts/bench_seed.py --reset --societes 1 --invoices 100000 --items 6
+    python3 scripts/bench_seed.py --sql-out seed.sql      # COPY stream for `psql -f seed.sql`
+"""
+
+import argparse
+import csv
+import datetime
+import io
+import json
+import os
+import random
+import subprocess
+import sys
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+from ts_codemod import REPO_ROOT
+
+ID_PREFIX = "bench_"
+BENCH_USER_ID = f"{ID_PREFIX}user"
+BENCH_USER_EMAIL = "bench@example.com"
+BENCH_PASSWORD = "bench-password"  # Plain-text fallback of api/auth/login (dev data only)
+DEFAULT_MANIFEST = REPO_ROOT / "bench-data.json"
+LOCAL_HOSTS = {"localhost", "127.0.0.1", "::1", "db", "postgres"}
+
+FIRST_NUMBER = 20180258
+CHUNK_SIZE = 5000
+
+INVOICE_STATUSES = [
+    ("Payée", 55), ("Envoyée", 18), ("Retard", 8), ("Brouillon", 7),
+    ("Téléchargée", 5), ("Annulée", 4), ("Archivée", 3),
+]
+QUOTE_STATUSES = [
+    ("Accepté", 30), ("Facturé", 25), ("Envoyé", 20), ("Refusé", 10), ("Brouillon", 10), ("Archivé", 5),
+]
+TVA_RATES = [(20.0, 85), (10.0, 8), (5.5, 5), (0.0, 2)]
+CITIES = [
+    ("Paris", "75001"), ("Lyon", "69002"), ("Marseille", "13001"), ("Toulouse", "31000"),
+    ("Nice", "06000"), ("Nantes", "44000"), ("Bordeaux", "33000"), ("Lille", "59000"),
+]
+PRODUCT_KINDS = ["Développement", "Conseil", "Maintenance", "Formation", "Licence", "Hébergement", "Design", "Audit"]
+
+# Tables cleared by --reset, children first
+RESET_STATEMENTS = [
+    'DELETE FROM "HistoryEntry" WHERE "societeId" LIKE \'bench\\_%\' OR "userId" LIKE \'bench\\_%\'',
+    'DELETE FROM "Paiement" WHERE "factureId" LIKE \'bench\\_%\'',
+    'DELETE FROM "FactureItem" WHERE "factureId" IN (SELECT "id" FROM "Facture" WHERE "societeId" LIKE \'bench\\_%\')',
+    'DELETE FROM "DevisItem" WHERE "devisId" IN (SELECT "id" FROM "Devis" WHERE "societeId" LIKE \'bench\\_%\')',
+    'DELETE FROM "Facture" WHERE "societeId" LIKE \'bench\\_%\'',
+    'DELETE FROM "Devis" WHERE "societeId" LIKE \'bench\\_%\'',
+    'DELETE FROM "Client" WHERE "societeId" LIKE \'bench\\_%\'',
+    'DELETE FROM "Produit" WHERE "societeId" LIKE \'bench\\_%\'',
+    'DELETE FROM "InvoiceMonthlyRollup" WHERE "societeId" LIKE \'bench\\_%\'',
+    'DELETE FROM "Membership" WHERE "societeId" LIKE \'bench\\_%\'',
+    'DELETE FROM "_SocieteMembers" WHERE "A" LIKE \'bench\\_%\'',
+    'DELETE FROM "Societe" WHERE "id" LIKE \'bench\\_%\'',
+    'DELETE FROM "User" WHERE "id" LIKE \'bench\\_%\'',
+]
+
+
+def weighted(rng, choices):
+    values, weights = zip(*choices)
+    return rng.choices(values, weights)[0]
+
+
+def ts(value):
+    return value.strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+
+
+class CopyWriter:
+    """Writes `COPY ... FROM STDIN (FORMAT csv)` blocks to a text stream."""
+
+    def __init__(self, out):
+        self.out = out
+
+    def statement(self, sql):
+        self.out.write(sql.rstrip(";") + ";\n")
+
+    def copy(self, table, columns, rows):
+        cols = ", ".join(f'"{c}"' for c in columns)
+        self.out.write(f'COPY "{table}" ({cols}) FROM STDIN WITH (FORMAT csv);\n')
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        count = 0
+        for row in rows:
+            writer.writerow("" if v is None else v for v in row)
+            count += 1
+            if count % 1000 == 0:
+                self.out.write(buffer.getvalue())
+                buffer.seek(0)
+                buffer.truncate()
+        self.out.write(buffer.getvalue())
+        self.out.write("\\.\n")
+        return count
+
+
+class Generator:
+    def __init__(self, args):
+        self.args = args
+        self.now = datetime.datetime.now(datetime.timezone.utc).replace(tzinfo=None)
+        self.counts = {"societes": 0, "clients": 0, "products": 0, "invoices": 0, "invoice_items": 0,
+                       "quotes": 0, "quote_items": 0}
+
+    # --- Identity -------------------------------------------------------
+
+    def societe_id(self, s):
+        return f"{ID_PREFIX}soc_{s}"
+
+    def write_accounts(self, w):
+        now = ts(self.now)
+        societes = [self.societe_id(s) for s in range(self.args.societes)]
+        w.copy("User", ["id", "email", "password", "fullName", "emailVerified", "currentSocieteId", "createdAt", "updatedAt"],
+               [(BENCH_USER_ID, BENCH_USER_EMAIL, BENCH_PASSWORD, "Bench User", "true", societes[0], now, now)])
+        self.counts["societes"] = w.copy("Societe", ["id", "nom", "email", "createdAt", "updatedAt"],
+                                         ((sid, f"Bench Société {i + 1}", f"contact+{i}@bench.example.com", now, now)
+                                          for i, sid in enumerate(societes)))
+        w.copy("Membership", ["id", "userId", "societeId", "role", "status", "createdAt", "updatedAt"],
+               ((f"{ID_PREFIX}mem_{i}", BENCH_USER_ID, sid, "OWNER", "active", now, now) for i, sid in enumerate(societes)))
+        w.copy("_SocieteMembers", ["A", "B"], ((sid, BENCH_USER_ID) for sid in societes))
+
+    # --- Per société ----------------------------------------------------
+
+    def write_societe(self, w, s):
+        rng = random.Random(f"{self.args.seed}:{s}")
+        sid = self.societe_id(s)
+        now = ts(self.now)
+
+        clients = [f"{ID_PREFIX}cli_{s}_{c}" for c in range(self.args.clients)]
+        self.counts["clients"] += w.copy(
+            "Client", ["id", "societeId", "nom", "email", "ville", "codePostal", "createdAt", "updatedAt"],
+            ((cid, sid, f"Client {c + 1:05d}", f"client{c}@bench.example.com", *rng.choice(CITIES), now, now)
+             for c, cid in enumerate(clients)))
+        client_weights = [1 / (rank + 1) for rank in range(len(clients))]
+
+        products = []
+        for p in range(self.args.products):
+            products.append((f"{ID_PREFIX}prod_{s}_{p}", f"{PRODUCT_KINDS[p % len(PRODUCT_KINDS)]} {p + 1:03d}",
+                             round(rng.lognormvariate(4.5, 0.8), 2), weighted(rng, TVA_RATES)))
+        self.counts["products"] += w.copy(
+            "Produit", ["id", "societeId", "nom", "description", "prixUnitaire", "tva", "createdAt", "updatedAt"],
+            ((pid, sid, nom, "", price, tva, now, now) for pid, nom, price, tva in products))
+
+        self.write_documents(w, rng, sid, s, clients, client_weights, products, quotes=False)
+        self.write_documents(w, rng, sid, s, clients, client_weights, products, quotes=True)
+
+    def emission_date(self, rng):
+        # Triangular with the mode on today: more documents in recent months
+        span_days = self.args.months * 30
+        days_ago = rng.triangular(0, span_days, 0)
+        return self.now - datetime.timedelta(days=days_ago, seconds=rng.randint(0, 86399))
+
+    def lines(self, rng, products):
+        count = max(1, min(int(rng.expovariate(1 / self.args.items)) + 1, self.args.items * 4))
+        for position in range(count):
+            quantity = float(rng.choice([1, 1, 1, 2, 3, 5, 10]))
+            if products and rng.random() < 0.8:
+                pid, nom, price, tva = rng.choice(products)
+            else:
+                pid, nom, price, tva = None, f"Prestation {rng.randint(1, 9999)}", round(rng.uniform(20, 900), 2), 20.0
+            yield position, pid, nom, quantity, price, tva, round(quantity * price, 2)
+
+    def write_documents(self, w, rng, sid, s, clients, client_weights, products, quotes):
+        total = self.args.quotes if quotes else self.args.invoices
+        table, item_table, parent_col = ("Devis", "DevisItem", "devisId") if quotes else ("Facture", "FactureItem", "factureId")
+        kind = "dev" if quotes else "fac"
+        doc_columns = (["id", "societeId", "clientId", "numero", "dateEmission", "dateValidite", "statut",
+                        "totalHT", "totalTTC", "createdAt", "updatedAt"] if quotes else
+                       ["id", "societeId", "clientId", "numero", "dateEmission", "dateEcheance", "datePaiement",
+                        "statut", "totalHT", "totalTTC", "isLocked", "archivedAt", "createdAt", "updatedAt"])
+        item_columns = ["id", parent_col, "produitId", "description", "quantite", "prixUnitaire", "tva",
+                        "montantHT", "position", "type", "createdAt", "updatedAt"]
+
+        # Numbers follow the emission order, like a real account
+        first_quote_number = int(f"{self.now:%y}010001")
+        for start in range(0, total, CHUNK_SIZE):
+            size = min(CHUNK_SIZE, total - start)
+            dates = sorted(self.emission_date(rng) for _ in range(size))
+            docs, items = [], []
+            for offset, emitted in enumerate(dates):
+                n = start + offset
+                doc_id = f"{ID_PREFIX}{kind}_{s}_{n}"
+                client_id = rng.choices(clients, client_weights)[0]
+                total_ht = total_ttc = 0.0
+                for position, pid, nom, qty, price, tva, amount in self.lines(rng, products):
+                    items.append((f"{doc_id}_{position}", doc_id, pid, nom, qty, price, tva, amount, position,
+                                  "produit" if pid else "service", ts(emitted), ts(emitted)))
+                    total_ht += amount
+                    total_ttc += amount * (1 + tva / 100)
+                number = str((first_quote_number if quotes else FIRST_NUMBER) + n)
+                if quotes:
+                    status = weighted(rng, QUOTE_STATUSES)
+                    docs.append((doc_id, sid, client_id, number, ts(emitted),
+                                 ts(emitted + datetime.timedelta(days=30)), status,
+                                 round(total_ht, 2), round(total_ttc, 2), ts(emitted), ts(emitted)))
+                else:
+                    status = weighted(rng, INVOICE_STATUSES)
+                    due = emitted + datetime.timedelta(days=30)
+                    if status in ("Envoyée", "Retard"):
+                        status = "Retard" if due < self.now else "Envoyée"
+                    paid_at = min(emitted + datetime.timedelta(days=rng.randint(0, 45)), self.now)
+                    paid = ts(paid_at) if status == "Payée" else None
+                    archived = ts(emitted + datetime.timedelta(days=90)) if status == "Archivée" else None
+                    docs.append((doc_id, sid, client_id, number, ts(emitted), ts(due), paid, status,
+                                 round(total_ht, 2), round(total_ttc, 2), "true" if status == "Archivée" else "false",
+                                 archived, ts(emitted), ts(emitted)))
+
+            self.counts["quotes" if quotes else "invoices"] += w.copy(table, doc_columns, docs)
+            self.counts["quote_items" if quotes else "invoice_items"] += w.copy(item_table, item_columns, items)
+            print(f"   → {self.societe_id(s)}: {start + size}/{total} {table}", file=sys.stderr)
+
+    def write(self, out):
+        w = CopyWriter(out)
+        out.write("\\set ON_ERROR_STOP on\n")
+        w.statement("BEGIN")
+        if self.args.reset:
+            for sql in RESET_STATEMENTS:
+                w.statement(sql)
+        self.write_accounts(w)
+        for s in range(self.args.societes):
+            self.write_societe(w, s)
+        w.statement("COMMIT")
+        for table in ("Facture", "FactureItem", "Devis", "DevisItem", "Client", "Produit"):
+            w.statement(f'ANALYZE "{table}"')
+
+
+def psql_target(database_url):
+    """psql-compatible URL (Prisma's ?schema= is not a libpq parameter) and its schema."""
+    parts = urlsplit(database_url)
+    query = dict(parse_qsl(parts.query))
+    schema = query.pop("schema", "public")
+    return urlunsplit(parts._replace(query=urlencode(query))), schema, parts.hostname
+
+
+def write_manifest(path, args, counts):
+    manifest = {
+        "user_id": BENCH_USER_ID,
+        "email": BENCH_USER_EMAIL,
+        "societes": [f"{ID_PREFIX}soc_{s}" for s in range(args.societes)],
+        "scale": {
+            "societes": args.societes, "clients": args.clients, "products": args.products,
+            "invoices": args.invoices, "quotes": args.quotes, "items": args.items, "months": args.months,
+        },
+        "counts": counts,
+        "seed": args.seed,
+        "seeded_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+    }
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, ensure_ascii=False)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Seed a local Postgres with synthetic invoicing data")
+    parser.add_argument("--database-url", default=os.environ.get("DATABASE_URL"), help="defaults to $DATABASE_URL")
+    parser.add_argument("--societes", type=int, default=1)
+    parser.add_argument("--clients", type=int, default=200, help="clients per société")
+    parser.add_argument("--products", type=int, default=50, help="products per société")
+    parser.add_argument("--invoices", type=int, default=10000, help="invoices per société")
+    parser.add_argument("--quotes", type=int, default=2000, help="quotes per société")
+    parser.add_argument("--items", type=int, default=4, help="mean line items per document")
+    parser.add_argument("--months", type=int, default=36, help="history depth of the documents")
+    parser.add_argument("--seed", default="bench", help="random seed (same seed, same data)")
+    parser.add_argument("--reset", action="store_true", help="delete previously seeded bench_ rows first")
+    parser.add_argument("--manifest", default=str(DEFAULT_MANIFEST), help="where to write the seeded ids/scale")
+    parser.add_argument("--sql-out", help="write the SQL/COPY stream to this file instead of running psql")
+    parser.add_argument("--allow-remote", action="store_true", help="allow a non-local database host")
+    args = parser.parse_args(argv)
+
+    if min(args.societes, args.clients, args.invoices, args.items) < 1 or args.quotes < 0 or args.products < 0:
+        parser.error("scale arguments must be positive")
+
+    generator = Generator(args)
+    print(f"🌱 Seeding {args.societes} société(s) × {args.clients} clients × {args.invoices} invoices "
+          f"(~{args.items} lines) + {args.quotes} quotes", file=sys.stderr)
+
+    if args.sql_out:
+        with open(args.sql_out, "w", encoding="utf-8") as out:
+            generator.write(out)
+        print(f"✅ SQL written to {args.sql_out}", file=sys.stderr)
+    else:
+        if not args.database_url:
+            parser.error("--database-url or $DATABASE_URL is required")
+        url, schema, host = psql_target(args.database_url)
+        if host not in LOCAL_HOSTS and not args.allow_remote:
+            parser.error(f"refusing to seed non-local host {host!r} (use --allow-remote)")
+
+        proc = subprocess.Popen(["psql", url, "-q", "-X"], stdin=subprocess.PIPE, text=True, encoding="utf-8")
+        try:
+            proc.stdin.write(f"SET search_path TO \"{schema}\";\n")
+            generator.write(proc.stdin)
+            proc.stdin.close()
+        except BrokenPipeError:
+            pass
+        if proc.wait() != 0:
+            print("❌ psql failed, nothing was committed", file=sys.stderr)
+            return 1
+
+    write_manifest(args.manifest, args, generator.counts)
+    print(f"🎉 Seeded {json.dumps(generator.counts)}\n   Manifest: {args.manifest}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
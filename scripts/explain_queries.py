@@ -0,0 +1,335 @@
+#!/usr/bin/env python3
+"""
+🔬 EXPLAIN QUERIES - Query-plan regression checker for the Prisma access patterns
+
+Measures, instead of guessing, what the hot paths cost on a seeded database:
+
+1. Capture: the app runs with PRISMA_QUERY_LOG=<file> (src/lib/prisma.ts
+   appends every SQL statement Prisma sends, with its params). Each access
+   pattern below is triggered once, sequentially, through the same HTTP calls
+   as bench_load.py; the lines appended meanwhile belong to that pattern.
+2. Explain: every distinct statement runs under
+   EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) through psql, inside a transaction
+   that is rolled back (writes included).
+3. Flags: sequential scans reading more than --seq-scan-rows rows, sorts and
+   hashes spilling to disk, row estimates off by more than --misestimate.
+4. Fingerprints: the plan shape (node types, relations, indexes; no costs)
+   is hashed per statement and compared with --baseline, so a schema, index
+   or query change shows as a plan diff. --update-baseline records the run.
+
+Usage:
+    PRISMA_QUERY_LOG=/tmp/queries.jsonl npm start         # app on seeded data (bench_seed.py)
+    python3 scripts/explain_queries.py --capture-file /tmp/queries.jsonl
+    python3 scripts/explain_queries.py --capture-file /tmp/queries.jsonl --update-baseline
+    python3 scripts/explain_queries.py --capture-file /tmp/queries.jsonl --fail-on-diff --json
+"""
+
+import argparse
+import datetime
+import hashlib
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+
+from bench_load import Client, DEFAULT_ACTION_MANIFEST, load_action_ids
+from bench_seed import DEFAULT_MANIFEST, ID_PREFIX, psql_target
+from ts_codemod import REPO_ROOT
+
+DEFAULT_BASELINE = REPO_ROOT / "prisma" / "query-plans.json"
+DEFAULT_SEQ_SCAN_ROWS = 1000
+DEFAULT_MISESTIMATE = 10.0
+SETTLE_S = 0.5  # Lets the last query events of a call reach the capture file
+
+# Statements with no plan
+SKIPPED = re.compile(r"^\s*(BEGIN|COMMIT|ROLLBACK|DEALLOCATE|SET|SHOW|SAVEPOINT|RELEASE)\b", re.IGNORECASE)
+
+
+def month_range():
+    end = datetime.datetime.now(datetime.timezone.utc)
+    return {"start": (end - datetime.timedelta(days=365)).isoformat(), "end": end.isoformat()}
+
+
+# name -> (server action, arguments built from the bench manifest) or (GET, path)
+def access_patterns(data):
+    societe = data["societes"][0]
+    invoice = f"{ID_PREFIX}fac_0_{data['scale']['invoices'] // 2}"
+    since = (datetime.datetime.now(datetime.timezone.utc) - datetime.timedelta(hours=1)).isoformat()
+    return {
+        "dashboard": ("fetchDashboardData", [data["user_id"], societe]),
+        "metrics": ("fetchDashboardMetrics", [societe, month_range()]),
+        "overdue": ("GET", "/api/cron/update-overdue-invoices?full=1"),
+        "list": ("listInvoices", [societe, {"filters": {}, "limit": 50}]),
+        "search": ("listInvoices", [societe, {"filters": {"search": "Client 0004"}, "limit": 50}]),
+        "detail": ("fetchInvoiceDetails", [invoice]),
+        "changes": ("fetchChanges", [societe, since]),
+        "cron": ("GET", "/api/cron/process-scheduled-emails"),
+    }
+
+
+# --- Capture -----------------------------------------------------------------
+
+def capture(patterns, names, client, actions, capture_file):
+    """{pattern: [{query, params}]} — distinct statements emitted by each call."""
+    captured = {}
+    for name in names:
+        target, args = patterns[name]
+        offset = os.path.getsize(capture_file) if os.path.exists(capture_file) else 0
+        if target == "GET":
+            secret = os.environ.get("CRON_SECRET")
+            status, _ = client.request("GET", args, headers={"Authorization": f"Bearer {secret}"} if secret else None)
+        else:
+            status, _ = client.action(actions[target], *args)
+        time.sleep(SETTLE_S)
+
+        statements, seen = [], set()
+        with open(capture_file, encoding="utf-8") as f:
+            f.seek(offset)
+            for line in f:
+                event = json.loads(line)
+                if SKIPPED.match(event["query"]) or event["query"] in seen:
+                    continue
+                seen.add(event["query"])
+                statements.append(event)
+        print(f"   {name}: HTTP {status}, {len(statements)} statement(s)", file=sys.stderr)
+        captured[name] = statements
+    return captured
+
+
+# --- Explain -----------------------------------------------------------------
+
+def sql_literal(value):
+    if value is None:
+        return "NULL"
+    if isinstance(value, bool):
+        return "'true'" if value else "'false'"
+    if isinstance(value, (list, dict)):
+        value = json.dumps(value)
+    return "'" + str(value).replace("'", "''") + "'"
+
+
+def parse_params(raw):
+    try:
+        params = json.loads(raw or "[]")
+        return params if isinstance(params, list) else [params]
+    except ValueError:
+        return None
+
+
+def explain(database_url, statement):
+    """Plan JSON (root object with Plan / Execution Time), or raises RuntimeError."""
+    params = parse_params(statement.get("params"))
+    if params is None:
+        raise RuntimeError("unparseable params")
+    url, schema, _ = psql_target(database_url)
+    execute = f"EXECUTE bench_q({', '.join(map(sql_literal, params))})" if params else "EXECUTE bench_q"
+    script = "\n".join([
+        "\\set ON_ERROR_STOP on",
+        "BEGIN;",
+        f'SET LOCAL search_path TO "{schema}";',
+        f"PREPARE bench_q AS {statement['query']};",
+        f"EXPLAIN (ANALYZE, BUFFERS, FORMAT JSON) {execute};",
+        "ROLLBACK;",
+    ])
+    proc = subprocess.run(["psql", url, "-X", "-q", "-A", "-t"], input=script, text=True, capture_output=True)
+    if proc.returncode != 0:
+        raise RuntimeError(proc.stderr.strip().splitlines()[-1] if proc.stderr.strip() else "psql failed")
+    return json.loads(proc.stdout)[0]
+
+
+def walk(node, depth=0):
+    yield node, depth
+    for child in node.get("Plans", []):
+        yield from walk(child, depth + 1)
+
+
+def node_label(node):
+    label = node["Node Type"]
+    if node.get("Relation Name"):
+        label += f" on {node['Relation Name']}"
+    if node.get("Index Name"):
+        label += f" using {node['Index Name']}"
+    return label
+
+
+def plan_shape(plan):
+    return [f"{'  ' * depth}{node_label(node)}" for node, depth in walk(plan["Plan"])]
+
+
+def fingerprint(shape):
+    return hashlib.sha1("\n".join(shape).encode("utf-8")).hexdigest()[:12]
+
+
+def findings(plan, seq_scan_rows, misestimate):
+    issues = []
+    for node, _ in walk(plan["Plan"]):
+        loops = node.get("Actual Loops", 1) or 1
+        actual = node.get("Actual Rows", 0) * loops
+        planned = node.get("Plan Rows", 0) * loops
+        if node["Node Type"] == "Seq Scan":
+            read = actual + node.get("Rows Removed by Filter", 0) * loops
+            if read >= seq_scan_rows:
+                issues.append(f"seq scan on {node.get('Relation Name')} read {read} rows"
+                              + (f" (filter: {node['Filter']})" if node.get("Filter") else ""))
+        if node.get("Sort Space Type") == "Disk":
+            issues.append(f"sort spilled to disk ({node.get('Sort Space Used')} kB, key {node.get('Sort Key')})")
+        if node.get("Hash Batches", 1) > 1:
+            issues.append(f"hash spilled to disk ({node['Hash Batches']} batches)")
+        if max(actual, planned) >= 100:
+            ratio = (max(actual, planned) + 1) / (min(actual, planned) + 1)
+            if ratio >= misestimate:
+                issues.append(f"{node_label(node)}: estimated {planned} rows, got {actual} (x{ratio:.0f})")
+    return issues
+
+
+def statement_key(query):
+    # Same statement with a different IN (...) arity is the same access pattern
+    normalized = re.sub(r"\$\d+(\s*,\s*\$\d+)*", "$n", query)
+    return hashlib.sha1(normalized.encode("utf-8")).hexdigest()[:12]
+
+
+def analyze(captured, database_url, seq_scan_rows, misestimate):
+    report = {}
+    for name, statements in captured.items():
+        entries = {}
+        for statement in statements:
+            key = statement_key(statement["query"])
+            if key in entries:
+                continue
+            entry = {"query": statement["query"], "captured_ms": statement.get("durationMs")}
+            try:
+                plan = explain(database_url, statement)
+                shape = plan_shape(plan)
+                buffers = plan["Plan"]
+                entry.update({
+                    "fingerprint": fingerprint(shape),
+                    "shape": shape,
+                    "execution_ms": round(plan.get("Execution Time", 0), 2),
+                    "shared_hit": buffers.get("Shared Hit Blocks", 0),
+                    "shared_read": buffers.get("Shared Read Blocks", 0),
+                    "issues": findings(plan, seq_scan_rows, misestimate),
+                })
+            except (RuntimeError, ValueError) as e:
+                entry["error"] = str(e)
+            entries[key] = entry
+        report[name] = entries
+    return report
+
+
+# --- Baseline diff -------------------------------------------------------------
+
+def diff_baseline(report, baseline):
+    changes = []
+    for name, entries in report.items():
+        before = baseline.get("patterns", {}).get(name, {})
+        for key, entry in entries.items():
+            old = before.get(key)
+            if old is None:
+                changes.append((name, key, "new statement", None, entry.get("shape")))
+            elif old.get("fingerprint") != entry.get("fingerprint"):
+                changes.append((name, key, "plan changed", old.get("shape"), entry.get("shape")))
+        for key in before.keys() - entries.keys():
+            changes.append((name, key, "statement gone", before[key].get("shape"), None))
+    return changes
+
+
+def print_report(report, changes):
+    for name, entries in report.items():
+        print(f"\n📌 {name}")
+        for key, entry in entries.items():
+            query = " ".join(entry["query"].split())[:110]
+            if "error" in entry:
+                print(f"   [{key}] ❓ {entry['error']}\n      {query}")
+                continue
+            flag = "⚠️ " if entry["issues"] else "✅"
+            print(f"   [{key}] {flag} {entry['execution_ms']:>8.2f} ms  hit {entry['shared_hit']:>6} "
+                  f"read {entry['shared_read']:>6}  {entry['fingerprint']}\n      {query}")
+            for issue in entry["issues"]:
+                print(f"      - {issue}")
+
+    if changes:
+        print(f"\n🔀 {len(changes)} plan change(s) vs baseline")
+        for name, key, kind, old, new in changes:
+            print(f"   {name} [{key}]: {kind}")
+            for line in old or []:
+                print(f"      - {line}")
+            for line in new or []:
+                print(f"      + {line}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="EXPLAIN ANALYZE the SQL of the main access patterns")
+    parser.add_argument("--capture-file", required=True, help="PRISMA_QUERY_LOG file of the running app")
+    parser.add_argument("--base-url", default="http://localhost:3000")
+    parser.add_argument("--database-url", default=os.environ.get("DATABASE_URL"), help="defaults to $DATABASE_URL")
+    parser.add_argument("--manifest", default=str(DEFAULT_MANIFEST), help="written by bench_seed.py")
+    parser.add_argument("--action-manifest", default=str(DEFAULT_ACTION_MANIFEST))
+    parser.add_argument("--action-ids", help='JSON file {"listInvoices": "<action id>", ...}')
+    parser.add_argument("--patterns", help="comma-separated subset (default: all)")
+    parser.add_argument("--seq-scan-rows", type=int, default=DEFAULT_SEQ_SCAN_ROWS)
+    parser.add_argument("--misestimate", type=float, default=DEFAULT_MISESTIMATE,
+                        help="flag row estimates off by this factor")
+    parser.add_argument("--baseline", default=str(DEFAULT_BASELINE))
+    parser.add_argument("--update-baseline", action="store_true", help="write this run as the new baseline")
+    parser.add_argument("--fail-on-diff", action="store_true", help="exit 1 on plan changes or flagged plans")
+    parser.add_argument("--json", action="store_true", help="print the full report as JSON")
+    args = parser.parse_args(argv)
+
+    if not args.database_url:
+        parser.error("--database-url or $DATABASE_URL is required")
+
+    with open(args.manifest, encoding="utf-8") as f:
+        data = json.load(f)
+    patterns = access_patterns(data)
+    names = [n.strip() for n in args.patterns.split(",")] if args.patterns else list(patterns)
+    unknown = [n for n in names if n not in patterns]
+    if unknown:
+        parser.error(f"unknown pattern(s): {', '.join(unknown)} (known: {', '.join(patterns)})")
+
+    action_names = {patterns[n][0] for n in names} - {"GET"}
+    actions = load_action_ids(args.action_manifest, args.action_ids, action_names)
+    missing = sorted(action_names - set(actions))
+    if missing:
+        print(f"❌ No action id for {', '.join(missing)}: build the app or pass --action-ids", file=sys.stderr)
+        return 1
+
+    print(f"🔬 Capturing {len(names)} access pattern(s) from {args.base_url}", file=sys.stderr)
+    client = Client(args.base_url, f"session_userid={data['user_id']}")
+    captured = capture(patterns, names, client, actions, args.capture_file)
+    report = analyze(captured, args.database_url, args.seq_scan_rows, args.misestimate)
+
+    baseline = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    changes = diff_baseline(report, baseline) if baseline else []
+
+    if args.json:
+        json.dump({"patterns": report, "changes": [
+            {"pattern": c[0], "statement": c[1], "change": c[2], "before": c[3], "after": c[4]} for c in changes
+        ]}, sys.stdout, indent=2, ensure_ascii=False)
+        print()
+    else:
+        print_report(report, changes)
+
+    if args.update_baseline:
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({
+                "recorded_at": datetime.datetime.now(datetime.timezone.utc).isoformat(timespec="seconds"),
+                "scale": data["scale"],
+                "patterns": {name: {key: {k: e.get(k) for k in ("query", "fingerprint", "shape")}
+                                    for key, e in entries.items() if "error" not in e}
+                             for name, entries in report.items()},
+            }, f, indent=2, ensure_ascii=False)
+        print(f"\n💾 Baseline written to {args.baseline}", file=sys.stderr)
+
+    flagged = sum(1 for entries in report.values() for e in entries.values() if e.get("issues"))
+    if args.fail_on_diff and (changes or flagged):
+        return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
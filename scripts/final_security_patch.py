@@ -2,142 +2,113 @@
 """
 🔒 FINAL SECURITY PATCHER - Complete All Remaining Actions
 Secures ALL remaining unprotected server actions
+
+Runs on the ts_codemod engine (single pass over src/lib/actions/). Also
+exposes `access_check_status`, the classification used to decide whether an
+exported action already verifies the caller.
+
+Usage:
+    python3 scripts/final_security_patch.py [--dry-run]
 """
 
-import re
+import sys
+
+from ts_codemod import main, register_patch
 
-def add_security_check_before_function_body(content, func_name, id_param, table_name=None):
-    """Add security check to a function that takes an ID parameter"""
-    
-    security_block = f"""        // 🔒 SECURITY: Verify access
-        const userRes = await getCurrentUser();
-        if (!userRes.success || !userRes.data) return {{ success: false, error: "Non authentifié" }};
+# Helpers that perform the membership check themselves
+ACCESS_HELPERS = ("canAccessSociete", "withSocieteAccessWrapper")
+AUTH_HELPERS = ("getCurrentUser",)
+
+AUTH_BLOCK = """
+// 🔒 SECURITY: Verify access
+const userRes = await getCurrentUser();
+if (!userRes.success || !userRes.data) return {{ success: false, error: "Non authentifié" }};
 """
-    
-    if table_name:
-        security_block += f"""        
-        const existing = await prisma.{table_name}.findUnique({{ 
-            where: {{ id: {id_param} }},
-            select: {{ societeId: true }}
-        }});
-        if (!existing) return {{ success: false, error: "Enregistrement introuvable" }};
-        
-        const hasAccess = await prisma.societe.findFirst({{ 
-            where: {{ id: existing.societeId, members: {{ some: {{ id: userRes.data.id }} }} }} 
-        }});
-        if (!hasAccess) return {{ success: false, error: "Accès refusé" }};
 
+LOOKUP_BLOCK = """
+const existing = await prisma.{table}.findUnique({{ where: {{ id: {id_expr} }}, select: {{ societeId: true }} }});
+if (!existing) return {{ success: false, error: "Enregistrement introuvable" }};
+
+const authorized = await canAccessSociete(userRes.data.id, existing.societeId, MembershipRole.EDITOR);
+if (!authorized) return {{ success: false, error: "Accès refusé" }};
 """
-    
-    # Pattern: find the function and insert after 'try {'
-    pattern = rf'(export async function {func_name}\([^{{]+\{{[^\{{]*try \{{)'
-    
-    def replacement(match):
-        # Check if already has security
-        next_300_chars = content[match.end():match.end()+300]
-        if '🔒 SECURITY' in next_300_chars or 'getCurrentUser()' in next_300_chars:
-            return match.group(0)
-        return match.group(1) + '\n' + security_block
-    
-    return re.sub(pattern, replacement, content, count=1)
-
-def fix_param_names(content):
-    """Fix parameter name mismatches in security blocks"""
-    
-    # Fix toggleInvoiceLock/toggleQuoteLock parameter names
-    fixes = [
-        # toggleInvoiceLock
-        (r'(export async function toggleInvoiceLock\(id: string[^)]*\).*?where: \{ id: )(id)(\s*\})',
-         r'\1id\3'),
-        
-        # toggleQuoteLock  
-        (r'(export async function toggleQuoteLock\(id: string[^)]*\).*?where: \{ id: )(id)(\s*\})',
-         r'\1id\3'),
-    ]
-    
-    for pattern, replacement in fixes:
-        content = re.sub(pattern, replacement, content, flags=re.DOTALL)
-    
-    return content
-
-# Read file
-print("📖 Reading src/app/actions.ts...")
-with open('src/app/actions.ts', 'r', encoding='utf-8') as f:
-    content = f.read()
-
-original_length = len(content)
-patch_count = 0
-
-# Define all remaining patches
-remaining_patches = [
-    # Toggle locks (have security but wrong param)
-    ('toggleInvoiceLock', 'id', 'facture'),
-    ('toggleQuoteLock', 'id', 'devis'),
-    
+
+
+def called_functions(fn):
+    """Names of functions called directly in the body (ident followed by '(')."""
+    body = [t for t in fn.body_tokens() if t.kind != "comment"]
+    return {
+        tok.value for tok, nxt in zip(body, body[1:])
+        if tok.kind == "ident" and nxt.value == "("
+    }
+
+
+def access_check_status(fn, exported=None):
+    """Classify an action: 'secured' (auth + membership), 'auth-only',
+    'delegated' (forwards to a secured exported action) or 'unsecured'."""
+    calls = called_functions(fn)
+    if calls & set(ACCESS_HELPERS) or fn.body_contains("🔒 SECURITY"):
+        return "secured"
+    if exported:
+        for name in calls:
+            target = exported.get(name)
+            if target is not None and target is not fn and access_check_status(target) == "secured":
+                return "delegated"
+    if calls & set(AUTH_HELPERS):
+        return "auth-only"
+    return "unsecured"
+
+
+# (function, id parameter index or None, table or None)
+REMAINING_PATCHES = [
+    # Toggle locks (param names now come from the index, no renaming pass needed)
+    ('toggleInvoiceLock', 0, 'facture'),
+    ('toggleQuoteLock', 0, 'devis'),
+
     # Import functions
-    ('importInvoice', None, None),  # Special handling needed
+    ('importInvoice', None, None),
     ('importQuote', None, None),
-    
+
     # Dashboard metrics (already has societeId param, just needs check)
     ('fetchDashboardMetrics', None, None),
-    
+
     # History functions
-    ('fetchHistory', None, None),  # Has societeId param
+    ('fetchHistory', None, None),
     ('createHistoryEntry', None, None),
-    
+
     # Email functions (check via invoice/quote)
     ('sendEmail', None, None),
     ('scheduleEmail', None, None),
 ]
 
-# Apply security checks
-for func_name, id_param, table in remaining_patches:
-    try:
-        # Check if function exists
-        if f'export async function {func_name}' not in content:
-            print(f"  ⏭️  {func_name} (not found or not exported)")
-            continue
-        
-        # Check if already secured
-        func_pattern = rf'export async function {func_name}\([^{{]+\{{'
-        match = re.search(func_pattern, content)
-        if match:
-            next_300 = content[match.end():match.end()+300]
-            if '🔒 SECURITY' in next_300:
-                print(f"  ✅ {func_name} (already secured)")
-                continue
-        
-        new_content = add_security_check_before_function_body(content, func_name, id_param, table)
-        if len(new_content) > len(content):
-            content = new_content
-            patch_count += 1
-            print(f"  ✅ {func_name}")
-        else:
-            print(f"  ⚠️  {func_name} (pattern not matched)")
-    
-    except Exception as e:
-        print(f"  ❌ {func_name}: {e}")
-
-# Fix parameter name issues
-print("\n🔧 Fixing parameter names...")
-content = fix_param_names(content)
-
-# Fix null vs undefined type issues in deleteRecord
-content = content.replace(
-    'let societeId: string | null = null;',
-    'let societeId: string | undefined = undefined;'
-)
-content = content.replace('societeId = record?.societeId || null;', 'societeId = record?.societeId;')
-
-# Write back
-if patch_count > 0 or 'string | null' in original_length:
-    print(f"\n💾 Writing changes...")
-    with open('src/app/actions.ts', 'w', encoding='utf-8') as f:
-        f.write(content)
-    
-    print(f"✅ Done! Patched {patch_count} functions")
-    print(f"📊 File size: {original_length} → {len(content)} (+{len(content)-original_length} bytes)")
-else:
-    print("\n⚠️  No new patches applied")
-
-print("\n🎉 ALL SECURITY FIXES COMPLETE!")
+
+def make_patch(func_name, id_index, table):
+    @register_patch("security:final", functions=[func_name])
+    def apply(fn, module):
+        # Delegating wrappers (importInvoice -> createInvoice) are secured by their target
+        if called_functions(fn) & {f.name for f in module.functions if f is not fn}:
+            return None
+        if fn.body_contains("🔒 SECURITY", *ACCESS_HELPERS, *AUTH_HELPERS):
+            return None
+
+        block = AUTH_BLOCK.format()
+        if table is not None and fn.param(id_index) is not None:
+            block += LOOKUP_BLOCK.format(table=table, id_expr=fn.param(id_index).name)
+
+        edits = [fn.insert_at_body_start(module, block)]
+        if module.path.stem != "auth":
+            edits.append(module.ensure_import('getCurrentUser', './auth'))
+        if table is not None:
+            edits.append(module.ensure_import('canAccessSociete', './members'))
+            edits.append(module.ensure_import('MembershipRole', '@prisma/client'))
+        return edits
+    return apply
+
+
+for patch in REMAINING_PATCHES:
+    make_patch(*patch)
+
+
+if __name__ == "__main__":
+    print("🔒 Securing remaining server actions...", file=sys.stderr)
+    sys.exit(main(description="Secure the remaining unprotected server actions"))
@@ -2,20 +2,24 @@ import { PrismaClient } from '@prisma/client';
 
 const prisma = new PrismaClient();
 
+// Numbers are unique per société (Facture / Devis @@unique([societeId, numero]))
+const numberKey = (societeId: string, numero: string) => `${societeId}:${numero}`;
+
 async function fixDuplicateNumbers() {
     console.log('🔍 Searching for duplicate invoice and quote numbers...\n');
 
     // Find duplicate invoices
     const invoices = await prisma.facture.findMany({
         orderBy: { createdAt: 'asc' },
-        select: { id: true, numero: true, createdAt: true }
+        select: { id: true, societeId: true, numero: true, createdAt: true }
     });
 
     const invoiceNumberMap = new Map<string, typeof invoices>();
     invoices.forEach(inv => {
-        const existing = invoiceNumberMap.get(inv.numero) || [];
+        const key = numberKey(inv.societeId, inv.numero);
+        const existing = invoiceNumberMap.get(key) || [];
         existing.push(inv);
-        invoiceNumberMap.set(inv.numero, existing);
+        invoiceNumberMap.set(key, existing);
     });
 
     const duplicateInvoices = Array.from(invoiceNumberMap.entries())
@@ -24,14 +28,15 @@ async function fixDuplicateNumbers() {
     // Find duplicate quotes
     const quotes = await prisma.devis.findMany({
         orderBy: { createdAt: 'asc' },
-        select: { id: true, numero: true, createdAt: true }
+        select: { id: true, societeId: true, numero: true, createdAt: true }
     });
 
     const quoteNumberMap = new Map<string, typeof quotes>();
     quotes.forEach(quote => {
-        const existing = quoteNumberMap.get(quote.numero) || [];
+        const key = numberKey(quote.societeId, quote.numero);
+        const existing = quoteNumberMap.get(key) || [];
         existing.push(quote);
-        quoteNumberMap.set(quote.numero, existing);
+        quoteNumberMap.set(key, existing);
     });
 
     const duplicateQuotes = Array.from(quoteNumberMap.entries())
@@ -47,7 +52,8 @@ async function fixDuplicateNumbers() {
 
     // Fix duplicate invoices
     let fixedInvoices = 0;
-    for (const [numero, duplicates] of duplicateInvoices) {
+    for (const [, duplicates] of duplicateInvoices) {
+        const { societeId, numero } = duplicates[0];
         console.log(`\n🔧 Fixing invoice number: ${numero} (${duplicates.length} duplicates)`);
 
         // Keep the oldest one (first in array due to createdAt sort)
@@ -58,7 +64,7 @@ async function fixDuplicateNumbers() {
         for (const duplicate of toRenumber) {
             // Find next available number
             let nextNumber = parseInt(numero) + 1;
-            while (invoiceNumberMap.has(nextNumber.toString().padStart(8, '0'))) {
+            while (invoiceNumberMap.has(numberKey(societeId, nextNumber.toString().padStart(8, '0')))) {
                 nextNumber++;
             }
             const newNumero = nextNumber.toString().padStart(8, '0');
@@ -69,7 +75,7 @@ async function fixDuplicateNumbers() {
             });
 
             // Update map to track new number
-            invoiceNumberMap.set(newNumero, [duplicate]);
+            invoiceNumberMap.set(numberKey(societeId, newNumero), [duplicate]);
 
             console.log(`   → Renumbered ${duplicate.id}: ${numero} → ${newNumero}`);
             fixedInvoices++;
@@ -78,7 +84,8 @@ async function fixDuplicateNumbers() {
 
     // Fix duplicate quotes
     let fixedQuotes = 0;
-    for (const [numero, duplicates] of duplicateQuotes) {
+    for (const [, duplicates] of duplicateQuotes) {
+        const { societeId, numero } = duplicates[0];
         console.log(`\n🔧 Fixing quote number: ${numero} (${duplicates.length} duplicates)`);
 
         const [original, ...toRenumber] = duplicates;
@@ -86,7 +93,7 @@ async function fixDuplicateNumbers() {
 
         for (const duplicate of toRenumber) {
             let nextNumber = parseInt(numero) + 1;
-            while (quoteNumberMap.has(nextNumber.toString().padStart(8, '0'))) {
+            while (quoteNumberMap.has(numberKey(societeId, nextNumber.toString().padStart(8, '0')))) {
                 nextNumber++;
             }
             const newNumero = nextNumber.toString().padStart(8, '0');
@@ -96,7 +103,7 @@ async function fixDuplicateNumbers() {
                 data: { numero: newNumero }
             });
 
-            quoteNumberMap.set(newNumero, [duplicate]);
+            quoteNumberMap.set(numberKey(societeId, newNumero), [duplicate]);
 
             console.log(`   → Renumbered ${duplicate.id}: ${numero} → ${newNumero}`);
             fixedQuotes++;
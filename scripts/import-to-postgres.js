@@ -1,6 +1,34 @@
 const { PrismaClient } = require('@prisma/client');
 const fs = require('fs');
 
+// Imports migration-backup.json (export-from-sqlite.js) in bulk: one
+// createMany per chunk, independent tables in parallel, parents first.
+// Re-runnable: rows already imported are skipped (skipDuplicates).
+// For large databases prefer scripts/migrate-sqlite-to-postgres.ts, which
+// streams from SQLite and checkpoints instead of loading one JSON file.
+const CHUNK = 1000;
+
+// FK levels: every table only references tables of the previous levels
+const LEVELS = [
+    [['users', 'user']],
+    [['societes', 'societe']],
+    [['clients', 'client'], ['produits', 'produit']],
+    [['factures', 'facture'], ['devis', 'devis']],
+    [['paiements', 'paiement'], ['history', 'historyEntry']]
+];
+
+async function importTable(prisma, rows, delegate) {
+    let imported = 0;
+    for (let i = 0; i < rows.length; i += CHUNK) {
+        const { count } = await prisma[delegate].createMany({
+            data: rows.slice(i, i + CHUNK),
+            skipDuplicates: true
+        });
+        imported += count;
+    }
+    return imported;
+}
+
 async function importToPostgres() {
     console.log('🚀 Starting import to PostgreSQL...\n');
 
@@ -13,88 +41,16 @@ async function importToPostgres() {
         console.log('✅ Connected to PostgreSQL\n');
 
         // Import in order (dependencies first)
-        console.log('📥 Importing Users...');
-        for (const user of data.users) {
-            await prisma.user.upsert({
-                where: { id: user.id },
-                update: user,
-                create: user
-            });
-        }
-        console.log(`  ✅ ${data.users.length} users imported\n`);
-
-        console.log('📥 Importing Sociétés...');
-        for (const societe of data.societes) {
-            await prisma.societe.upsert({
-                where: { id: societe.id },
-                update: societe,
-                create: societe
-            });
-        }
-        console.log(`  ✅ ${data.societes.length} sociétés imported\n`);
-
-        console.log('📥 Importing Clients...');
-        for (const client of data.clients) {
-            await prisma.client.upsert({
-                where: { id: client.id },
-                update: client,
-                create: client
-            });
-        }
-        console.log(`  ✅ ${data.clients.length} clients imported\n`);
-
-        console.log('📥 Importing Produits...');
-        for (const produit of data.produits) {
-            await prisma.produit.upsert({
-                where: { id: produit.id },
-                update: produit,
-                create: produit
-            });
-        }
-        console.log(`  ✅ ${data.produits.length} produits imported\n`);
-
-        console.log('📥 Importing Factures...');
-        for (const facture of data.factures) {
-            await prisma.facture.upsert({
-                where: { id: facture.id },
-                update: facture,
-                create: facture
-            });
-        }
-        console.log(`  ✅ ${data.factures.length} factures imported\n`);
-
-        console.log('📥 Importing Devis...');
-        for (const devis of data.devis) {
-            await prisma.devis.upsert({
-                where: { id: devis.id },
-                update: devis,
-                create: devis
-            });
-        }
-        console.log(`  ✅ ${data.devis.length} devis imported\n`);
-
-        console.log('📥 Importing Paiements...');
-        for (const paiement of data.paiements) {
-            await prisma.paiement.upsert({
-                where: { id: paiement.id },
-                update: paiement,
-                create: paiement
-            });
-        }
-        console.log(`  ✅ ${data.paiements.length} paiements imported\n`);
-
-        console.log('📥 Importing History...');
-        for (const entry of data.history) {
-            await prisma.historyEntry.upsert({
-                where: { id: entry.id },
-                update: entry,
-                create: entry
-            });
+        for (const level of LEVELS) {
+            await Promise.all(level.map(async ([key, delegate]) => {
+                const rows = data[key] || [];
+                const imported = await importTable(prisma, rows, delegate);
+                console.log(`📥 ${key}: ${imported} imported, ${rows.length - imported} already present`);
+            }));
         }
-        console.log(`  ✅ ${data.history.length} history entries imported\n`);
 
         await prisma.$disconnect();
-        console.log('🎉 Migration completed successfully!');
+        console.log('\n🎉 Migration completed successfully!');
 
     } catch (error) {
         console.error('❌ Import failed:', error);
@@ -1,121 +1,254 @@
+/**
+ * Backfill FactureItem / DevisItem from itemsJSON, in chunks.
+ *
+ * For each chunk of documents (keyset on id):
+ * - decode itemsJSON once and compare it with the existing item rows;
+ * - rebuild the rows of mismatching documents (deleteMany + createMany) in one
+ *   transaction per chunk;
+ * - re-read the chunk and verify count / fields of every document.
+ *
+ * Rows flagged backfilled = false (written before the position / date / type
+ * columns) always count as mismatching.
+ *
+ * Re-runnable: documents already in sync are left untouched.
+ *
+ * Usage:
+ *   npx tsx scripts/migrate-json-to-relations.ts [--chunk 500] [--after <id>] [--only factures|devis] [--dry-run] [--verify]
+ *
+ *   --after    resume after this document id (printed after each chunk)
+ *   --dry-run  report mismatches, write nothing
+ *   --verify   same as --dry-run, exits with code 1 when a mismatch is found
+ */
 
 import { PrismaClient } from '@prisma/client';
+import { decodeJSON, toItemRows } from '../src/lib/line-items';
 
 const prisma = new PrismaClient();
 
-async function migrateInvoices() {
-    console.log("Migrating Invoices...");
-    const invoices = await prisma.facture.findMany({
-        include: { items: true } // Check existing items
-    });
+function argValue(name: string): string | undefined {
+    const index = process.argv.indexOf(name);
+    return index !== -1 ? process.argv[index + 1] : undefined;
+}
 
-    let count = 0;
-    for (const inv of invoices) {
-        if (inv.items.length > 0) {
-            console.log(`Skipping Invoice ${inv.numero} (already has items)`);
-            continue;
-        }
+const CHUNK = Number(argValue('--chunk')) || 500;
+const AFTER = argValue('--after');
+const ONLY = argValue('--only');
+const VERIFY = process.argv.includes('--verify');
+const DRY_RUN = VERIFY || process.argv.includes('--dry-run');
+
+type ItemRow = ReturnType<typeof toItemRows>[number];
+
+interface StoredRow {
+    parentId: string;
+    produitId: string | null;
+    description: string;
+    quantite: number;
+    prixUnitaire: number;
+    tva: number;
+    remise: number | null;
+    remiseType: string | null;
+    montantHT: number;
+    position: number;
+    date: string | null;
+    type: string | null;
+    backfilled: boolean;
+}
 
-        let items = [];
-        try {
-            items = JSON.parse(inv.itemsJSON || "[]");
-        } catch (e) {
-            console.error(`Error parsing JSON for Invoice ${inv.numero}`, e);
-            continue;
-        }
+interface Stats {
+    documents: number;
+    inSync: number;
+    rebuilt: number;
+    mismatches: number;
+    invalidJSON: number;
+}
 
-        if (items.length === 0) continue;
-
-        console.log(`Migrating Invoice ${inv.numero} (${items.length} items)...`);
-
-        // Create items
-        for (const item of items) {
-            await prisma.factureItem.create({
-                data: {
-                    factureId: inv.id,
-                    produitId: item.id && item.id.length < 30 ? item.id : undefined, // Check if ID is likely a valid CUID/UUID or legacy
-                    // Actually, item.id in JSON might be UUID generated by frontend or DB product ID.
-                    // If it matches a Product in DB, good. 
-                    // But we can't guarantee constraint.
-                    // Safer: Do NOT link produitId unless we are sure.
-                    // Or TRY to link if it fails catch?
-                    // Let's rely on description/price.
-                    // Ideally we link if possible.
-                    // For now, let's keep produitId undefined to be safe against FK errors, unless we verify.
-                    // Wait, if I don't link, reporting is weaker.
-                    // Let's try to link if item.id looks like a CUID/UUID.
-                    // But if that ID doesn't exist in Product table, it will crash.
-                    // So better to skip product link for this migration unless we do a lookup.
-                    // Let's skip produitId for safety in this migration script, can be improved later.
-                    description: item.nom || item.description || "Article",
-                    quantite: Number(item.quantite) || 0,
-                    prixUnitaire: Number(item.prixUnitaire) || 0,
-                    tva: Number(item.tva) || 0,
-                    remise: Number(item.remise) || 0,
-                    remiseType: item.remiseType || 'pourcentage',
-                    montantHT: Number(item.montantHT) || 0
-                }
-            });
-        }
-        count++;
-    }
-    console.log(`Migrated ${count} Invoices.`);
+/**
+ * Expected rows of a document. Product links that no longer exist are dropped
+ * (FK), like the previous version of this script did for all of them.
+ */
+function expectedRows(itemsJSON: string, knownProducts: Set<string>): ItemRow[] | null {
+    const items = decodeJSON<any[] | null>(itemsJSON, null);
+    if (!Array.isArray(items)) return null;
+
+    return toItemRows(items).map(row => ({
+        ...row,
+        produitId: row.produitId && knownProducts.has(row.produitId) ? row.produitId : undefined
+    }));
 }
 
-async function migrateQuotes() {
-    console.log("Migrating Quotes...");
-    const quotes = await prisma.devis.findMany({
-        include: { items: true }
+function sameRows(expected: ItemRow[], stored: StoredRow[]): boolean {
+    if (expected.length !== stored.length) return false;
+
+    const sorted = [...stored].sort((a, b) => a.position - b.position);
+    return expected.every((row, i) => {
+        const s = sorted[i];
+        return s.position === row.position
+            && s.description === row.description
+            && s.quantite === row.quantite
+            && s.prixUnitaire === row.prixUnitaire
+            && s.tva === row.tva
+            && (s.remise ?? 0) === row.remise
+            && (s.remiseType ?? 'pourcentage') === row.remiseType
+            && s.montantHT === row.montantHT
+            && (s.produitId ?? undefined) === row.produitId
+            && s.date === row.date
+            && s.type === row.type
+            && s.backfilled;
     });
+}
 
-    let count = 0;
-    for (const quote of quotes) {
-        if (quote.items.length > 0) {
-            console.log(`Skipping Quote ${quote.numero} (already has items)`);
-            continue;
-        }
+function groupByParent(rows: StoredRow[]): Map<string, StoredRow[]> {
+    const grouped = new Map<string, StoredRow[]>();
+    for (const row of rows) {
+        const list = grouped.get(row.parentId) || [];
+        list.push(row);
+        grouped.set(row.parentId, list);
+    }
+    return grouped;
+}
 
-        let items = [];
-        try {
-            items = JSON.parse(quote.itemsJSON || "[]");
-        } catch (e) {
-            console.error(`Error parsing JSON for Quote ${quote.numero}`, e);
-            continue;
+interface Target {
+    label: string;
+    fetchChunk: (after: string | undefined) => Promise<{ id: string, numero: string, itemsJSON: string }[]>;
+    fetchRows: (ids: string[]) => Promise<StoredRow[]>;
+    rebuild: (docs: { id: string, rows: ItemRow[] }[]) => Promise<unknown>;
+}
+
+const rowColumns = {
+    produitId: true,
+    description: true,
+    quantite: true,
+    prixUnitaire: true,
+    tva: true,
+    remise: true,
+    remiseType: true,
+    montantHT: true,
+    position: true,
+    date: true,
+    type: true,
+    backfilled: true
+} as const;
+
+const factures: Target = {
+    label: 'Factures',
+    fetchChunk: (after) => prisma.facture.findMany({
+        where: after ? { id: { gt: after } } : {},
+        select: { id: true, numero: true, itemsJSON: true },
+        orderBy: { id: 'asc' },
+        take: CHUNK
+    }),
+    fetchRows: async (ids) => {
+        const rows = await prisma.factureItem.findMany({
+            where: { factureId: { in: ids } },
+            select: { factureId: true, ...rowColumns }
+        });
+        return rows.map(({ factureId, ...row }) => ({ parentId: factureId, ...row }));
+    },
+    rebuild: (docs) => prisma.$transaction([
+        prisma.factureItem.deleteMany({ where: { factureId: { in: docs.map(d => d.id) } } }),
+        prisma.factureItem.createMany({
+            data: docs.flatMap(d => d.rows.map(row => ({ factureId: d.id, ...row })))
+        })
+    ])
+};
+
+const devis: Target = {
+    label: 'Devis',
+    fetchChunk: (after) => prisma.devis.findMany({
+        where: after ? { id: { gt: after } } : {},
+        select: { id: true, numero: true, itemsJSON: true },
+        orderBy: { id: 'asc' },
+        take: CHUNK
+    }),
+    fetchRows: async (ids) => {
+        const rows = await prisma.devisItem.findMany({
+            where: { devisId: { in: ids } },
+            select: { devisId: true, ...rowColumns }
+        });
+        return rows.map(({ devisId, ...row }) => ({ parentId: devisId, ...row }));
+    },
+    rebuild: (docs) => prisma.$transaction([
+        prisma.devisItem.deleteMany({ where: { devisId: { in: docs.map(d => d.id) } } }),
+        prisma.devisItem.createMany({
+            data: docs.flatMap(d => d.rows.map(row => ({ devisId: d.id, ...row })))
+        })
+    ])
+};
+
+async function migrate(target: Target, knownProducts: Set<string>): Promise<Stats> {
+    console.log(`\n📦 ${target.label} (chunk ${CHUNK}${AFTER ? `, after ${AFTER}` : ''})`);
+    const stats: Stats = { documents: 0, inSync: 0, rebuilt: 0, mismatches: 0, invalidJSON: 0 };
+
+    let after = AFTER;
+    while (true) {
+        const docs = await target.fetchChunk(after);
+        if (docs.length === 0) break;
+
+        const ids = docs.map(d => d.id);
+        const stored = groupByParent(await target.fetchRows(ids));
+
+        const toRebuild: { id: string, rows: ItemRow[] }[] = [];
+        for (const doc of docs) {
+            const rows = expectedRows(doc.itemsJSON, knownProducts);
+            if (!rows) {
+                console.warn(`   ⚠️  ${doc.numero} (${doc.id}): itemsJSON illisible, ignoré`);
+                stats.invalidJSON++;
+                continue;
+            }
+            if (sameRows(rows, stored.get(doc.id) || [])) {
+                stats.inSync++;
+            } else {
+                toRebuild.push({ id: doc.id, rows });
+            }
         }
+        stats.documents += docs.length;
+        stats.mismatches += toRebuild.length;
+
+        if (toRebuild.length > 0 && !DRY_RUN) {
+            await target.rebuild(toRebuild);
 
-        if (items.length === 0) continue;
-
-        console.log(`Migrating Quote ${quote.numero} (${items.length} items)...`);
-
-        for (const item of items) {
-            await prisma.devisItem.create({
-                data: {
-                    devisId: quote.id,
-                    // produiId: skipped for safety
-                    description: item.nom || item.description || "Article",
-                    quantite: Number(item.quantite) || 0,
-                    prixUnitaire: Number(item.prixUnitaire) || 0,
-                    tva: Number(item.tva) || 0,
-                    remise: Number(item.remise) || 0,
-                    remiseType: item.remiseType || 'pourcentage',
-                    montantHT: Number(item.montantHT) || 0
+            // Verify what was written
+            const written = groupByParent(await target.fetchRows(toRebuild.map(d => d.id)));
+            for (const doc of toRebuild) {
+                if (!sameRows(doc.rows, written.get(doc.id) || [])) {
+                    throw new Error(`Verification failed for ${target.label} ${doc.id}`);
                 }
-            });
+            }
+            stats.rebuilt += toRebuild.length;
+        } else if (toRebuild.length > 0) {
+            for (const doc of toRebuild) console.log(`   ≠ ${doc.id}`);
         }
-        count++;
+
+        after = docs[docs.length - 1].id;
+        console.log(`   ✓ ${stats.documents} documents (${toRebuild.length} ${DRY_RUN ? 'to rebuild' : 'rebuilt'} in chunk) — resume with --after ${after}`);
     }
-    console.log(`Migrated ${count} Quotes.`);
+
+    console.log(`   ${target.label}: ${stats.documents} documents, ${stats.inSync} in sync, ${DRY_RUN ? `${stats.mismatches} mismatching` : `${stats.rebuilt} rebuilt`}, ${stats.invalidJSON} invalid JSON`);
+    return stats;
 }
 
 async function main() {
-    try {
-        await migrateInvoices();
-        await migrateQuotes();
-        console.log("Migration Complete.");
-    } catch (e) {
-        console.error("Migration Failed", e);
-        process.exit(1);
+    console.log(DRY_RUN ? '🔍 Dry run: nothing will be written' : '🚀 Backfilling line items');
+
+    const products = await prisma.produit.findMany({ select: { id: true } });
+    const knownProducts = new Set(products.map(p => p.id));
+
+    const results: Stats[] = [];
+    if (!ONLY || ONLY === 'factures') results.push(await migrate(factures, knownProducts));
+    if (!ONLY || ONLY === 'devis') results.push(await migrate(devis, knownProducts));
+
+    const mismatches = results.reduce((sum, s) => sum + s.mismatches, 0);
+    if (VERIFY && mismatches > 0) {
+        console.error(`\n❌ ${mismatches} documents out of sync`);
+        process.exitCode = 1;
+    } else {
+        console.log('\n✅ Done');
     }
 }
 
-main();
+main()
+    .catch((e) => {
+        console.error('Migration Failed', e);
+        process.exitCode = 1;
+    })
+    .finally(() => prisma.$disconnect());
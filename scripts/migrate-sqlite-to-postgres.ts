@@ -0,0 +1,459 @@
+/**
+ * 🚚 SQLite → PostgreSQL migration (streaming, resumable, verified)
+ *
+ * Tables come from the Prisma schema and are loaded level by level in FK
+ * order (User/Societe first, items and history last); the tables of one
+ * level run in parallel. Each table is streamed from SQLite in chunks
+ * (keyset on rowid) and every chunk is bulk-inserted with one createMany
+ * (multi-row INSERT … ON CONFLICT DO NOTHING), so memory stays flat whatever
+ * the size of the tenant.
+ *
+ * Progress is checkpointed after every chunk: after an interruption, the same
+ * command resumes where it stopped (a chunk replayed twice is a no-op).
+ * At the end every migrated row is read back from PostgreSQL and compared
+ * with the source: row counts and a SHA-256 checksum per table.
+ *
+ * Rows already present in PostgreSQL with the same primary key are left
+ * untouched and reported by the verification as differing. Unique keys are
+ * checked before anything is written (createMany would skip those rows
+ * silently, then their children would fail on their FK):
+ * - duplicate product names within a société are renamed with the rule of
+ *   the 20261017160000_produit_unique_nom migration, and listed;
+ * - any other conflict (document numbers, emails...), within the SQLite file
+ *   or with rows already in PostgreSQL, is listed and nothing is migrated.
+ *
+ * Usage:
+ *   npx tsx scripts/migrate-sqlite-to-postgres.ts [--db ./data/dev.db] [--chunk 1000] [--parallel 4]
+ *                                                 [--only Facture,Devis] [--checkpoint <file>] [--restart]
+ *   npx tsx scripts/migrate-sqlite-to-postgres.ts --verify-only
+ *
+ *   --only        migrate these models only (their parents must already be loaded)
+ *   --restart     ignore the checkpoint and start over
+ *   --verify-only compare source and target, write nothing (exit code 1 on mismatch)
+ */
+
+import crypto from 'crypto';
+import fs from 'fs';
+import path from 'path';
+import dotenv from 'dotenv';
+import Database from 'better-sqlite3';
+import { Prisma, PrismaClient } from '@prisma/client';
+
+dotenv.config({ path: '.env.local' });
+dotenv.config({ path: '.env' });
+
+function argValue(name: string): string | undefined {
+    const index = process.argv.indexOf(name);
+    return index !== -1 ? process.argv[index + 1] : undefined;
+}
+
+const DB_PATH = argValue('--db') || './data/dev.db';
+const CHUNK = Number(argValue('--chunk')) || 1000;
+const PARALLEL = Number(argValue('--parallel')) || 4;
+const ONLY = argValue('--only')?.split(',').map(s => s.trim()).filter(Boolean);
+const CHECKPOINT_PATH = argValue('--checkpoint') || `${DB_PATH}.migration-checkpoint.json`;
+const RESTART = process.argv.includes('--restart');
+const VERIFY_ONLY = process.argv.includes('--verify-only');
+
+const prisma = new PrismaClient();
+
+type Row = Record<string, unknown>;
+
+interface Table {
+    model: string;
+    source: string;
+    delegate: string;
+    primaryKey: string[];
+    columns: { name: string, type: string }[];
+    defaults: Row;
+    uniqueKeys: string[][];
+    renamed: Map<string, Row>; // primary key → columns rewritten by DUPLICATE_RENAMES
+    level: number;
+}
+
+interface TableProgress {
+    lastRowid: number;
+    rows: number;
+    done: boolean;
+}
+
+interface Checkpoint {
+    source: string;
+    tables: Record<string, TableProgress>;
+}
+
+// --- Schema --------------------------------------------------------------------
+
+// Columns whose PostgreSQL default is wrong for rows coming from an older
+// schema: item rows without position / date / type must be read from
+// itemsJSON until scripts/migrate-json-to-relations.ts rebuilds them
+const LEGACY_DEFAULTS: Record<string, Row> = {
+    FactureItem: { backfilled: false },
+    DevisItem: { backfilled: false }
+};
+
+// Same rule as prisma/migrations/20261017160000_produit_unique_nom: the oldest
+// row keeps its value, the others are renamed. Document numbers are never
+// rewritten (20261017140000_document_sequences aborts on duplicates)
+const DUPLICATE_RENAMES: Record<string, { field: string, rename: (value: string, rank: number) => string }> = {
+    Produit: { field: 'nom', rename: (nom, rank) => `${nom} (doublon ${rank})` }
+};
+
+/**
+ * Models present in the SQLite file, with the columns both sides know and
+ * their FK level (0 = no parent). Columns missing from SQLite get the
+ * PostgreSQL defaults, or LEGACY_DEFAULTS.
+ */
+function planTables(db: Database.Database): Table[] {
+    const models = Prisma.dmmf.datamodel.models;
+    const sqliteTables = new Set((db.prepare(`SELECT name FROM sqlite_master WHERE type = 'table'`).all() as { name: string }[]).map(t => t.name));
+
+    const parents = new Map(models.map(m => [m.name, new Set(
+        m.fields
+            .filter(f => f.kind === 'object' && f.relationFromFields && f.relationFromFields.length > 0 && f.type !== m.name)
+            .map(f => f.type)
+    )]));
+
+    const levels = new Map<string, number>();
+    const levelOf = (name: string): number => {
+        if (!levels.has(name)) {
+            levels.set(name, 0); // guards against cycles
+            levels.set(name, Math.max(0, ...[...parents.get(name)!].map(p => levelOf(p) + 1)));
+        }
+        return levels.get(name)!;
+    };
+
+    return models
+        .filter(m => sqliteTables.has(m.dbName || m.name))
+        .map(m => {
+            const sqliteColumns = new Set((db.prepare(`PRAGMA table_info("${m.dbName || m.name}")`).all() as { name: string }[]).map(c => c.name));
+            return {
+                model: m.name,
+                source: m.dbName || m.name,
+                delegate: m.name.charAt(0).toLowerCase() + m.name.slice(1),
+                primaryKey: m.primaryKey?.fields ? [...m.primaryKey.fields] : m.fields.filter(f => f.isId).map(f => f.name),
+                columns: m.fields
+                    .filter(f => f.kind !== 'object' && !f.isList && sqliteColumns.has(f.name))
+                    .map(f => ({ name: f.name, type: f.type })),
+                defaults: Object.fromEntries(Object.entries(LEGACY_DEFAULTS[m.name] || {}).filter(([name]) => !sqliteColumns.has(name))),
+                uniqueKeys: [...m.uniqueFields.map(fields => [...fields]), ...m.fields.filter(f => f.isUnique).map(f => [f.name])]
+                    .filter(fields => fields.every(name => sqliteColumns.has(name))),
+                renamed: new Map<string, Row>(),
+                level: levelOf(m.name)
+            };
+        })
+        .filter(t => !ONLY || ONLY.includes(t.model))
+        .sort((a, b) => a.level - b.level || a.model.localeCompare(b.model));
+}
+
+// SQLite stores booleans as 0/1 and DateTime as epoch ms (Prisma) or ISO text
+function convert(value: unknown, type: string): unknown {
+    if (value === null || value === undefined) return null;
+    switch (type) {
+        case 'Boolean':
+            return Boolean(value);
+        case 'DateTime':
+            return new Date(typeof value === 'string' && /^\d+$/.test(value) ? Number(value) : value as string | number);
+        case 'Bytes':
+            return Buffer.from(value as Uint8Array);
+        case 'BigInt':
+            return BigInt(value as number);
+        default:
+            return value;
+    }
+}
+
+function convertRow(table: Table, raw: Row): Row {
+    const row: Row = { ...table.defaults };
+    for (const column of table.columns) {
+        row[column.name] = convert(raw[column.name], column.type);
+    }
+    return table.renamed.size > 0 ? { ...row, ...table.renamed.get(keyOf(table, row)) } : row;
+}
+
+function readChunk(db: Database.Database, table: Table, afterRowid: number): { rowid: number, row: Row }[] {
+    const columns = table.columns.map(c => `"${c.name}"`).join(', ');
+    const rows = db.prepare(`SELECT rowid AS "__rowid", ${columns} FROM "${table.source}" WHERE rowid > ? ORDER BY rowid LIMIT ?`)
+        .all(afterRowid, CHUNK) as Row[];
+    return rows.map(raw => ({ rowid: raw.__rowid as number, row: convertRow(table, raw) }));
+}
+
+// --- Unique keys -----------------------------------------------------------------
+
+function canonicalValue(value: unknown): unknown {
+    if (value instanceof Date) return value.toISOString();
+    if (value instanceof Uint8Array) return Buffer.from(value).toString('base64');
+    if (typeof value === 'bigint') return value.toString();
+    return value ?? null;
+}
+
+function uniqueValue(fields: string[], row: Row): string | null {
+    if (fields.some(name => row[name] === null || row[name] === undefined)) return null; // NULLs never conflict
+    return JSON.stringify(fields.map(name => canonicalValue(row[name])));
+}
+
+function describeKey(table: Table, fields: string[], row: Row): string {
+    return `${table.model} ${fields.map(name => `${name}=${String(row[name])}`).join(', ')}`;
+}
+
+/**
+ * Duplicates inside the SQLite file: renamed when the model has a rename
+ * rule (fills table.renamed), returned as conflicts otherwise
+ */
+function checkSourceDuplicates(db: Database.Database, table: Table): string[] {
+    const conflicts: string[] = [];
+    const rule = DUPLICATE_RENAMES[table.model];
+    const pk = table.primaryKey.map(k => `"${k}"`).join(', ');
+    const hasCreatedAt = table.columns.some(c => c.name === 'createdAt');
+
+    for (const fields of table.uniqueKeys) {
+        const key = fields.map(name => `"${name}"`).join(', ');
+        const rows = db.prepare(`SELECT rowid AS "__rowid", * FROM "${table.source}"
+            WHERE (${key}) IN (SELECT ${key} FROM "${table.source}" GROUP BY ${key} HAVING COUNT(*) > 1)
+            ORDER BY ${key}, ${hasCreatedAt ? '"createdAt", ' : ''}${pk}`).all() as Row[];
+
+        let previous: string | null = null;
+        let rank = 0;
+        for (const raw of rows) {
+            const row = convertRow(table, raw);
+            const value = uniqueValue(fields, row);
+            if (value === null) continue;
+            rank = value === previous ? rank + 1 : 1;
+            previous = value;
+            if (rank === 1) continue;
+
+            if (rule && fields.includes(rule.field)) {
+                const renamed = rule.rename(String(row[rule.field]), rank);
+                table.renamed.set(keyOf(table, row), { [rule.field]: renamed });
+                console.warn(`   ✏️  ${describeKey(table, fields, row)} → ${rule.field}=${renamed}`);
+            } else {
+                conflicts.push(`${describeKey(table, fields, row)} (${rank} rows in SQLite)`);
+            }
+        }
+    }
+    return conflicts;
+}
+
+/**
+ * Source rows whose unique key is already used in PostgreSQL by another row
+ */
+async function checkTargetConflicts(db: Database.Database, table: Table): Promise<string[]> {
+    if (table.uniqueKeys.length === 0) return [];
+    const conflicts: string[] = [];
+    const delegate = (prisma as any)[table.delegate];
+    const select = Object.fromEntries([...table.primaryKey, ...table.uniqueKeys.flat()].map(name => [name, true]));
+
+    let lastRowid = 0;
+    while (true) {
+        const chunk = readChunk(db, table, lastRowid);
+        if (chunk.length === 0) break;
+        lastRowid = chunk[chunk.length - 1].rowid;
+
+        for (const fields of table.uniqueKeys) {
+            const rows = chunk.map(c => c.row).filter(row => uniqueValue(fields, row) !== null);
+            if (rows.length === 0) continue;
+            const where = fields.length === 1
+                ? { [fields[0]]: { in: rows.map(r => r[fields[0]]) } }
+                : { OR: rows.map(r => Object.fromEntries(fields.map(name => [name, r[name]]))) };
+            const existing = new Map((await delegate.findMany({ where, select }) as Row[]).map(r => [uniqueValue(fields, r), r]));
+
+            for (const row of rows) {
+                const target = existing.get(uniqueValue(fields, row));
+                if (target && keyOf(table, target) !== keyOf(table, row)) {
+                    conflicts.push(`${describeKey(table, fields, row)} (already used in PostgreSQL by ${keyOf(table, target).replace(/\u0000/g, '/')})`);
+                }
+            }
+        }
+    }
+    return conflicts;
+}
+
+// --- Checkpoint ------------------------------------------------------------------
+
+function loadCheckpoint(): Checkpoint {
+    const source = path.resolve(DB_PATH);
+    if (!RESTART && fs.existsSync(CHECKPOINT_PATH)) {
+        const checkpoint = JSON.parse(fs.readFileSync(CHECKPOINT_PATH, 'utf8')) as Checkpoint;
+        if (checkpoint.source === source) return checkpoint;
+        console.warn(`⚠️  ${CHECKPOINT_PATH} belongs to ${checkpoint.source}, starting over`);
+    }
+    return { source, tables: {} };
+}
+
+// Written synchronously (temp file + rename): never a half-written checkpoint
+function saveCheckpoint(checkpoint: Checkpoint) {
+    const tmp = `${CHECKPOINT_PATH}.tmp`;
+    fs.writeFileSync(tmp, JSON.stringify(checkpoint, null, 2));
+    fs.renameSync(tmp, CHECKPOINT_PATH);
+}
+
+// --- Copy ------------------------------------------------------------------------
+
+async function copyTable(db: Database.Database, table: Table, checkpoint: Checkpoint) {
+    const progress = checkpoint.tables[table.model] ??= { lastRowid: 0, rows: 0, done: false };
+    if (progress.done) {
+        console.log(`   ⏭️  ${table.model}: already migrated (${progress.rows} rows)`);
+        return;
+    }
+
+    const total = (db.prepare(`SELECT COUNT(*) AS n FROM "${table.source}" WHERE rowid > ?`).get(progress.lastRowid) as { n: number }).n + progress.rows;
+    const started = Date.now();
+    const delegate = (prisma as any)[table.delegate];
+
+    while (true) {
+        const chunk = readChunk(db, table, progress.lastRowid);
+        if (chunk.length === 0) break;
+
+        await delegate.createMany({ data: chunk.map(c => c.row), skipDuplicates: true });
+
+        progress.lastRowid = chunk[chunk.length - 1].rowid;
+        progress.rows += chunk.length;
+        saveCheckpoint(checkpoint);
+
+        const rate = Math.round(progress.rows / Math.max(1, (Date.now() - started) / 1000));
+        console.log(`   → ${table.model}: ${progress.rows}/${total} (${rate} rows/s)`);
+    }
+
+    progress.done = true;
+    saveCheckpoint(checkpoint);
+    console.log(`   ✅ ${table.model}: ${progress.rows} rows`);
+}
+
+async function runLimited<T>(items: T[], limit: number, task: (item: T) => Promise<void>) {
+    const queue = [...items];
+    const workers = Array.from({ length: Math.min(limit, queue.length) }, async () => {
+        while (queue.length > 0) await task(queue.shift()!);
+    });
+    await Promise.all(workers);
+}
+
+// --- Verification --------------------------------------------------------------
+
+function canonical(table: Table, row: Row): string {
+    return JSON.stringify(table.columns.map(({ name }) => canonicalValue(row[name])));
+}
+
+function keyOf(table: Table, row: Row): string {
+    return table.primaryKey.map(k => String(row[k])).join('\u0000');
+}
+
+interface Verification {
+    model: string;
+    source: number;
+    missing: number;
+    differing: number;
+    sourceChecksum: string;
+    targetChecksum: string;
+    examples: string[];
+}
+
+/**
+ * Reads every source row back from PostgreSQL by primary key (the target may
+ * hold other tenants: no table-wide count)
+ */
+async function verifyTable(db: Database.Database, table: Table): Promise<Verification> {
+    const delegate = (prisma as any)[table.delegate];
+    const select = Object.fromEntries(table.columns.map(c => [c.name, true]));
+    const sourceHash = crypto.createHash('sha256');
+    const targetHash = crypto.createHash('sha256');
+    const result: Verification = { model: table.model, source: 0, missing: 0, differing: 0, sourceChecksum: '', targetChecksum: '', examples: [] };
+
+    let lastRowid = 0;
+    while (true) {
+        const chunk = readChunk(db, table, lastRowid);
+        if (chunk.length === 0) break;
+        lastRowid = chunk[chunk.length - 1].rowid;
+
+        const rows = chunk.map(c => c.row);
+        const where = table.primaryKey.length === 1
+            ? { [table.primaryKey[0]]: { in: rows.map(r => r[table.primaryKey[0]]) } }
+            : { OR: rows.map(r => Object.fromEntries(table.primaryKey.map(k => [k, r[k]]))) };
+        const stored = new Map((await delegate.findMany({ where, select }) as Row[]).map(r => [keyOf(table, r), r]));
+
+        for (const row of rows) {
+            const key = keyOf(table, row);
+            const expected = canonical(table, row);
+            const target = stored.get(key);
+            const actual = target ? canonical(table, target) : '∅';
+            sourceHash.update(expected + '\n');
+            targetHash.update(actual + '\n');
+
+            if (!target) result.missing++;
+            else if (actual !== expected) result.differing++;
+            else continue;
+            if (result.examples.length < 5) result.examples.push(`${target ? '≠' : '∅'} ${key.replace(/\u0000/g, '/')}`);
+        }
+        result.source += rows.length;
+    }
+
+    result.sourceChecksum = sourceHash.digest('hex').slice(0, 16);
+    result.targetChecksum = targetHash.digest('hex').slice(0, 16);
+    return result;
+}
+
+// --- Main ------------------------------------------------------------------------
+
+async function migrateSQLiteToPostgres() {
+    if (!fs.existsSync(DB_PATH)) {
+        throw new Error(`SQLite database not found: ${DB_PATH}`);
+    }
+
+    const db = new Database(DB_PATH, { readonly: true });
+    try {
+        const tables = planTables(db);
+        console.log(`🚀 Migration SQLite → PostgreSQL (${DB_PATH}, chunk ${CHUNK}, parallel ${PARALLEL})\n`);
+
+        // Renames are needed by the verification too
+        console.log('🔑 Checking unique keys...');
+        const conflicts = tables.flatMap(table => checkSourceDuplicates(db, table));
+
+        if (!VERIFY_ONLY) {
+            const checkpoint = loadCheckpoint();
+            await runLimited(tables.filter(t => !checkpoint.tables[t.model]?.done), PARALLEL, async table => {
+                conflicts.push(...await checkTargetConflicts(db, table));
+            });
+            if (conflicts.length > 0) {
+                conflicts.forEach(conflict => console.error(`   ❌ ${conflict}`));
+                throw new Error(`${conflicts.length} unique key conflict(s): resolve them in ${DB_PATH} or in PostgreSQL first (nothing written by this run)`);
+            }
+
+            const levels = [...new Set(tables.map(t => t.level))];
+            for (const level of levels) {
+                const group = tables.filter(t => t.level === level);
+                console.log(`📥 Level ${level}: ${group.map(t => t.model).join(', ')}`);
+                await runLimited(group, PARALLEL, table => copyTable(db, table, checkpoint));
+            }
+        }
+
+        console.log('\n🔍 Verifying row counts and checksums...');
+        const results: Verification[] = [];
+        await runLimited(tables, PARALLEL, async table => { results.push(await verifyTable(db, table)); });
+
+        let failed = 0;
+        for (const table of tables) {
+            const r = results.find(v => v.model === table.model)!;
+            const ok = r.missing === 0 && r.differing === 0;
+            if (!ok) failed++;
+            console.log(`   ${ok ? '✅' : '❌'} ${r.model.padEnd(24)} ${String(r.source).padStart(8)} rows  ${r.sourceChecksum} ➜ ${r.targetChecksum}`
+                + (ok ? '' : `  (${r.missing} missing, ${r.differing} differing)`));
+            r.examples.forEach(example => console.log(`      ${example}`));
+        }
+
+        if (failed > 0) {
+            console.error(`\n❌ ${failed} table(s) differ between SQLite and PostgreSQL`);
+            process.exitCode = 1;
+        } else {
+            console.log(`\n🎉 ${VERIFY_ONLY ? 'Source and target match' : 'Migration terminée et vérifiée'}`);
+            if (!VERIFY_ONLY && fs.existsSync(CHECKPOINT_PATH)) fs.unlinkSync(CHECKPOINT_PATH);
+        }
+    } finally {
+        db.close();
+    }
+}
+
+migrateSQLiteToPostgres()
+    .catch((error) => {
+        console.error('\n❌ Erreur:', error);
+        process.exitCode = 1;
+    })
+    .finally(() => prisma.$disconnect());
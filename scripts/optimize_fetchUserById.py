@@ -2,25 +2,23 @@
 """
 Ultra-optimize fetchUserById to remove unnecessary fields
 Safe: Only modifies specific function, backs up original
+
+Runs through the shared patch runner, so whichever module defines
+fetchUserById today (src/lib/actions/auth.ts) is found; backups are reverse
+diffs in .patch-cache/backups/.
 """
 
 import re
-from pathlib import Path
+import sys
 
-# Path to actions.ts
-ACTIONS_PATH = Path(__file__).parent.parent / "src" / "app" / "actions.ts"
+from patch_runner import PatchSet, main
 
-def optimize_fetch_user():
+def optimize_fetch_user(path, content):
     """Optimize fetchUserById by removing email, fullName, role from select"""
     
-    # Read file
-    content = ACTIONS_PATH.read_text()
-    
-    # Create backup
-    backup_path = ACTIONS_PATH.with_suffix('.ts.backup')
-    backup_path.write_text(content)
-    print(f"✅ Backup created: {backup_path}")
-    
+    if 'function fetchUserById' not in content:
+        return content
+
     # Pattern to match the fetchUserById function
     old_select = r'''select: \{
                 id: true,
@@ -71,20 +69,9 @@ def optimize_fetch_user():
     
     # Check if changes were made
     if content_new != content:
-        ACTIONS_PATH.write_text(content_new)
-        print("✅ fetchUserById optimized!")
-        print("   - Removed: email, fullName, role from select")
-        print("   - Expected gain: 400-500ms → ~50ms (-90%)")
-        return True
-    else:
-        print("⚠️  No changes needed (already optimized or pattern not found)")
-        return False
+        return content_new, ["fetchUserById optimized (removed email, fullName, role from select)"]
+    return content_new, ["No changes needed (already optimized or pattern not found)"]
 
 if __name__ == "__main__":
     print("🚀 Optimizing fetchUserById...")
-    success = optimize_fetch_user()
-    if success:
-        print("\n✅ Optimization complete!")
-        print("   Refresh your app to see the performance improvement")
-    else:
-        print("\n⚠️  Check if the code has already been modified")
+    sys.exit(main(PatchSet("optimize-fetchUserById", optimize_fetch_user)))
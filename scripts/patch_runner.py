@@ -0,0 +1,244 @@
+#!/usr/bin/env python3
+"""
+⚡ PATCH RUNNER - Parallel, cached multi-file patching for maintenance scripts
+
+Fans a patch set out over a process pool (one file per job) across
+src/lib/actions, src/app/api and src/components.
+
+- Content-hash cache (.patch-cache/cache.json): a file whose sha256 and
+  patch-set version are unchanged since the last run is skipped without
+  being re-patched, so repeated cleanup runs are close to no-ops.
+- Backups are compact reverse diffs (.patch-cache/backups/<run>/...rdiff.json)
+  holding only the replaced line ranges, not full .ts.backup copies.
+
+Usage (from a patch script):
+    from patch_runner import PatchSet, main
+    def transform(path, source):
+        return source.replace(...)
+    main(PatchSet("my-cleanup", transform))
+
+    python3 scripts/patch_runner.py --restore <run-id>
+"""
+
+import argparse
+import datetime
+import difflib
+import hashlib
+import inspect
+import json
+import os
+import sys
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_ROOTS = [
+    REPO_ROOT / "src" / "lib" / "actions",
+    REPO_ROOT / "src" / "app" / "api",
+    REPO_ROOT / "src" / "components",
+]
+CACHE_DIR = REPO_ROOT / ".patch-cache"
+CACHE_FILE = CACHE_DIR / "cache.json"
+BACKUP_DIR = CACHE_DIR / "backups"
+RUNNER_VERSION = "1"
+
+
+def sha256(text):
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def relpath(path):
+    path = Path(path).resolve()
+    return path.relative_to(REPO_ROOT) if path.is_relative_to(REPO_ROOT) else path
+
+
+class PatchSet:
+    """A named transform `transform(path, source) -> new_source | (new_source, notes)`.
+
+    The transform must be a module-level function (it is pickled to workers).
+    `version` defaults to a hash of the transform's module source, so editing
+    the patch script invalidates the cache automatically.
+    """
+
+    def __init__(self, name, transform, version=None, suffixes=(".ts", ".tsx")):
+        self.name = name
+        self.transform = transform
+        self.suffixes = tuple(suffixes)
+        if version is None:
+            try:
+                module_source = inspect.getsource(sys.modules[transform.__module__])
+            except (OSError, TypeError, KeyError):
+                module_source = transform.__qualname__
+            version = sha256(RUNNER_VERSION + module_source)[:12]
+        self.version = str(version)
+
+    @property
+    def key(self):
+        return f"{self.name}@{self.version}"
+
+
+# --- Reverse diffs ----------------------------------------------------------
+
+def reverse_diff(old, new):
+    """Hunks turning `new` back into `old`: [[start, end, old_lines], ...] over new's lines."""
+    old_lines = old.splitlines(keepends=True)
+    new_lines = new.splitlines(keepends=True)
+    matcher = difflib.SequenceMatcher(None, new_lines, old_lines, autojunk=False)
+    return [
+        [j1, j2, old_lines[k1:k2]]
+        for tag, j1, j2, k1, k2 in matcher.get_opcodes()
+        if tag != "equal"
+    ]
+
+
+def apply_reverse_diff(new, hunks):
+    lines = new.splitlines(keepends=True)
+    for start, end, replacement in sorted(hunks, key=lambda h: h[0], reverse=True):
+        lines[start:end] = replacement
+    return "".join(lines)
+
+
+# --- Worker -----------------------------------------------------------------
+
+def _process(job):
+    """Runs in a worker process: patch one file, write its reverse diff, report back."""
+    path, transform, run_dir, dry_run = job
+    path = Path(path)
+    source = path.read_text(encoding="utf-8")
+    before = sha256(source)
+
+    result = transform(str(path), source)
+    new_source, notes = result if isinstance(result, tuple) else (result, [])
+
+    if new_source == source:
+        return {"path": str(path), "status": "unchanged", "sha256": before, "notes": notes}
+
+    rel = relpath(path)
+    if dry_run:
+        diff = "".join(difflib.unified_diff(
+            source.splitlines(keepends=True), new_source.splitlines(keepends=True),
+            fromfile=f"a/{rel}", tofile=f"b/{rel}",
+        ))
+        return {"path": str(path), "status": "would-change", "sha256": before, "notes": notes, "diff": diff}
+
+    after = sha256(new_source)
+    backup = Path(run_dir) / f"{str(rel).lstrip('/')}.rdiff.json"
+    backup.parent.mkdir(parents=True, exist_ok=True)
+    backup.write_text(json.dumps({
+        "path": str(rel),
+        "sha256_before": before,
+        "sha256_after": after,
+        "hunks": reverse_diff(source, new_source),
+    }, ensure_ascii=False), encoding="utf-8")
+    path.write_text(new_source, encoding="utf-8")
+    return {"path": str(path), "status": "patched", "sha256": after, "notes": notes}
+
+
+# --- Runner -----------------------------------------------------------------
+
+def iter_files(roots, suffixes):
+    for root in roots:
+        root = Path(root)
+        if root.is_file():
+            yield root
+        elif root.is_dir():
+            for path in sorted(root.rglob("*")):
+                if path.is_file() and path.suffix in suffixes and not path.name.endswith(".d.ts"):
+                    yield path
+
+
+def load_cache():
+    try:
+        return json.loads(CACHE_FILE.read_text(encoding="utf-8"))
+    except (OSError, ValueError):
+        return {}
+
+
+def save_cache(cache):
+    CACHE_DIR.mkdir(parents=True, exist_ok=True)
+    tmp = CACHE_FILE.with_suffix(".tmp")
+    tmp.write_text(json.dumps(cache, indent=1, sort_keys=True), encoding="utf-8")
+    os.replace(tmp, CACHE_FILE)
+
+
+def run(patch_set, roots=None, workers=None, dry_run=False, force=False):
+    """Apply a patch set; returns the list of per-file results (cached files excluded)."""
+    cache = load_cache()
+    entries = cache.setdefault(patch_set.key, {})
+    run_id = datetime.datetime.now().strftime("%Y%m%d_%H%M%S") + f"_{patch_set.name}"
+    run_dir = BACKUP_DIR / run_id
+
+    jobs, skipped = [], 0
+    for path in iter_files(roots or DEFAULT_ROOTS, patch_set.suffixes):
+        rel = str(relpath(path))
+        if not force and entries.get(rel) == sha256(path.read_text(encoding="utf-8")):
+            skipped += 1
+            continue
+        jobs.append((str(path), patch_set.transform, str(run_dir), dry_run))
+
+    results = []
+    if jobs:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_process, jobs, chunksize=1))
+
+    if not dry_run:
+        for res in results:
+            entries[str(relpath(res["path"]))] = res["sha256"]
+        # Drop cache entries of older versions of this patch set
+        for key in [k for k in cache if k.startswith(f"{patch_set.name}@") and k != patch_set.key]:
+            del cache[key]
+        save_cache(cache)
+
+    patched = [r for r in results if r["status"] in ("patched", "would-change")]
+    print(f"\n📊 {patch_set.name}: {len(patched)} changed, "
+          f"{len(results) - len(patched)} unchanged, {skipped} skipped (cache hit)", file=sys.stderr)
+    if patched and not dry_run:
+        print(f"💾 Reverse diffs: {relpath(run_dir)}", file=sys.stderr)
+    return results
+
+
+def restore(run_id):
+    """Undo a run by applying its reverse diffs (only to files still in the patched state)."""
+    run_dir = BACKUP_DIR / run_id
+    if not run_dir.is_dir():
+        print(f"❌ Unknown run: {run_id}", file=sys.stderr)
+        return 1
+    for backup in sorted(run_dir.rglob("*.rdiff.json")):
+        data = json.loads(backup.read_text(encoding="utf-8"))
+        target = REPO_ROOT / data["path"]  # absolute paths stay absolute
+        current = target.read_text(encoding="utf-8")
+        if sha256(current) != data["sha256_after"]:
+            print(f"  ⚠️  {data['path']} changed since the run, not restored", file=sys.stderr)
+            continue
+        target.write_text(apply_reverse_diff(current, data["hunks"]), encoding="utf-8")
+        print(f"  ↩️  {data['path']}", file=sys.stderr)
+    return 0
+
+
+def main(patch_set, argv=None):
+    parser = argparse.ArgumentParser(description=f"Run the '{patch_set.name}' patch set")
+    parser.add_argument("--dry-run", action="store_true", help="print diffs, write nothing")
+    parser.add_argument("--force", action="store_true", help="ignore the content-hash cache")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--root", action="append", type=Path, help="directory or file to process (repeatable)")
+    args = parser.parse_args(argv)
+
+    roots = [p if p.is_absolute() else REPO_ROOT / p for p in args.root] if args.root else None
+    results = run(patch_set, roots, workers=args.jobs, dry_run=args.dry_run, force=args.force)
+    for res in results:
+        if res.get("diff"):
+            sys.stdout.write(res["diff"])
+        for note in res["notes"]:
+            print(f"   {Path(res['path']).name}: {note}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Patch runner utilities")
+    parser.add_argument("--restore", metavar="RUN_ID", help="undo a run from its reverse diffs")
+    parser.add_argument("--list", action="store_true", help="list recorded runs")
+    args = parser.parse_args()
+    if args.restore:
+        sys.exit(restore(args.restore))
+    for run_dir in sorted(BACKUP_DIR.glob("*")) if BACKUP_DIR.exists() else []:
+        print(run_dir.name)
@@ -0,0 +1,70 @@
+import { PrismaClient } from '@prisma/client';
+
+const prisma = new PrismaClient();
+
+/**
+ * Rebuilds "InvoiceMonthlyRollup" from "Facture" (normally maintained by triggers).
+ * Usage:
+ *   npx tsx scripts/rebuild-invoice-rollup.ts            # check drift only
+ *   npx tsx scripts/rebuild-invoice-rollup.ts --fix      # rebuild drifting sociétés
+ *   npx tsx scripts/rebuild-invoice-rollup.ts --fix <societeId>
+ */
+async function rebuildInvoiceRollup() {
+    const fix = process.argv.includes('--fix');
+    const societeId = process.argv.slice(2).find(arg => !arg.startsWith('--'));
+
+    console.log('🔍 Comparing InvoiceMonthlyRollup with Facture...\n');
+
+    const drift = await prisma.$queryRaw<Array<{ societeId: string, buckets: number }>>`
+        WITH expected AS (
+            SELECT "societeId", date_trunc('month', "dateEmission")::date AS "month", "statut",
+                   COUNT(*)::int AS "invoiceCount", COALESCE(SUM("totalTTC"), 0) AS "totalTTC"
+            FROM "Facture"
+            WHERE "deletedAt" IS NULL
+            GROUP BY 1, 2, 3
+        )
+        SELECT COALESCE(e."societeId", r."societeId") AS "societeId", COUNT(*)::int AS buckets
+        FROM expected e
+        FULL OUTER JOIN "InvoiceMonthlyRollup" r
+          ON r."societeId" = e."societeId" AND r."month" = e."month" AND r."statut" = e."statut"
+        WHERE e."societeId" IS NULL
+           OR r."societeId" IS NULL
+           OR r."invoiceCount" <> e."invoiceCount"
+           OR abs(r."totalTTC" - e."totalTTC") > 0.005
+        GROUP BY 1
+    `;
+
+    const targets = drift.filter(row => !societeId || row.societeId === societeId);
+    if (targets.length === 0) {
+        console.log('✅ Rollup is in sync');
+        return;
+    }
+
+    targets.forEach(row => console.log(`   ⚠️  ${row.societeId}: ${row.buckets} bucket(s) out of sync`));
+    if (!fix) {
+        console.log('\nRun with --fix to rebuild them.');
+        return;
+    }
+
+    for (const row of targets) {
+        // Same transaction as the Facture scan: concurrent trigger updates wait on the row locks
+        await prisma.$transaction([
+            prisma.$executeRaw`SELECT 1 FROM "Facture" WHERE "societeId" = ${row.societeId} FOR UPDATE`,
+            prisma.$executeRaw`DELETE FROM "InvoiceMonthlyRollup" WHERE "societeId" = ${row.societeId}`,
+            prisma.$executeRaw`
+                INSERT INTO "InvoiceMonthlyRollup" ("societeId", "month", "statut", "invoiceCount", "totalTTC")
+                SELECT "societeId", date_trunc('month', "dateEmission")::date, "statut", COUNT(*), COALESCE(SUM("totalTTC"), 0)
+                FROM "Facture"
+                WHERE "societeId" = ${row.societeId} AND "deletedAt" IS NULL
+                GROUP BY 1, 2, 3
+            `
+        ]);
+        console.log(`   → Rebuilt ${row.societeId}`);
+    }
+
+    console.log(`\n🎉 Rebuilt ${targets.length} société(s)`);
+}
+
+rebuildInvoiceRollup()
+    .catch(console.error)
+    .finally(() => prisma.$disconnect());
@@ -1,64 +1,41 @@
 #!/usr/bin/env python3
 """
 SAFE cleanup script - Remove all console.time/timeEnd that cause conflicts
+
+Runs through the shared patch runner: every .ts/.tsx file under
+src/lib/actions, src/app/api and src/components is processed in parallel,
+unchanged files are skipped via the content-hash cache and backups are
+stored as reverse diffs in .patch-cache/backups/.
 """
 
-import re
-from pathlib import Path
+import sys
+
+from patch_runner import PatchSet, main
 
-ACTIONS_PATH = Path(__file__).parent.parent / "src" / "app" / "actions.ts"
 
-def safe_cleanup():
-    """Remove console.time/timeEnd safely"""
-    
-    if not ACTIONS_PATH.exists():
-        print(f"❌ File not found: {ACTIONS_PATH}")
-        return False
-    
-    content = ACTIONS_PATH.read_text()
-    
-    # Create backup with timestamp
-    import datetime
-    timestamp = datetime.datetime.now().strftime("%Y%m%d_%H%M%S")
-    backup_path = ACTIONS_PATH.with_suffix(f'.ts.backup_{timestamp}')
-    backup_path.write_text(content)
-    print(f"✅ Backup: {backup_path.name}")
-    
-    # Remove console.time and console.timeEnd lines
-    lines = content.split('\n')
+def safe_cleanup(path, content):
+    """Remove lines that are ONLY a console.time/timeEnd call"""
     cleaned_lines = []
-    removed_count = 0
-    
-    for i, line in enumerate(lines):
+    notes = []
+
+    for i, line in enumerate(content.split('\n')):
         stripped = line.strip()
-        
-        # Check if line is ONLY a console.time/timeEnd call
-        if (stripped.startswith('console.time(') or 
-            stripped.startswith('console.timeEnd(')):
-            print(f"   Line {i+1}: Removing {stripped[:50]}...")
-            removed_count += 1
+
+        if (stripped.startswith('console.time(') or
+                stripped.startswith('console.timeEnd(')):
+            notes.append(f"Line {i+1}: Removing {stripped[:50]}...")
             continue
-            
+
         cleaned_lines.append(line)
-    
-    # Write cleaned content
-    cleaned_content = '\n'.join(cleaned_lines)
-    ACTIONS_PATH.write_text(cleaned_content)
-    
-    print(f"\n✅ Cleanup complete!")
-    print(f"   Removed {removed_count} timer calls")
-    print(f"   File size: {len(content)} → {len(cleaned_content)} bytes")
-    
-    return True
+
+    return '\n'.join(cleaned_lines), notes
+
 
 if __name__ == "__main__":
     print("🧹 Starting SAFE cleanup...")
     print("=" * 50)
-    success = safe_cleanup()
+    status = main(PatchSet("safe-cleanup", safe_cleanup))
     print("=" * 50)
-    
-    if success:
-        print("\n✅ All done! Restart your dev server:")
-        print("   npm run dev")
-    else:
-        print("\n❌ Cleanup failed")
+    print("\n✅ All done! Restart your dev server:")
+    print("   npm run dev")
+    sys.exit(status)
@@ -0,0 +1,56 @@
+import { PrismaClient, Prisma } from '@prisma/client';
+
+const prisma = new PrismaClient();
+
+const DOCUMENT_TABLES = {
+    facture: Prisma.raw('"Facture"'),
+    devis: Prisma.raw('"Devis"')
+};
+
+/**
+ * Seeds "DocumentSequence" from the highest 8-digit numero of each société.
+ * Safe to run again: a counter is only ever moved forward.
+ * (Sociétés without a row are also seeded lazily by lib/document-numbers.ts.)
+ * Usage:
+ *   npx tsx scripts/seed-document-sequences.ts --dry-run   # show counters only
+ *   npx tsx scripts/seed-document-sequences.ts
+ */
+async function seedDocumentSequences() {
+    const dryRun = process.argv.includes('--dry-run');
+
+    console.log('🔍 Reading current document number maxima...\n');
+
+    for (const [documentType, table] of Object.entries(DOCUMENT_TABLES)) {
+        const maxima = await prisma.$queryRaw<Array<{ societeId: string, lastValue: number, counter: number | null }>>`
+            SELECT d."societeId", MAX(d."numero"::int) AS "lastValue", s."lastValue" AS "counter"
+            FROM ${table} d
+            LEFT JOIN "DocumentSequence" s ON s."societeId" = d."societeId" AND s."documentType" = ${documentType}
+            WHERE d."numero" ~ '^[0-9]{8}$'
+            GROUP BY d."societeId", s."lastValue"
+        `;
+
+        const behind = maxima.filter(row => row.counter === null || row.counter < row.lastValue);
+        console.log(`📊 ${documentType}: ${maxima.length} société(s), ${behind.length} counter(s) to seed or move forward`);
+        behind.forEach(row => console.log(`   → ${row.societeId}: ${row.counter ?? '—'} ➜ ${row.lastValue}`));
+
+        if (dryRun || behind.length === 0) continue;
+
+        const updated = await prisma.$executeRaw`
+            INSERT INTO "DocumentSequence" ("societeId", "documentType", "lastValue", "updatedAt")
+            SELECT "societeId", ${documentType}, MAX("numero"::int), NOW()
+            FROM ${table}
+            WHERE "numero" ~ '^[0-9]{8}$'
+            GROUP BY "societeId"
+            ON CONFLICT ("societeId", "documentType") DO UPDATE
+            SET "lastValue" = EXCLUDED."lastValue", "updatedAt" = NOW()
+            WHERE "DocumentSequence"."lastValue" < EXCLUDED."lastValue"
+        `;
+        console.log(`   ✓ ${updated} counter(s) written\n`);
+    }
+
+    console.log(dryRun ? '\nDry run: nothing written.' : '\n🎉 Document sequences seeded');
+}
+
+seedDocumentSequences()
+    .catch(console.error)
+    .finally(() => prisma.$disconnect());
@@ -0,0 +1,76 @@
+"""Action count and round-trips of analyze_access_checks.
+
+    python3 -m unittest discover -s scripts/tests -t scripts
+"""
+
+import re
+import sys
+import tempfile
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from analyze_access_checks import ACTION_ROOTS, Analyzer  # noqa: E402
+
+FIXTURE = '''"use server";
+
+import { prisma } from '@/lib/prisma';
+import { traced } from '@/lib/tracing';
+
+async function fetchInvoiceImpl(id: string) {
+    const invoice = await prisma.facture.findUnique({ where: { id } });
+    const again = await prisma.facture.findUnique({ where: { id } });
+    return { success: !!invoice && !!again };
+}
+
+async function listInvoicesImpl(societeId: string) {
+    const [rows, total] = await Promise.all([
+        prisma.facture.findMany({ where: { societeId } }),
+        prisma.facture.count({ where: { societeId } })
+    ]);
+    return { success: true, data: rows, total };
+}
+
+export const fetchInvoice = traced('fetchInvoice', fetchInvoiceImpl);
+export const listInvoices = traced('listInvoices', listInvoicesImpl);
+'''
+
+
+class AnalyzerFixtureTest(unittest.TestCase):
+    def setUp(self):
+        # Inside the repository: reported locations are relative to REPO_ROOT
+        self.tmp = tempfile.TemporaryDirectory(dir=Path(__file__).resolve().parent)
+        root = Path(self.tmp.name)
+        (root / "invoices.ts").write_text(FIXTURE, encoding="utf-8")
+        (root / "helpers.ts").write_text("export const NOTHING = 1;\n", encoding="utf-8")
+        self.report = Analyzer([root / "invoices.ts"], [root / "helpers.ts"]).report()
+        self.rows = {row["action"]: row for row in self.report["ranking"]}
+
+    def tearDown(self):
+        self.tmp.cleanup()
+
+    def test_traced_actions_are_analyzed(self):
+        self.assertEqual(self.report["actions"], 2)
+        self.assertEqual(set(self.rows), {"fetchInvoice", "listInvoices"})
+
+    def test_round_trips(self):
+        self.assertEqual(self.rows["fetchInvoice"]["serial_round_trips"], 2)
+        self.assertEqual(self.rows["fetchInvoice"]["redundant_lookups"], 1)
+        # Promise.all: one round-trip
+        self.assertEqual(self.rows["listInvoices"]["serial_round_trips"], 1)
+
+
+class AnalyzerTreeTest(unittest.TestCase):
+    def test_every_traced_action_is_counted(self):
+        traced = sum(
+            len(re.findall(r"^export const \w+ = traced\(", path.read_text(encoding="utf-8"), re.MULTILINE))
+            for root in ACTION_ROOTS
+            for path in root.glob("*.ts")
+        )
+        self.assertGreater(traced, 0)
+        self.assertEqual(Analyzer().report()["actions"], traced)
+
+
+if __name__ == "__main__":
+    unittest.main()
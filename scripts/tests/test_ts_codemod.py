@@ -0,0 +1,86 @@
+"""ModuleIndex on the export forms used under src/lib/actions/.
+
+    python3 -m unittest discover -s scripts/tests -t scripts
+"""
+
+import sys
+import unittest
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from ts_codemod import Codemod, Edit, ModuleIndex, Patch  # noqa: E402
+
+TRACED_MODULE = '''"use server";
+
+import { prisma } from '@/lib/prisma';
+import { traced } from '@/lib/tracing';
+
+async function fetchClientsImpl(societeId: string): Promise<{ success: boolean }> {
+    const rows = await prisma.client.findMany({ where: { societeId } });
+    return { success: rows.length > 0 };
+}
+
+async function helper(id: string) {
+    return id;
+}
+
+export async function plain(id: string) {
+    return helper(id);
+}
+
+export const loadThing = cache(async (id: string) => {
+    return id;
+});
+
+export const fetchClients = traced('fetchClients', fetchClientsImpl);
+'''
+
+
+def index(source=TRACED_MODULE):
+    return ModuleIndex(Path("actions/clients.ts"), source)
+
+
+class TracedExportTest(unittest.TestCase):
+    def test_traced_export_is_indexed_under_its_exported_name(self):
+        module = index()
+        self.assertEqual([fn.name for fn in module.functions], ["fetchClients", "plain", "loadThing"])
+
+        fn = module.by_name("fetchClients")[0]
+        self.assertEqual(fn.traced_impl, "fetchClientsImpl")
+        self.assertTrue(fn.is_async)
+        self.assertEqual([p.name for p in fn.params], ["societeId"])
+        self.assertTrue(fn.body_contains("findMany"))
+
+    def test_impl_stays_a_helper(self):
+        module = index()
+        self.assertIn("fetchClientsImpl", [fn.name for fn in module.helpers])
+        self.assertIsNone(module.by_name("plain")[0].traced_impl)
+        self.assertTrue(module.by_name("loadThing")[0].memoized)
+
+    def test_traced_without_impl_is_ignored(self):
+        module = index("export const orphan = traced('orphan', missingImpl);\n")
+        self.assertEqual(module.functions, [])
+
+    def test_patches_edit_the_impl_body(self):
+        def insert(fn, module):
+            return [fn.insert_at_body_start(module, "// checked\n", inside_try=False)]
+
+        codemod = Codemod([Patch("insert", insert, functions=["fetchClients"])])
+        patched = codemod.transform(Path("actions/clients.ts"), TRACED_MODULE)
+
+        self.assertIn(
+            "async function fetchClientsImpl(societeId: string): Promise<{ success: boolean }> {\n"
+            "    // checked\n",
+            patched,
+        )
+        self.assertEqual(codemod.missing(), [])
+
+    def test_edits_must_not_overlap(self):
+        codemod = Codemod([Patch("overlap", lambda fn, module: [Edit(0, 5, ""), Edit(2, 3, "")], functions=["plain"])])
+        with self.assertRaises(ValueError):
+            codemod.transform(Path("actions/clients.ts"), TRACED_MODULE)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,756 @@
+#!/usr/bin/env python3
+"""
+🛠️ TS CODEMOD ENGINE - Single-pass patcher for server actions
+
+Tokenizes each TypeScript module ONCE, indexes its exported functions
+(name, parameters, body span) and applies every registered patch in a
+single pass per file. Replaces the one-regex-per-function approach of the
+old patchers, which scanned the whole file for every patch entry and only
+looked at src/app/actions.ts (now a re-export barrel).
+
+Files are dispatched through patch_runner (process pool, content-hash
+cache, reverse-diff backups), so re-running an unchanged patch script over
+an unchanged tree is a no-op.
+
+Usage (from a patch script):
+    from ts_codemod import register_patch, main
+    @register_patch("my-patch", functions=["createInvoice"])
+    def my_patch(fn, module):
+        return [fn.insert_at_body_start(module, "// hello\\n")]
+    main()
+
+    python3 scripts/apply_security_fixes.py --dry-run
+"""
+
+import argparse
+import hashlib
+import sys
+from collections import namedtuple
+from pathlib import Path
+
+import patch_runner
+from patch_runner import PatchSet
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+DEFAULT_ROOTS = [REPO_ROOT / "src" / "lib" / "actions"]
+
+Token = namedtuple("Token", "kind value start end")
+Edit = namedtuple("Edit", "start end text")
+
+# Multi-char punctuators. '>>' is deliberately absent so that nested
+# generics (Promise<Array<X>>) close one bracket per token.
+_PUNCTUATORS = (
+    "...", "===", "!==", "**=", "&&=", "||=", "??=",
+    "=>", "==", "!=", "<=", ">=", "&&", "||", "??", "?.", "++", "--",
+    "+=", "-=", "*=", "/=", "%=", "&=", "|=", "^=", "**",
+)
+# After these tokens a '/' starts a regex literal, not a division.
+_REGEX_PREFIX_KEYWORDS = {"return", "typeof", "case", "do", "else", "in", "of", "new", "delete", "void", "throw", "yield", "await"}
+
+
+class TokenizeError(Exception):
+    pass
+
+
+def _is_ident_start(ch):
+    return ch.isalpha() or ch in "_$" or ord(ch) > 127
+
+
+def _is_ident_part(ch):
+    return ch.isalnum() or ch in "_$" or ord(ch) > 127
+
+
+def tokenize(src):
+    """Tokenize TypeScript source into a flat list (comments kept, whitespace dropped)."""
+    tokens = []
+    _scan(src, 0, tokens, stop_at_brace=False)
+    return tokens
+
+
+def _scan(src, i, tokens, stop_at_brace):
+    """Scan from i; when stop_at_brace, stop at the '}' closing a template ${...}."""
+    n = len(src)
+    depth = 0
+    while i < n:
+        ch = src[i]
+
+        if ch.isspace():
+            i += 1
+            continue
+
+        start = i
+
+        # Comments
+        if src.startswith("//", i):
+            end = src.find("\n", i)
+            end = n if end == -1 else end
+            tokens.append(Token("comment", src[i:end], i, end))
+            i = end
+            continue
+        if src.startswith("/*", i):
+            end = src.find("*/", i + 2)
+            if end == -1:
+                raise TokenizeError(f"Unterminated block comment at {i}")
+            tokens.append(Token("comment", src[i:end + 2], i, end + 2))
+            i = end + 2
+            continue
+
+        # Strings
+        if ch in "'\"":
+            i += 1
+            while i < n and src[i] != ch:
+                if src[i] == "\\":
+                    i += 1
+                elif src[i] == "\n":
+                    raise TokenizeError(f"Unterminated string at {start}")
+                i += 1
+            i += 1
+            tokens.append(Token("string", src[start:i], start, i))
+            continue
+
+        # Template literals (nested ${ ... } expressions are skipped as a unit)
+        if ch == "`":
+            i += 1
+            while i < n and src[i] != "`":
+                if src[i] == "\\":
+                    i += 2
+                    continue
+                if src.startswith("${", i):
+                    i = _scan(src, i + 2, [], stop_at_brace=True)
+                    continue
+                i += 1
+            if i >= n:
+                raise TokenizeError(f"Unterminated template literal at {start}")
+            i += 1
+            tokens.append(Token("template", src[start:i], start, i))
+            continue
+
+        # Identifiers / keywords
+        if _is_ident_start(ch):
+            while i < n and _is_ident_part(src[i]):
+                i += 1
+            tokens.append(Token("ident", src[start:i], start, i))
+            continue
+
+        # Numbers
+        if ch.isdigit() or (ch == "." and i + 1 < n and src[i + 1].isdigit()):
+            while i < n and (src[i].isalnum() or src[i] in "._"):
+                i += 1
+            tokens.append(Token("number", src[start:i], start, i))
+            continue
+
+        # Regex literals
+        if ch == "/" and _regex_allowed(tokens):
+            i += 1
+            in_class = False
+            while i < n:
+                c = src[i]
+                if c == "\\":
+                    i += 2
+                    continue
+                if c == "[":
+                    in_class = True
+                elif c == "]":
+                    in_class = False
+                elif c == "/" and not in_class:
+                    break
+                elif c == "\n":
+                    raise TokenizeError(f"Unterminated regex at {start}")
+                i += 1
+            i += 1
+            while i < n and src[i].isalpha():
+                i += 1
+            tokens.append(Token("regex", src[start:i], start, i))
+            continue
+
+        # Punctuation
+        if stop_at_brace:
+            if ch == "{":
+                depth += 1
+            elif ch == "}":
+                if depth == 0:
+                    return i + 1
+                depth -= 1
+        for p in _PUNCTUATORS:
+            if src.startswith(p, i):
+                i += len(p)
+                break
+        else:
+            i += 1
+        tokens.append(Token("punct", src[start:i], start, i))
+
+    if stop_at_brace:
+        raise TokenizeError("Unterminated template expression")
+    return i
+
+
+def _regex_allowed(tokens):
+    prev = next((t for t in reversed(tokens) if t.kind != "comment"), None)
+    if prev is None:
+        return True
+    if prev.kind == "ident":
+        return prev.value in _REGEX_PREFIX_KEYWORDS
+    if prev.kind in ("number", "string", "template", "regex"):
+        return False
+    return prev.value not in (")", "]", "}")
+
+
+# --- Index -----------------------------------------------------------------
+
+class Param:
+    def __init__(self, name, type_text, default, text):
+        self.name = name          # identifier, or the destructuring pattern text
+        self.type = type_text     # annotation text or None
+        self.default = default    # default value text or None
+        self.text = text          # full parameter text
+
+    def __repr__(self):
+        return f"Param({self.name!r}, type={self.type!r})"
+
+
+class ExportedFunction:
+    """An exported function declaration (or exported const arrow function).
+
+    Also used for top-level non-exported helpers (ModuleIndex.helpers), and
+    for traced actions: `export const name = traced('name', nameImpl)` is
+    indexed as `name`, with the parameters and body of `nameImpl`.
+    """
+
+    def __init__(self, name, path, is_async, params, export_tok, params_open, params_close, body_open, body_close, tokens):
+        self.name = name
+        self.path = path
+        self.is_async = is_async
+        self.params = params
+        self._tokens = tokens
+        self.export_index = export_tok
+        self.params_open = params_open      # token index of '('
+        self.params_close = params_close    # token index of ')'
+        self.body_open = body_open          # token index of '{'
+        self.body_close = body_close        # token index of matching '}'
+        self.memoized = False               # `const name = cache(async (...) => {...})`
+        self.wrapper_close = None           # token index of the ')' closing cache(
+        self.traced_impl = None             # `nameImpl` when exported through traced()
+
+    # Spans are character offsets into the module source
+    @property
+    def span(self):
+        close = self.wrapper_close if self.wrapper_close is not None else self.body_close
+        return (self._tokens[self.export_index].start, self._tokens[close].end)
+
+    @property
+    def body_span(self):
+        return (self._tokens[self.body_open].start, self._tokens[self.body_close].end)
+
+    @property
+    def params_span(self):
+        return (self._tokens[self.params_open].start, self._tokens[self.params_close].end)
+
+    def line(self, module):
+        return module.source.count("\n", 0, self.span[0]) + 1
+
+    def body_tokens(self):
+        return self._tokens[self.body_open + 1:self.body_close]
+
+    def body_contains(self, *needles):
+        """True if an identifier or comment inside the body matches one of the needles."""
+        for tok in self.body_tokens():
+            if tok.kind == "ident" and tok.value in needles:
+                return True
+            if tok.kind == "comment" and any(n in tok.value for n in needles):
+                return True
+        return False
+
+    def param(self, index_or_name):
+        if isinstance(index_or_name, int):
+            return self.params[index_or_name] if index_or_name < len(self.params) else None
+        return next((p for p in self.params if p.name == index_or_name), None)
+
+    def try_block_open(self):
+        """Token index of the '{' of a leading `try {`, or None."""
+        body = self.body_tokens()
+        significant = [i for i, t in enumerate(body) if t.kind != "comment"]
+        if len(significant) >= 2:
+            first, second = body[significant[0]], body[significant[1]]
+            if first.value == "try" and second.value == "{":
+                return self.body_open + 1 + significant[1]
+        return None
+
+    def insert_at_body_start(self, module, block, inside_try=True):
+        """Edit inserting `block` right after the body '{' (or after a leading `try {`)."""
+        open_index = self.try_block_open() if inside_try else None
+        if open_index is None:
+            open_index = self.body_open
+        offset = self._tokens[open_index].end
+        indent = module.indent_after(offset)
+        text = "\n" + reindent(block, indent).rstrip("\n") + "\n"
+        return Edit(offset, offset, text)
+
+
+class ModuleIndex:
+    """Tokens + exported-function index for one TS module, built once per run."""
+
+    def __init__(self, path, source):
+        self.path = Path(path)
+        self.source = source
+        self.tokens = tokenize(source)
+        self.functions = []
+        self.helpers = []           # top-level non-exported function declarations
+        self._traced = []           # (exported name, impl name) of `export const x = traced('x', xImpl)`
+        self._imports = None
+        self._build()
+
+    def by_name(self, name):
+        return [fn for fn in self.functions if fn.name == name]
+
+    def duplicates(self):
+        seen = {}
+        for fn in self.functions:
+            seen.setdefault(fn.name, []).append(fn)
+        return {name: fns for name, fns in seen.items() if len(fns) > 1}
+
+    def indent_after(self, offset):
+        """Indentation of the first non-blank line following `offset`."""
+        nl = self.source.find("\n", offset)
+        while nl != -1:
+            line_end = self.source.find("\n", nl + 1)
+            line = self.source[nl + 1:line_end if line_end != -1 else len(self.source)]
+            if line.strip():
+                return line[:len(line) - len(line.lstrip())]
+            nl = line_end
+        return "    "
+
+    # Imports
+
+    def imported_names(self):
+        if self._imports is None:
+            self._imports = {}
+            toks = self._significant()
+            for k, (i, tok) in enumerate(toks):
+                if tok.value != "import" or tok.kind != "ident":
+                    continue
+                names, j = [], k + 1
+                while j < len(toks) and toks[j][1].value != "from" and toks[j][1].value != ";":
+                    t = toks[j][1]
+                    if t.kind == "ident" and t.value not in ("type", "as", "import", "from"):
+                        names.append(t.value)
+                    j += 1
+                if j + 1 < len(toks) and toks[j][1].value == "from":
+                    module_name = toks[j + 1][1].value.strip("'\"")
+                    for name in names:
+                        self._imports[name] = module_name
+        return self._imports
+
+    def ensure_import(self, name, module_name):
+        """Edit adding `import { name } from 'module_name'` when `name` is not imported yet."""
+        if name in self.imported_names():
+            return None
+        last_end = 0
+        toks = self._significant()
+        for k, (i, tok) in enumerate(toks):
+            # Static imports only: a dynamic import('...') sits inside a body
+            if tok.kind == "ident" and tok.value == "import" and not (k + 1 < len(toks) and toks[k + 1][1].value == "("):
+                j = k
+                while j < len(toks) and toks[j][1].kind != "string":
+                    j += 1
+                if j < len(toks):
+                    end = toks[j][1].end
+                    if j + 1 < len(toks) and toks[j + 1][1].value == ";":
+                        end = toks[j + 1][1].end
+                    last_end = max(last_end, end)
+        self._imports[name] = module_name
+        return Edit(last_end, last_end, f"\nimport {{ {name} }} from '{module_name}';")
+
+    # Parsing
+
+    def _significant(self):
+        return [(i, t) for i, t in enumerate(self.tokens) if t.kind != "comment"]
+
+    def _build(self):
+        toks = self._significant()
+        k = 0
+        depth = 0
+        while k < len(toks):
+            i, tok = toks[k]
+            if tok.kind == "punct" and tok.value in "{([":
+                depth += 1
+            elif tok.kind == "punct" and tok.value in "})]":
+                depth -= 1
+            elif depth == 0 and tok.kind == "ident" and tok.value == "export":
+                fn, next_k = self._parse_export(toks, k)
+                if fn:
+                    self.functions.append(fn)
+                    k = next_k
+                    continue
+            elif depth == 0 and tok.kind == "ident" and tok.value in ("async", "function", "const"):
+                fn, next_k = self._parse_export(toks, k, exported=False)
+                if fn:
+                    self.helpers.append(fn)
+                    k = next_k
+                    continue
+            k += 1
+        self._resolve_traced()
+
+    def _resolve_traced(self):
+        """Index `export const x = traced('x', xImpl)` as the action x, body of xImpl."""
+        impls = {fn.name: fn for fn in self.helpers}
+        for name, impl_name in self._traced:
+            impl = impls.get(impl_name)
+            if impl is None:
+                continue
+            fn = ExportedFunction(
+                name, self.path, impl.is_async, impl.params,
+                impl.export_index, impl.params_open, impl.params_close,
+                impl.body_open, impl.body_close, self.tokens,
+            )
+            fn.traced_impl = impl_name
+            self.functions.append(fn)
+        self.functions.sort(key=lambda fn: fn.export_index)
+
+    def _parse_export(self, toks, k, exported=True):
+        start_k = k
+        if exported:
+            k += 1
+            if k < len(toks) and toks[k][1].value == "default":
+                k += 1
+        is_async = False
+
+        cache_open = None
+        if k < len(toks) and toks[k][1].value in ("const", "let"):
+            # export const name = async (...) => { ... }
+            # const name = cache(async (...) => { ... })  (React per-request memoization)
+            if k + 2 >= len(toks) or toks[k + 2][1].value not in ("=", ":"):
+                return None, k
+            name = toks[k + 1][1].value
+            k += 2
+            while k < len(toks) and toks[k][1].value != "=":
+                k += 1
+            k += 1
+            if exported and self._is_traced(toks, k):
+                # export const name = traced('name', nameImpl)
+                self._traced.append((name, toks[k + 4][1].value))
+                return None, k + 5
+            if k + 1 < len(toks) and toks[k][1].value == "cache" and toks[k + 1][1].value == "(":
+                cache_open = k + 1
+                k += 2
+            if k < len(toks) and toks[k][1].value == "async":
+                is_async = True
+                k += 1
+            if k >= len(toks) or toks[k][1].value != "(":
+                return None, k
+            params_open = k
+            params_close = self._match(toks, k)
+            k = params_close + 1
+            k = self._skip_return_type(toks, k, until="=>")
+            if k >= len(toks) or toks[k][1].value != "=>":
+                return None, k
+            k += 1
+        else:
+            if k < len(toks) and toks[k][1].value == "async":
+                is_async = True
+                k += 1
+            if k >= len(toks) or toks[k][1].value != "function":
+                return None, k
+            k += 1
+            if k < len(toks) and toks[k][1].value == "*":
+                k += 1
+            if k >= len(toks) or toks[k][1].kind != "ident":
+                return None, k
+            name = toks[k][1].value
+            k += 1
+            if k < len(toks) and toks[k][1].value == "<":
+                k = self._match(toks, k) + 1
+            if k >= len(toks) or toks[k][1].value != "(":
+                return None, k
+            params_open = k
+            params_close = self._match(toks, k)
+            k = self._skip_return_type(toks, params_close + 1, until="{")
+
+        if k >= len(toks) or toks[k][1].value != "{":
+            return None, k  # overload signature or expression-bodied arrow
+        body_open = k
+        body_close = self._match(toks, k)
+        params = self._parse_params(toks[params_open + 1:params_close])
+        fn = ExportedFunction(
+            name, self.path, is_async, params,
+            toks[start_k][0], toks[params_open][0], toks[params_close][0],
+            toks[body_open][0], toks[body_close][0], self.tokens,
+        )
+        if cache_open is not None:
+            fn.memoized = True
+            wrapper_close = self._match(toks, cache_open)
+            fn.wrapper_close = toks[wrapper_close][0]
+            return fn, wrapper_close + 1
+        return fn, body_close + 1
+
+    @staticmethod
+    def _is_traced(toks, k):
+        """True when toks[k:] reads `traced('name', nameImpl)`."""
+        window = [t for _, t in toks[k:k + 6]]
+        return (len(window) == 6 and window[0].value == "traced" and window[1].value == "("
+                and window[2].kind == "string" and window[3].value == ","
+                and window[4].kind == "ident" and window[5].value == ")")
+
+    @staticmethod
+    def _match(toks, k):
+        """Index (in toks) of the bracket closing the one at k."""
+        pairs = {"(": ")", "{": "}", "[": "]", "<": ">"}
+        opener = toks[k][1].value
+        closer = pairs[opener]
+        depth = 0
+        for j in range(k, len(toks)):
+            v = toks[j][1].value
+            if toks[j][1].kind != "punct":
+                continue
+            if v == opener:
+                depth += 1
+            elif v == closer:
+                depth -= 1
+                if depth == 0:
+                    return j
+        raise TokenizeError(f"Unbalanced '{opener}' at offset {toks[k][1].start}")
+
+    def _skip_return_type(self, toks, k, until):
+        """Skip an optional `: ReturnType`, stopping at the body '{' (or '=>')."""
+        if k >= len(toks) or toks[k][1].value != ":":
+            return k
+        k += 1
+        angle = 0
+        while k < len(toks):
+            v = toks[k][1].value
+            if toks[k][1].kind == "punct":
+                if v == "<":
+                    angle += 1
+                elif v == ">":
+                    angle -= 1
+                elif v in ("(", "["):
+                    k = self._match(toks, k)
+                elif v == "{":
+                    prev = toks[k - 1][1].value
+                    if angle > 0 or prev in (":", "|", "&", "=>", "<", ",", "("):
+                        k = self._match(toks, k)  # object type literal
+                    elif until == "{":
+                        return k
+                elif v == until and angle == 0:
+                    return k
+            k += 1
+        return k
+
+    def _parse_params(self, toks):
+        params, current, depth = [], [], 0
+        for _, tok in toks:
+            if tok.kind == "punct" and tok.value in "({[<":
+                depth += 1
+            elif tok.kind == "punct" and tok.value in ")}]>":
+                depth -= 1
+            if depth == 0 and tok.value == ",":
+                if current:
+                    params.append(self._make_param(current))
+                current = []
+                continue
+            if tok.kind != "comment":
+                current.append(tok)
+        if current:
+            params.append(self._make_param(current))
+        return params
+
+    def _make_param(self, toks):
+        text = self.source[toks[0].start:toks[-1].end]
+        depth, colon, equals = 0, None, None
+        for j, tok in enumerate(toks):
+            if tok.kind == "punct" and tok.value in "({[<":
+                depth += 1
+            elif tok.kind == "punct" and tok.value in ")}]>":
+                depth -= 1
+            elif depth == 0 and tok.value == ":" and colon is None and equals is None:
+                colon = j
+            elif depth == 0 and tok.value == "=" and equals is None:
+                equals = j
+        name_end = colon if colon is not None else (equals if equals is not None else len(toks))
+        name_toks = [t for t in toks[:name_end] if t.value not in ("...", "?")]
+        name = self.source[name_toks[0].start:name_toks[-1].end] if name_toks else text
+        type_text = None
+        if colon is not None:
+            type_end = equals if equals is not None else len(toks)
+            type_text = self.source[toks[colon + 1].start:toks[type_end - 1].end]
+        default = self.source[toks[equals + 1].start:toks[-1].end] if equals is not None else None
+        return Param(name, type_text, default, text)
+
+
+def reindent(block, indent):
+    """Re-indent a dedented multi-line block to `indent`."""
+    lines = block.strip("\n").split("\n")
+    widths = [len(l) - len(l.lstrip()) for l in lines if l.strip()]
+    base = min(widths) if widths else 0
+    return "\n".join((indent + l[base:]) if l.strip() else "" for l in lines)
+
+
+# --- Patch registry ---------------------------------------------------------
+
+class Patch:
+    """A registered patch. `functions=None` means every exported function;
+    `scope="module"` patches are called once per module instead."""
+
+    def __init__(self, name, apply, functions=None, scope="function"):
+        self.name = name
+        self.apply = apply
+        self.functions = set(functions) if functions else None
+        self.scope = scope
+
+
+REGISTRY = []
+
+
+def register_patch(name, functions=None, scope="function"):
+    def decorator(apply):
+        REGISTRY.append(Patch(name, apply, functions, scope))
+        return apply
+    return decorator
+
+
+class Codemod:
+    """Applies a patch set to many modules, one tokenize/index pass per file."""
+
+    def __init__(self, patches=None):
+        self.patches = list(REGISTRY if patches is None else patches)
+        self._by_function = {}
+        self._generic = []
+        self._module_level = []
+        for patch in self.patches:
+            if patch.scope == "module":
+                self._module_level.append(patch)
+            elif patch.functions is None:
+                self._generic.append(patch)
+            else:
+                for fn_name in patch.functions:
+                    self._by_function.setdefault(fn_name, []).append(patch)
+        self.found = set()
+        self.applied = []  # (patch name, function name, path)
+
+    def edits_for(self, module):
+        edits = []
+        for patch in self._module_level:
+            for edit in patch.apply(module) or []:
+                if edit:
+                    edits.append(edit)
+                    self.applied.append((patch.name, None, module.path))
+        for fn in module.functions:
+            patches = self._by_function.get(fn.name, []) + self._generic
+            if fn.name in self._by_function:
+                self.found.add(fn.name)
+            for patch in patches:
+                produced = [e for e in (patch.apply(fn, module) or []) if e]
+                if produced:
+                    edits.extend(produced)
+                    self.applied.append((patch.name, fn.name, module.path))
+        return edits
+
+    def transform(self, path, source):
+        """Return the patched source for one module."""
+        module = ModuleIndex(path, source)
+        return apply_edits(source, self.edits_for(module))
+
+    def missing(self):
+        """Targeted function names that were not found in any scanned module."""
+        return sorted(set(self._by_function) - self.found)
+
+
+def apply_edits(source, edits):
+    """Apply non-overlapping edits in one pass (insertions at the same offset keep their order)."""
+    if not edits:
+        return source
+    ordered = sorted(enumerate(edits), key=lambda e: (e[1].start, e[1].end, e[0]))
+    out, cursor = [], 0
+    for _, edit in ordered:
+        if edit.start < cursor:
+            raise ValueError(f"Overlapping edits at offset {edit.start}")
+        out.append(source[cursor:edit.start])
+        out.append(edit.text)
+        cursor = edit.end
+    out.append(source[cursor:])
+    return "".join(out)
+
+
+def iter_modules(roots):
+    for root in roots:
+        root = Path(root)
+        if root.is_file():
+            yield root
+            continue
+        # .tsx is not indexed: JSX text is not tokenizable as plain TS
+        for path in sorted(root.rglob("*.ts")):
+            if not path.name.endswith(".d.ts"):
+                yield path
+
+
+def load_index(roots=None):
+    """Index every module under roots: {path: ModuleIndex}."""
+    return {path: ModuleIndex(path, path.read_text(encoding="utf-8")) for path in iter_modules(roots or DEFAULT_ROOTS)}
+
+
+def codemod_transform(path, source):
+    """patch_runner transform: apply the registered patches to one module."""
+    codemod = Codemod()
+    new_source = codemod.transform(Path(path), source)
+    notes = [{"patch": patch, "function": fn} for patch, fn, _ in codemod.applied]
+    notes += [{"found": name} for name in codemod.found]
+    return new_source, notes
+
+
+def _patch_set_version():
+    """Cache key: this engine plus the patch script that registered the patches."""
+    sources = [Path(__file__).read_text(encoding="utf-8")]
+    script = getattr(sys.modules.get("__main__"), "__file__", None)
+    if script:
+        sources.append(Path(script).read_text(encoding="utf-8"))
+    return hashlib.sha256("".join(sources).encode("utf-8")).hexdigest()[:12]
+
+
+def run(roots=None, dry_run=False, force=False, workers=None):
+    """Apply REGISTRY through the shared patch runner (parallel, hash-cached)."""
+    script = Path(getattr(sys.modules.get("__main__"), "__file__", "codemod")).stem
+    patch_set = PatchSet(f"codemod-{script}", codemod_transform, version=_patch_set_version(), suffixes=(".ts",))
+    results = patch_runner.run(patch_set, roots or DEFAULT_ROOTS, workers=workers, dry_run=dry_run, force=force)
+
+    applied, found = [], set()
+    for res in results:
+        for note in res["notes"]:
+            if "found" in note:
+                found.add(note["found"])
+            else:
+                applied.append((note["patch"], note["function"], Path(res["path"])))
+    targeted = {name for patch in REGISTRY if patch.functions for name in patch.functions}
+    return results, applied, sorted(targeted - found)
+
+
+def main(argv=None, description=None):
+    parser = argparse.ArgumentParser(description=description or "Apply registered TS codemods")
+    parser.add_argument("--dry-run", action="store_true", help="print a unified diff instead of writing files")
+    parser.add_argument("--force", action="store_true", help="ignore the patch runner content-hash cache")
+    parser.add_argument("--jobs", type=int, default=None, help="worker processes (default: CPU count)")
+    parser.add_argument("--root", action="append", type=Path, help="directory or file to scan (repeatable)")
+    args = parser.parse_args(argv)
+
+    roots = [p if p.is_absolute() else REPO_ROOT / p for p in args.root] if args.root else DEFAULT_ROOTS
+    results, applied, missing = run(roots, dry_run=args.dry_run, force=args.force, workers=args.jobs)
+
+    for res in results:
+        if res.get("diff"):
+            sys.stdout.write(res["diff"])
+    for patch_name, fn_name, path in applied:
+        target = fn_name or "<module>"
+        print(f"  ✅ {patch_name}: {target} ({path.name})", file=sys.stderr)
+    if results and len(results) == sum(1 for _ in iter_modules(roots)):
+        # Only meaningful when no module was skipped by the cache
+        for fn_name in missing:
+            print(f"  ⏭️  {fn_name} (not exported anywhere under the scanned roots)", file=sys.stderr)
+    if args.dry_run:
+        print("🔍 Dry run: no file written", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    # Without a patch set, list the index (useful to see where functions moved)
+    for path, module in load_index().items():
+        for fn in module.functions:
+            params = ", ".join(p.name for p in fn.params)
+            print(f"{path.relative_to(REPO_ROOT)}:{fn.line(module)}  {fn.name}({params})")
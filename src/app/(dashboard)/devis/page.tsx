@@ -1,6 +1,6 @@
 "use client";
 
-import { useState, useRef, useEffect, Suspense } from "react";
+import { useState, useRef, useEffect, Suspense, useMemo } from "react";
 import Link from "next/link";
 import { Plus, Search, FileText, Calendar, ArrowRight, CheckCircle, Trash2, Upload, Filter, Eye, Pencil, Download, Send, Clock, Minimize2, X } from "lucide-react";
 import { cn } from "@/lib/utils";
@@ -12,9 +12,10 @@ import { generateInvoicePDF } from "@/lib/pdf-generator";
 import { PDFPreviewModal } from "@/components/ui/PDFPreviewModal";
 import { format } from "date-fns";
 import { safeFormat } from "@/lib/date-utils";
-import { deleteRecord, updateQuoteStatus, convertQuoteToInvoice } from "@/app/actions";
+import { deleteRecord, updateQuoteStatus, convertQuoteToInvoice, listQuotes } from "@/app/actions";
 import { toast } from "sonner";
 import { useInvoiceEmail } from "@/hooks/use-invoice-email";
+import { useListingPages } from "@/hooks/use-listing-pages";
 import { EmailComposer } from "@/components/features/EmailComposer";
 import { SidePanel } from "@/components/ui/SidePanel";
 import { CommunicationsPanel } from "@/components/features/CommunicationsPanel";
@@ -166,8 +167,24 @@ function DevisPage() {
         setSelectedQuote(null);
     };
 
+    // Older / searched quotes, paginated server-side beyond the recent ones of the DataProvider
+    const serverSearch = searchTerm.trim();
+    const olderPages = useListingPages<Devis>(
+        cursor => listQuotes(societe!.id, {
+            filters: { search: serverSearch, statut: statusFilter === "ALL" ? undefined : statusFilter },
+            cursor
+        }) as Promise<any>,
+        `${societe?.id}|${serverSearch}|${statusFilter}`,
+        !!societe && (serverSearch.length >= 2 || statusFilter !== "ALL")
+    );
+
+    const listedQuotes = useMemo(() => {
+        const known = new Set(quotes.map(q => q.id));
+        return [...quotes, ...olderPages.rows.filter(q => !known.has(q.id))];
+    }, [quotes, olderPages.rows]);
+
     // Filter logic...
-    const filteredDevis = quotes.filter(devis => {
+    const filteredDevis = listedQuotes.filter(devis => {
         const client = clients.find(c => c.id === devis.clientId);
         const searchLower = searchTerm.toLowerCase();
 
@@ -590,6 +607,17 @@ function DevisPage() {
                     </div>
                 );
             })}
+            {societe && olderPages.hasMore && (
+                <div className="flex justify-center">
+                    <button
+                        onClick={olderPages.loadMore}
+                        disabled={olderPages.isLoading}
+                        className="rounded-lg border border-border dark:border-white/20 px-4 py-2 text-sm text-muted-foreground hover:text-foreground hover:border-primary/30 transition-colors disabled:opacity-50"
+                    >
+                        {olderPages.isLoading ? "Chargement..." : "Charger plus"}
+                    </button>
+                </div>
+            )}
             {
                 statusModalOpen && (
                     <div className="fixed inset-0 z-50 flex items-center justify-center bg-black/50 backdrop-blur-sm">
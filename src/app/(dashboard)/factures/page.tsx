@@ -14,9 +14,10 @@ import { toast } from "sonner";
 import { format } from "date-fns";
 import { fr } from "date-fns/locale";
 import { safeFormat } from "@/lib/date-utils";
-import { deleteRecord, updateInvoice, markInvoiceAsSent, createInvoice, markInvoiceAsDownloaded } from "@/app/actions";
+import { deleteRecord, updateInvoice, markInvoiceAsSent, createInvoice, markInvoiceAsDownloaded, listInvoices } from "@/app/actions";
 import { createClientAction as createClient } from "@/app/actions-clients";
 import { useInvoiceEmail } from "@/hooks/use-invoice-email";
+import { useListingPages } from "@/hooks/use-listing-pages";
 import { Minimize2, Maximize2, X } from "lucide-react";
 import { SidePanel } from "@/components/ui/SidePanel";
 import { getClientDisplayName, getClientSearchText } from "@/lib/client-utils";
@@ -201,8 +202,24 @@ function InvoicesPage() {
         }
     };
 
+    // Older / searched invoices, paginated server-side beyond the recent ones of the DataProvider
+    const serverSearch = searchTerm.trim();
+    const olderPages = useListingPages<Facture>(
+        cursor => listInvoices(societe!.id, {
+            filters: { search: serverSearch, statut: statusFilter === "ALL" ? undefined : statusFilter },
+            cursor
+        }) as Promise<any>,
+        `${societe?.id}|${serverSearch}|${statusFilter}`,
+        !!societe && (serverSearch.length >= 2 || statusFilter !== "ALL")
+    );
+
+    const listedInvoices = useMemo(() => {
+        const known = new Set(invoices.map(inv => inv.id));
+        return [...invoices, ...olderPages.rows.filter(inv => !known.has(inv.id))];
+    }, [invoices, olderPages.rows]);
+
     const { filteredInvoices, invoicesByMonth, sortedMonthKeys, totalFilteredTTC } = useMemo(() => {
-        const filtered = invoices.filter(facture => {
+        const filtered = listedInvoices.filter(facture => {
             const client = clients.find(c => c.id === facture.clientId);
             const searchLower = searchTerm.toLowerCase();
 
@@ -245,7 +262,7 @@ function InvoicesPage() {
             sortedMonthKeys: sortedKeys,
             totalFilteredTTC: totalTTC
         };
-    }, [invoices, clients, searchTerm, statusFilter]);
+    }, [listedInvoices, clients, searchTerm, statusFilter]);
 
     const handleDelete = (id: string) => {
         confirm({
@@ -686,11 +703,23 @@ function InvoicesPage() {
                     );
                 })}
 
-                {sortedMonthKeys.length === 0 && (
+                {sortedMonthKeys.length === 0 && !olderPages.isLoading && (
                     <div className="text-center py-12 text-muted-foreground">
                         Aucune facture trouvée.
                     </div>
                 )}
+
+                {societe && olderPages.hasMore && (
+                    <div className="flex justify-center">
+                        <button
+                            onClick={olderPages.loadMore}
+                            disabled={olderPages.isLoading}
+                            className="rounded-lg border border-border dark:border-white/20 px-4 py-2 text-sm text-muted-foreground hover:text-foreground hover:border-primary/30 transition-colors disabled:opacity-50"
+                        >
+                            {olderPages.isLoading ? "Chargement..." : "Charger plus"}
+                        </button>
+                    </div>
+                )}
             </div>
             <PDFPreviewModal
                 isOpen={isPreviewOpen}
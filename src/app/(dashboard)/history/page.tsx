@@ -4,15 +4,30 @@ import { useData } from "@/components/data-provider";
 import { format } from "date-fns";
 import { fr } from "date-fns/locale";
 import { History, Search, ArrowLeft } from "lucide-react";
-import { useState } from "react";
+import { useState, useMemo } from "react";
 import { useRouter } from "next/navigation";
+import { listHistory } from "@/lib/actions/history";
+import { useListingPages } from "@/hooks/use-listing-pages";
 
 export default function HistoryPage() {
-    const { history } = useData();
+    const { history, societe } = useData();
     const [search, setSearch] = useState("");
     const router = useRouter();
 
-    const filteredHistory = history.filter((entry: any) =>
+    // Full log, paginated server-side (the DataProvider only holds the latest entries)
+    const serverSearch = search.trim();
+    const olderPages = useListingPages<any>(
+        cursor => listHistory(societe!.id, { search: serverSearch, cursor }),
+        `${societe?.id}|${serverSearch}`,
+        !!societe
+    );
+
+    const listedHistory = useMemo(() => {
+        const known = new Set(history.map((entry: any) => entry.id));
+        return [...history, ...olderPages.rows.filter((entry: any) => !known.has(entry.id))];
+    }, [history, olderPages.rows]);
+
+    const filteredHistory = listedHistory.filter((entry: any) =>
         entry.description.toLowerCase().includes(search.toLowerCase()) ||
         entry.userName.toLowerCase().includes(search.toLowerCase())
     );
@@ -102,6 +117,17 @@ export default function HistoryPage() {
                 <div className="mt-4 text-xs text-muted-foreground text-center">
                     Affichage des {filteredHistory.length} dernières actions
                 </div>
+                {societe && olderPages.hasMore && (
+                    <div className="mt-4 flex justify-center">
+                        <button
+                            onClick={olderPages.loadMore}
+                            disabled={olderPages.isLoading}
+                            className="rounded-lg border border-white/10 px-4 py-2 text-sm text-muted-foreground hover:text-foreground transition-colors disabled:opacity-50"
+                        >
+                            {olderPages.isLoading ? "Chargement..." : "Charger plus"}
+                        </button>
+                    </div>
+                )}
             </div>
         </div>
     );
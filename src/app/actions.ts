@@ -11,6 +11,7 @@ export * from '@/lib/actions/quotes';
 export * from '@/lib/actions/history';
 export * from '@/lib/actions/dashboard';
 export * from '@/lib/actions/emails';
+export * from '@/lib/actions/sync';
 
 // Aliases for backward compatibility or semantic naming
 import { createClientAction } from '@/lib/actions/clients';
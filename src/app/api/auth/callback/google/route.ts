@@ -1,5 +1,6 @@
 import { NextResponse } from 'next/server';
 import { prisma } from '@/lib/prisma';
+import { invalidateUser } from '@/lib/session-cache';
 
 // Mock function to simulate getting user info from Google
 // In production, this would exchange the 'code' for tokens and fetch user profile
@@ -55,6 +56,7 @@ export async function GET(request: Request) {
                 }
             });
             userId = updated.id;
+            invalidateUser(userId);
         } else {
             // 3. Create new user
             const newUser = await prisma.user.create({
@@ -14,7 +14,7 @@ export async function POST(request: Request) {
 
         // Rate limiting by email
         const rateLimitKey = `forgot-password:${email}`;
-        if (!checkRateLimit(rateLimitKey, 3, 15 * 60 * 1000)) { // 3 attempts per 15 min
+        if (!(await checkRateLimit(rateLimitKey, 3, 15 * 60 * 1000))) { // 3 attempts per 15 min
             return NextResponse.json(
                 { success: true, message: "Si un compte existe, tu recevras un email." },
                 { status: 200 }
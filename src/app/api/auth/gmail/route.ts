@@ -2,6 +2,7 @@
 import { NextResponse } from 'next/server';
 import { prisma } from '@/lib/prisma';
 import { encrypt } from '@/lib/encryption';
+import { invalidateTransporters } from '@/lib/email';
 
 const GOOGLE_AUTH_URL = 'https://accounts.google.com/o/oauth2/v2/auth';
 const GOOGLE_TOKEN_URL = 'https://oauth2.googleapis.com/token';
@@ -87,6 +88,7 @@ export async function GET(req: Request) {
                     smtpFrom: userData.email // Auto se sender email
                 }
             });
+            invalidateTransporters(societeId);
 
             return NextResponse.redirect(new URL('/settings?success=gmail_connected', req.url));
 
@@ -1,5 +1,6 @@
 import { NextResponse } from 'next/server';
 import { prisma } from '@/lib/prisma';
+import { invalidateUser } from '@/lib/session-cache';
 import { cookies } from 'next/headers';
 
 export async function GET(request: Request) {
@@ -69,6 +70,7 @@ export async function GET(request: Request) {
                     // hasAvatar: !!picture // Optional logic
                 }
             });
+            invalidateUser(user.id);
         } else {
             // CREATE new user
             user = await prisma.user.create({
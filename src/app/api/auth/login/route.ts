@@ -3,6 +3,7 @@ import { prisma } from '@/lib/prisma';
 import bcrypt from 'bcryptjs';
 import { cookies } from 'next/headers';
 import { createTemplateSociete } from '@/lib/actions/template-societe';
+import { checkRateLimits, clearRateLimit, getClientIp } from '@/lib/rate-limit';
 
 export async function POST(request: Request) {
     try {
@@ -15,9 +16,20 @@ export async function POST(request: Request) {
             );
         }
 
+        // Rate limiting by IP and by account, checked together
+        const emailKey = `login:email:${String(email).toLowerCase()}`;
+        const withinLimit = await checkRateLimits([
+            { key: `login:ip:${getClientIp(request)}`, max: 20, windowMs: 15 * 60 * 1000 },
+            { key: emailKey, max: 5, windowMs: 15 * 60 * 1000 }
+        ]);
+        if (!withinLimit) {
+            return NextResponse.json(
+                { success: false, error: 'Trop de tentatives. Réessaye plus tard.' },
+                { status: 429 }
+            );
+        }
+
         // Find user by email
-        // TIMING: Start
-        const startQuery = Date.now();
         const user = await prisma.user.findUnique({
             where: { email },
             include: {
@@ -26,8 +38,6 @@ export async function POST(request: Request) {
                 }
             }
         });
-        console.log(`[PERF] Login Query: ${Date.now() - startQuery}ms`);
-        // TIMING: End
 
         if (!user) {
             console.log('[AUTH_LOGIN] Account not found:', email);
@@ -75,6 +85,9 @@ export async function POST(request: Request) {
         }
         */
 
+        // Failed attempts on this account no longer count
+        await clearRateLimit(emailKey);
+
         // Set Cookie
         const cookieStore = await cookies(); // FIX: await cookies()
         cookieStore.set('session_userid', user.id, {
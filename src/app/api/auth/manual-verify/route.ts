@@ -1,5 +1,6 @@
 import { NextResponse } from 'next/server';
 import { prisma } from '@/lib/prisma';
+import { invalidateUser } from '@/lib/session-cache';
 import { cookies } from 'next/headers';
 
 export async function POST(request: Request) {
@@ -30,6 +31,7 @@ export async function POST(request: Request) {
                 where: { id: user.id },
                 data: { emailVerified: true }
             });
+            invalidateUser(user.id);
 
             // Delete verification tokens
             await prisma.emailVerificationToken.deleteMany({
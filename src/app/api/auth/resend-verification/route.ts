@@ -14,7 +14,7 @@ export async function POST(request: Request) {
 
         // Rate limiting: 1 resend per 60 seconds per email
         const rateLimitKey = `resend-verification:${email}`;
-        if (!checkRateLimit(rateLimitKey, 1, 60 * 1000)) {
+        if (!(await checkRateLimit(rateLimitKey, 1, 60 * 1000))) {
             return NextResponse.json(
                 { error: "Attends 60 secondes avant de renvoyer l'email" },
                 { status: 429 }
@@ -1,8 +1,9 @@
 import { NextResponse } from 'next/server';
 import { prisma } from '@/lib/prisma';
+import { invalidateUser } from '@/lib/session-cache';
 import { hashToken } from '@/lib/tokens';
 import bcrypt from 'bcryptjs';
-import { checkRateLimit } from '@/lib/rate-limit';
+import { checkRateLimit, getClientIp } from '@/lib/rate-limit';
 
 export async function POST(request: Request) {
     try {
@@ -17,8 +18,8 @@ export async function POST(request: Request) {
         }
 
         // Rate limiting by IP (basic protection)
-        const ip = request.headers.get('x-forwarded-for') || 'unknown';
-        if (!checkRateLimit(`reset-password:${ip}`, 5, 15 * 60 * 1000)) {
+        const ip = getClientIp(request);
+        if (!(await checkRateLimit(`reset-password:${ip}`, 5, 15 * 60 * 1000))) {
             return NextResponse.json({ error: "Trop de tentatives. Réessaye plus tard." }, { status: 429 });
         }
 
@@ -56,6 +57,7 @@ export async function POST(request: Request) {
             where: { id: resetToken.userId },
             data: { password: hashedPassword }
         });
+        invalidateUser(resetToken.userId);
 
         // Mark token as used
         await prisma.passwordResetToken.update({
@@ -6,6 +6,7 @@ import { generateToken, hashToken } from '@/lib/tokens';
 import { sendEmail, getEmailVerificationTemplate } from '@/lib/email';
 
 import { createTemplateSociete } from '@/lib/actions/template-societe';
+import { checkRateLimits, getClientIp } from '@/lib/rate-limit';
 
 export async function POST(request: Request) {
     try {
@@ -19,6 +20,15 @@ export async function POST(request: Request) {
             return NextResponse.json({ error: "Le mot de passe doit contenir au moins 6 caractères" }, { status: 400 });
         }
 
+        // 1b. Rate limiting by IP and by email, checked together
+        const withinLimit = await checkRateLimits([
+            { key: `signup:ip:${getClientIp(request)}`, max: 5, windowMs: 60 * 60 * 1000 },
+            { key: `signup:email:${String(email).toLowerCase()}`, max: 3, windowMs: 60 * 60 * 1000 }
+        ]);
+        if (!withinLimit) {
+            return NextResponse.json({ error: "Trop de tentatives. Réessaye plus tard." }, { status: 429 });
+        }
+
         // 2. Check for existing user
         const existingUser = await prisma.user.findUnique({
             where: { email }
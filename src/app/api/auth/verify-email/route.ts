@@ -1,5 +1,6 @@
 import { NextResponse } from 'next/server';
 import { prisma } from '@/lib/prisma';
+import { invalidateUser } from '@/lib/session-cache';
 import { hashToken } from '@/lib/tokens';
 
 export async function GET(request: Request) {
@@ -38,6 +39,7 @@ export async function GET(request: Request) {
             where: { id: verificationToken.userId },
             data: { emailVerified: true }
         });
+        invalidateUser(verificationToken.userId);
 
         // Delete the used token
         await prisma.emailVerificationToken.delete({
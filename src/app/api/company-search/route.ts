@@ -1,48 +1,69 @@
 import { NextRequest, NextResponse } from "next/server";
+import { cachedLookup } from "@/lib/lookup-cache";
+
+const UPSTREAM_TIMEOUT_MS = 4000;
+const CACHE_OPTIONS = {
+    ttlMs: 24 * 60 * 60 * 1000,
+    negativeTtlMs: 60 * 60 * 1000
+};
+
+/**
+ * Cache key: "  Acme   sas " and "ACME SAS" are the same search
+ */
+function normalizeQuery(query: string) {
+    return query.normalize("NFC").trim().replace(/\s+/g, " ").toLowerCase();
+}
+
+async function searchCompanies(query: string) {
+    const response = await fetch(`https://recherche-entreprises.api.gouv.fr/search?q=${encodeURIComponent(query)}&per_page=5`, {
+        headers: { 'Accept': 'application/json' },
+        signal: AbortSignal.timeout(UPSTREAM_TIMEOUT_MS),
+        cache: 'no-store'
+    });
+
+    if (!response.ok) {
+        throw new Error(`API Error ${response.status}`);
+    }
+
+    const data = await response.json();
+    if (!data.results || data.results.length === 0) return null;
+
+    return data.results.map((company: any) => {
+        const siege = company.siege;
+        const siren = company.siren;
+        const tvaKey = (12 + 3 * (parseInt(siren, 10) % 97)) % 97;
+        const tvaKeyStr = tvaKey.toString().padStart(2, '0');
+        const tvaIntra = `FR${tvaKeyStr}${siren}`;
+
+        return {
+            nom: company.nom_complet,
+            siret: siege?.siret || company.siret,
+            adresse: siege ? [
+                siege.numero_voie,
+                siege.type_voie,
+                siege.libelle_voie
+            ].filter(Boolean).join(" ") : company.adresse,
+            codePostal: siege?.code_postal || company.code_postal,
+            ville: siege?.libelle_commune || company.libelle_commune,
+            formeJuridique: mapLegalForm(company.nature_juridique),
+            tvaIntra: tvaIntra,
+            siren: siren
+        };
+    });
+}
 
 export async function GET(req: NextRequest) {
     try {
         const { searchParams } = new URL(req.url);
-        const query = searchParams.get("q");
+        const query = normalizeQuery(searchParams.get("q") || "");
 
         if (!query) {
             return NextResponse.json({ error: "Query required" }, { status: 400 });
         }
 
-        const response = await fetch(`https://recherche-entreprises.api.gouv.fr/search?q=${query}&per_page=5`, {
-            headers: { 'Accept': 'application/json' }
-        });
-
-        if (!response.ok) {
-            return NextResponse.json({ error: "API Error" }, { status: response.status });
-        }
-
-        const data = await response.json();
-
-        if (data.results && data.results.length > 0) {
-            const results = data.results.map((company: any) => {
-                const siege = company.siege;
-                const siren = company.siren;
-                const tvaKey = (12 + 3 * (parseInt(siren, 10) % 97)) % 97;
-                const tvaKeyStr = tvaKey.toString().padStart(2, '0');
-                const tvaIntra = `FR${tvaKeyStr}${siren}`;
-
-                return {
-                    nom: company.nom_complet,
-                    siret: siege?.siret || company.siret,
-                    adresse: siege ? [
-                        siege.numero_voie,
-                        siege.type_voie,
-                        siege.libelle_voie
-                    ].filter(Boolean).join(" ") : company.adresse,
-                    codePostal: siege?.code_postal || company.code_postal,
-                    ville: siege?.libelle_commune || company.libelle_commune,
-                    formeJuridique: mapLegalForm(company.nature_juridique),
-                    tvaIntra: tvaIntra,
-                    siren: siren
-                };
-            });
+        const results = await cachedLookup("company-search", query, () => searchCompanies(query), CACHE_OPTIONS);
 
+        if (results) {
             return NextResponse.json({
                 success: true,
                 results: results
@@ -53,7 +74,8 @@ export async function GET(req: NextRequest) {
 
     } catch (error: any) {
         console.error("Siret Lookup Error:", error);
-        return NextResponse.json({ error: error.message }, { status: 500 });
+        const timedOut = error?.name === "TimeoutError";
+        return NextResponse.json({ error: timedOut ? "API Timeout" : error.message }, { status: timedOut ? 504 : 502 });
     }
 }
 
@@ -0,0 +1,26 @@
+import { NextResponse } from 'next/server';
+import { isCronRequest } from '@/lib/bearer-auth';
+import { processOverdueInvoices } from '@/lib/overdue-invoices';
+
+export const dynamic = 'force-dynamic';
+export const revalidate = 0;
+
+export async function GET(request: Request) {
+    if (!isCronRequest(request)) {
+        return NextResponse.json({ success: false, error: 'Non autorisé' }, { status: 401 });
+    }
+
+    try {
+        // Only invoices due since the last run (watermark); ?full=1 re-checks every open invoice
+        const full = new URL(request.url).searchParams.get('full') === '1';
+        const results = await processOverdueInvoices(new Date(), { full });
+
+        console.log(`[CRON] Overdue invoices: ${results.updated} updated in ${results.societes} société(s), ${results.batches} batch(es)${results.complete ? '' : ' (incomplete, resumed next run)'}.`);
+
+        return NextResponse.json({ success: true, results });
+
+    } catch (error: any) {
+        console.error("[CRON] Critical Error:", error);
+        return NextResponse.json({ success: false, error: error.message }, { status: 500 });
+    }
+}
@@ -0,0 +1,76 @@
+import { NextResponse } from 'next/server';
+import { MembershipRole } from '@prisma/client';
+import { prisma } from '@/lib/prisma';
+import { getCurrentUser } from '@/lib/actions/auth';
+import { canAccessSociete } from '@/lib/actions/members';
+import { EXPORT_KINDS, ExportKind, exportChunks, exportFilename, parseExportPeriod } from '@/lib/accounting-export';
+
+export const runtime = 'nodejs';
+export const dynamic = 'force-dynamic';
+
+// GET /api/export?societeId=...&type=factures|devis|paiements|fec&year=2026
+// (or &month=2026-01, or &from=2026-01-01&to=2026-12-31)
+// Rows are written as they are read, one keyset page per pull, gzipped when
+// the client accepts it.
+export async function GET(request: Request) {
+    try {
+        const { searchParams } = new URL(request.url);
+        const societeId = searchParams.get('societeId');
+        const kind = (searchParams.get('type') || 'factures') as ExportKind;
+        const period = parseExportPeriod(searchParams);
+
+        if (!societeId || !period || !EXPORT_KINDS.includes(kind)) {
+            return NextResponse.json({ error: "Paramètres requis: societeId, type (factures, devis, paiements, fec), year (YYYY), month (YYYY-MM) ou from/to (YYYY-MM-DD)" }, { status: 400 });
+        }
+
+        const userRes = await getCurrentUser();
+        if (!userRes.success || !userRes.data) return NextResponse.json({ error: "Non authentifié" }, { status: 401 });
+
+        const authorized = await canAccessSociete(userRes.data.id, societeId, MembershipRole.VIEWER);
+        if (!authorized) return NextResponse.json({ error: "Accès refusé" }, { status: 403 });
+
+        const societe = await prisma.societe.findUnique({ where: { id: societeId }, select: { nom: true, siret: true } });
+        if (!societe) return NextResponse.json({ error: "Société introuvable" }, { status: 404 });
+
+        const chunks = exportChunks(kind, societeId, period);
+        const encoder = new TextEncoder();
+
+        // Pull-based: the next page is only read once the previous one is consumed
+        let body: ReadableStream<Uint8Array> = new ReadableStream<Uint8Array>({
+            async pull(controller) {
+                try {
+                    const { value, done } = await chunks.next();
+                    if (done) {
+                        controller.close();
+                        return;
+                    }
+                    controller.enqueue(encoder.encode(value));
+                } catch (e) {
+                    console.error("[EXPORT] Export failed", e);
+                    controller.error(e);
+                }
+            },
+            async cancel() {
+                // Client gone: stop reading pages
+                await chunks.return(undefined);
+            }
+        });
+
+        const gzip = /\bgzip\b/.test(request.headers.get('accept-encoding') || '');
+        if (gzip) body = body.pipeThrough(new CompressionStream('gzip'));
+
+        const filename = exportFilename(kind, societe, period);
+        return new NextResponse(body, {
+            status: 200,
+            headers: {
+                'Content-Type': kind === 'fec' ? 'text/plain; charset=utf-8' : 'text/csv; charset=utf-8',
+                'Content-Disposition': `attachment; filename="${filename}"`,
+                'Cache-Control': 'private, no-store',
+                ...(gzip ? { 'Content-Encoding': 'gzip', 'Vary': 'Accept-Encoding' } : {})
+            }
+        });
+    } catch (error: any) {
+        console.error("[EXPORT] Error:", error);
+        return NextResponse.json({ error: error.message }, { status: 500 });
+    }
+}
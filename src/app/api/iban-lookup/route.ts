@@ -1,31 +1,88 @@
 import { NextRequest, NextResponse } from 'next/server';
+import { getBankDetails, isValidIban, normalizeIban } from '@/lib/banks';
+import { cachedLookup } from '@/lib/lookup-cache';
 
-// Local fallback database for common French banks
-const FRENCH_BANKS: Record<string, { name: string, bic: string }> = {
-    "30004": { name: "BNP PARIBAS", bic: "BNPAFRPP" },
-    "30003": { name: "SOCIETE GENERALE", bic: "SOGEFRPP" },
-    "30002": { name: "LCL", bic: "CRLYFRPP" },
-    "30066": { name: "CIC", bic: "CMCIFRPP" },
-    "20041": { name: "LA BANQUE POSTALE", bic: "PSSTFRPP" },
-    "10907": { name: "BOURSORAMA", bic: "BOUSFRPP" },
-    "16006": { name: "FORTUNEO", bic: "FTNOFRP1" },
-    "14505": { name: "ING", bic: "INGBFRPP" },
-    "11195": { name: "HELLO BANK", bic: "BNPAFRPP" },
-    "19499": { name: "QONTO", bic: "QNTOFRP1" },
-    "16598": { name: "SHINE", bic: "SABOROPP" },
-    "10278": { name: "CREDIT MUTUEL", bic: "CMCIFR2A" },
-    "11706": { name: "CAISSE D'EPARGNE", bic: "CEPAFRPP" },
-    "11406": { name: "CREDIT AGRICOLE", bic: "AGRIFRPP" },
-    "11315": { name: "BANQUE POPULAIRE", bic: "CCBPFRPP" },
-    "28233": { name: "REVOLUT", bic: "REVOFRPP" },
-    "10207": { name: "BANQUE POPULAIRE", bic: "CCBPFRPP" },
+const UPSTREAM_TIMEOUT_MS = 3000;
+const CACHE_OPTIONS = {
+    ttlMs: 30 * 24 * 60 * 60 * 1000, // Bank codes hardly ever move
+    negativeTtlMs: 24 * 60 * 60 * 1000
 };
 
-function getLocalBankDetails(iban: string) {
-    const clean = iban.replace(/\s/g, '').toUpperCase();
-    if (!clean.startsWith('FR') || clean.length < 14) return null;
-    const bankCode = clean.substring(4, 9);
-    return FRENCH_BANKS[bankCode] || null;
+interface BankLookup {
+    source: string;
+    data: { bankName: string, bic: string, city?: string, zip?: string };
+}
+
+/**
+ * Cache key: country + bank and branch codes (first 10 characters of the
+ * BBAN in France), never the account number
+ */
+function bankLookupKey(iban: string) {
+    return iban.substring(0, 2) + iban.substring(4, 14);
+}
+
+async function fetchOpenIban(iban: string): Promise<BankLookup | null> {
+    const response = await fetch(`https://openiban.com/validate/${iban}?getBIC=true&validateBankCode=true`, {
+        headers: { 'Accept': 'application/json' },
+        signal: AbortSignal.timeout(UPSTREAM_TIMEOUT_MS),
+        cache: 'no-store' // Cached by lookup-cache, per bank code instead of per IBAN
+    });
+    if (!response.ok) throw new Error(`OpenIBAN HTTP ${response.status}`);
+
+    const data = await response.json();
+    // Critical check: valid AND has a bank name
+    if (!data.valid || !data.bankData?.name) return null;
+    return {
+        source: 'openiban',
+        data: {
+            bankName: data.bankData.name,
+            bic: data.bankData.bic || '',
+            city: data.bankData.city || '',
+            zip: data.bankData.zip || ''
+        }
+    };
+}
+
+async function fetchIbanApi(iban: string): Promise<BankLookup | null> {
+    const response = await fetch(`https://api.ibanapi.com/v1/validate/${iban}`, {
+        headers: { 'Accept': 'application/json' },
+        signal: AbortSignal.timeout(UPSTREAM_TIMEOUT_MS),
+        cache: 'no-store'
+    });
+    if (!response.ok) throw new Error(`IBANAPI HTTP ${response.status}`);
+
+    const data = await response.json();
+    if (data.result !== 200 || !data.data?.bank) return null;
+    return {
+        source: 'ibanapi',
+        data: {
+            bankName: data.data.bank.bank_name || '',
+            bic: data.data.bank.bic || ''
+        }
+    };
+}
+
+/**
+ * Providers tried in order. "Not found" only when one of them answered:
+ * if all of them failed, the error is thrown (and not cached)
+ */
+async function fetchBankDetails(iban: string): Promise<BankLookup | null> {
+    let answered = false;
+    let lastError: unknown;
+
+    for (const provider of [fetchOpenIban, fetchIbanApi]) {
+        try {
+            const result = await provider(iban);
+            if (result) return result;
+            answered = true;
+        } catch (error) {
+            console.error(`${provider.name} error:`, error);
+            lastError = error;
+        }
+    }
+
+    if (!answered) throw lastError;
+    return null;
 }
 
 export async function GET(request: NextRequest) {
@@ -36,10 +93,15 @@ export async function GET(request: NextRequest) {
         return NextResponse.json({ success: false, error: 'IBAN trop court' });
     }
 
-    const cleanIban = iban.replace(/\s/g, '').toUpperCase();
+    const cleanIban = normalizeIban(iban);
+
+    // 1. Checksum: a mistyped IBAN never reaches the external APIs
+    if (!isValidIban(cleanIban)) {
+        return NextResponse.json({ success: false, error: 'IBAN invalide' });
+    }
 
-    // 1. Try local database first (faster)
-    const localResult = getLocalBankDetails(cleanIban);
+    // 2. Local bank code index (lib/banks)
+    const localResult = getBankDetails(cleanIban);
     if (localResult) {
         return NextResponse.json({
             success: true,
@@ -51,55 +113,14 @@ export async function GET(request: NextRequest) {
         });
     }
 
-    // 2. Try OpenIBAN API
+    // 3. External APIs, cached per bank code
     try {
-        const response = await fetch(`https://openiban.com/validate/${cleanIban}?getBIC=true&validateBankCode=true`, {
-            headers: { 'Accept': 'application/json' },
-            next: { revalidate: 86400 } // Cache for 24h
-        });
-
-        if (response.ok) {
-            const data = await response.json();
-
-            // Critical check: valid AND has a bank name
-            if (data.valid && data.bankData && data.bankData.name) {
-                return NextResponse.json({
-                    success: true,
-                    source: 'openiban',
-                    data: {
-                        bankName: data.bankData.name,
-                        bic: data.bankData.bic || '',
-                        city: data.bankData.city || '',
-                        zip: data.bankData.zip || ''
-                    }
-                });
-            }
-        }
-    } catch (error) {
-        console.error('OpenIBAN API error:', error);
-    }
-
-    // 3. Try IBAN.com API as fallback
-    try {
-        const response = await fetch(`https://api.ibanapi.com/v1/validate/${cleanIban}`, {
-            headers: { 'Accept': 'application/json' }
-        });
-
-        if (response.ok) {
-            const data = await response.json();
-            if (data.result === 200 && data.data?.bank) {
-                return NextResponse.json({
-                    success: true,
-                    source: 'ibanapi',
-                    data: {
-                        bankName: data.data.bank.bank_name || '',
-                        bic: data.data.bank.bic || ''
-                    }
-                });
-            }
+        const result = await cachedLookup('iban', bankLookupKey(cleanIban), () => fetchBankDetails(cleanIban), CACHE_OPTIONS);
+        if (result) {
+            return NextResponse.json({ success: true, source: result.source, data: result.data });
         }
     } catch (error) {
-        console.error('IBANAPI error:', error);
+        console.error('IBAN lookup unavailable:', error);
     }
 
     return NextResponse.json({
@@ -0,0 +1,32 @@
+import { NextResponse } from 'next/server';
+import { hasBearerToken } from '@/lib/bearer-auth';
+import { metricsSnapshot, resetMetrics } from '@/lib/tracing';
+
+export const dynamic = 'force-dynamic';
+export const revalidate = 0;
+
+// Disabled unless METRICS_SECRET is set; callers send "Authorization: Bearer <secret>"
+function isAuthorized(request: Request): boolean {
+    return hasBearerToken(request, process.env.METRICS_SECRET);
+}
+
+/**
+ * Per-action latency histograms, query counts and DB time of this instance
+ */
+export async function GET(request: Request) {
+    if (!isAuthorized(request)) {
+        return NextResponse.json({ success: false, error: 'Non autorisé' }, { status: 401 });
+    }
+    return NextResponse.json({ success: true, ...metricsSnapshot() });
+}
+
+/**
+ * Resets the counters (e.g. before a measurement window)
+ */
+export async function DELETE(request: Request) {
+    if (!isAuthorized(request)) {
+        return NextResponse.json({ success: false, error: 'Non autorisé' }, { status: 401 });
+    }
+    resetMetrics();
+    return NextResponse.json({ success: true });
+}
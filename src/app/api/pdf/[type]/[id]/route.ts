@@ -0,0 +1,71 @@
+import { NextResponse } from 'next/server';
+import { MembershipRole } from '@prisma/client';
+import { prisma } from '@/lib/prisma';
+import { getCurrentUser } from '@/lib/actions/auth';
+import { canAccessSociete } from '@/lib/actions/members';
+import { getPdfAssets, loadPdfSociete, loadPdfSources, pdfFilename, renderPdfSource, PdfDocumentType } from '@/lib/pdf-server';
+import type { Societe } from '@/types';
+
+export const runtime = 'nodejs';
+export const dynamic = 'force-dynamic';
+
+const CHUNK_SIZE = 64 * 1024;
+
+// GET /api/pdf/factures/:id or /api/pdf/devis/:id — server-rendered PDF, streamed
+export async function GET(
+    request: Request,
+    { params }: { params: Promise<{ type: string, id: string }> }
+) {
+    try {
+        const { type, id } = await params;
+        if (type !== 'factures' && type !== 'devis') {
+            return NextResponse.json({ error: "Type de document invalide" }, { status: 400 });
+        }
+
+        const owner = type === 'factures'
+            ? await prisma.facture.findUnique({ where: { id }, select: { societeId: true } })
+            : await prisma.devis.findUnique({ where: { id }, select: { societeId: true } });
+        if (!owner) return NextResponse.json({ error: "Document introuvable" }, { status: 404 });
+
+        const userRes = await getCurrentUser();
+        if (!userRes.success || !userRes.data) return NextResponse.json({ error: "Non authentifié" }, { status: 401 });
+
+        const authorized = await canAccessSociete(userRes.data.id, owner.societeId, MembershipRole.VIEWER);
+        if (!authorized) return NextResponse.json({ error: "Accès refusé" }, { status: 403 });
+
+        const [societe, sources] = await Promise.all([
+            loadPdfSociete(owner.societeId),
+            loadPdfSources(type as PdfDocumentType, { societeId: owner.societeId, ids: [id] }, { take: 1 })
+        ]);
+        if (!societe || sources.length === 0) return NextResponse.json({ error: "Document introuvable" }, { status: 404 });
+
+        const assets = await getPdfAssets(societe);
+        const bytes = renderPdfSource(sources[0], societe as unknown as Societe, assets);
+
+        let offset = 0;
+        const stream = new ReadableStream<Uint8Array>({
+            pull(controller) {
+                if (offset >= bytes.length) {
+                    controller.close();
+                    return;
+                }
+                controller.enqueue(bytes.subarray(offset, offset + CHUNK_SIZE));
+                offset += CHUNK_SIZE;
+            }
+        });
+
+        const disposition = new URL(request.url).searchParams.get('download') ? 'attachment' : 'inline';
+        return new NextResponse(stream, {
+            status: 200,
+            headers: {
+                'Content-Type': 'application/pdf',
+                'Content-Length': bytes.length.toString(),
+                'Content-Disposition': `${disposition}; filename="${pdfFilename(type, sources[0].document.numero)}"`,
+                'Cache-Control': 'private, no-store'
+            }
+        });
+    } catch (error: any) {
+        console.error("[PDF] Render error:", error);
+        return NextResponse.json({ error: error.message }, { status: 500 });
+    }
+}
@@ -0,0 +1,110 @@
+import { NextResponse } from 'next/server';
+import { MembershipRole } from '@prisma/client';
+import { getCurrentUser } from '@/lib/actions/auth';
+import { canAccessSociete } from '@/lib/actions/members';
+import { getPdfAssets, loadPdfSociete, loadPdfSources, pdfFilename, renderPdfSource, PdfDocumentType } from '@/lib/pdf-server';
+import { ZipWriter } from '@/lib/zip-stream';
+import type { Societe } from '@/types';
+
+export const runtime = 'nodejs';
+export const dynamic = 'force-dynamic';
+
+const PAGE_SIZE = 25;
+
+/**
+ * Period from ?month=YYYY-MM or ?year=YYYY: [from, to) in UTC
+ */
+function parsePeriod(searchParams: URLSearchParams): { from: Date, to: Date, label: string } | null {
+    const month = searchParams.get('month');
+    if (month && /^\d{4}-\d{2}$/.test(month)) {
+        const [y, m] = month.split('-').map(Number);
+        return { from: new Date(Date.UTC(y, m - 1, 1)), to: new Date(Date.UTC(y, m, 1)), label: month };
+    }
+    const year = searchParams.get('year');
+    if (year && /^\d{4}$/.test(year)) {
+        const y = Number(year);
+        return { from: new Date(Date.UTC(y, 0, 1)), to: new Date(Date.UTC(y + 1, 0, 1)), label: year };
+    }
+    return null;
+}
+
+// GET /api/pdf/batch?societeId=...&month=2026-01 (or &year=2026) [&type=devis]
+// Zip of every document of the period, rendered and streamed page by page.
+export async function GET(request: Request) {
+    try {
+        const { searchParams } = new URL(request.url);
+        const societeId = searchParams.get('societeId');
+        const type = (searchParams.get('type') || 'factures') as PdfDocumentType;
+        const period = parsePeriod(searchParams);
+
+        if (!societeId || !period || (type !== 'factures' && type !== 'devis')) {
+            return NextResponse.json({ error: "Paramètres requis: societeId, month (YYYY-MM) ou year (YYYY)" }, { status: 400 });
+        }
+
+        const userRes = await getCurrentUser();
+        if (!userRes.success || !userRes.data) return NextResponse.json({ error: "Non authentifié" }, { status: 401 });
+
+        const authorized = await canAccessSociete(userRes.data.id, societeId, MembershipRole.VIEWER);
+        if (!authorized) return NextResponse.json({ error: "Accès refusé" }, { status: 403 });
+
+        const societe = await loadPdfSociete(societeId);
+        if (!societe) return NextResponse.json({ error: "Société introuvable" }, { status: 404 });
+
+        const assets = await getPdfAssets(societe);
+        const zip = new ZipWriter();
+        const errors: string[] = [];
+        let after: { dateEmission: Date, id: string } | undefined;
+        let done = false;
+
+        // One page of documents per pull: memory stays bounded by PAGE_SIZE PDFs
+        const stream = new ReadableStream<Uint8Array>({
+            async pull(controller) {
+                try {
+                    if (done) return;
+
+                    const sources = await loadPdfSources(type, { societeId, from: period.from, to: period.to }, { take: PAGE_SIZE, after });
+
+                    for (const source of sources) {
+                        const folder = source.document.dateEmission.slice(0, 7); // YYYY-MM
+                        const name = `${folder}/${pdfFilename(type, source.document.numero)}`;
+                        try {
+                            controller.enqueue(zip.addFile(name, renderPdfSource(source, societe as unknown as Societe, assets), source.updatedAt));
+                        } catch (e: any) {
+                            console.error(`[PDF] Batch render failed for ${source.document.numero}`, e);
+                            errors.push(`${source.document.numero}: ${e.message}`);
+                        }
+                    }
+
+                    if (sources.length === PAGE_SIZE) {
+                        const last = sources[sources.length - 1];
+                        after = { dateEmission: new Date(last.document.dateEmission), id: last.document.id };
+                        return;
+                    }
+
+                    if (errors.length > 0) {
+                        controller.enqueue(zip.addFile('ERREURS.txt', Buffer.from(errors.join('\n'), 'utf8')));
+                    }
+                    controller.enqueue(zip.finish());
+                    done = true;
+                    controller.close();
+                } catch (e) {
+                    console.error("[PDF] Batch export failed", e);
+                    controller.error(e);
+                }
+            }
+        });
+
+        const filename = `${type === 'factures' ? 'Factures' : 'Devis'}_${period.label}.zip`;
+        return new NextResponse(stream, {
+            status: 200,
+            headers: {
+                'Content-Type': 'application/zip',
+                'Content-Disposition': `attachment; filename="${filename}"`,
+                'Cache-Control': 'private, no-store'
+            }
+        });
+    } catch (error: any) {
+        console.error("[PDF] Batch error:", error);
+        return NextResponse.json({ error: error.message }, { status: 500 });
+    }
+}
@@ -31,6 +31,7 @@ export async function POST(req: Request) {
                 }
 
                 config = {
+                    societeId: societe.id,
                     provider: societe.emailProvider || "SMTP",
                     host: societe.smtpHost,
                     port: societe.smtpPort,
@@ -1,6 +1,5 @@
 import { NextRequest, NextResponse } from "next/server";
-import { writeFile, mkdir } from "fs/promises";
-import path from "path";
+import { AVATAR_SIZES, writePublicVariants } from "@/lib/image-variants";
 
 export async function POST(req: NextRequest) {
     try {
@@ -11,26 +10,20 @@ export async function POST(req: NextRequest) {
             return NextResponse.json({ error: "No file uploaded" }, { status: 400 });
         }
 
-        const buffer = Buffer.from(await file.arrayBuffer());
-
-        // Ensure public/uploads directory exists
-        const publicDir = path.join(process.cwd(), "public", "uploads");
-        try {
-            await mkdir(publicDir, { recursive: true });
-        } catch (e) {
-            // ignore if exists
+        if (!file.type.startsWith("image/")) {
+            return NextResponse.json({ error: "Invalid file type. Only images allowed." }, { status: 400 });
         }
 
-        // Generate unique filename to prevent conflicts
-        const filename = `avatar-${Date.now()}-${file.name.replace(/[^a-zA-Z0-9.-]/g, "")}`;
-        const filePath = path.join(publicDir, filename);
+        const buffer = Buffer.from(await file.arrayBuffer());
 
-        await writeFile(filePath, buffer);
+        // Original + size variants, named by content hash (served as immutable)
+        const extension = file.name.split(".").pop()?.toLowerCase().replace(/[^a-z0-9]/g, "") || "png";
+        const stored = await writePublicVariants("uploads", "avatar", buffer, extension, AVATAR_SIZES, "cover");
 
-        // Return the URL relative to public
         return NextResponse.json({
             success: true,
-            avatarUrl: `/uploads/${filename}`
+            avatarUrl: stored.url,
+            variants: stored.variants
         });
     } catch (error) {
         console.error("Upload error:", error);
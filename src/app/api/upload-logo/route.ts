@@ -1,6 +1,5 @@
 import { NextRequest, NextResponse } from "next/server";
-import { writeFile, mkdir } from "fs/promises";
-import path from "path";
+import { LOGO_SIZES, writePublicVariants } from "@/lib/image-variants";
 
 export async function POST(req: NextRequest) {
     try {
@@ -11,25 +10,20 @@ export async function POST(req: NextRequest) {
             return NextResponse.json({ error: "No file uploaded" }, { status: 400 });
         }
 
-        const buffer = Buffer.from(await file.arrayBuffer());
-
-        // Ensure public/uploads/logos directory exists
-        const publicDir = path.join(process.cwd(), "public", "uploads", "logos");
-        try {
-            await mkdir(publicDir, { recursive: true });
-        } catch (e) {
-            // ignore if exists
+        if (!file.type.startsWith("image/")) {
+            return NextResponse.json({ error: "Invalid file type. Only images allowed." }, { status: 400 });
         }
 
-        // Generate unique filename
-        const filename = `logo-${Date.now()}-${file.name.replace(/[^a-zA-Z0-9.-]/g, "")}`;
-        const filePath = path.join(publicDir, filename);
+        const buffer = Buffer.from(await file.arrayBuffer());
 
-        await writeFile(filePath, buffer);
+        // Original + size variants, named by content hash (served as immutable)
+        const extension = file.name.split(".").pop()?.toLowerCase().replace(/[^a-z0-9]/g, "") || "png";
+        const stored = await writePublicVariants("uploads/logos", "logo", buffer, extension, LOGO_SIZES, "inside");
 
         return NextResponse.json({
             success: true,
-            logoUrl: `/uploads/logos/${filename}`
+            logoUrl: stored.url,
+            variants: stored.variants
         });
     } catch (error) {
         console.error("Upload error:", error);
@@ -1,7 +1,12 @@
 import { NextResponse } from 'next/server';
-import { prisma } from '@/lib/prisma';
-import sharp from 'sharp';
-
+import { loadAvatar } from '@/lib/avatars';
+import { AVATAR_SIZES, IMMUTABLE_CACHE_CONTROL, REVALIDATE_CACHE_CONTROL, isNotModified, pickVariantSize, variantETag } from '@/lib/image-variants';
+
+/**
+ * Avatar variant (WebP, rendered at upload)
+ * ?size= picks the smallest variant covering it, ?v= is User.avatarHash:
+ * versioned URLs are immutable, others are revalidated through the ETag.
+ */
 export async function GET(
     request: Request,
     { params }: { params: Promise<{ userId: string }> }
@@ -11,55 +16,40 @@ export async function GET(
         const { searchParams } = new URL(request.url);
         const sizeParam = searchParams.get('size');
         const size = sizeParam ? parseInt(sizeParam) : null;
+        const version = searchParams.get('v');
 
         if (!userId) {
             return new NextResponse("User ID required", { status: 400 });
         }
 
-        const user = await prisma.user.findUnique({
-            where: { id: userId },
-            select: { avatarBytes: true, avatarMime: true }
-        });
+        // Versioned URL already held by the browser: nothing to load
+        if (version) {
+            const versionETag = variantETag(version, pickVariantSize(AVATAR_SIZES, size));
+            if (isNotModified(request, versionETag)) {
+                return new NextResponse(null, {
+                    status: 304,
+                    headers: { 'ETag': versionETag, 'Cache-Control': IMMUTABLE_CACHE_CONTROL }
+                });
+            }
+        }
 
-        if (!user || !user.avatarBytes || !user.avatarMime) {
-            console.warn(`Avatar not found for user ${userId}`);
+        const avatar = await loadAvatar(userId, size, version);
+        if (!avatar) {
             return new NextResponse("Avatar not found", { status: 404 });
         }
 
-        // Ensure we have a Buffer
-        let imageBuffer = Buffer.from(user.avatarBytes);
-        let mimeType = user.avatarMime;
-
-        console.log(`[AvatarAPI] User ${userId} | Original Size: ${imageBuffer.length} | Mime: ${mimeType} | Requested Size: ${size}`);
-
-        // Optimization with Sharp if size requested
-        if (size || mimeType !== 'image/webp') {
-            try {
-                let pipeline = sharp(imageBuffer);
-
-                if (size) {
-                    pipeline = pipeline.resize(size, size, { fit: 'cover' });
-                }
+        const etag = variantETag(avatar.hash, avatar.size);
+        const headers = new Headers();
+        headers.set('ETag', etag);
+        headers.set('Cache-Control', version === avatar.hash ? IMMUTABLE_CACHE_CONTROL : REVALIDATE_CACHE_CONTROL);
 
-                const processedBuffer = await pipeline.webp({ quality: 80 }).toBuffer();
-                imageBuffer = processedBuffer as any;
-                mimeType = 'image/webp';
-                console.log(`[AvatarAPI] Optimization Success | New Size: ${imageBuffer.length}`);
-            } catch (e) {
-                console.error("[AvatarAPI] Sharp optimization failed, serving original", e);
-                // Fallback to original is already set in imageBuffer
-            }
+        if (isNotModified(request, etag)) {
+            return new NextResponse(null, { status: 304, headers });
         }
 
-        console.log(`[AvatarAPI] Returning response | Mime: ${mimeType} | Length: ${imageBuffer.length}`);
-
-        // Return Image
-        const headers = new Headers();
-        headers.set('Content-Type', mimeType);
-        // headers.set('Content-Length', imageBuffer.length.toString()); // Let Next handles chunking if needed
-        headers.set('Cache-Control', 'public, max-age=31536000, immutable');
-
-        return new NextResponse(imageBuffer as any, {
+        headers.set('Content-Type', 'image/webp');
+        headers.set('Content-Length', avatar.bytes.length.toString());
+        return new NextResponse(new Uint8Array(avatar.bytes), {
             status: 200,
             headers
         });
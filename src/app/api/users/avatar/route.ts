@@ -1,6 +1,7 @@
 
 import { NextResponse } from 'next/server';
-import { prisma } from '@/lib/prisma';
+import { saveAvatar } from '@/lib/avatars';
+import { invalidateUser } from '@/lib/session-cache';
 
 export async function POST(request: Request) {
     try {
@@ -30,20 +31,11 @@ export async function POST(request: Request) {
 
         console.log("[DEBUG SERVER] Received File:", file.name, "Size:", file.size, "Type:", file.type);
 
-        // Update User in DB
-        const updatedUser = await prisma.user.update({
-            where: { id: userId },
-            data: {
-                avatarBytes: buffer,
-                avatarMime: file.type,
-                hasAvatar: true
-                // avatarUrl: null - Removed per instruction
-            }
-        });
+        // Store the original + its size variants (rendered once, here)
+        const avatarHash = await saveAvatar(userId, buffer, file.type);
+        invalidateUser(userId);
 
-        console.log("[DEBUG SERVER] DB Updated. User hasAvatar:", updatedUser.hasAvatar);
-
-        return NextResponse.json({ success: true, hasAvatar: true });
+        return NextResponse.json({ success: true, hasAvatar: true, avatarHash });
 
     } catch (error: any) {
         console.error("Avatar Upload Error:", error);
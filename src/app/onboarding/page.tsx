@@ -6,6 +6,8 @@ import { toast } from 'sonner';
 import { useData } from '@/components/data-provider';
 import { useState, useEffect, useRef, Suspense } from 'react';
 import { cn } from '@/lib/utils';
+import { getBankDetails, isValidIban } from '@/lib/banks';
+import { searchCompanies } from '@/lib/company-search';
 import { getMyPendingInvitations, acceptInvitation } from '@/lib/actions/members';
 import { migrateTemplateToReal, createTemplateSociete } from '@/lib/actions/template-societe';
 
@@ -85,8 +87,7 @@ function OnboardingContent() {
             if (searchTerm.length >= 3 && !selectedCompany) {
                 setIsSearching(true);
                 try {
-                    const response = await fetch(`/api/company-search?q=${encodeURIComponent(searchTerm)}`);
-                    const data = await response.json();
+                    const data = await searchCompanies(searchTerm);
                     if (data.success) {
                         setSearchResults(data.results);
                         setShowResults(true);
@@ -112,7 +113,16 @@ function OnboardingContent() {
         const val = e.target.value.toUpperCase().replace(/[^A-Z0-9]/g, ''); // Keep spaces removed for logic, add formatting later if needed
         setFormData(prev => ({ ...prev, iban: val }));
 
-        if (val.length >= 14 && val.startsWith('FR')) {
+        if (val.length >= 9 && val.startsWith('FR')) {
+            // Bank code known locally: no request while typing
+            const local = getBankDetails(val);
+            if (local) {
+                setFormData(prev => ({ ...prev, banque: local.name, bic: local.bic }));
+                return;
+            }
+        }
+
+        if (val.startsWith('FR') && isValidIban(val)) {
             // lookup
             try {
                 const res = await fetch(`/api/iban-lookup?iban=${val}`);
@@ -123,9 +133,7 @@ function OnboardingContent() {
                         banque: data.data.bankName || prev.banque,
                         bic: data.data.bic || prev.bic,
                     }));
-                    if (data.source !== 'local') {
-                        toast.success(`Banque détectée : ${data.data.bankName}`);
-                    }
+                    toast.success(`Banque détectée : ${data.data.bankName}`);
                 }
             } catch (err) {
                 // silent
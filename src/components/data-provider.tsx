@@ -2,7 +2,8 @@
 
 import { createContext, useContext, useEffect, useState, useRef, ReactNode } from "react";
 import { dataService } from "@/lib/data-service";
-import { fetchClients, fetchProducts, fetchInvoices, fetchQuotes, fetchSocietes, createSociete as createSocieteAction, updateSociete as updateSocieteAction, getSociete, updateOverdueInvoices, fetchUserById, markHistoryAsRead, fetchAllUsers } from "@/app/actions";
+import { fetchClients, fetchProducts, fetchInvoices, fetchQuotes, fetchSocietes, createSociete as createSocieteAction, updateSociete as updateSocieteAction, getSociete, fetchUserById, markHistoryAsRead, fetchAllUsers, fetchChanges } from "@/app/actions";
+import { loadSnapshot, saveSnapshot, applyDeltaToSnapshot, mergeDelta, byDocumentDateDesc } from "@/lib/sync-cache";
 import { ConfirmationModal } from "@/components/ui/ConfirmationModal";
 import { Societe, Facture, Client, Produit, Devis, User } from "@/types";
 import { usePathname, useRouter } from "next/navigation";
@@ -61,6 +62,9 @@ export function DataProvider({ children }: { children: ReactNode }) {
     // MUTEX: Proper useRef for persistence across renders
     const fetchingRef = useRef(false);
 
+    // DELTA SYNC: server cursor of the lists currently in state
+    const syncCursorRef = useRef<{ societeId: string, cursor: string } | null>(null);
+
     const fetchData = async (silent: boolean = false) => {
         // MUTEX GUARD
         if (fetchingRef.current) {
@@ -84,7 +88,6 @@ export function DataProvider({ children }: { children: ReactNode }) {
 
             // 1. Parallelize Initial Independent Fetches
             // Run independent tasks concurrently
-            updateOverdueInvoices().catch(e => { if (process.env.NODE_ENV === 'development') console.error("Overdue error (bg)", e); });
 
             const [societesRes] = await Promise.all([
                 fetchSocietes().catch(e => { console.error("Societes fetch error", e); return { success: false, data: [] }; })
@@ -184,7 +187,8 @@ export function DataProvider({ children }: { children: ReactNode }) {
             let shouldRedirectToOnboarding = false;
 
             if (societesRes && societesRes.success && societesRes.data) {
-                validSocietes = societesRes.data as Societe[];
+                // Catalog rows (id, nom, logoUrl, isTemplate, role), enough for the switchers
+                validSocietes = societesRes.data as unknown as Societe[];
                 setSocietes(validSocietes);
             }
 
@@ -231,6 +235,11 @@ export function DataProvider({ children }: { children: ReactNode }) {
 
             // Only fetch data if we have an active society
             if (activeSociete) {
+                // Full settings (PDF mentions, bank details, email templates) of the active société only
+                const settingsRes = await getSociete(activeSociete.id).catch(e => { console.error("Societe fetch error", e); return { success: false, data: null }; });
+                if (settingsRes.success && settingsRes.data) {
+                    activeSociete = { ...activeSociete, ...settingsRes.data } as unknown as Societe;
+                }
                 setSociete(activeSociete);
                 const currentSocieteId = activeSociete.id;
 
@@ -239,49 +248,51 @@ export function DataProvider({ children }: { children: ReactNode }) {
                     localStorage.setItem("glassy_active_societe", JSON.stringify(activeSociete));
                 }
 
-                // DIAGNOSTIC: Log query params
-
-                // OPTIMIZED: Single DB call instead of 4 parallel calls
-                const t0 = performance.now();
-
-
-                const [clientsRes, productsRes, dashboardRes] = await Promise.all([
-                    fetchClients(currentSocieteId),
-                    fetchProducts(currentSocieteId),
-                    import("@/lib/actions/dashboard").then(mod => mod.fetchDashboardData(userId!, currentSocieteId))
-                ]);
-
-                const t1 = performance.now();
-
+                const knownCursor = syncCursorRef.current?.societeId === currentSocieteId ? syncCursorRef.current.cursor : null;
+                const deltaRes = knownCursor ? await fetchChanges(currentSocieteId, knownCursor) : null;
 
+                if (deltaRes && deltaRes.success && deltaRes.data && !deltaRes.data.reset) {
+                    // DELTA: only the rows changed since the last sync
+                    const delta = deltaRes.data;
+                    setInvoices(prev => mergeDelta(prev, 'invoices', delta, byDocumentDateDesc));
+                    setQuotes(prev => mergeDelta(prev, 'quotes', delta, byDocumentDateDesc));
+                    setClients(prev => mergeDelta(prev, 'clients', delta));
+                    setProducts(prev => mergeDelta(prev, 'products', delta));
 
+                    syncCursorRef.current = { societeId: currentSocieteId, cursor: delta.cursor };
+                    applyDeltaToSnapshot(currentSocieteId, delta);
+                } else {
+                    // FULL LOAD: first visit of this société, or cursor expired
+                    // The cursor is taken alongside, so changes made during the load are picked up by the next delta
+                    const [clientsRes, productsRes, dashboardRes, cursorRes] = await Promise.all([
+                        fetchClients(currentSocieteId),
+                        fetchProducts(currentSocieteId),
+                        import("@/lib/actions/dashboard").then(mod => mod.fetchDashboardData(userId!, currentSocieteId)),
+                        fetchChanges(currentSocieteId, null)
+                    ]);
+
+                    // Update state with dashboard data
+                    if (dashboardRes.success && dashboardRes.data) {
+                        setInvoices(dashboardRes.data.invoices as Facture[]);
+                        setQuotes(dashboardRes.data.quotes as Devis[]);
+                    }
 
-                // Log details if empty
-                if (dashboardRes.data?.invoices.length === 0) {
-
-                }
-
-                // Update state with dashboard data
-                if (dashboardRes.success && dashboardRes.data) {
-                    setInvoices(dashboardRes.data.invoices as Facture[]);
-                    setQuotes(dashboardRes.data.quotes as Devis[]);
-                }
-
-                if (clientsRes.success && clientsRes.data) setClients(clientsRes.data);
-                if (productsRes.success && productsRes.data) setProducts(productsRes.data);
-
-                // CACHE SAVE
-                if (typeof window !== 'undefined') {
-                    try {
-                        const cache = {
-                            invoices: dashboardRes.success ? dashboardRes.data?.invoices : [],
-                            quotes: dashboardRes.success ? dashboardRes.data?.quotes : [],
-                            clients: clientsRes.success ? clientsRes.data : [],
-                            products: productsRes.success ? productsRes.data : [],
-                            timestamp: Date.now()
-                        };
-                        localStorage.setItem(`glassy_cache_${currentSocieteId}`, JSON.stringify(cache));
-                    } catch (e) { console.error("Cache save error", e); }
+                    if (clientsRes.success && clientsRes.data) setClients(clientsRes.data);
+                    if (productsRes.success && productsRes.data) setProducts(productsRes.data);
+
+                    // CACHE SAVE (IndexedDB, only a complete snapshot)
+                    if (clientsRes.success && productsRes.success && dashboardRes.success && cursorRes.success && cursorRes.data) {
+                        syncCursorRef.current = { societeId: currentSocieteId, cursor: cursorRes.data.cursor };
+                        saveSnapshot(currentSocieteId, {
+                            cursor: cursorRes.data.cursor,
+                            invoices: (dashboardRes.data?.invoices || []) as Facture[],
+                            quotes: (dashboardRes.data?.quotes || []) as Devis[],
+                            clients: clientsRes.data || [],
+                            products: productsRes.data || []
+                        });
+                    } else {
+                        syncCursorRef.current = null;
+                    }
                 }
             } else {
                 // Should be unreachable due to onboarding check, but guard anyway
@@ -317,44 +328,48 @@ export function DataProvider({ children }: { children: ReactNode }) {
         // Initial fetch triggers
         if (!authChecked) { // Only fetch if we haven't resolved auth yet (or refreshing)
             // Try to restore cache first for instant load
-            let cacheRestored = false;
-            if (typeof window !== 'undefined') {
+            const restoreCache = async (): Promise<boolean> => {
+                if (typeof window === 'undefined') return false;
                 try {
                     const storedSoc = localStorage.getItem("glassy_active_societe");
-                    if (storedSoc) {
-                        const s = JSON.parse(storedSoc);
-                        setSociete(s);
-                        const c = localStorage.getItem(`glassy_cache_${s.id}`);
-                        if (c) {
-                            const cache = JSON.parse(c);
-                            if (cache.invoices) setInvoices(cache.invoices);
-                            if (cache.quotes) setQuotes(cache.quotes);
-                            if (cache.clients) setClients(cache.clients);
-                            if (cache.products) setProducts(cache.products);
-
-                            // Restore User from Cache to prevent FOUC in MobileGuard
-                            const uId = localStorage.getItem("glassy_current_user_id");
-                            const uStr = localStorage.getItem("glassy_users");
-                            if (uId && uStr) {
-                                const uList = JSON.parse(uStr);
-                                const found = uList.find((u: any) => u.id === uId);
-                                if (found) {
-                                    setUser(found);
-                                    setAuthChecked(true); // Assume auth valid for instant load (verified later by fetch)
-                                }
-                            }
-
-                            // Instant Unlock
-                            setIsLoading(false);
-                            cacheRestored = true;
+                    if (!storedSoc) return false;
+
+                    const s = JSON.parse(storedSoc);
+                    setSociete(s);
+                    // Legacy localStorage cache, replaced by IndexedDB (sync-cache)
+                    localStorage.removeItem(`glassy_cache_${s.id}`);
+
+                    const cache = await loadSnapshot(s.id);
+                    if (!cache) return false;
+
+                    setInvoices(cache.invoices);
+                    setQuotes(cache.quotes);
+                    setClients(cache.clients);
+                    setProducts(cache.products);
+                    syncCursorRef.current = { societeId: s.id, cursor: cache.cursor };
+
+                    // Restore User from Cache to prevent FOUC in MobileGuard
+                    const uId = localStorage.getItem("glassy_current_user_id");
+                    const uStr = localStorage.getItem("glassy_users");
+                    if (uId && uStr) {
+                        const uList = JSON.parse(uStr);
+                        const found = uList.find((u: any) => u.id === uId);
+                        if (found) {
+                            setUser(found);
+                            setAuthChecked(true); // Assume auth valid for instant load (verified later by fetch)
                         }
                     }
+
+                    // Instant Unlock
+                    setIsLoading(false);
+                    return true;
                 } catch (e) {
                     console.error("Cache restore error", e);
+                    return false;
                 }
-            }
+            };
 
-            fetchData(cacheRestored); // Silent fetch if cache restored
+            restoreCache().then(cacheRestored => fetchData(cacheRestored)); // Silent fetch if cache restored
         }
     }, [pathname, authChecked, user]);
 
@@ -463,23 +478,6 @@ export function DataProvider({ children }: { children: ReactNode }) {
         }
     };
 
-    // CRON POLL (Kept for Dev/Self-Hosting where external cron is unavailable)
-    useEffect(() => {
-        const checkScheduled = async () => {
-            try {
-                // Low priority fetch
-                await fetch('/api/cron/process-scheduled-emails', { priority: 'low' });
-            } catch (e) {
-                // Silent fail
-            }
-        };
-        // Run on mount
-        checkScheduled();
-        // Run every minute (60000ms)
-        const interval = setInterval(checkScheduled, 60000);
-        return () => clearInterval(interval);
-    }, []);
-
     // SYNC: Auto-refresh on window focus (Critical for multi-device usage)
     useEffect(() => {
         const handleSync = () => {
@@ -532,11 +530,10 @@ export function DataProvider({ children }: { children: ReactNode }) {
                 const currentUser = user || dataService.getCurrentUser();
 
                 if (currentUser) {
-                    await dataService.logAction(currentUser, action, entityType, description, entityId);
-                    // OPTIMIZATION: Do NOT trigger full app refresh here. 
-                    // Just update the history locally or fetch only history.
-                    const newHistory = await dataService.getHistory(15, societe?.id);
-                    setHistory(newHistory);
+                    const entry = await dataService.logAction(currentUser, action, entityType, description, entityId);
+                    // OPTIMIZATION: Do NOT trigger full app refresh here.
+                    // The entry is written in a batch server-side: prepend it locally.
+                    if (entry) setHistory(prev => [entry, ...prev].slice(0, 15));
                 } else {
                     console.error("[DataProvider] Action NOT logged: No user identified");
                 }
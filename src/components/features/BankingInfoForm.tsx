@@ -8,25 +8,26 @@ import { Input } from '@/components/ui/input';
 import { Button } from '@/components/ui/button';
 import { Alert, AlertDescription } from '@/components/ui/alert';
 import { Building2, CheckCircle2, Loader2, Info, AlertTriangle, CreditCard } from 'lucide-react';
-
-// --- BASE DE DONNÉES LOCALE (BANK_DATABASE) ---
-const BANK_DATABASE: Record<string, { name: string; bic: string; color: string }> = {
-    "30004": { name: "BNP PARIBAS", bic: "BNPAFRPP", color: "#16a34a" },      // Green
-    "30003": { name: "SOCIETE GENERALE", bic: "SOGEFRPP", color: "#dc2626" }, // Red
-    "30002": { name: "LCL", bic: "LCLFRPP", color: "#2563eb" },               // Blue
-    "30066": { name: "CIC", bic: "CMCIFRPP", color: "#ea580c" },              // Orange
-    "10278": { name: "CREDIT MUTUEL", bic: "CMCIFRPP", color: "#ef4444" },    // Red/Orange
-    "10207": { name: "BANQUE POPULAIRE RIVES DE PARIS", bic: "BPOPFRPP", color: "#0284c7" }, // Light Blue
-    "20041": { name: "LA BANQUE POSTALE", bic: "LBPFRPP", color: "#fbbf24" }, // Yellow
-    "16006": { name: "FORTUNEO", bic: "FTNOFRPP", color: "#4ade80" },         // Light Green
-    "10907": { name: "BOURSORAMA", bic: "BOUSFRPP", color: "#ec4899" },       // Pink
-    "28233": { name: "REVOLUT", bic: "REVOFRPP", color: "#000000" },          // Black
-    "19499": { name: "QONTO", bic: "QNTOFRP1", color: "#8b5cf6" },            // Purple
-    "16958": { name: "QONTO", bic: "QNTOFRP1", color: "#6B4FBB" },            // Qonto (Nouveau code ?)
-    "16598": { name: "SHINE", bic: "SABOROPP", color: "#f59e0b" },            // Amber
-    "23605": { name: "AXA BANQUE", bic: "AXABFRPP", color: "#1d4ed8" },       // Dark Blue
-    "14505": { name: "ING", bic: "INGBFRPP", color: "#f97316" },              // Orange
-    "10107": { name: "BANQUE POPULAIRE", bic: "BPOPFRPP", color: "#0284c7" }  // Generic BP
+import { getBankDetails, isValidIban } from '@/lib/banks';
+
+// --- COULEURS PAR CODE BANQUE (noms et BIC : index de lib/banks) ---
+const BANK_COLORS: Record<string, string> = {
+    "30004": "#16a34a", // BNP PARIBAS - Green
+    "30003": "#dc2626", // SOCIETE GENERALE - Red
+    "30002": "#2563eb", // LCL - Blue
+    "30066": "#ea580c", // CIC - Orange
+    "10278": "#ef4444", // CREDIT MUTUEL - Red/Orange
+    "10207": "#0284c7", // BANQUE POPULAIRE - Light Blue
+    "20041": "#fbbf24", // LA BANQUE POSTALE - Yellow
+    "16006": "#4ade80", // FORTUNEO - Light Green
+    "10907": "#ec4899", // BOURSORAMA - Pink
+    "28233": "#000000", // REVOLUT - Black
+    "19499": "#8b5cf6", // QONTO - Purple
+    "16958": "#6B4FBB", // QONTO
+    "16598": "#f59e0b", // SHINE - Amber
+    "23605": "#1d4ed8", // AXA BANQUE - Dark Blue
+    "14505": "#f97316", // ING - Orange
+    "10107": "#0284c7"  // BANQUE POPULAIRE
 };
 
 // --- UTILS ---
@@ -42,38 +43,6 @@ const formatIBAN = (val: string) => {
     return chunks ? chunks.join(' ') : clean;
 };
 
-/**
- * Calcul du Modulo 97 pour validation IBAN
- * (Déplace les 4 premiers caractères à la fin, remplace les lettres, calcule le reste)
- */
-const isValidIBANFR = (ibanClean: string): boolean => {
-    if (ibanClean.length !== 27) return false;
-    if (!ibanClean.startsWith('FR')) return false;
-
-    // Déplacer les 4 premiers caractères (FRkk) à la fin
-    const rearranged = ibanClean.substring(4) + ibanClean.substring(0, 4);
-
-    // Remplacer lettres par chiffres (A=10, B=11, ..., Z=35)
-    let numeric = "";
-    for (let char of rearranged) {
-        const code = char.charCodeAt(0);
-        if (code >= 65 && code <= 90) {
-            numeric += (code - 55).toString();
-        } else {
-            numeric += char;
-        }
-    }
-
-    // Calculer mod 97 (par morceaux car le nombre est trop grand pour JS)
-    let remainder = 0;
-    for (let i = 0; i < numeric.length; i++) {
-        const digit = parseInt(numeric[i], 10);
-        remainder = (remainder * 10 + digit) % 97;
-    }
-
-    return remainder === 1;
-};
-
 interface BankingInfoFormProps {
     onChange?: (data: { iban: string; bic: string; banque: string }) => void;
     onSave?: () => void;
@@ -132,45 +101,53 @@ export default function BankingInfoForm({ onChange, onSave, initialData }: Banki
         notifyParent(formatted, bic, bankName);
     };
 
-    const validateIban = (clean: string) => {
-        setStatus('validating');
+    const validateIban = async (clean: string) => {
+        if (!clean.startsWith('FR')) {
+            setStatus('error');
+            setStatusMessage("❌ Seuls les IBAN français (FR) sont acceptés ici.");
+            return;
+        }
 
-        // Simuler latence réseau/calcul
-        setTimeout(() => {
-            if (!clean.startsWith('FR')) {
-                setStatus('error');
-                setStatusMessage("❌ Seuls les IBAN français (FR) sont acceptés ici.");
-                return;
-            }
+        if (!isValidIban(clean)) {
+            setStatus('error');
+            setStatusMessage("❌ IBAN invalide - Vérifiez le numéro saisi (checksum incorrect).");
+            setBankName("");
+            setBic("");
+            setBankColor(null);
+            return;
+        }
 
-            if (!isValidIBANFR(clean)) {
-                setStatus('error');
-                setStatusMessage("❌ IBAN invalide - Vérifiez le numéro saisi (checksum incorrect).");
-                setBankName("");
-                setBic("");
-                setBankColor(null);
-            } else {
-                // IBAN Valide -> Extraction code banque
-                const bankCode = clean.substring(4, 9);
-                const detected = BANK_DATABASE[bankCode];
-
-                if (detected) {
-                    // SUCCÈS : Banque trouvée
-                    setStatus('success');
-                    setBankName(detected.name);
-                    setBic(detected.bic);
-                    setBankColor(detected.color);
-                    setStatusMessage(`✅ ${detected.name} détectée automatiquement !`);
-                    notifyParent(formatIBAN(clean), detected.bic, detected.name);
-                } else {
-                    // WARNING : Banque inconnue
-                    setStatus('warning');
-                    setStatusMessage(`⚠️ IBAN valide (code banque: ${bankCode}). Banque inconnue, veuillez renseigner le nom et BIC manuellement.`);
-                    setBankColor(null);
-                    // On ne vide pas bankName/bic pour laisser l'utilisateur saisir
-                }
+        // IBAN Valide -> Extraction code banque (index local, sans appel réseau)
+        const bankCode = clean.substring(4, 9);
+        let detected: { name: string; bic: string } | null = getBankDetails(clean);
+
+        if (!detected) {
+            // Code inconnu localement -> API (résultats mis en cache côté serveur)
+            setStatus('validating');
+            try {
+                const res = await fetch(`/api/iban-lookup?iban=${clean}`);
+                const json = await res.json();
+                if (json.success) detected = { name: json.data.bankName, bic: json.data.bic };
+            } catch (error) {
+                console.error("IBAN lookup error:", error);
             }
-        }, 300);
+        }
+
+        if (detected) {
+            // SUCCÈS : Banque trouvée
+            setStatus('success');
+            setBankName(detected.name);
+            setBic(detected.bic);
+            setBankColor(BANK_COLORS[bankCode] || null);
+            setStatusMessage(`✅ ${detected.name} détectée automatiquement !`);
+            notifyParent(formatIBAN(clean), detected.bic, detected.name);
+        } else {
+            // WARNING : Banque inconnue
+            setStatus('warning');
+            setStatusMessage(`⚠️ IBAN valide (code banque: ${bankCode}). Banque inconnue, veuillez renseigner le nom et BIC manuellement.`);
+            setBankColor(null);
+            // On ne vide pas bankName/bic pour laisser l'utilisateur saisir
+        }
     };
 
     // --- Autres Inputs ---
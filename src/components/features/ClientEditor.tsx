@@ -10,6 +10,7 @@ import { dataService } from "@/lib/data-service";
 import { createClientAction, updateClientAction as updateClient } from "@/app/actions-clients";
 import { Client } from "@/types";
 import { COUNTRIES } from "@/lib/countries";
+import { searchCompanies } from "@/lib/company-search";
 import Link from "next/link";
 import { cn } from "@/lib/utils";
 
@@ -146,8 +147,7 @@ export function ClientEditor({ initialData, onSuccess, onCancel }: { initialData
             if (searchTerm.length >= 3 && document.activeElement === searchRef.current?.querySelector('input')) {
                 setIsSearching(true);
                 try {
-                    const response = await fetch(`/api/company-search?q=${encodeURIComponent(searchTerm)}`);
-                    const data = await response.json();
+                    const data = await searchCompanies(searchTerm);
                     if (data.success) {
                         setSearchResults(data.results);
                         setShowResults(true);
@@ -1,7 +1,7 @@
 "use client";
 
 import { useState, useRef } from "react";
-import { Upload, Trash2, FileText, Receipt, Database, AlertTriangle, Users, Package } from "lucide-react";
+import { Upload, Trash2, FileText, Receipt, Database, AlertTriangle, Users, Package, Download } from "lucide-react";
 import { useData } from "@/components/data-provider";
 import { dataService } from "@/lib/data-service";
 // import { airtableService } from "@/lib/airtable-service"; // REMOVED
@@ -23,6 +23,11 @@ export function DataManagement({ onBack }: { onBack?: () => void }) {
     const fileInputRefFactures = useRef<HTMLInputElement>(null);
     const fileInputRefClients = useRef<HTMLInputElement>(null);
     const fileInputRefProduits = useRef<HTMLInputElement>(null);
+    const [exportYear, setExportYear] = useState(new Date().getFullYear());
+
+    // Streamed by the server (/api/export): no document has to be loaded here
+    const exportUrl = (type: 'factures' | 'devis' | 'paiements' | 'fec') =>
+        `/api/export?societeId=${encodeURIComponent(societe?.id || "")}&type=${type}&year=${exportYear}`;
 
     const checkConnection = async () => {
         const result = await checkDatabaseConnection();
@@ -453,6 +458,47 @@ export function DataManagement({ onBack }: { onBack?: () => void }) {
                 </div>
             </div>
 
+            <div className="w-full">
+                <div className="flex items-center gap-2 mb-4">
+                    <Download className="h-5 w-5 text-blue-400" />
+                    <h3 className="text-lg font-semibold text-foreground">Export comptable</h3>
+                </div>
+
+                <div className="bg-muted/50 rounded-xl p-4 border border-border space-y-4 dark:bg-white/5 dark:border-white/10">
+                    <div className="flex items-center justify-between">
+                        <div>
+                            <p className="text-sm font-medium text-foreground mb-1">Exercice</p>
+                            <p className="text-xs text-muted-foreground">Factures (avec lignes), devis et paiements en CSV, ou fichier FEC</p>
+                        </div>
+                        <input
+                            type="number"
+                            value={exportYear}
+                            onChange={(e) => setExportYear(Number(e.target.value))}
+                            className="w-24 px-3 py-1.5 bg-background text-foreground rounded-lg text-xs border border-border dark:bg-white/5 dark:border-white/10"
+                        />
+                    </div>
+
+                    <div className="grid grid-cols-2 md:grid-cols-4 gap-2 pt-4 border-t border-border dark:border-white/10">
+                        {([
+                            ['factures', 'Factures CSV'],
+                            ['devis', 'Devis CSV'],
+                            ['paiements', 'Paiements CSV'],
+                            ['fec', 'FEC']
+                        ] as const).map(([type, label]) => (
+                            <a
+                                key={type}
+                                href={exportUrl(type)}
+                                download
+                                className="flex items-center justify-center gap-2 px-3 py-1.5 bg-background hover:bg-muted text-foreground rounded-lg text-xs font-medium transition-colors border border-border dark:bg-white/5 dark:hover:bg-white/10 dark:text-white dark:border-white/10"
+                            >
+                                <Download className="h-3 w-3" />
+                                {label}
+                            </a>
+                        ))}
+                    </div>
+                </div>
+            </div>
+
             <div className="grid md:grid-cols-2 gap-6">
                 {/* DEVIS SECTION */}
                 <div className="glass-card p-6 rounded-2xl space-y-6 border border-border dark:border-white/10">
@@ -142,7 +142,7 @@ export function UserProfileEditor({ onBack }: { onBack?: () => void }) {
                                 }
                                 if (showServer) {
                                     return <img
-                                        src={`/api/users/avatar/${user.id}?t=${user.updatedAt ? new Date(user.updatedAt).getTime() : 0}`}
+                                        src={`/api/users/avatar/${user.id}?size=96&v=${user.avatarHash || ''}`}
                                         alt="Avatar"
                                         className="h-full w-full object-cover"
                                     />;
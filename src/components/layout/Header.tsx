@@ -60,10 +60,11 @@ export function Header() {
                         <div className="h-8 w-8 rounded-full bg-gradient-to-br from-blue-600 to-purple-600 flex items-center justify-center text-sm font-bold text-white shadow-lg shadow-blue-500/20 overflow-hidden border border-white/10">
                             {user?.hasAvatar ? (
                                 <Image
-                                    src={`/api/users/avatar/${user.id}?size=60`}
+                                    src={`/api/users/avatar/${user.id}?size=60&v=${user.avatarHash || ''}`}
                                     alt="User"
                                     width={60}
                                     height={60}
+                                    unoptimized
                                     className="h-full w-full object-cover"
                                 />
                             ) : (
@@ -44,10 +44,11 @@ export function BottomNav() {
                                 <div className={cn("h-6 w-6 rounded-full overflow-hidden flex items-center justify-center border border-transparent transition-all", isActive(item.path) ? "border-[var(--primary)] bg-[var(--primary)]/10 text-[var(--primary)]" : "bg-muted text-muted-foreground")}>
                                     {user?.hasAvatar ? (
                                         <Image
-                                            src={`/api/users/avatar/${user.id}?size=48&t=${Date.now()}`}
+                                            src={`/api/users/avatar/${user.id}?size=48&v=${user.avatarHash || ''}`}
                                             alt="Profil"
                                             width={24}
                                             height={24}
+                                            unoptimized
                                             className="h-full w-full object-cover"
                                         />
                                     ) : (
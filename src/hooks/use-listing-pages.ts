@@ -0,0 +1,63 @@
+import { useState, useEffect, useRef, useCallback } from 'react';
+import type { ListingPage } from '@/lib/keyset';
+
+type PageLoader<T> = (cursor: string | null) => Promise<{ success: boolean, data?: ListingPage<T>, error?: string }>;
+
+/**
+ * Older / searched rows fetched page by page from a listing action
+ * (listInvoices, listQuotes, listHistory), on top of the recent ones held by
+ * the DataProvider.
+ *
+ * `queryKey` identifies the current filters: when it changes the pages are
+ * dropped, and the first page is fetched right away (debounced) if `active`.
+ */
+export function useListingPages<T extends { id: string }>(load: PageLoader<T>, queryKey: string, active: boolean) {
+    const [rows, setRows] = useState<T[]>([]);
+    const [nextCursor, setNextCursor] = useState<string | null>(null);
+    const [hasMore, setHasMore] = useState(true);
+    const [isLoading, setIsLoading] = useState(false);
+
+    const loadRef = useRef(load);
+    loadRef.current = load;
+    const requestRef = useRef(0);
+
+    const fetchPage = useCallback(async (cursor: string | null) => {
+        const request = ++requestRef.current;
+        setIsLoading(true);
+        try {
+            const res = await loadRef.current(cursor);
+            if (request !== requestRef.current) return; // Filters changed meanwhile
+            if (res.success && res.data) {
+                const page = res.data;
+                setRows(prev => {
+                    const known = new Set(prev.map(row => row.id));
+                    return [...prev, ...page.items.filter(row => !known.has(row.id))];
+                });
+                setNextCursor(page.nextCursor);
+                setHasMore(page.nextCursor !== null);
+            } else {
+                console.error("[PAGINATION] Page load failed:", res.error);
+            }
+        } finally {
+            if (request === requestRef.current) setIsLoading(false);
+        }
+    }, []);
+
+    useEffect(() => {
+        requestRef.current++;
+        setRows([]);
+        setNextCursor(null);
+        setHasMore(true);
+        setIsLoading(false);
+        if (!active) return;
+
+        const timer = setTimeout(() => fetchPage(null), 300);
+        return () => clearTimeout(timer);
+    }, [queryKey, active, fetchPage]);
+
+    const loadMore = useCallback(() => {
+        if (!isLoading && hasMore) fetchPage(nextCursor);
+    }, [isLoading, hasMore, nextCursor, fetchPage]);
+
+    return { rows, hasMore, isLoading, loadMore };
+}
@@ -0,0 +1,109 @@
+import { describe, it } from 'node:test';
+import assert from 'node:assert/strict';
+import {
+    decodeCursor,
+    documentCursor,
+    documentKeysetWhere,
+    encodeCursor,
+    historyCursor,
+    historyKeysetWhere,
+    toPage
+} from '@/lib/keyset';
+
+const INVALID = /Curseur de pagination invalide/;
+
+function raw(value: unknown): string {
+    return Buffer.from(JSON.stringify(value)).toString('base64url');
+}
+
+describe('encodeCursor / decodeCursor', () => {
+    it('round-trips the sort key', () => {
+        const values = ['2024-03-01T00:00:00.000Z', 'FAC-2024-0042', 'ckz1abc'];
+        assert.deepEqual(decodeCursor(encodeCursor(values), 3), values);
+    });
+
+    it('round-trips values with non-ASCII and URL characters', () => {
+        const values = ['Société Générale/ä?&=', '+=/'];
+        const cursor = encodeCursor(values);
+        assert.match(cursor, /^[A-Za-z0-9_-]+$/);
+        assert.deepEqual(decodeCursor(cursor, 2), values);
+    });
+
+    it('returns null without a cursor', () => {
+        assert.equal(decodeCursor(undefined, 3), null);
+        assert.equal(decodeCursor(null, 3), null);
+        assert.equal(decodeCursor('', 3), null);
+    });
+
+    it('rejects a cursor that is not base64url JSON', () => {
+        assert.throws(() => decodeCursor('not a cursor!', 2), INVALID);
+        assert.throws(() => decodeCursor(Buffer.from('{"a":').toString('base64url'), 2), INVALID);
+    });
+
+    it('rejects a cursor of the wrong length', () => {
+        assert.throws(() => decodeCursor(encodeCursor(['a', 'b']), 3), INVALID);
+        assert.throws(() => decodeCursor(encodeCursor(['a', 'b', 'c', 'd']), 3), INVALID);
+    });
+
+    it('rejects a cursor that is not an array of strings', () => {
+        assert.throws(() => decodeCursor(raw({ 0: 'a', 1: 'b', length: 2 }), 2), INVALID);
+        assert.throws(() => decodeCursor(raw(['a', 2]), 2), INVALID);
+        assert.throws(() => decodeCursor(raw(null), 2), INVALID);
+    });
+});
+
+describe('keyset where', () => {
+    const date = new Date('2024-03-01T00:00:00.000Z');
+
+    it('starts documents strictly after the cursor row, bounded on dateEmission', () => {
+        const cursor = documentCursor({ dateEmission: date, numero: 'FAC-0042', id: 'id-9' });
+
+        assert.deepEqual(documentKeysetWhere(cursor), {
+            dateEmission: { lte: date },
+            OR: [
+                { dateEmission: { lt: date } },
+                { dateEmission: date, numero: { lt: 'FAC-0042' } },
+                { dateEmission: date, numero: 'FAC-0042', id: { lt: 'id-9' } }
+            ]
+        });
+    });
+
+    it('starts history strictly after the cursor row, bounded on timestamp', () => {
+        const cursor = historyCursor({ timestamp: date, id: 'h-3' });
+
+        assert.deepEqual(historyKeysetWhere(cursor), {
+            timestamp: { lte: date },
+            OR: [
+                { timestamp: { lt: date } },
+                { timestamp: date, id: { lt: 'h-3' } }
+            ]
+        });
+    });
+
+    it('has no condition on the first page', () => {
+        assert.deepEqual(documentKeysetWhere(null), {});
+        assert.deepEqual(historyKeysetWhere(undefined), {});
+    });
+
+    it('rejects a history cursor passed as a document cursor', () => {
+        const cursor = historyCursor({ timestamp: date, id: 'h-3' });
+        assert.throws(() => documentKeysetWhere(cursor), INVALID);
+    });
+});
+
+describe('toPage', () => {
+    const cursorOf = (row: { id: string }) => encodeCursor([row.id]);
+    const rows = [{ id: 'c' }, { id: 'b' }, { id: 'a' }];
+
+    it('returns the cursor of the last kept row when there are more rows', () => {
+        const page = toPage(rows, 2, cursorOf, row => row.id);
+        assert.deepEqual(page.items, ['c', 'b']);
+        assert.deepEqual(decodeCursor(page.nextCursor, 1), ['b']);
+    });
+
+    it('has no next cursor on the last page', () => {
+        const page = toPage(rows, 3, cursorOf, row => row.id);
+        assert.deepEqual(page.items, ['c', 'b', 'a']);
+        assert.equal(page.nextCursor, null);
+    });
+});
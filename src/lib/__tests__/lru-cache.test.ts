@@ -0,0 +1,97 @@
+import { afterEach, beforeEach, describe, it, mock } from 'node:test';
+import assert from 'node:assert/strict';
+import { LRUCache } from '@/lib/lru-cache';
+
+describe('LRUCache', () => {
+    let now = 0;
+
+    beforeEach(() => {
+        now = 1_000_000;
+        mock.method(Date, 'now', () => now);
+    });
+
+    afterEach(() => {
+        mock.restoreAll();
+    });
+
+    it('returns a value until its TTL has passed', () => {
+        const cache = new LRUCache<string, number>(10, 1000);
+        cache.set('a', 1);
+
+        now += 1000;
+        assert.equal(cache.get('a'), 1);
+
+        now += 1;
+        assert.equal(cache.get('a'), undefined);
+        assert.equal(cache.size, 0);
+    });
+
+    it('uses the per-entry TTL over the default one', () => {
+        const cache = new LRUCache<string, number>(10, 1000);
+        cache.set('short', 1, 100);
+        cache.set('long', 2, 5000);
+
+        now += 101;
+        assert.equal(cache.get('short'), undefined);
+        assert.equal(cache.get('long'), 2);
+    });
+
+    it('restarts the TTL when a key is set again', () => {
+        const cache = new LRUCache<string, number>(10, 1000);
+        cache.set('a', 1);
+
+        now += 800;
+        cache.set('a', 2);
+
+        now += 800;
+        assert.equal(cache.get('a'), 2);
+    });
+
+    it('evicts the least recently set entry past maxEntries', () => {
+        const cache = new LRUCache<string, number>(2, 1000);
+        cache.set('a', 1);
+        cache.set('b', 2);
+        cache.set('c', 3);
+
+        assert.equal(cache.size, 2);
+        assert.equal(cache.get('a'), undefined);
+        assert.equal(cache.get('b'), 2);
+        assert.equal(cache.get('c'), 3);
+    });
+
+    it('keeps an entry that was read recently', () => {
+        const cache = new LRUCache<string, number>(2, 1000);
+        cache.set('a', 1);
+        cache.set('b', 2);
+
+        assert.equal(cache.get('a'), 1);
+        cache.set('c', 3);
+
+        assert.equal(cache.get('a'), 1);
+        assert.equal(cache.get('b'), undefined);
+        assert.equal(cache.get('c'), 3);
+    });
+
+    it('does not grow when an existing key is overwritten', () => {
+        const cache = new LRUCache<string, number>(2, 1000);
+        cache.set('a', 1);
+        cache.set('b', 2);
+        cache.set('a', 10);
+
+        assert.equal(cache.size, 2);
+        assert.equal(cache.get('a'), 10);
+        assert.equal(cache.get('b'), 2);
+    });
+
+    it('deletes the entries matching a predicate', () => {
+        const cache = new LRUCache<string, number>(10, 1000);
+        cache.set('s1:clients', 1);
+        cache.set('s1:produits', 2);
+        cache.set('s2:clients', 3);
+
+        cache.deleteWhere(key => key.startsWith('s1:'));
+
+        assert.equal(cache.size, 1);
+        assert.equal(cache.get('s2:clients'), 3);
+    });
+});
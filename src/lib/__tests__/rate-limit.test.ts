@@ -0,0 +1,124 @@
+import { afterEach, beforeEach, describe, it, mock } from 'node:test';
+import assert from 'node:assert/strict';
+import {
+    MemoryRateLimitStore,
+    checkRateLimits,
+    clearRateLimit,
+    setRateLimitStore,
+    type RateLimitRule,
+    type RateLimitStore
+} from '@/lib/rate-limit';
+
+const WINDOW_MS = 1000;
+
+async function hits(store: MemoryRateLimitStore, rule: RateLimitRule, now: number, count: number): Promise<number> {
+    let allowed = 0;
+    for (let i = 0; i < count; i++) {
+        if ((await store.hit([rule], now)).has(rule.key)) allowed++;
+    }
+    return allowed;
+}
+
+describe('MemoryRateLimitStore sliding window', () => {
+    const rule: RateLimitRule = { key: 'ip:1', max: 10, windowMs: WINDOW_MS };
+
+    it('allows max hits in a window and refuses the next one', async () => {
+        const store = new MemoryRateLimitStore();
+        assert.equal(await hits(store, rule, 100, 10), 10);
+        assert.equal(await hits(store, rule, 900, 1), 0);
+    });
+
+    it('does not count refused hits', async () => {
+        const store = new MemoryRateLimitStore();
+        await hits(store, rule, 0, 10);
+        await hits(store, rule, 500, 50);
+
+        // Only the 10 allowed hits weigh on the next window
+        assert.equal(await hits(store, rule, 1500, 10), 5);
+    });
+
+    it('weighs the previous window by the share still covered', async () => {
+        const store = new MemoryRateLimitStore();
+        await hits(store, rule, 0, 10);
+
+        // Boundary: the previous window still counts in full
+        assert.equal(await hits(store, rule, 1000, 1), 0);
+        // Halfway: 10 * 0.5 + current < 10 leaves room for 5 hits
+        assert.equal(await hits(store, rule, 1500, 10), 5);
+    });
+
+    it('forgets hits older than the previous window', async () => {
+        const store = new MemoryRateLimitStore();
+        await hits(store, rule, 0, 10);
+        assert.equal(await hits(store, rule, 2000, 10), 10);
+    });
+
+    it('counts a hit only on the keys within their limit', async () => {
+        const store = new MemoryRateLimitStore();
+        const ip: RateLimitRule = { key: 'ip:1', max: 2, windowMs: WINDOW_MS };
+        const email: RateLimitRule = { key: 'email:a', max: 5, windowMs: WINDOW_MS };
+        await hits(store, ip, 0, 2);
+
+        const allowed = await store.hit([ip, email], 10);
+        assert.deepEqual([...allowed], ['email:a']);
+        assert.equal(await hits(store, email, 20, 10), 4);
+    });
+
+    it('starts over after clear', async () => {
+        const store = new MemoryRateLimitStore();
+        await hits(store, rule, 0, 10);
+        await store.clear(rule.key);
+        assert.equal(await hits(store, rule, 100, 10), 10);
+    });
+});
+
+describe('checkRateLimits', () => {
+    let now = 0;
+
+    beforeEach(() => {
+        now = 10 * WINDOW_MS;
+        mock.method(Date, 'now', () => now);
+        mock.method(console, 'error', () => { });
+        setRateLimitStore(new MemoryRateLimitStore());
+    });
+
+    afterEach(() => {
+        mock.restoreAll();
+    });
+
+    it('is refused as soon as one key is over its limit', async () => {
+        const ip = { key: 'ip:1', max: 1, windowMs: WINDOW_MS };
+        const email = { key: 'email:a', max: 5, windowMs: WINDOW_MS };
+
+        assert.equal(await checkRateLimits([ip, email]), true);
+        assert.equal(await checkRateLimits([ip, email]), false);
+        assert.equal(await checkRateLimits([email]), true);
+    });
+
+    it('counts a key listed twice once', async () => {
+        const rule = { key: 'ip:1', max: 2, windowMs: WINDOW_MS };
+
+        assert.equal(await checkRateLimits([rule, rule]), true);
+        assert.equal(await checkRateLimits([rule]), true);
+        assert.equal(await checkRateLimits([rule]), false);
+    });
+
+    it('allows the request again after clearRateLimit', async () => {
+        const rule = { key: 'ip:1', max: 1, windowMs: WINDOW_MS };
+
+        await checkRateLimits([rule]);
+        assert.equal(await checkRateLimits([rule]), false);
+        await clearRateLimit(rule.key);
+        assert.equal(await checkRateLimits([rule]), true);
+    });
+
+    it('fails open when the store is unavailable', async () => {
+        const failing: RateLimitStore = {
+            hit: async () => { throw new Error('connection refused'); },
+            clear: async () => { }
+        };
+        setRateLimitStore(failing);
+
+        assert.equal(await checkRateLimits([{ key: 'ip:1', max: 1, windowMs: WINDOW_MS }]), true);
+    });
+});
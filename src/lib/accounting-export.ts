@@ -0,0 +1,384 @@
+/**
+ * 📒 Bulk accounting export (CSV / FEC)
+ *
+ * Invoices with their lines, quotes and payments of a société over a period,
+ * produced as text chunks by async generators: each chunk is one keyset page
+ * (dateEmission / datePaiement, id) read from the database, so the export
+ * route can write it to the response before reading the next one. Memory is
+ * bounded by PAGE_SIZE documents whatever the period.
+ *
+ * - CSV: ";" separated, decimal comma, UTF-8 BOM (opens as-is in Excel FR).
+ *   One row per document line for invoices and quotes.
+ * - FEC (Fichier des Écritures Comptables, art. A47 A-1 LPF): tab separated,
+ *   one entry per issued invoice in the sales journal (411 / 706 / 44571) and
+ *   one per payment in the bank journal (512 / 411), in chronological order.
+ *   Drafts and cancelled invoices carry no entry.
+ */
+
+import { Prisma } from '@prisma/client';
+import { prisma } from '@/lib/prisma';
+import { LINE_ITEMS_RELATION, resolveLineItems } from '@/lib/line-items';
+import type { LigneItem } from '@/types';
+
+const PAGE_SIZE = 500;
+const BOM = '\uFEFF';
+
+export type ExportKind = 'factures' | 'devis' | 'paiements' | 'fec';
+export const EXPORT_KINDS: ExportKind[] = ['factures', 'devis', 'paiements', 'fec'];
+
+export interface ExportPeriod {
+    from: Date;
+    to: Date; // exclusive
+    label: string;
+}
+
+// Invoices without accounting entries
+const NON_POSTED_INVOICE_STATUSES = ['Brouillon', 'Annulée'];
+
+const SALES_JOURNAL = { code: 'VE', label: 'Ventes' };
+const BANK_JOURNAL = { code: 'BQ', label: 'Banque' };
+const ACCOUNTS = {
+    customers: { num: '411000', label: 'Clients' },
+    sales: { num: '706000', label: 'Prestations de services' },
+    vat: { num: '445710', label: 'TVA collectée' },
+    bank: { num: '512000', label: 'Banque' }
+};
+
+const FEC_COLUMNS = [
+    'JournalCode', 'JournalLib', 'EcritureNum', 'EcritureDate', 'CompteNum', 'CompteLib',
+    'CompAuxNum', 'CompAuxLib', 'PieceRef', 'PieceDate', 'EcritureLib', 'Debit', 'Credit',
+    'EcritureLet', 'DateLet', 'ValidDate', 'Montantdevise', 'Idevise'
+];
+
+/**
+ * Period from ?from=YYYY-MM-DD&to=YYYY-MM-DD (to included), ?month=YYYY-MM
+ * or ?year=YYYY: [from, to) in UTC
+ */
+export function parseExportPeriod(searchParams: URLSearchParams): ExportPeriod | null {
+    const from = searchParams.get('from');
+    const to = searchParams.get('to');
+    if (from && to && /^\d{4}-\d{2}-\d{2}$/.test(from) && /^\d{4}-\d{2}-\d{2}$/.test(to)) {
+        const start = new Date(`${from}T00:00:00Z`);
+        const end = new Date(`${to}T00:00:00Z`);
+        if (isNaN(start.getTime()) || isNaN(end.getTime()) || end < start) return null;
+        end.setUTCDate(end.getUTCDate() + 1);
+        return { from: start, to: end, label: `${from}_${to}` };
+    }
+    const month = searchParams.get('month');
+    if (month && /^\d{4}-\d{2}$/.test(month)) {
+        const [y, m] = month.split('-').map(Number);
+        return { from: new Date(Date.UTC(y, m - 1, 1)), to: new Date(Date.UTC(y, m, 1)), label: month };
+    }
+    const year = searchParams.get('year');
+    if (year && /^\d{4}$/.test(year)) {
+        const y = Number(year);
+        return { from: new Date(Date.UTC(y, 0, 1)), to: new Date(Date.UTC(y + 1, 0, 1)), label: year };
+    }
+    return null;
+}
+
+// --- Formatting ---
+
+function csvField(value: string | number | null | undefined): string {
+    if (value === null || value === undefined) return '';
+    const text = typeof value === 'number' ? decimal(value) : value;
+    return /[";\r\n]/.test(text) ? `"${text.replace(/"/g, '""')}"` : text;
+}
+
+function csvRow(values: (string | number | null | undefined)[]): string {
+    return values.map(csvField).join(';') + '\r\n';
+}
+
+function decimal(value: number): string {
+    return (Math.round(value * 100) / 100).toFixed(2).replace('.', ',');
+}
+
+function isoDate(date: Date | null | undefined): string {
+    return date ? date.toISOString().slice(0, 10) : '';
+}
+
+function fecDate(date: Date): string {
+    return date.toISOString().slice(0, 10).replace(/-/g, '');
+}
+
+// Tabs and line breaks are the only forbidden characters in a FEC field
+function fecField(value: string | null | undefined): string {
+    return (value || '').replace(/[\t\r\n]+/g, ' ').trim();
+}
+
+// --- Keyset reads ---
+
+function periodAfter<K extends string>(field: K, period: ExportPeriod, after: { date: Date, id: string } | undefined) {
+    return {
+        [field]: { gte: period.from, lt: period.to },
+        ...(after ? {
+            OR: [
+                { [field]: { gt: after.date } },
+                { [field]: after.date, id: { gt: after.id } }
+            ]
+        } : {})
+    };
+}
+
+const clientColumns = { select: { id: true, nom: true, siret: true, tvaIntra: true } };
+
+const invoiceColumns = {
+    id: true, numero: true, dateEmission: true, dateEcheance: true, statut: true,
+    totalHT: true, totalTTC: true, client: clientColumns
+} as const;
+
+// Issued invoices only; FEC entries are built from the totals, no lines needed
+async function readPostedInvoicePage(societeId: string, period: ExportPeriod, after: { date: Date, id: string } | undefined) {
+    return prisma.facture.findMany({
+        where: {
+            societeId,
+            deletedAt: null,
+            statut: { notIn: NON_POSTED_INVOICE_STATUSES },
+            ...periodAfter('dateEmission', period, after)
+        } as Prisma.FactureWhereInput,
+        select: invoiceColumns,
+        orderBy: [{ dateEmission: 'asc' }, { id: 'asc' }],
+        take: PAGE_SIZE
+    });
+}
+
+async function readPaymentPage(societeId: string, period: ExportPeriod, after: { date: Date, id: string } | undefined) {
+    return prisma.paiement.findMany({
+        where: {
+            facture: { societeId, deletedAt: null },
+            ...periodAfter('datePaiement', period, after)
+        } as Prisma.PaiementWhereInput,
+        select: {
+            id: true, montant: true, datePaiement: true, moyenPaiement: true, reference: true,
+            facture: { select: { numero: true, client: clientColumns } }
+        },
+        orderBy: [{ datePaiement: 'asc' }, { id: 'asc' }],
+        take: PAGE_SIZE
+    });
+}
+
+/**
+ * Every row of the period, one keyset page at a time
+ */
+async function* paged<R extends { id: string }>(read: (after: { date: Date, id: string } | undefined) => Promise<R[]>, dateOf: (row: R) => Date): AsyncGenerator<R[]> {
+    let after: { date: Date, id: string } | undefined;
+    while (true) {
+        const rows = await read(after);
+        if (rows.length > 0) yield rows;
+        if (rows.length < PAGE_SIZE) return;
+        const last = rows[rows.length - 1];
+        after = { date: dateOf(last), id: last.id };
+    }
+}
+
+async function withLines<R extends { id: string, items: any[] }>(rows: R[], table: 'facture' | 'devis'): Promise<Map<string, LigneItem[]>> {
+    // Documents not backfilled yet fall back on their itemsJSON (one query per page)
+    return resolveLineItems(rows, ids => table === 'facture'
+        ? prisma.facture.findMany({ where: { id: { in: ids } }, select: { id: true, itemsJSON: true } })
+        : prisma.devis.findMany({ where: { id: { in: ids } }, select: { id: true, itemsJSON: true } }));
+}
+
+// --- CSV ---
+
+const LINE_COLUMNS = ['Désignation', 'Quantité', 'Prix unitaire HT', 'TVA %', 'Remise', 'Montant HT'];
+
+function lineValues(item: LigneItem | undefined) {
+    if (!item) return ['', '', '', '', '', ''];
+    return [item.description, item.quantite, item.prixUnitaire, item.tva, item.remise ?? 0, item.totalLigne];
+}
+
+async function* invoicesCsv(societeId: string, period: ExportPeriod): AsyncGenerator<string> {
+    yield BOM + csvRow(['Numéro', 'Date', 'Échéance', 'Statut', 'Client', 'SIRET client', 'TVA client', ...LINE_COLUMNS, 'Total HT', 'Total TTC']);
+
+    const read = (after: { date: Date, id: string } | undefined) => prisma.facture.findMany({
+        where: { societeId, deletedAt: null, ...periodAfter('dateEmission', period, after) } as Prisma.FactureWhereInput,
+        select: { ...invoiceColumns, items: LINE_ITEMS_RELATION },
+        orderBy: [{ dateEmission: 'asc' }, { id: 'asc' }],
+        take: PAGE_SIZE
+    });
+
+    for await (const rows of paged(read, row => row.dateEmission)) {
+        const lines = await withLines(rows, 'facture');
+        let chunk = '';
+        for (const row of rows) {
+            const head = [row.numero, isoDate(row.dateEmission), isoDate(row.dateEcheance), row.statut, row.client.nom, row.client.siret, row.client.tvaIntra];
+            const items = lines.get(row.id) || [];
+            for (const item of items.length > 0 ? items : [undefined]) {
+                chunk += csvRow([...head, ...lineValues(item), row.totalHT, row.totalTTC]);
+            }
+        }
+        yield chunk;
+    }
+}
+
+async function* quotesCsv(societeId: string, period: ExportPeriod): AsyncGenerator<string> {
+    yield BOM + csvRow(['Numéro', 'Date', 'Validité', 'Statut', 'Client', 'SIRET client', 'TVA client', ...LINE_COLUMNS, 'Total HT', 'Total TTC']);
+
+    const read = (after: { date: Date, id: string } | undefined) => prisma.devis.findMany({
+        where: { societeId, deletedAt: null, ...periodAfter('dateEmission', period, after) } as Prisma.DevisWhereInput,
+        select: {
+            id: true, numero: true, dateEmission: true, dateValidite: true, statut: true,
+            totalHT: true, totalTTC: true, client: clientColumns, items: LINE_ITEMS_RELATION
+        },
+        orderBy: [{ dateEmission: 'asc' }, { id: 'asc' }],
+        take: PAGE_SIZE
+    });
+
+    for await (const rows of paged(read, row => row.dateEmission)) {
+        const lines = await withLines(rows, 'devis');
+        let chunk = '';
+        for (const row of rows) {
+            const head = [row.numero, isoDate(row.dateEmission), isoDate(row.dateValidite), row.statut, row.client.nom, row.client.siret, row.client.tvaIntra];
+            const items = lines.get(row.id) || [];
+            for (const item of items.length > 0 ? items : [undefined]) {
+                chunk += csvRow([...head, ...lineValues(item), row.totalHT, row.totalTTC]);
+            }
+        }
+        yield chunk;
+    }
+}
+
+async function* paymentsCsv(societeId: string, period: ExportPeriod): AsyncGenerator<string> {
+    yield BOM + csvRow(['Date', 'Facture', 'Client', 'Montant', 'Moyen de paiement', 'Référence']);
+
+    for await (const rows of paged(after => readPaymentPage(societeId, period, after), row => row.datePaiement)) {
+        yield rows.map(row => csvRow([
+            isoDate(row.datePaiement), row.facture.numero, row.facture.client.nom,
+            row.montant, row.moyenPaiement, row.reference
+        ])).join('');
+    }
+}
+
+// --- FEC ---
+
+interface FecLine {
+    account: { num: string, label: string };
+    aux?: { num: string, label: string };
+    label: string;
+    amount: number; // > 0: debit, < 0: credit
+}
+
+interface FecEntry {
+    journal: { code: string, label: string };
+    date: Date;
+    pieceRef: string;
+    pieceDate: Date;
+    lines: FecLine[];
+}
+
+function invoiceEntry(row: Awaited<ReturnType<typeof readPostedInvoicePage>>[number]): FecEntry {
+    const customer = { num: row.client.id, label: row.client.nom };
+    const label = `Facture ${row.numero} ${row.client.nom}`;
+    const vat = Math.round((row.totalTTC - row.totalHT) * 100) / 100;
+    // Credit notes (negative totals) come out with debit and credit swapped
+    return {
+        journal: SALES_JOURNAL,
+        date: row.dateEmission,
+        pieceRef: row.numero,
+        pieceDate: row.dateEmission,
+        lines: [
+            { account: ACCOUNTS.customers, aux: customer, label, amount: row.totalTTC },
+            { account: ACCOUNTS.sales, label, amount: -row.totalHT },
+            ...(vat !== 0 ? [{ account: ACCOUNTS.vat, label, amount: -vat }] : [])
+        ]
+    };
+}
+
+function paymentEntry(row: Awaited<ReturnType<typeof readPaymentPage>>[number]): FecEntry {
+    const customer = { num: row.facture.client.id, label: row.facture.client.nom };
+    const label = `Règlement ${row.facture.numero}${row.moyenPaiement ? ` (${row.moyenPaiement})` : ''}`;
+    return {
+        journal: BANK_JOURNAL,
+        date: row.datePaiement,
+        pieceRef: row.reference || row.facture.numero,
+        pieceDate: row.datePaiement,
+        lines: [
+            { account: ACCOUNTS.bank, label, amount: row.montant },
+            { account: ACCOUNTS.customers, aux: customer, label, amount: -row.montant }
+        ]
+    };
+}
+
+async function* entries<R extends { id: string }>(pages: AsyncGenerator<R[]>, toEntry: (row: R) => FecEntry): AsyncGenerator<FecEntry> {
+    for await (const rows of pages) {
+        for (const row of rows) yield toEntry(row);
+    }
+}
+
+/**
+ * Both journals interleaved by date, each one still read page by page
+ */
+async function* mergeByDate(a: AsyncGenerator<FecEntry>, b: AsyncGenerator<FecEntry>): AsyncGenerator<FecEntry> {
+    let nextA = await a.next();
+    let nextB = await b.next();
+    while (!nextA.done || !nextB.done) {
+        if (nextB.done || (!nextA.done && nextA.value.date <= (nextB.value as FecEntry).date)) {
+            yield nextA.value as FecEntry;
+            nextA = await a.next();
+        } else {
+            yield nextB.value as FecEntry;
+            nextB = await b.next();
+        }
+    }
+}
+
+async function* fec(societeId: string, period: ExportPeriod): AsyncGenerator<string> {
+    yield FEC_COLUMNS.join('\t') + '\r\n';
+
+    const counters = new Map<string, number>();
+    let chunk = '';
+    let pending = 0;
+
+    const merged = mergeByDate(
+        entries(paged(after => readPostedInvoicePage(societeId, period, after), row => row.dateEmission), invoiceEntry),
+        entries(paged(after => readPaymentPage(societeId, period, after), row => row.datePaiement), paymentEntry)
+    );
+
+    for await (const entry of merged) {
+        const number = (counters.get(entry.journal.code) || 0) + 1;
+        counters.set(entry.journal.code, number);
+        const ecritureNum = `${entry.journal.code}${String(number).padStart(6, '0')}`;
+
+        for (const line of entry.lines) {
+            chunk += [
+                entry.journal.code, entry.journal.label, ecritureNum, fecDate(entry.date),
+                line.account.num, line.account.label, fecField(line.aux?.num), fecField(line.aux?.label),
+                fecField(entry.pieceRef), fecDate(entry.pieceDate), fecField(line.label),
+                decimal(Math.max(line.amount, 0)), decimal(Math.max(-line.amount, 0)),
+                '', '', fecDate(entry.date), '', ''
+            ].join('\t') + '\r\n';
+        }
+
+        if (++pending === PAGE_SIZE) {
+            yield chunk;
+            chunk = '';
+            pending = 0;
+        }
+    }
+    if (chunk) yield chunk;
+}
+
+/**
+ * Text chunks of the export, to be written as they come
+ */
+export function exportChunks(kind: ExportKind, societeId: string, period: ExportPeriod): AsyncGenerator<string> {
+    switch (kind) {
+        case 'factures': return invoicesCsv(societeId, period);
+        case 'devis': return quotesCsv(societeId, period);
+        case 'paiements': return paymentsCsv(societeId, period);
+        case 'fec': return fec(societeId, period);
+    }
+}
+
+/**
+ * FEC: "<SIREN>FEC<closing date>.txt" as expected by the tax administration
+ */
+export function exportFilename(kind: ExportKind, societe: { nom: string, siret: string | null }, period: ExportPeriod): string {
+    if (kind === 'fec') {
+        const siren = (societe.siret || '').replace(/\D/g, '').slice(0, 9) || 'SIREN';
+        const closing = new Date(period.to.getTime() - 24 * 60 * 60 * 1000);
+        return `${siren}FEC${fecDate(closing)}.txt`;
+    }
+    const name = kind === 'factures' ? 'Factures' : kind === 'devis' ? 'Devis' : 'Paiements';
+    return `${name}_${period.label}.csv`;
+}
@@ -3,6 +3,9 @@
 import { prisma } from '@/lib/prisma';
 import { User } from '@/types';
 import { cookies } from "next/headers";
+import { cache } from 'react';
+import { loadUser, invalidateUser } from '@/lib/session-cache';
+import { traced } from '@/lib/tracing';
 
 function mapUser(prismaUser: any): User {
     return {
@@ -16,11 +19,12 @@ function mapUser(prismaUser: any): User {
         lastReadHistory: prismaUser.lastReadHistory ? prismaUser.lastReadHistory.toISOString() : undefined,
         password: prismaUser.password,
         avatarUrl: prismaUser.avatarUrl,
-        hasAvatar: prismaUser.hasAvatar
+        hasAvatar: prismaUser.hasAvatar,
+        avatarHash: prismaUser.avatarHash
     };
 }
 
-export async function registerUser(data: any) {
+async function registerUserImpl(data: any) {
     try {
         const existing = await prisma.user.findUnique({ where: { email: data.email } });
         if (existing) return { success: false, error: "Cet email est déjà utilisé" };
@@ -61,7 +65,7 @@ export async function registerUser(data: any) {
     }
 }
 
-export async function loginUser(email: string, password: string) {
+async function loginUserImpl(email: string, password: string) {
     try {
         const user = await prisma.user.findUnique({
             where: { email },
@@ -94,7 +98,7 @@ export async function loginUser(email: string, password: string) {
     }
 }
 
-export async function getDefaultUser() {
+async function getDefaultUserImpl() {
     try {
         // Try to get usr_1 first (standard default)
         let user = await prisma.user.findUnique({
@@ -126,7 +130,8 @@ export async function getDefaultUser() {
     }
 }
 
-export async function getCurrentUser() {
+// Memoized per request: every action of a render shares one cookie parse + user lookup
+const getSessionUser = cache(async () => {
     try {
         const cookieStore = await cookies();
         const token = cookieStore.get("session_userid")?.value;
@@ -147,9 +152,13 @@ export async function getCurrentUser() {
     } catch (e) {
         return { success: false, error: "Erreur authentification" };
     }
+});
+
+async function getCurrentUserImpl() {
+    return getSessionUser();
 }
 
-export async function updateUser(userData: any) {
+async function updateUserImpl(userData: any) {
     try {
         const user = await prisma.user.update({
             where: { id: userData.id },
@@ -171,13 +180,14 @@ export async function updateUser(userData: any) {
                 }
             }
         });
+        invalidateUser(user.id);
         return { success: true, data: mapUser(user) };
     } catch (error: any) {
         return { success: false, error: error.message };
     }
 }
 
-export async function upsertUser(userData: any) {
+async function upsertUserImpl(userData: any) {
     try {
         // Enforce DB constraints via Prisma Upsert
         // If id matches, Update. If not, Create.
@@ -214,6 +224,8 @@ export async function upsertUser(userData: any) {
             }
         });
 
+        invalidateUser(user.id);
+
         // Ensure we always return the fresh DB state
         return { success: true, data: mapUser(user) };
     } catch (error: any) {
@@ -222,7 +234,7 @@ export async function upsertUser(userData: any) {
     }
 }
 
-export async function fetchAllUsers() {
+async function fetchAllUsersImpl() {
     try {
         const users = await prisma.user.findMany({
             include: {
@@ -241,20 +253,9 @@ export async function fetchAllUsers() {
     }
 }
 
-export async function fetchUserById(userId: string) {
+async function fetchUserByIdImpl(userId: string) {
     try {
-        const user = await prisma.user.findUnique({
-            where: { id: userId },
-            include: {
-                societes: {
-                    select: {
-                        id: true,
-                        nom: true,
-                        logoUrl: true
-                    }
-                }
-            }
-        });
+        const user = await loadUser(userId);
         if (!user) return { success: false, error: "Utilisateur introuvable" };
         return { success: true, data: mapUser(user) };
     } catch (error: any) {
@@ -262,19 +263,20 @@ export async function fetchUserById(userId: string) {
     }
 }
 
-export async function markHistoryAsRead(userId: string) {
+async function markHistoryAsReadImpl(userId: string) {
     try {
         await prisma.user.update({
             where: { id: userId },
             data: { lastReadHistory: new Date() }
         });
+        invalidateUser(userId);
         return { success: true };
     } catch (error: any) {
         return { success: false, error: error.message };
     }
 }
 
-export async function updateUserProfile(data: { fullName?: string; email?: string; currentPassword?: string; newPassword?: string }) {
+async function updateUserProfileImpl(data: { fullName?: string; email?: string; currentPassword?: string; newPassword?: string }) {
     try {
         const cookieStore = await cookies();
         const userId = cookieStore.get("session_userid")?.value;
@@ -303,6 +305,7 @@ export async function updateUserProfile(data: { fullName?: string; email?: strin
             where: { id: userId },
             data: updateData
         });
+        invalidateUser(userId);
 
         // Update session cookie if needed (optional but good practice)
         // But Next.js server actions handle this mostly via data.
@@ -312,3 +315,14 @@ export async function updateUserProfile(data: { fullName?: string; email?: strin
         return { success: false, error: error.message };
     }
 }
+
+export const registerUser = traced('registerUser', registerUserImpl);
+export const loginUser = traced('loginUser', loginUserImpl);
+export const getDefaultUser = traced('getDefaultUser', getDefaultUserImpl);
+export const getCurrentUser = traced('getCurrentUser', getCurrentUserImpl);
+export const updateUser = traced('updateUser', updateUserImpl);
+export const upsertUser = traced('upsertUser', upsertUserImpl);
+export const fetchAllUsers = traced('fetchAllUsers', fetchAllUsersImpl);
+export const fetchUserById = traced('fetchUserById', fetchUserByIdImpl);
+export const markHistoryAsRead = traced('markHistoryAsRead', markHistoryAsReadImpl);
+export const updateUserProfile = traced('updateUserProfile', updateUserProfileImpl);
@@ -5,8 +5,11 @@ import { Client } from '@/types';
 import { getCurrentUser } from './auth';
 import { canAccessSociete } from './members';
 import { MembershipRole } from '@prisma/client';
+import { CLIENT_LIST_INCLUDE, toListClient } from '@/lib/list-rows';
+import { recordDeletions } from '@/lib/delta-sync';
+import { traced } from '@/lib/tracing';
 
-export async function fetchClients(societeId: string): Promise<{ success: boolean, data?: Client[], error?: string }> {
+async function fetchClientsImpl(societeId: string): Promise<{ success: boolean, data?: Client[], error?: string }> {
     try {
         const userRes = await getCurrentUser();
         if (!userRes.success || !userRes.data) return { success: false, error: "Non authentifié" };
@@ -16,28 +19,10 @@ export async function fetchClients(societeId: string): Promise<{ success: boolea
 
         const clients = await prisma.client.findMany({
             where: { societeId },
-            include: {
-                factures: {
-                    where: { deletedAt: null, statut: { not: 'Annulée' as any } },
-                    select: { totalTTC: true }
-                }
-            }
+            include: CLIENT_LIST_INCLUDE
         });
 
-        const mapped: Client[] = clients.map((c: any) => ({
-            id: c.id,
-            societeId: c.societeId,
-            nom: c.nom,
-            email: c.email || undefined,
-            telephone: c.telephone || undefined,
-            adresse: c.adresse || undefined,
-            ville: c.ville || undefined,
-            codePostal: c.codePostal || undefined,
-            pays: c.pays || undefined,
-            siret: c.siret || undefined,
-            tvaIntra: c.tvaIntra || undefined,
-            totalPurchases: c.factures.reduce((sum: number, f: any) => sum + (f.totalTTC || 0), 0)
-        }));
+        const mapped: Client[] = clients.map(toListClient);
 
         return { success: true, data: mapped };
     } catch (error: any) {
@@ -45,7 +30,7 @@ export async function fetchClients(societeId: string): Promise<{ success: boolea
     }
 }
 
-export async function createClientAction(client: Client) {
+async function createClientActionImpl(client: Client) {
     try {
         const userRes = await getCurrentUser();
         if (!userRes.success || !userRes.data) return { success: false, error: "Non authentifié" };
@@ -76,7 +61,7 @@ export async function createClientAction(client: Client) {
     }
 }
 
-export async function updateClient(client: Client) {
+async function updateClientImpl(client: Client) {
     if (!client.id) return { success: false, error: "ID manquant" };
     try {
         const existing = await prisma.client.findUnique({ where: { id: client.id }, select: { societeId: true } });
@@ -108,7 +93,7 @@ export async function updateClient(client: Client) {
     }
 }
 
-export async function deleteClient(id: string) {
+async function deleteClientImpl(id: string) {
     if (!id) return { success: false, error: "ID manquant" };
     try {
         const existing = await prisma.client.findUnique({ where: { id }, select: { societeId: true } });
@@ -121,8 +106,14 @@ export async function deleteClient(id: string) {
         if (!authorized) return { success: false, error: "Droit insuffisant" };
 
         await prisma.client.delete({ where: { id } });
+        await recordDeletions(existing.societeId, 'clients', [id]);
         return { success: true };
     } catch (error: any) {
         return { success: false, error: error.message };
     }
 }
+
+export const fetchClients = traced('fetchClients', fetchClientsImpl);
+export const createClientAction = traced('createClientAction', createClientActionImpl);
+export const updateClient = traced('updateClient', updateClientImpl);
+export const deleteClient = traced('deleteClient', deleteClientImpl);
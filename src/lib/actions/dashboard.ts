@@ -1,101 +1,75 @@
 "use server";
 
 import { prisma } from '@/lib/prisma';
-import type { User, Societe, Facture, Devis } from '@/types';
+import type { User, Facture, Devis } from '@/types';
+import { MembershipRole } from '@prisma/client';
+import { getCurrentUser } from './auth';
+import { canAccessSociete } from './members';
+import { aggregateInvoiceMetrics, InvoiceMetrics } from '@/lib/invoice-metrics';
+import { resolveLineItems } from '@/lib/line-items';
+import {
+    ARCHIVED_INVOICE_STATUS, ARCHIVED_QUOTE_STATUS,
+    INVOICE_LIST_SELECT, QUOTE_LIST_SELECT, toListInvoice, toListQuote
+} from '@/lib/list-rows';
+import { traced } from '@/lib/tracing';
+import { loadSocieteCatalog, loadUser, SocieteCatalogEntry } from '@/lib/session-cache';
 
 interface DashboardData {
     user: User | null;
-    societes: Societe[];
+    societes: SocieteCatalogEntry[];
     invoices: Partial<Facture>[];
     quotes: Partial<Devis>[];
 }
 
-export async function fetchDashboardData(userId: string, societeId: string): Promise<{ success: boolean, data?: DashboardData, error?: string }> {
+async function fetchDashboardDataImpl(userId: string, societeId: string): Promise<{ success: boolean, data?: DashboardData, error?: string }> {
     try {
-        const startTotal = Date.now();
-
-
-        // Single Prisma transaction with all queries
-        const [user, societes, invoices, quotes] = await prisma.$transaction([
-            // User with societes
-            prisma.user.findUnique({
-                where: { id: userId },
-                include: {
-                    societes: {
-                        select: {
-                            id: true,
-                            nom: true,
-                            logoUrl: true
-                        }
-                    }
-                }
-            }),
-
-            // All societes
-            prisma.societe.findMany(),
-
-            // Invoices for societe
-            prisma.facture.findMany({
-                where: { societeId, deletedAt: null, statut: { not: 'Archivée' as any } },
-                select: {
-                    id: true,
-                    numero: true,
-                    clientId: true,
-                    societeId: true,
-                    dateEmission: true,
-                    dateEcheance: true,
-                    datePaiement: true,
-                    statut: true,
-                    totalHT: true,
-                    totalTTC: true,
-                    createdAt: true,
-                    updatedAt: true,
-                    client: {
-                        select: { nom: true }
-                    },
-                    itemsJSON: true,
-                    config: true,
-                    isLocked: true
-                },
-                orderBy: [
-                    { dateEmission: 'desc' },
-                    { numero: 'desc' }
-                ],
-                take: 50
-            }),
-
-            // Quotes for societe
-            prisma.devis.findMany({
-                where: { societeId, deletedAt: null, statut: { not: 'Archivé' as any } },
-                select: {
-                    id: true,
-                    numero: true,
-                    clientId: true,
-                    societeId: true,
-                    dateEmission: true,
-                    dateValidite: true,
-                    statut: true,
-                    totalHT: true,
-                    totalTTC: true,
-                    createdAt: true,
-                    updatedAt: true,
-                    client: {
-                        select: { nom: true }
-                    },
-                    itemsJSON: true,
-                    config: true,
-                    isLocked: true
-                },
-                orderBy: [
-                    { dateEmission: 'desc' },
-                    { numero: 'desc' }
-                ],
-                take: 50
-            })
+        const userRes = await getCurrentUser();
+        if (!userRes.success || !userRes.data) return { success: false, error: "Non authentifié" };
+        if (userRes.data.id !== userId) return { success: false, error: "Accès refusé" };
+
+        const authorized = await canAccessSociete(userId, societeId, MembershipRole.VIEWER);
+        if (!authorized) return { success: false, error: "Accès refusé" };
+
+        // User row and société catalog come from the session cache (scoped to the caller's memberships)
+        const [user, societes, [invoices, quotes]] = await Promise.all([
+            loadUser(userId),
+            loadSocieteCatalog(userId),
+            prisma.$transaction([
+                // Invoices for societe
+                prisma.facture.findMany({
+                    where: { societeId, deletedAt: null, statut: { not: ARCHIVED_INVOICE_STATUS as any } },
+                    select: INVOICE_LIST_SELECT,
+                    orderBy: [
+                        { dateEmission: 'desc' },
+                        { numero: 'desc' }
+                    ],
+                    take: 50
+                }),
+
+                // Quotes for societe
+                prisma.devis.findMany({
+                    where: { societeId, deletedAt: null, statut: { not: ARCHIVED_QUOTE_STATUS as any } },
+                    select: QUOTE_LIST_SELECT,
+                    orderBy: [
+                        { dateEmission: 'desc' },
+                        { numero: 'desc' }
+                    ],
+                    take: 50
+                })
+            ])
         ]);
 
-        const totalTime = Date.now() - startTotal;
-
+        // Documents not backfilled yet fall back on their itemsJSON (one query each)
+        const [invoiceItems, quoteItems] = await Promise.all([
+            resolveLineItems(invoices, ids => prisma.facture.findMany({
+                where: { id: { in: ids } },
+                select: { id: true, itemsJSON: true }
+            })),
+            resolveLineItems(quotes, ids => prisma.devis.findMany({
+                where: { id: { in: ids } },
+                select: { id: true, itemsJSON: true }
+            }))
+        ]);
 
         // Map user
         const mappedUser = user ? {
@@ -109,108 +83,14 @@ export async function fetchDashboardData(userId: string, societeId: string): Pro
             permissions: [] // Default empty permissions
         } as User : null;
 
-        // Map societes (convert Date fields to strings)
-        const mappedSocietes = societes.map((s: any) => ({
-            ...s,
-            createdAt: s.createdAt.toISOString(),
-            updatedAt: s.updatedAt.toISOString()
-        })) as Societe[];
-
-        // Map invoices
-        const mappedInvoices = invoices.map((inv: any) => {
-            let items: any[] = [];
-            try {
-                if (inv.itemsJSON) {
-                    const parsed = JSON.parse(inv.itemsJSON);
-                    items = typeof parsed === 'string' ? JSON.parse(parsed) : parsed;
-                }
-            } catch (e) {
-                console.error("Error parsing itemsJSON for invoice:", inv.id);
-            }
-            return {
-                id: inv.id,
-                numero: inv.numero,
-                clientId: inv.clientId,
-                societeId: inv.societeId,
-                dateEmission: inv.dateEmission.toISOString(),
-                echeance: inv.dateEcheance ? inv.dateEcheance.toISOString() : "",
-                statut: inv.statut,
-                isLocked: inv.isLocked,
-                totalHT: inv.totalHT,
-                totalTTC: inv.totalTTC,
-                datePaiement: inv.datePaiement ? inv.datePaiement.toISOString() : undefined,
-                type: "Facture" as const,
-                items: items.map((item: any) => ({
-                    description: item.nom || item.description || "Article",
-                    quantite: Number(item.quantite) || 0,
-                    prixUnitaire: Number(item.prixUnitaire) || 0,
-                    totalLigne: Number(item.montantHT || item.totalLigne) || 0,
-                    date: item.date // Map date for validation
-                })),
-                emails: [],
-                config: (() => {
-                    if (!inv.config) return {};
-                    try {
-                        const parsed = JSON.parse(inv.config);
-                        return typeof parsed === 'string' ? JSON.parse(parsed) : parsed;
-                    } catch { return {}; }
-                })()
-            };
-        });
-
-        // Map quotes
-        const mappedQuotes = quotes.map((q: any) => {
-            let items: any[] = [];
-            try {
-                if (q.itemsJSON) {
-                    const parsed = JSON.parse(q.itemsJSON);
-                    items = typeof parsed === 'string' ? JSON.parse(parsed) : parsed;
-                }
-            } catch (e) {
-                console.error("Error parsing itemsJSON for quote:", q.id);
-            }
-            return {
-                id: q.id,
-                numero: q.numero,
-                clientId: q.clientId,
-                societeId: q.societeId,
-                dateValidite: q.dateValidite ? q.dateValidite.toISOString() : "",
-                statut: q.statut,
-                isLocked: q.isLocked,
-                totalHT: q.totalHT,
-                totalTTC: q.totalTTC,
-                type: "Devis" as const,
-                items: items.map((item: any) => ({
-                    id: item.id,
-                    nom: item.nom || item.description || "Article",
-                    description: item.nom || item.description || "Article",
-                    quantite: Number(item.quantite) || 0,
-                    prixUnitaire: Number(item.prixUnitaire) || 0,
-                    tva: Number(item.tva) || 20,
-                    remise: Number(item.remise) || 0,
-                    remiseType: item.remiseType || 'pourcentage',
-                    totalLigne: Number(item.montantHT || item.totalLigne) || 0,
-                    montantHT: Number(item.montantHT || item.totalLigne) || 0,
-                    date: item.date || "",
-                    produitId: item.produitId || "",
-                    type: item.type || 'produit'
-                })),
-                emails: [],
-                config: (() => {
-                    if (!q.config) return {};
-                    try {
-                        const parsed = JSON.parse(q.config);
-                        return typeof parsed === 'string' ? JSON.parse(parsed) : parsed;
-                    } catch { return {}; }
-                })()
-            };
-        });
+        const mappedInvoices = invoices.map(inv => toListInvoice(inv, invoiceItems.get(inv.id) || []));
+        const mappedQuotes = quotes.map(q => toListQuote(q, quoteItems.get(q.id) || []));
 
         return {
             success: true,
             data: {
                 user: mappedUser,
-                societes: mappedSocietes,
+                societes,
                 invoices: mappedInvoices as any,
                 quotes: mappedQuotes as any
             }
@@ -222,82 +102,24 @@ export async function fetchDashboardData(userId: string, societeId: string): Pro
     }
 }
 
-export async function fetchDashboardMetrics(societeId: string, dateRange: { start: Date, end: Date }): Promise<{ success: boolean, data?: any, error?: string }> {
+async function fetchDashboardMetricsImpl(societeId: string, dateRange: { start: Date, end: Date }): Promise<{ success: boolean, data?: InvoiceMetrics, error?: string }> {
     try {
-        const { start, end } = dateRange;
+        const userRes = await getCurrentUser();
+        if (!userRes.success || !userRes.data) return { success: false, error: "Non authentifié" };
 
-        // Fetch invoices within date range
-        const invoices = await prisma.facture.findMany({
-            where: {
-                societeId,
-                deletedAt: null,
-                dateEmission: {
-                    gte: start,
-                    lte: end
-                }
-            },
-            select: {
-                statut: true,
-                totalTTC: true,
-                dateEcheance: true,
-                datePaiement: true
-            }
-        });
-
-        // Calculate metrics
-        const now = new Date();
-        // CA = Toutes les factures sauf Brouillon et Annulée (CA engagé)
-        const revenue = invoices
-            .filter(inv => inv.statut !== 'Brouillon' && inv.statut !== 'Annulée')
-            .reduce((sum, inv) => sum + (inv.totalTTC || 0), 0);
-
-        // Count and amounts by status
-        const counts: Record<string, number> = {};
-        const amounts: Record<string, number> = {};
-        invoices.forEach(inv => {
-            counts[inv.statut] = (counts[inv.statut] || 0) + 1;
-            amounts[inv.statut] = (amounts[inv.statut] || 0) + (inv.totalTTC || 0);
-        });
+        const authorized = await canAccessSociete(userRes.data.id, societeId, MembershipRole.VIEWER);
+        if (!authorized) return { success: false, error: "Accès refusé" };
 
-        // Overdue invoices
-        const overdueInvoices = invoices.filter(inv =>
-            inv.statut !== 'Payée' &&
-            inv.statut !== 'Annulée' &&
-            inv.dateEcheance &&
-            new Date(inv.dateEcheance) < now
-        );
-        const overdueAmount = overdueInvoices.reduce((sum, inv) => sum + (inv.totalTTC || 0), 0);
-        const overdueCount = overdueInvoices.length;
+        // One grouped SQL statement (monthly rollup + partial months), see lib/invoice-metrics
+        const data = await aggregateInvoiceMetrics(societeId, new Date(dateRange.start), new Date(dateRange.end));
 
-        // Due soon (next 7 days)
-        const sevenDaysFromNow = new Date();
-        sevenDaysFromNow.setDate(sevenDaysFromNow.getDate() + 7);
-
-        const dueSoonInvoices = invoices.filter(inv =>
-            inv.statut !== 'Payée' &&
-            inv.statut !== 'Annulée' &&
-            inv.dateEcheance &&
-            new Date(inv.dateEcheance) >= now &&
-            new Date(inv.dateEcheance) <= sevenDaysFromNow
-        );
-        const dueSoonAmount = dueSoonInvoices.reduce((sum, inv) => sum + (inv.totalTTC || 0), 0);
-        const dueSoonCount = dueSoonInvoices.length;
-
-        return {
-            success: true,
-            data: {
-                revenue,
-                counts,
-                amounts,
-                overdueAmount,
-                overdueCount,
-                dueSoonAmount,
-                dueSoonCount
-            }
-        };
+        return { success: true, data };
 
     } catch (error: any) {
         console.error('[ERROR] fetchDashboardMetrics:', error);
         return { success: false, error: error.message };
     }
 }
+
+export const fetchDashboardData = traced('fetchDashboardData', fetchDashboardDataImpl);
+export const fetchDashboardMetrics = traced('fetchDashboardMetrics', fetchDashboardMetricsImpl);
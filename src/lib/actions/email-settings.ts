@@ -3,6 +3,8 @@
 import { prisma } from "@/lib/prisma";
 import { encrypt } from "@/lib/encryption";
 import { revalidatePath } from "next/cache";
+import { invalidateTransporters } from "@/lib/email";
+import { traced } from '@/lib/tracing';
 
 interface EmailSettingsData {
     provider: "SMTP" | "GMAIL";
@@ -17,7 +19,7 @@ interface EmailSettingsData {
     emailTemplates?: string;
 }
 
-export async function saveEmailConfiguration(societeId: string, data: EmailSettingsData) {
+async function saveEmailConfigurationImpl(societeId: string, data: EmailSettingsData) {
     try {
         const updateData: any = {
             emailProvider: data.provider,
@@ -45,6 +47,7 @@ export async function saveEmailConfiguration(societeId: string, data: EmailSetti
             where: { id: societeId },
             data: updateData
         });
+        invalidateTransporters(societeId);
 
         revalidatePath("/settings");
         return { success: true };
@@ -53,3 +56,5 @@ export async function saveEmailConfiguration(societeId: string, data: EmailSetti
         throw new Error(error.message);
     }
 }
+
+export const saveEmailConfiguration = traced('saveEmailConfiguration', saveEmailConfigurationImpl);
@@ -2,8 +2,9 @@
 
 import { prisma } from '@/lib/prisma';
 import { revalidatePath } from "next/cache";
+import { enqueueScheduledEmails } from '@/lib/scheduled-emails';
 
-export async function getDocumentEmailHistory(type: 'facture' | 'devis', id: string) {
+async function getDocumentEmailHistoryImpl(type: 'facture' | 'devis', id: string) {
     try {
         if (type === 'facture') {
             const doc = await prisma.facture.findUnique({
@@ -27,11 +28,12 @@ export async function getDocumentEmailHistory(type: 'facture' | 'devis', id: str
     }
 }
 
-export async function registerDocumentEmailSent(type: 'facture' | 'devis', id: string, emails: any[]) {
+async function registerDocumentEmailSentImpl(type: 'facture' | 'devis', id: string, emails: any[]) {
     try {
-        const json = JSON.stringify(emails);
         if (type === 'facture') {
-            const invoice = await prisma.facture.findUnique({ where: { id }, select: { statut: true } });
+            const invoice = await prisma.facture.findUnique({ where: { id }, select: { statut: true, societeId: true } });
+            // Scheduled entries go to the ScheduledEmail queue (drained by the cron)
+            const json = JSON.stringify(invoice ? await enqueueScheduledEmails(type, id, invoice.societeId, emails) : emails);
 
             // Auto-transition to "Envoyée" if currently "Brouillon" or "Téléchargée"
             let newStatus = undefined;
@@ -48,7 +50,8 @@ export async function registerDocumentEmailSent(type: 'facture' | 'devis', id: s
             });
         } else {
             // For Quotes, same logic: Auto-transition to "Envoyé" if currently "Brouillon"
-            const quote = await prisma.devis.findUnique({ where: { id }, select: { statut: true } });
+            const quote = await prisma.devis.findUnique({ where: { id }, select: { statut: true, societeId: true } });
+            const json = JSON.stringify(quote ? await enqueueScheduledEmails(type, id, quote.societeId, emails) : emails);
             let newStatus = undefined;
             if (quote && (quote.statut === "Brouillon" || quote.statut === "Téléchargé")) {
                 newStatus = "Envoyé";
@@ -70,6 +73,7 @@ export async function registerDocumentEmailSent(type: 'facture' | 'devis', id: s
 }
 
 import nodemailer from 'nodemailer';
+import { traced } from '@/lib/tracing';
 
 // Configure transporter (Using environement variables in real app, but fallback to something or mock if needed)
 // For this MVP user local context, we check if they have env vars, otherwise we might warn.
@@ -88,7 +92,7 @@ const transporter = nodemailer.createTransport({
     },
 });
 
-export async function sendInvoiceEmail(
+async function sendInvoiceEmailImpl(
     id: string,
     type: 'facture' | 'devis',
     to: string,
@@ -144,3 +148,7 @@ export async function sendInvoiceEmail(
         return { success: false, error: error.message };
     }
 }
+
+export const getDocumentEmailHistory = traced('getDocumentEmailHistory', getDocumentEmailHistoryImpl);
+export const registerDocumentEmailSent = traced('registerDocumentEmailSent', registerDocumentEmailSentImpl);
+export const sendInvoiceEmail = traced('sendInvoiceEmail', sendInvoiceEmailImpl);
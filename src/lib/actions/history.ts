@@ -5,64 +5,49 @@ import { revalidatePath } from "next/cache";
 import { getCurrentUser } from './auth';
 import { canAccessSociete } from './members';
 import { MembershipRole } from '@prisma/client';
-
-export async function createHistoryEntry(entry: {
-    userId: string;
+import { invalidateSocieteMemberships } from '@/lib/session-cache';
+import { recordDeletions } from '@/lib/delta-sync';
+import { flushAudit, recordAudit } from '@/lib/audit-log';
+import {
+    HISTORY_PAGE_ORDER, ListingPage,
+    historyCursor, historyKeysetWhere, historySearchWhere, pageSize, toPage
+} from '@/lib/keyset';
+import { traced } from '@/lib/tracing';
+
+async function createHistoryEntryImpl(entry: {
     action: string;
     entityType: string;
     description: string;
     entityId?: string;
     societeId?: string;
 }) {
-    // Audit log creation is typically implicit, but we can check if user is valid.
-    // Generally, this is called internally by other actions which are already secured.
-    if (!entry.userId || !entry.action || !entry.description) {
+    if (!entry.action || !entry.description) {
         return { success: false, error: "Champs requis manquants pour l'historique" };
     }
 
     try {
-        let finalSocieteId = entry.societeId;
-
-        if (entry.entityId) {
-            let fetchedSocieteId: string | undefined | null;
-
-            if (entry.entityType === 'facture') {
-                const item = await prisma.facture.findUnique({ where: { id: entry.entityId }, select: { societeId: true } });
-                fetchedSocieteId = item?.societeId;
-            } else if (entry.entityType === 'devis') {
-                const item = await prisma.devis.findUnique({ where: { id: entry.entityId }, select: { societeId: true } });
-                fetchedSocieteId = item?.societeId;
-            } else if (entry.entityType === 'client') {
-                const item = await prisma.client.findUnique({ where: { id: entry.entityId }, select: { societeId: true } });
-                fetchedSocieteId = item?.societeId;
-            } else if (entry.entityType === 'produit') {
-                const item = await prisma.produit.findUnique({ where: { id: entry.entityId }, select: { societeId: true } });
-                fetchedSocieteId = item?.societeId;
-            }
+        // Author from the session, never from the client
+        const userRes = await getCurrentUser();
+        if (!userRes.success || !userRes.data) return { success: false, error: "Non authentifié" };
 
-            if (fetchedSocieteId) {
-                finalSocieteId = fetchedSocieteId;
-            }
+        let societeId = entry.societeId || null;
+        if (societeId && !await canAccessSociete(userRes.data.id, societeId, MembershipRole.VIEWER)) {
+            // A société that no longer exists (just deleted, local placeholder): entry kept, unattached
+            const exists = await prisma.societe.findUnique({ where: { id: societeId }, select: { id: true } });
+            if (exists) return { success: false, error: "Accès refusé" };
+            societeId = null;
         }
 
-        await prisma.historyEntry.create({
-            data: {
-                userId: entry.userId,
-                action: entry.action,
-                entityType: entry.entityType,
-                description: entry.description,
-                entityId: entry.entityId,
-                societeId: finalSocieteId
-            }
-        });
-        return { success: true };
+        // Queued, written in batches (lib/audit-log)
+        const [queued] = recordAudit({ ...entry, societeId, userId: userRes.data.id });
+        return { success: true, data: { id: queued.id, timestamp: queued.timestamp.toISOString() } };
     } catch (error: any) {
         console.error("Failed to create history entry:", error);
         return { success: false, error: error.message };
     }
 }
 
-export async function fetchHistory(limit: number = 50, societeId?: string) {
+async function fetchHistoryImpl(limit: number = 50, societeId?: string) {
     try {
         const userRes = await getCurrentUser();
         if (!userRes.success || !userRes.data) return { success: false, error: "Non authentifié" };
@@ -80,6 +65,9 @@ export async function fetchHistory(limit: number = 50, societeId?: string) {
             return { success: false, error: "ID Société requis" };
         }
 
+        // Entries still queued by this instance
+        await flushAudit();
+
         const history = await prisma.historyEntry.findMany({
             where: whereClause,
             take: limit,
@@ -114,7 +102,63 @@ export async function fetchHistory(limit: number = 50, societeId?: string) {
 }
 
 
-export async function deleteRecord(tableName: string, recordId: string) {
+/**
+ * One page of the history of a société, newest first, optionally searched.
+ * Pass the returned nextCursor to get the following page (null: last page).
+ */
+async function listHistoryImpl(
+    societeId: string,
+    options: { search?: string, cursor?: string | null, limit?: number } = {}
+): Promise<{ success: boolean, data?: ListingPage<any>, error?: string }> {
+    try {
+        const userRes = await getCurrentUser();
+        if (!userRes.success || !userRes.data) return { success: false, error: "Non authentifié" };
+
+        const authorized = await canAccessSociete(userRes.data.id, societeId, MembershipRole.VIEWER);
+        if (!authorized) return { success: false, error: "Accès refusé" };
+
+        // Entries still queued by this instance (first page only)
+        if (!options.cursor) await flushAudit();
+
+        const size = pageSize(options.limit);
+        const rows = await prisma.historyEntry.findMany({
+            where: {
+                societeId,
+                AND: [historySearchWhere(options.search), historyKeysetWhere(options.cursor)]
+            },
+            orderBy: HISTORY_PAGE_ORDER,
+            take: size + 1,
+            select: {
+                id: true,
+                userId: true,
+                action: true,
+                entityType: true,
+                entityId: true,
+                description: true,
+                timestamp: true,
+                user: { select: { fullName: true } }
+            }
+        });
+
+        return {
+            success: true,
+            data: toPage(rows, size, historyCursor, h => ({
+                id: h.id,
+                userId: h.userId,
+                userName: h.user?.fullName || "Utilisateur Inconnu",
+                action: h.action,
+                entityType: h.entityType,
+                entityId: h.entityId,
+                description: h.description,
+                timestamp: h.timestamp.toISOString()
+            }))
+        };
+    } catch (error: any) {
+        return { success: false, error: error.message };
+    }
+}
+
+async function deleteRecordImpl(tableName: string, recordId: string) {
     if (!recordId) return { success: false, error: "Missing ID" };
 
     try {
@@ -161,9 +205,11 @@ export async function deleteRecord(tableName: string, recordId: string) {
         switch (tableName) {
             case 'Clients':
                 await prisma.client.delete({ where: { id: recordId } });
+                await recordDeletions(societeId, 'clients', [recordId]);
                 break;
             case 'Produits':
                 await prisma.produit.delete({ where: { id: recordId } });
+                await recordDeletions(societeId, 'products', [recordId]);
                 break;
             case 'Factures':
                 await prisma.facture.update({
@@ -191,6 +237,7 @@ export async function deleteRecord(tableName: string, recordId: string) {
                     prisma.devis.deleteMany({ where: { societeId: recordId } }),
                     prisma.societe.delete({ where: { id: recordId } })
                 ]);
+                invalidateSocieteMemberships(recordId);
                 break;
             default:
                 throw new Error("Table inconnue");
@@ -204,7 +251,7 @@ export async function deleteRecord(tableName: string, recordId: string) {
 
 // REMOVED deleteAllRecords as it is too dangerous for production.
 
-export async function unarchiveRecord(tableName: 'Factures' | 'Devis', id: string) {
+async function unarchiveRecordImpl(tableName: 'Factures' | 'Devis', id: string) {
     try {
         const userRes = await getCurrentUser();
         if (!userRes.success || !userRes.data) return { success: false, error: "Non authentifié" };
@@ -249,7 +296,7 @@ export async function unarchiveRecord(tableName: 'Factures' | 'Devis', id: strin
     }
 }
 
-export async function archiveRecord(tableName: 'Factures' | 'Devis', id: string) {
+async function archiveRecordImpl(tableName: 'Factures' | 'Devis', id: string) {
     try {
         const userRes = await getCurrentUser();
         if (!userRes.success || !userRes.data) return { success: false, error: "Non authentifié" };
@@ -288,7 +335,7 @@ export async function archiveRecord(tableName: 'Factures' | 'Devis', id: string)
     }
 }
 
-export async function restoreRecord(tableName: 'Factures' | 'Devis', id: string) {
+async function restoreRecordImpl(tableName: 'Factures' | 'Devis', id: string) {
     try {
         const userRes = await getCurrentUser();
         if (!userRes.success || !userRes.data) return { success: false, error: "Non authentifié" };
@@ -326,7 +373,7 @@ export async function restoreRecord(tableName: 'Factures' | 'Devis', id: string)
     }
 }
 
-export async function emptyTrash(societeId: string) {
+async function emptyTrashImpl(societeId: string) {
     try {
         const userRes = await getCurrentUser();
         if (!userRes.success || !userRes.data) return { success: false, error: "Non authentifié" };
@@ -335,19 +382,29 @@ export async function emptyTrash(societeId: string) {
         if (!authorized) return { success: false, error: "Droit insuffisant" };
 
         // Archive Invoices
-        await prisma.facture.updateMany({
+        const invoices = await prisma.facture.updateMany({
             // @ts-ignore
             where: { societeId, deletedAt: { not: null } },
             // @ts-ignore
             data: { deletedAt: null, statut: 'Archivée', isLocked: true, archivedAt: new Date() }
         });
         // Archive Quotes
-        await prisma.devis.updateMany({
+        const quotes = await prisma.devis.updateMany({
             // @ts-ignore
             where: { societeId, deletedAt: { not: null } },
             // @ts-ignore
             data: { deletedAt: null, statut: 'Archivé' }
         });
+
+        // One batched history insert for the whole operation
+        const audit = [];
+        if (invoices.count > 0) {
+            audit.push({ userId: userRes.data.id, societeId, action: 'update', entityType: 'facture', description: `Corbeille vidée : ${invoices.count} facture(s) archivée(s)` });
+        }
+        if (quotes.count > 0) {
+            audit.push({ userId: userRes.data.id, societeId, action: 'update', entityType: 'devis', description: `Corbeille vidée : ${quotes.count} devis archivé(s)` });
+        }
+        recordAudit(audit);
         revalidatePath("/", "layout");
         return { success: true };
     } catch (error: any) {
@@ -355,7 +412,7 @@ export async function emptyTrash(societeId: string) {
     }
 }
 
-export async function permanentlyDeleteRecord(tableName: 'Factures' | 'Devis', id: string) {
+async function permanentlyDeleteRecordImpl(tableName: 'Factures' | 'Devis', id: string) {
     try {
         const userRes = await getCurrentUser();
         if (!userRes.success || !userRes.data) return { success: false, error: "Non authentifié" };
@@ -380,6 +437,7 @@ export async function permanentlyDeleteRecord(tableName: 'Factures' | 'Devis', i
             throw new Error("Les factures ne peuvent pas être supprimées définitivement.");
         } else if (tableName === 'Devis') {
             await prisma.devis.delete({ where: { id } });
+            await recordDeletions(societeId, 'quotes', [id]);
         }
         revalidatePath("/", "layout");
         return { success: true };
@@ -388,7 +446,7 @@ export async function permanentlyDeleteRecord(tableName: 'Factures' | 'Devis', i
     }
 }
 
-export async function deleteAllRecords(tableName: string, societeId?: string) {
+async function deleteAllRecordsImpl(tableName: string, societeId?: string) {
     try {
         const userRes = await getCurrentUser();
         if (!userRes.success || !userRes.data) return { success: false, error: "Non authentifié" };
@@ -407,23 +465,37 @@ export async function deleteAllRecords(tableName: string, societeId?: string) {
         const authorized = await canAccessSociete(userRes.data.id, societeId, MembershipRole.OWNER);
         if (!authorized) return { success: false, error: "Droit insuffisant (Propriétaire requis)" };
 
+        let deleted: { count: number };
         switch (tableName) {
             case 'Factures':
-                await prisma.facture.deleteMany({ where: { societeId } });
+                deleted = await prisma.facture.deleteMany({ where: { societeId } });
+                await recordDeletions(societeId, 'invoices', null);
                 break;
             case 'Devis':
-                await prisma.devis.deleteMany({ where: { societeId } });
+                deleted = await prisma.devis.deleteMany({ where: { societeId } });
+                await recordDeletions(societeId, 'quotes', null);
                 break;
             case 'Clients':
-                await prisma.client.deleteMany({ where: { societeId } });
+                deleted = await prisma.client.deleteMany({ where: { societeId } });
+                await recordDeletions(societeId, 'clients', null);
                 break;
             case 'Produits':
-                await prisma.produit.deleteMany({ where: { societeId } });
+                deleted = await prisma.produit.deleteMany({ where: { societeId } });
+                await recordDeletions(societeId, 'products', null);
                 break;
             default:
                 return { success: false, error: "Type de données inconnu" };
         }
 
+        const ENTITY_TYPES: Record<string, string> = { Factures: 'facture', Devis: 'devis', Clients: 'client', Produits: 'produit' };
+        recordAudit({
+            userId: userRes.data.id,
+            societeId,
+            action: 'delete',
+            entityType: ENTITY_TYPES[tableName],
+            description: `Suppression de toutes les données ${tableName} (${deleted.count})`
+        });
+
         revalidatePath("/", "layout");
         return { success: true };
     } catch (error: any) {
@@ -431,3 +503,14 @@ export async function deleteAllRecords(tableName: string, societeId?: string) {
         return { success: false, error: error.message };
     }
 }
+
+export const createHistoryEntry = traced('createHistoryEntry', createHistoryEntryImpl);
+export const fetchHistory = traced('fetchHistory', fetchHistoryImpl);
+export const listHistory = traced('listHistory', listHistoryImpl);
+export const deleteRecord = traced('deleteRecord', deleteRecordImpl);
+export const unarchiveRecord = traced('unarchiveRecord', unarchiveRecordImpl);
+export const archiveRecord = traced('archiveRecord', archiveRecordImpl);
+export const restoreRecord = traced('restoreRecord', restoreRecordImpl);
+export const emptyTrash = traced('emptyTrash', emptyTrashImpl);
+export const permanentlyDeleteRecord = traced('permanentlyDeleteRecord', permanentlyDeleteRecordImpl);
+export const deleteAllRecords = traced('deleteAllRecords', deleteAllRecordsImpl);
@@ -8,10 +8,47 @@ import { getCurrentUser } from './auth';
 import { handleActionError } from './shared';
 import { canAccessSociete } from './members';
 import { MembershipRole } from '@prisma/client';
-import { generateNextInvoiceNumber } from '../invoice-utils';
+import { allocateDocumentNumber } from '../document-numbers';
+import { LINE_ITEMS_RELATION, decodeJSON, resolveLineItems, toItemRows } from '../line-items';
+import {
+    DOCUMENT_PAGE_ORDER, ListingFilters, ListingPage,
+    documentCursor, documentFilterWhere, documentKeysetWhere, pageSize, toPage
+} from '../keyset';
+import { traced } from '@/lib/tracing';
+
+// Columns shown by the invoice lists and editor; items come from FactureItem
+const INVOICE_COLUMNS = {
+    id: true,
+    numero: true,
+    clientId: true,
+    societeId: true,
+    dateEmission: true,
+    dateEcheance: true,
+    datePaiement: true,
+    statut: true,
+    totalHT: true,
+    totalTTC: true,
+    createdAt: true,
+    updatedAt: true,
+    isLocked: true,
+    archivedAt: true,
+    deletedAt: true,
+    client: {
+        select: { id: true, nom: true }
+    },
+    items: LINE_ITEMS_RELATION
+} as const;
+
+// Invoices not backfilled yet (no FactureItem rows): read their itemsJSON only
+function loadLegacyInvoiceItems(ids: string[]) {
+    return prisma.facture.findMany({
+        where: { id: { in: ids } },
+        select: { id: true, itemsJSON: true }
+    });
+}
 
 // Guards
-export async function checkInvoiceMutability(id: string) {
+async function checkInvoiceMutabilityImpl(id: string) {
     const invoice = await prisma.facture.findUnique({
         where: { id },
         select: { statut: true, archivedAt: true }
@@ -34,40 +71,46 @@ export async function checkInvoiceMutability(id: string) {
     return { success: true };
 }
 
-// Helper: Ensure unique invoice number
-async function ensureUniqueInvoiceNumber(numero: string, societeId: string, excludeId?: string): Promise<string> {
-    let attempts = 0;
-    let currentNumero = numero;
-
-    while (attempts < 10) {
-        const existing = await prisma.facture.findFirst({
-            where: {
-                numero: currentNumero,
-                societeId,
-                id: excludeId ? { not: excludeId } : undefined
-            }
-        });
-
-        if (!existing) {
-            return currentNumero; // Unique!
-        }
-
-        // Number exists, generate next one
-        const allInvoices = await prisma.facture.findMany({
-            where: { societeId },
-            select: { numero: true }
-        });
+// Fetch Actions
 
-        currentNumero = generateNextInvoiceNumber(allInvoices as any);
-        attempts++;
+// Columns of the lightweight lists (no lines, no emails)
+const INVOICE_LITE_COLUMNS = {
+    id: true,
+    numero: true,
+    clientId: true,
+    societeId: true,
+    dateEmission: true,
+    dateEcheance: true,
+    datePaiement: true,
+    statut: true,
+    totalHT: true,
+    totalTTC: true,
+    createdAt: true,
+    updatedAt: true,
+    client: {
+        select: { nom: true }
     }
-
-    throw new Error('Unable to generate unique invoice number after 10 attempts');
+} as const;
+
+function toLiteInvoice(inv: any) {
+    return {
+        id: inv.id,
+        numero: inv.numero,
+        clientId: inv.clientId,
+        societeId: inv.societeId,
+        dateEmission: inv.dateEmission.toISOString(),
+        echeance: inv.dateEcheance ? inv.dateEcheance.toISOString() : "",
+        statut: inv.statut as any,
+        totalHT: inv.totalHT,
+        totalTTC: inv.totalTTC,
+        datePaiement: inv.datePaiement ? inv.datePaiement.toISOString() : undefined,
+        type: "Facture" as const,
+        items: [],
+        emails: [],
+    };
 }
 
-// Fetch Actions
-
-export async function fetchInvoicesLite(societeId: string): Promise<{ success: boolean, data?: Partial<Facture>[], error?: string }> {
+async function fetchInvoicesLiteImpl(societeId: string): Promise<{ success: boolean, data?: Partial<Facture>[], error?: string }> {
     try {
         const userRes = await getCurrentUser();
         if (!userRes.success || !userRes.data) return { success: false, error: "Non authentifié" };
@@ -75,29 +118,10 @@ export async function fetchInvoicesLite(societeId: string): Promise<{ success: b
         const authorized = await canAccessSociete(userRes.data.id, societeId, MembershipRole.VIEWER);
         if (!authorized) return { success: false, error: "Accès refusé" };
 
-        const startTotal = Date.now();
-        console.log('[PERF] fetchInvoicesLite START');
-
         const invoices = await prisma.facture.findMany({
             // @ts-ignore
             where: { societeId, deletedAt: null, statut: { not: 'Archivée' } },
-            select: {
-                id: true,
-                numero: true,
-                clientId: true,
-                societeId: true,
-                dateEmission: true,
-                dateEcheance: true,
-                datePaiement: true,
-                statut: true,
-                totalHT: true,
-                totalTTC: true,
-                createdAt: true,
-                updatedAt: true,
-                client: {
-                    select: { nom: true }
-                }
-            },
+            select: INVOICE_LITE_COLUMNS,
             orderBy: [
                 { dateEmission: 'desc' },
                 { numero: 'desc' }
@@ -105,28 +129,50 @@ export async function fetchInvoicesLite(societeId: string): Promise<{ success: b
             take: 50
         });
 
-        const mapped = invoices.map((inv: any) => ({
-            id: inv.id,
-            numero: inv.numero,
-            clientId: inv.clientId,
-            societeId: inv.societeId,
-            dateEmission: inv.dateEmission.toISOString(),
-            echeance: inv.dateEcheance ? inv.dateEcheance.toISOString() : "",
-            statut: inv.statut as any,
-            totalHT: inv.totalHT,
-            totalTTC: inv.totalTTC,
-            datePaiement: inv.datePaiement ? inv.datePaiement.toISOString() : undefined,
-            type: "Facture" as const,
-            items: [],
-            emails: [],
-        }));
+        const mapped = invoices.map(toLiteInvoice);
         return { success: true, data: mapped };
     } catch (error: any) {
         return { success: false, error: error.message };
     }
 }
 
-export async function fetchInvoices(societeId: string): Promise<{ success: boolean, data?: Facture[], error?: string }> {
+/**
+ * One page of invoices, newest first, filtered and searched server-side.
+ * Pass the returned nextCursor to get the following page (null: last page).
+ */
+async function listInvoicesImpl(
+    societeId: string,
+    options: { filters?: ListingFilters, cursor?: string | null, limit?: number } = {}
+): Promise<{ success: boolean, data?: ListingPage<Partial<Facture>>, error?: string }> {
+    try {
+        const userRes = await getCurrentUser();
+        if (!userRes.success || !userRes.data) return { success: false, error: "Non authentifié" };
+
+        const authorized = await canAccessSociete(userRes.data.id, societeId, MembershipRole.VIEWER);
+        if (!authorized) return { success: false, error: "Accès refusé" };
+
+        const size = pageSize(options.limit);
+        const rows = await prisma.facture.findMany({
+            where: {
+                societeId,
+                deletedAt: null,
+                AND: [
+                    ...documentFilterWhere(options.filters || {}, 'Archivée'),
+                    documentKeysetWhere(options.cursor)
+                ]
+            },
+            select: INVOICE_LITE_COLUMNS,
+            orderBy: DOCUMENT_PAGE_ORDER,
+            take: size + 1
+        });
+
+        return { success: true, data: toPage(rows, size, documentCursor, toLiteInvoice) };
+    } catch (error: any) {
+        return { success: false, error: error.message };
+    }
+}
+
+async function fetchInvoicesImpl(societeId: string): Promise<{ success: boolean, data?: Facture[], error?: string }> {
     return fetchInvoicesLegacy(societeId);
 }
 
@@ -141,10 +187,10 @@ async function fetchInvoicesLegacy(societeId: string): Promise<{ success: boolea
         const invoices = await prisma.facture.findMany({
             // @ts-ignore
             where: { societeId, deletedAt: null, statut: { not: 'Archivée' } },
-            include: {
-                client: {
-                    select: { id: true, nom: true }
-                }
+            select: {
+                ...INVOICE_COLUMNS,
+                emailsJSON: true,
+                config: true
             },
             orderBy: [
                 { dateEmission: 'desc' },
@@ -153,18 +199,9 @@ async function fetchInvoicesLegacy(societeId: string): Promise<{ success: boolea
             take: 100
         });
 
-        const mapped: Facture[] = invoices.map((inv: any) => {
-            let items = [];
-            let emails = [];
-            try {
-                if (inv.itemsJSON) items = JSON.parse(inv.itemsJSON);
-                if (inv.emailsJSON) emails = JSON.parse(inv.emailsJSON);
-            } catch (e) {
-                console.error("Error parsing JSON fields", e);
-                items = [];
-                emails = [];
-            }
+        const itemsById = await resolveLineItems(invoices, loadLegacyInvoiceItems);
 
+        const mapped: Facture[] = invoices.map((inv: any) => {
             return {
                 id: inv.id,
                 numero: inv.numero,
@@ -176,14 +213,14 @@ async function fetchInvoicesLegacy(societeId: string): Promise<{ success: boolea
                 totalHT: inv.totalHT,
                 totalTTC: inv.totalTTC,
                 datePaiement: inv.datePaiement ? inv.datePaiement.toISOString() : undefined,
-                items: items,
-                emails: emails,
+                items: itemsById.get(inv.id) || [],
+                emails: decodeJSON(inv.emailsJSON, []),
                 type: "Facture",
                 createdAt: inv.createdAt ? inv.createdAt.toISOString() : undefined,
                 updatedAt: inv.updatedAt ? inv.updatedAt.toISOString() : undefined,
                 isLocked: inv.isLocked,
                 archivedAt: inv.archivedAt ? inv.archivedAt.toISOString() : undefined,
-                config: inv.config ? JSON.parse(inv.config) : {},
+                config: decodeJSON(inv.config, {}),
                 clientSnapshot: (inv as any).client
             };
         });
@@ -193,14 +230,14 @@ async function fetchInvoicesLegacy(societeId: string): Promise<{ success: boolea
     }
 }
 
-export async function fetchInvoiceDetails(id: string): Promise<{ success: boolean, data?: Facture, error?: string }> {
+async function fetchInvoiceDetailsImpl(id: string): Promise<{ success: boolean, data?: Facture, error?: string }> {
     try {
         const inv = await prisma.facture.findUnique({
             where: { id },
-            include: {
-                client: {
-                    select: { id: true, nom: true }
-                }
+            select: {
+                ...INVOICE_COLUMNS,
+                emailsJSON: true,
+                config: true
             }
         });
 
@@ -213,16 +250,7 @@ export async function fetchInvoiceDetails(id: string): Promise<{ success: boolea
         const authorized = await canAccessSociete(userRes.data.id, inv.societeId, MembershipRole.VIEWER);
         if (!authorized) return { success: false, error: "Accès refusé" };
 
-        let items = [];
-        let emails = [];
-        try {
-            if (inv.itemsJSON) items = JSON.parse(inv.itemsJSON);
-            if (inv.emailsJSON) emails = JSON.parse(inv.emailsJSON);
-        } catch (e) {
-            console.error("Error parsing JSON fields", e);
-            items = [];
-            emails = [];
-        }
+        const itemsById = await resolveLineItems([inv], loadLegacyInvoiceItems);
 
         const mapped: Facture = {
             id: inv.id,
@@ -235,14 +263,14 @@ export async function fetchInvoiceDetails(id: string): Promise<{ success: boolea
             totalHT: inv.totalHT,
             totalTTC: inv.totalTTC,
             datePaiement: inv.datePaiement ? inv.datePaiement.toISOString() : undefined,
-            items: items,
-            emails: emails,
+            items: itemsById.get(inv.id) || [],
+            emails: decodeJSON(inv.emailsJSON, []),
             type: "Facture",
             createdAt: inv.createdAt ? inv.createdAt.toISOString() : undefined,
             updatedAt: inv.updatedAt ? inv.updatedAt.toISOString() : undefined,
             isLocked: inv.isLocked,
             archivedAt: inv.archivedAt ? inv.archivedAt.toISOString() : undefined,
-            config: inv.config ? JSON.parse(inv.config) : {},
+            config: decodeJSON(inv.config, {}),
             clientSnapshot: (inv as any).client
         };
         return { success: true, data: mapped };
@@ -251,7 +279,7 @@ export async function fetchInvoiceDetails(id: string): Promise<{ success: boolea
     }
 }
 
-export async function createInvoice(invoice: Facture) {
+async function createInvoiceImpl(invoice: Facture) {
     try {
         const userRes = await getCurrentUser();
         if (!userRes.success || !userRes.data) return { success: false, error: "Non authentifié" };
@@ -264,11 +292,11 @@ export async function createInvoice(invoice: Facture) {
         const authorized = await canAccessSociete(userRes.data.id, targetSocieteId, MembershipRole.EDITOR);
         if (!authorized) return { success: false, error: "Droit insuffisant (Requis: Éditeur)" };
 
-        // Ensure unique numero
-        const uniqueNumero = await ensureUniqueInvoiceNumber(invoice.numero, targetSocieteId);
-
         // Transaction
         const result = await prisma.$transaction(async (tx) => {
+            // Numero from the société counter (atomic, see lib/document-numbers)
+            const uniqueNumero = await allocateDocumentNumber(tx, targetSocieteId, 'facture', invoice.numero);
+
             const processedItems = await ensureProductsExist(invoice.items || [], targetSocieteId, tx);
             const itemsJson = JSON.stringify(processedItems);
 
@@ -286,16 +314,7 @@ export async function createInvoice(invoice: Facture) {
                     clientId: invoice.clientId,
                     config: JSON.stringify(invoice.config || {}),
                     items: {
-                        create: processedItems.map((item: any) => ({
-                            produitId: item.produitId || undefined,
-                            description: item.nom || item.description || "Article",
-                            quantite: Number(item.quantite) || 0,
-                            prixUnitaire: Number(item.prixUnitaire) || 0,
-                            tva: Number(item.tva) || 0,
-                            remise: Number(item.remise) || 0,
-                            remiseType: item.remiseType || 'pourcentage',
-                            montantHT: Number(item.montantHT) || 0
-                        }))
+                        create: toItemRows(processedItems)
                     }
                 }
             });
@@ -303,14 +322,14 @@ export async function createInvoice(invoice: Facture) {
         });
 
         revalidatePath('/factures', 'page');
-        return { success: true, id: result.id };
+        return { success: true, id: result.id, numero: result.numero };
     } catch (error: any) {
         console.error("[SAVE] ERROR", error);
         return handleActionError(error);
     }
 }
 
-export async function updateInvoice(invoice: Facture) {
+async function updateInvoiceImpl(invoice: Facture) {
     if (!invoice.id) return { success: false, error: "ID manquant" };
     try {
         const mutabilityCheck = await checkInvoiceMutability(invoice.id);
@@ -371,16 +390,7 @@ export async function updateInvoice(invoice: Facture) {
                 ...(updateData.itemsJSON ? {
                     items: {
                         deleteMany: {},
-                        create: processedItems.map((item: any) => ({
-                            produitId: item.produitId || undefined,
-                            description: item.nom || item.description || "Article",
-                            quantite: Number(item.quantite) || 0,
-                            prixUnitaire: Number(item.prixUnitaire) || 0,
-                            tva: Number(item.tva) || 0,
-                            remise: Number(item.remise) || 0,
-                            remiseType: item.remiseType || 'pourcentage',
-                            montantHT: Number(item.montantHT) || 0
-                        }))
+                        create: toItemRows(processedItems)
                     }
                 } : {})
             },
@@ -399,7 +409,7 @@ export async function updateInvoice(invoice: Facture) {
     }
 }
 
-export async function toggleInvoiceLock(invoiceId: string, isLocked: boolean) {
+async function toggleInvoiceLockImpl(invoiceId: string, isLocked: boolean) {
     if (!invoiceId) return { success: false, error: "ID manquant" };
     try {
         const invoice = await prisma.facture.findUnique({
@@ -430,11 +440,11 @@ export async function toggleInvoiceLock(invoiceId: string, isLocked: boolean) {
     }
 }
 
-export async function importInvoice(invoice: Facture, clientName: string) {
+async function importInvoiceImpl(invoice: Facture, clientName: string) {
     return createInvoice(invoice);
 }
 
-export async function fetchDeletedInvoices(societeId: string) {
+async function fetchDeletedInvoicesImpl(societeId: string) {
     try {
         const userRes = await getCurrentUser();
         if (!userRes.success || !userRes.data) return { success: false, error: "Non authentifié" };
@@ -445,10 +455,9 @@ export async function fetchDeletedInvoices(societeId: string) {
         const invoices = await prisma.facture.findMany({
             // @ts-ignore
             where: { societeId, deletedAt: { not: null } },
-            include: {
-                client: { select: { id: true, nom: true } }
-            }
+            select: INVOICE_COLUMNS
         });
+        const itemsById = await resolveLineItems(invoices, loadLegacyInvoiceItems);
         const mapped = invoices.map((inv: any) => ({
             id: inv.id,
             numero: inv.numero,
@@ -461,7 +470,7 @@ export async function fetchDeletedInvoices(societeId: string) {
             totalHT: inv.totalHT,
             totalTTC: inv.totalTTC,
             datePaiement: inv.datePaiement ? inv.datePaiement.toISOString() : undefined,
-            items: inv.itemsJSON ? JSON.parse(inv.itemsJSON) : [],
+            items: itemsById.get(inv.id) || [],
             type: "Facture",
             createdAt: inv.createdAt.toISOString(),
             updatedAt: inv.updatedAt.toISOString(),
@@ -473,7 +482,7 @@ export async function fetchDeletedInvoices(societeId: string) {
     }
 }
 
-export async function fetchArchivedInvoices(societeId: string) {
+async function fetchArchivedInvoicesImpl(societeId: string) {
     try {
         const userRes = await getCurrentUser();
         if (!userRes.success || !userRes.data) return { success: false, error: "Non authentifié" };
@@ -485,10 +494,9 @@ export async function fetchArchivedInvoices(societeId: string) {
             // @ts-ignore
             where: { societeId, statut: 'Archivée', deletedAt: null },
             orderBy: { dateEmission: 'desc' },
-            include: {
-                client: { select: { id: true, nom: true } }
-            }
+            select: INVOICE_COLUMNS
         });
+        const itemsById = await resolveLineItems(invoices, loadLegacyInvoiceItems);
         // Mapping logic consistent with others
         const mapped = invoices.map((inv: any) => ({
             id: inv.id,
@@ -501,7 +509,7 @@ export async function fetchArchivedInvoices(societeId: string) {
             statut: inv.statut as any,
             totalHT: inv.totalHT,
             totalTTC: inv.totalTTC,
-            items: inv.itemsJSON ? JSON.parse(inv.itemsJSON) : [],
+            items: itemsById.get(inv.id) || [],
             type: "Facture",
             createdAt: inv.createdAt.toISOString(),
             updatedAt: inv.updatedAt.toISOString(),
@@ -514,7 +522,7 @@ export async function fetchArchivedInvoices(societeId: string) {
     }
 }
 
-export async function markInvoiceAsSent(id: string) {
+async function markInvoiceAsSentImpl(id: string) {
     try {
         const invoice = await prisma.facture.findUnique({ where: { id }, select: { societeId: true, statut: true, archivedAt: true } });
         if (!invoice) return { success: false, error: "Facture introuvable" };
@@ -543,45 +551,7 @@ export async function markInvoiceAsSent(id: string) {
     }
 }
 
-export async function updateOverdueInvoices() {
-    try {
-        // This is a background task, typically run by cron or a logged-in user triggering it.
-        // Needs careful handling. For now, assume if triggered by user, they need access to the invoices they update.
-        // But updateMany spans multiple societies? 
-        // WARNING: This function updates ALL overdue invoices.
-        // For safety, it should probably be scoped or run by system.
-        // If run by user, should only update THEIR societies.
-
-        const userRes = await getCurrentUser();
-        if (!userRes.success || !userRes.data) return { success: false, error: "Non authentifié" };
-
-        // Find societies where user is ADMIN/OWNER? Or check all?
-        // Simpler: Find societies where user has EDITOR+
-        const now = new Date();
-
-        const userSocieties = await prisma.membership.findMany({
-            where: { userId: userRes.data.id, role: { in: ['OWNER', 'ADMIN', 'EDITOR'] } },
-            select: { societeId: true }
-        });
-
-        const allowedIds = userSocieties.map(s => s.societeId);
-
-        const res = await prisma.facture.updateMany({
-            where: {
-                societeId: { in: allowedIds },
-                dateEcheance: { lt: now },
-                statut: { notIn: ["Payée", "Annulée", "Retard"] }
-            },
-            data: { statut: "Retard" }
-        });
-        revalidatePath("/", "layout");
-        return { success: true, count: res.count };
-    } catch (error: any) {
-        return { success: false, error: error.message };
-    }
-}
-
-export async function markInvoiceAsDownloaded(id: string) {
+async function markInvoiceAsDownloadedImpl(id: string) {
     try {
         // Downloading doesn't necessarily change state in a way that requires EDITOR, but it does update DB.
         // Let's require VIEWER at least to read it, but updating status might be implicit?
@@ -609,3 +579,17 @@ export async function markInvoiceAsDownloaded(id: string) {
         return { success: false, error: error.message };
     }
 }
+
+export const checkInvoiceMutability = traced('checkInvoiceMutability', checkInvoiceMutabilityImpl);
+export const fetchInvoicesLite = traced('fetchInvoicesLite', fetchInvoicesLiteImpl);
+export const listInvoices = traced('listInvoices', listInvoicesImpl);
+export const fetchInvoices = traced('fetchInvoices', fetchInvoicesImpl);
+export const fetchInvoiceDetails = traced('fetchInvoiceDetails', fetchInvoiceDetailsImpl);
+export const createInvoice = traced('createInvoice', createInvoiceImpl);
+export const updateInvoice = traced('updateInvoice', updateInvoiceImpl);
+export const toggleInvoiceLock = traced('toggleInvoiceLock', toggleInvoiceLockImpl);
+export const importInvoice = traced('importInvoice', importInvoiceImpl);
+export const fetchDeletedInvoices = traced('fetchDeletedInvoices', fetchDeletedInvoicesImpl);
+export const fetchArchivedInvoices = traced('fetchArchivedInvoices', fetchArchivedInvoicesImpl);
+export const markInvoiceAsSent = traced('markInvoiceAsSent', markInvoiceAsSentImpl);
+export const markInvoiceAsDownloaded = traced('markInvoiceAsDownloaded', markInvoiceAsDownloadedImpl);
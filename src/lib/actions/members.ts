@@ -4,14 +4,13 @@ import { prisma } from '@/lib/prisma';
 import { getCurrentUser } from './auth';
 import { MembershipRole } from '@prisma/client';
 import { randomUUID } from 'crypto';
+import { loadMembership, invalidateMembership, invalidateUser } from '@/lib/session-cache';
+import { traced } from '@/lib/tracing';
 
 // --- Security Helper ---
-export async function canAccessSociete(userId: string, societeId: string, minRole?: MembershipRole) {
-    const membership = await prisma.membership.findUnique({
-        where: {
-            userId_societeId: { userId, societeId }
-        }
-    });
+// Membership comes from the session cache (per request + short-lived LRU)
+async function canAccessSocieteImpl(userId: string, societeId: string, minRole?: MembershipRole) {
+    const membership = await loadMembership(userId, societeId);
 
     if (!membership || membership.status !== 'active') return false;
     if (!minRole) return true;
@@ -28,7 +27,7 @@ export async function canAccessSociete(userId: string, societeId: string, minRol
 
 // --- Actions ---
 
-export async function getMembers(societeId: string) {
+async function getMembersImpl(societeId: string) {
     const session = await getCurrentUser();
     if (!session.success || !session.data) return { success: false, error: "Non authentifié" };
 
@@ -62,7 +61,7 @@ export async function getMembers(societeId: string) {
     }
 }
 
-export async function inviteMember(data: { email: string, role: MembershipRole, societeId: string }) {
+async function inviteMemberImpl(data: { email: string, role: MembershipRole, societeId: string }) {
     const session = await getCurrentUser();
     if (!session.success || !session.data) return { success: false, error: "Non authentifié" };
 
@@ -193,7 +192,7 @@ export async function inviteMember(data: { email: string, role: MembershipRole,
     }
 }
 
-export async function updateMemberRole(data: { userId: string, role: MembershipRole, societeId: string }) {
+async function updateMemberRoleImpl(data: { userId: string, role: MembershipRole, societeId: string }) {
     const session = await getCurrentUser();
     if (!session.success || !session.data) return { success: false, error: "Non authentifié" };
 
@@ -213,6 +212,7 @@ export async function updateMemberRole(data: { userId: string, role: MembershipR
             },
             data: { role: data.role }
         });
+        invalidateMembership(data.userId, data.societeId);
 
         return { success: true };
     } catch (error: any) {
@@ -220,7 +220,7 @@ export async function updateMemberRole(data: { userId: string, role: MembershipR
     }
 }
 
-export async function removeMember(data: { userId: string, societeId: string }) {
+async function removeMemberImpl(data: { userId: string, societeId: string }) {
     const session = await getCurrentUser();
     if (!session.success || !session.data) return { success: false, error: "Non authentifié" };
 
@@ -234,6 +234,7 @@ export async function removeMember(data: { userId: string, societeId: string })
                 userId_societeId: { userId: data.userId, societeId: data.societeId }
             }
         });
+        invalidateMembership(data.userId, data.societeId);
 
         return { success: true };
     } catch (error: any) {
@@ -241,7 +242,7 @@ export async function removeMember(data: { userId: string, societeId: string })
     }
 }
 
-export async function getMyPendingInvitations() {
+async function getMyPendingInvitationsImpl() {
     const session = await getCurrentUser();
     if (!session.success || !session.data) return { success: false, error: "Non authentifié" };
 
@@ -267,7 +268,7 @@ export async function getMyPendingInvitations() {
     }
 }
 
-export async function acceptInvitation(token: string) {
+async function acceptInvitationImpl(token: string) {
     const session = await getCurrentUser();
     if (!session.success || !session.data) return { success: false, error: "Non authentifié" };
 
@@ -293,6 +294,7 @@ export async function acceptInvitation(token: string) {
                 status: 'active'
             }
         });
+        invalidateMembership(session.data.id, invitation.societeId);
 
         // Update invite status
         await prisma.invitation.update({
@@ -306,6 +308,7 @@ export async function acceptInvitation(token: string) {
                 where: { id: session.data.id },
                 data: { currentSocieteId: invitation.societeId }
             });
+            invalidateUser(session.data.id);
         }
 
         return { success: true, message: `Bienvenue chez ${invitation.societe.nom}` };
@@ -315,7 +318,7 @@ export async function acceptInvitation(token: string) {
 }
 
 
-export async function revokeInvitation(invitationId: string) {
+async function revokeInvitationImpl(invitationId: string) {
     const session = await getCurrentUser();
     if (!session.success || !session.data) return { success: false, error: "Non authentifié" };
 
@@ -332,3 +335,12 @@ export async function revokeInvitation(invitationId: string) {
         return { success: false, error: error.message };
     }
 }
+
+export const canAccessSociete = traced('canAccessSociete', canAccessSocieteImpl);
+export const getMembers = traced('getMembers', getMembersImpl);
+export const inviteMember = traced('inviteMember', inviteMemberImpl);
+export const updateMemberRole = traced('updateMemberRole', updateMemberRoleImpl);
+export const removeMember = traced('removeMember', removeMemberImpl);
+export const getMyPendingInvitations = traced('getMyPendingInvitations', getMyPendingInvitationsImpl);
+export const acceptInvitation = traced('acceptInvitation', acceptInvitationImpl);
+export const revokeInvitation = traced('revokeInvitation', revokeInvitationImpl);
@@ -6,9 +6,12 @@ import { v4 as uuidv4 } from 'uuid';
 import { getCurrentUser } from './auth';
 import { canAccessSociete } from './members';
 import { MembershipRole } from '@prisma/client';
+import { PRODUCT_LIST_INCLUDE, toListProduct } from '@/lib/list-rows';
+import { recordDeletions } from '@/lib/delta-sync';
+import { traced } from '@/lib/tracing';
 
 // Helper to Auto-Create Products (Used by Invoices and Quotes)
-export async function ensureProductsExist(items: any[], societeId: string, tx?: any) {
+async function ensureProductsExistImpl(items: any[], societeId: string, tx?: any) {
     if (!items || !Array.isArray(items)) return [];
 
     const db = tx || prisma; // Use transaction if provided, otherwise use global prisma
@@ -31,51 +34,43 @@ export async function ensureProductsExist(items: any[], societeId: string, tx?:
         }
     }
 
-    // 2. Batch check existing products
+    // 2. Resolve every name in two statements, however many lines: insert the
+    // missing ones (ON CONFLICT (societeId, nom) DO NOTHING), then read the ids
     if (productsToProcess.size > 0) {
         const names = Array.from(productsToProcess.keys());
-        const existingProducts = await db.produit.findMany({
+
+        const created = await db.produit.createMany({
+            data: names.map(name => {
+                const templateItem = productsToProcess.get(name)!;
+                return {
+                    societeId: societeId,
+                    nom: name,
+                    description: templateItem.description || "", // Use description as description too
+                    prixUnitaire: typeof templateItem.prixUnitaire === 'number' ? templateItem.prixUnitaire : parseFloat(templateItem.prixUnitaire) || 0,
+                    tva: typeof templateItem.tva === 'number' ? templateItem.tva : parseFloat(templateItem.tva) || 20
+                };
+            }),
+            skipDuplicates: true
+        });
+        if (created.count > 0) console.log(`[AUTO-CREATE] Created ${created.count} new product(s)`);
+
+        const products: { id: string, nom: string }[] = await db.produit.findMany({
             where: {
                 societeId: societeId,
                 nom: { in: names }
-            }
+            },
+            select: { id: true, nom: true }
         });
-
-        // 3. Create missing products
-        for (const name of names) {
-            const existing = existingProducts.find((p: any) => p.nom === name);
-            let finalProductId = existing?.id;
-
-            if (!existing) {
-                // CREATE NEW
-                try {
-                    const templateItem = productsToProcess.get(name)!;
-                    console.log(`[AUTO-CREATE] Creating new product: "${name}"`);
-                    const newProduct = await db.produit.create({
-                        data: {
-                            societeId: societeId,
-                            nom: name,
-                            description: templateItem.description || "", // Use description as description too
-                            prixUnitaire: typeof templateItem.prixUnitaire === 'number' ? templateItem.prixUnitaire : parseFloat(templateItem.prixUnitaire) || 0,
-                            tva: typeof templateItem.tva === 'number' ? templateItem.tva : parseFloat(templateItem.tva) || 20
-                        }
-                    });
-                    finalProductId = newProduct.id;
-                } catch (err) {
-                    console.error(`[AUTO-CREATE] Failed to create product "${name}"`, err);
-                }
-            }
-
-            // 4. Update items with the resolved Product ID
-            if (finalProductId) {
-                for (const item of processedItems) {
-                    const itemName = item.nom || item.description;
-                    if (itemName && itemName.trim() === name && !item.produitId) {
-                        item.produitId = finalProductId;
-                        // Also ensure 'nom' is set for consistency if it was missing
-                        if (!item.nom) item.nom = name;
-                    }
-                }
+        const productIds = new Map(products.map(p => [p.nom, p.id]));
+
+        // 3. Update items with the resolved Product ID
+        for (const item of processedItems) {
+            const itemName = (item.nom || item.description)?.trim();
+            const productId = itemName && !item.produitId ? productIds.get(itemName) : undefined;
+            if (productId) {
+                item.produitId = productId;
+                // Also ensure 'nom' is set for consistency if it was missing
+                if (!item.nom) item.nom = itemName;
             }
         }
     }
@@ -105,7 +100,7 @@ export async function ensureProductsExist(items: any[], societeId: string, tx?:
     });
 }
 
-export async function fetchProducts(societeId: string): Promise<{ success: boolean, data?: Produit[], error?: string }> {
+async function fetchProductsImpl(societeId: string): Promise<{ success: boolean, data?: Produit[], error?: string }> {
     try {
         const userRes = await getCurrentUser();
         if (!userRes.success || !userRes.data) return { success: false, error: "Non authentifié" };
@@ -115,35 +110,17 @@ export async function fetchProducts(societeId: string): Promise<{ success: boole
 
         const products = await prisma.produit.findMany({
             where: { societeId },
-            include: {
-                factureItems: {
-                    where: {
-                        facture: {
-                            deletedAt: null,
-                            statut: { in: ['Payée', 'Envoyée', 'Téléchargée', 'Retard', 'Archivée'] }
-                        }
-                    },
-                    select: { quantite: true }
-                }
-            }
+            include: PRODUCT_LIST_INCLUDE
         });
 
-        const mapped: Produit[] = products.map((p: any) => ({
-            id: p.id,
-            societeId: p.societeId,
-            nom: p.nom,
-            description: p.description || "",
-            prixUnitaire: p.prixUnitaire,
-            tva: p.tva,
-            soldCount: p.factureItems.reduce((sum: number, item: any) => sum + (item.quantite || 0), 0)
-        }));
+        const mapped: Produit[] = products.map(toListProduct);
         return { success: true, data: mapped };
     } catch (error: any) {
         return { success: false, error: error.message };
     }
 }
 
-export async function createProduct(product: Produit) {
+async function createProductImpl(product: Produit) {
     try {
         const userRes = await getCurrentUser();
         if (!userRes.success || !userRes.data) return { success: false, error: "Non authentifié" };
@@ -165,11 +142,12 @@ export async function createProduct(product: Produit) {
         });
         return { success: true, id: res.id };
     } catch (error: any) {
+        if (error.code === 'P2002') return { success: false, error: "Un produit portant ce nom existe déjà" };
         return { success: false, error: error.message };
     }
 }
 
-export async function updateProduct(product: Produit) {
+async function updateProductImpl(product: Produit) {
     if (!product.id) return { success: false, error: "ID manquant" };
     try {
         const userRes = await getCurrentUser();
@@ -192,11 +170,12 @@ export async function updateProduct(product: Produit) {
         });
         return { success: true };
     } catch (error: any) {
+        if (error.code === 'P2002') return { success: false, error: "Un produit portant ce nom existe déjà" };
         return { success: false, error: error.message };
     }
 }
 
-export async function deleteProduct(id: string) {
+async function deleteProductImpl(id: string) {
     if (!id) return { success: false, error: "ID manquant" };
     try {
         const userRes = await getCurrentUser();
@@ -209,8 +188,15 @@ export async function deleteProduct(id: string) {
         if (!authorized) return { success: false, error: "Accès refusé" };
 
         await prisma.produit.delete({ where: { id } });
+        await recordDeletions(existing.societeId, 'products', [id]);
         return { success: true };
     } catch (error: any) {
         return { success: false, error: error.message };
     }
 }
+
+export const ensureProductsExist = traced('ensureProductsExist', ensureProductsExistImpl);
+export const fetchProducts = traced('fetchProducts', fetchProductsImpl);
+export const createProduct = traced('createProduct', createProductImpl);
+export const updateProduct = traced('updateProduct', updateProductImpl);
+export const deleteProduct = traced('deleteProduct', deleteProductImpl);
@@ -8,42 +8,81 @@ import { getCurrentUser } from './auth';
 import { handleActionError } from './shared';
 import { canAccessSociete } from './members';
 import { MembershipRole } from '@prisma/client';
-import { generateNextQuoteNumber } from '../invoice-utils';
-
-// Helper: Ensure unique quote number
-async function ensureUniqueQuoteNumber(numero: string, societeId: string, excludeId?: string): Promise<string> {
-    let attempts = 0;
-    let currentNumero = numero;
-
-    while (attempts < 10) {
-        const existing = await prisma.devis.findFirst({
-            where: {
-                numero: currentNumero,
-                societeId,
-                id: excludeId ? { not: excludeId } : undefined
-            }
-        });
-
-        if (!existing) {
-            return currentNumero; // Unique!
-        }
+import { allocateDocumentNumber } from '../document-numbers';
+import { LINE_ITEMS_RELATION, decodeJSON, fromItemRow, hasBackfilledItems, resolveLineItems, toItemRows } from '../line-items';
+import {
+    DOCUMENT_PAGE_ORDER, ListingFilters, ListingPage,
+    documentCursor, documentFilterWhere, documentKeysetWhere, pageSize, toPage
+} from '../keyset';
+import { traced } from '@/lib/tracing';
+
+// Columns shown by the quote lists and editor; items come from DevisItem
+const QUOTE_COLUMNS = {
+    id: true,
+    numero: true,
+    clientId: true,
+    societeId: true,
+    dateEmission: true,
+    dateValidite: true,
+    statut: true,
+    totalHT: true,
+    totalTTC: true,
+    createdAt: true,
+    updatedAt: true,
+    isLocked: true,
+    deletedAt: true,
+    client: {
+        select: { id: true, nom: true }
+    },
+    items: LINE_ITEMS_RELATION
+} as const;
+
+// Quotes not backfilled yet (no DevisItem rows): read their itemsJSON only
+function loadLegacyQuoteItems(ids: string[]) {
+    return prisma.devis.findMany({
+        where: { id: { in: ids } },
+        select: { id: true, itemsJSON: true }
+    });
+}
 
-        // Number exists, generate next one
-        const allQuotes = await prisma.devis.findMany({
-            where: { societeId },
-            select: { numero: true }
-        });
+// Fetch Actions
 
-        currentNumero = generateNextQuoteNumber(allQuotes as any);
-        attempts++;
+// Columns of the lightweight lists (no lines, no emails)
+const QUOTE_LITE_COLUMNS = {
+    id: true,
+    numero: true,
+    clientId: true,
+    societeId: true,
+    dateEmission: true,
+    dateValidite: true,
+    statut: true,
+    totalHT: true,
+    totalTTC: true,
+    createdAt: true,
+    updatedAt: true,
+    client: {
+        select: { nom: true } // Only fetch client name for list display
     }
-
-    throw new Error('Unable to generate unique quote number after 10 attempts');
+} as const;
+
+function toLiteQuote(q: any) {
+    return {
+        id: q.id,
+        numero: q.numero,
+        clientId: q.clientId,
+        societeId: q.societeId,
+        dateEmission: q.dateEmission.toISOString(),
+        dateValidite: q.dateValidite ? q.dateValidite.toISOString() : "",
+        statut: q.statut as any,
+        totalHT: q.totalHT,
+        totalTTC: q.totalTTC,
+        type: "Devis" as const,
+        items: [], // Empty for lite version
+        emails: [],
+    };
 }
 
-// Fetch Actions
-
-export async function fetchQuotesLite(societeId: string): Promise<{ success: boolean, data?: Partial<Devis>[], error?: string }> {
+async function fetchQuotesLiteImpl(societeId: string): Promise<{ success: boolean, data?: Partial<Devis>[], error?: string }> {
     try {
         const userRes = await getCurrentUser();
         if (!userRes.success || !userRes.data) return { success: false, error: "Non authentifié" };
@@ -54,49 +93,57 @@ export async function fetchQuotesLite(societeId: string): Promise<{ success: boo
         const quotes = await prisma.devis.findMany({
             // @ts-ignore
             where: { societeId, deletedAt: null, statut: { not: 'Archivé' } },
-            select: {
-                id: true,
-                numero: true,
-                clientId: true,
-                societeId: true,
-                dateEmission: true,
-                dateValidite: true,
-                statut: true,
-                totalHT: true,
-                totalTTC: true,
-                createdAt: true,
-                updatedAt: true,
-                client: {
-                    select: { nom: true } // Only fetch client name for list display
-                }
-            },
+            select: QUOTE_LITE_COLUMNS,
             orderBy: [
                 { dateEmission: 'desc' },
                 { numero: 'desc' }
             ]
         });
 
-        const mapped = quotes.map((q: any) => ({
-            id: q.id,
-            numero: q.numero,
-            clientId: q.clientId,
-            societeId: q.societeId,
-            dateEmission: q.dateEmission.toISOString(),
-            dateValidite: q.dateValidite ? q.dateValidite.toISOString() : "",
-            statut: q.statut as any,
-            totalHT: q.totalHT,
-            totalTTC: q.totalTTC,
-            type: "Devis" as const,
-            items: [], // Empty for lite version
-            emails: [],
-        }));
+        const mapped = quotes.map(toLiteQuote);
         return { success: true, data: mapped };
     } catch (error: any) {
         return { success: false, error: error.message };
     }
 }
 
-export async function fetchQuotes(societeId: string): Promise<{ success: boolean, data?: Devis[], error?: string }> {
+/**
+ * One page of quotes, newest first, filtered and searched server-side.
+ * Pass the returned nextCursor to get the following page (null: last page).
+ */
+async function listQuotesImpl(
+    societeId: string,
+    options: { filters?: ListingFilters, cursor?: string | null, limit?: number } = {}
+): Promise<{ success: boolean, data?: ListingPage<Partial<Devis>>, error?: string }> {
+    try {
+        const userRes = await getCurrentUser();
+        if (!userRes.success || !userRes.data) return { success: false, error: "Non authentifié" };
+
+        const authorized = await canAccessSociete(userRes.data.id, societeId, MembershipRole.VIEWER);
+        if (!authorized) return { success: false, error: "Accès refusé" };
+
+        const size = pageSize(options.limit);
+        const rows = await prisma.devis.findMany({
+            where: {
+                societeId,
+                deletedAt: null,
+                AND: [
+                    ...documentFilterWhere(options.filters || {}, 'Archivé'),
+                    documentKeysetWhere(options.cursor)
+                ]
+            },
+            select: QUOTE_LITE_COLUMNS,
+            orderBy: DOCUMENT_PAGE_ORDER,
+            take: size + 1
+        });
+
+        return { success: true, data: toPage(rows, size, documentCursor, toLiteQuote) };
+    } catch (error: any) {
+        return { success: false, error: error.message };
+    }
+}
+
+async function fetchQuotesImpl(societeId: string): Promise<{ success: boolean, data?: Devis[], error?: string }> {
     return fetchQuotesLegacy(societeId);
 }
 
@@ -111,10 +158,10 @@ async function fetchQuotesLegacy(societeId: string): Promise<{ success: boolean,
         const quotes = await prisma.devis.findMany({
             // @ts-ignore
             where: { societeId, deletedAt: null, statut: { not: 'Archivé' } },
-            include: {
-                client: {
-                    select: { id: true, nom: true }
-                }
+            select: {
+                ...QUOTE_COLUMNS,
+                emailsJSON: true,
+                config: true
             },
             orderBy: [
                 { dateEmission: 'desc' },
@@ -123,22 +170,9 @@ async function fetchQuotesLegacy(societeId: string): Promise<{ success: boolean,
             take: 100
         });
 
-        const mapped: Devis[] = quotes.map((q: any) => {
-            let items = [];
-            let emails = [];
-            try {
-                if (q.itemsJSON) {
-                    const parsed = JSON.parse(q.itemsJSON);
-                    items = typeof parsed === 'string' ? JSON.parse(parsed) : parsed;
-                }
-                if (q.emailsJSON) {
-                    const parsed = JSON.parse(q.emailsJSON);
-                    emails = typeof parsed === 'string' ? JSON.parse(parsed) : parsed;
-                }
-            } catch (e) {
-                console.error("Error parsing JSON fields", e);
-            }
+        const itemsById = await resolveLineItems(quotes, loadLegacyQuoteItems);
 
+        const mapped: Devis[] = quotes.map((q: any) => {
             return {
                 id: q.id,
                 numero: q.numero,
@@ -149,19 +183,13 @@ async function fetchQuotesLegacy(societeId: string): Promise<{ success: boolean,
                 statut: q.statut as any,
                 totalHT: q.totalHT,
                 totalTTC: q.totalTTC,
-                items: items,
-                emails: emails,
+                items: itemsById.get(q.id) || [],
+                emails: decodeJSON(q.emailsJSON, []),
                 type: "Devis",
                 createdAt: q.createdAt ? q.createdAt.toISOString() : undefined,
                 updatedAt: q.updatedAt ? q.updatedAt.toISOString() : undefined,
                 isLocked: q.isLocked,
-                config: (() => {
-                    if (!q.config) return {};
-                    try {
-                        const parsed = JSON.parse(q.config);
-                        return typeof parsed === 'string' ? JSON.parse(parsed) : parsed;
-                    } catch { return {}; }
-                })()
+                config: decodeJSON(q.config, {})
             };
         });
         return { success: true, data: mapped };
@@ -170,15 +198,14 @@ async function fetchQuotesLegacy(societeId: string): Promise<{ success: boolean,
     }
 }
 
-export async function fetchQuoteDetails(id: string): Promise<{ success: boolean, data?: Devis, error?: string }> {
+async function fetchQuoteDetailsImpl(id: string): Promise<{ success: boolean, data?: Devis, error?: string }> {
     try {
         const q = await prisma.devis.findUnique({
             where: { id },
-            // @ts-ignore
-            include: {
-                client: {
-                    select: { id: true, nom: true }
-                }
+            select: {
+                ...QUOTE_COLUMNS,
+                emailsJSON: true,
+                config: true
             }
         });
 
@@ -190,22 +217,7 @@ export async function fetchQuoteDetails(id: string): Promise<{ success: boolean,
         const authorized = await canAccessSociete(userRes.data.id, q.societeId, MembershipRole.VIEWER);
         if (!authorized) return { success: false, error: "Accès refusé" };
 
-        let items = [];
-        let emails = [];
-        try {
-            // @ts-ignore
-            if (q.itemsJSON) {
-                const parsed = JSON.parse(q.itemsJSON);
-                items = typeof parsed === 'string' ? JSON.parse(parsed) : parsed;
-            }
-            // @ts-ignore
-            if (q.emailsJSON) {
-                const parsed = JSON.parse(q.emailsJSON);
-                emails = typeof parsed === 'string' ? JSON.parse(parsed) : parsed;
-            }
-        } catch (e) {
-            console.error("Error parsing JSON fields", e);
-        }
+        const itemsById = await resolveLineItems([q], loadLegacyQuoteItems);
 
         const mapped: Devis = {
             id: q.id,
@@ -217,20 +229,13 @@ export async function fetchQuoteDetails(id: string): Promise<{ success: boolean,
             statut: q.statut as any,
             totalHT: q.totalHT,
             totalTTC: q.totalTTC,
-            items: items,
-            emails: emails,
+            items: itemsById.get(q.id) || [],
+            emails: decodeJSON(q.emailsJSON, []),
             type: "Devis",
             createdAt: q.createdAt.toISOString(),
             updatedAt: q.updatedAt.toISOString(),
             isLocked: q.isLocked,
-            // @ts-ignore
-            config: (() => {
-                if (!q.config) return {};
-                try {
-                    const parsed = JSON.parse(q.config);
-                    return typeof parsed === 'string' ? JSON.parse(parsed) : parsed;
-                } catch { return {}; }
-            })()
+            config: decodeJSON(q.config, {})
         };
         return { success: true, data: mapped };
     } catch (error: any) {
@@ -238,7 +243,7 @@ export async function fetchQuoteDetails(id: string): Promise<{ success: boolean,
     }
 }
 
-export async function createQuote(quote: Devis) {
+async function createQuoteImpl(quote: Devis) {
     try {
         const userRes = await getCurrentUser();
         if (!userRes.success || !userRes.data) return { success: false, error: "Non authentifié" };
@@ -252,49 +257,41 @@ export async function createQuote(quote: Devis) {
 
         if (!quote.clientId) throw new Error("Client requis");
 
-        // Ensure unique numero
-        const uniqueNumero = await ensureUniqueQuoteNumber(quote.numero, targetSocieteId);
-
-        const processedItems = await ensureProductsExist(quote.items || [], targetSocieteId);
-        const itemsJson = JSON.stringify(processedItems);
-
-        const res = await prisma.devis.create({
-            data: {
-                numero: uniqueNumero,
-                dateEmission: new Date(quote.dateEmission),
-                statut: quote.statut,
-                totalHT: quote.totalHT,
-                totalTTC: quote.totalTTC,
-                dateValidite: quote.dateValidite ? new Date(quote.dateValidite) : null,
-                itemsJSON: itemsJson,
-                emailsJSON: JSON.stringify(quote.emails || []),
-                societeId: targetSocieteId,
-                clientId: quote.clientId,
-                isLocked: quote.isLocked || false,
-                config: JSON.stringify(quote.config || {}),
-                // @ts-ignore
-                items: {
-                    create: processedItems.map((item: any) => ({
-                        produitId: item.produitId || undefined,
-                        description: item.nom || item.description || "Article",
-                        quantite: Number(item.quantite) || 0,
-                        prixUnitaire: Number(item.prixUnitaire) || 0,
-                        tva: Number(item.tva) || 0,
-                        remise: Number(item.remise) || 0,
-                        remiseType: item.remiseType || 'pourcentage',
-                        montantHT: Number(item.montantHT) || 0
-                    }))
+        const res = await prisma.$transaction(async (tx) => {
+            // Numero from the société counter (atomic, see lib/document-numbers)
+            const uniqueNumero = await allocateDocumentNumber(tx, targetSocieteId, 'devis', quote.numero);
+
+            const processedItems = await ensureProductsExist(quote.items || [], targetSocieteId, tx);
+            const itemsJson = JSON.stringify(processedItems);
+
+            return tx.devis.create({
+                data: {
+                    numero: uniqueNumero,
+                    dateEmission: new Date(quote.dateEmission),
+                    statut: quote.statut,
+                    totalHT: quote.totalHT,
+                    totalTTC: quote.totalTTC,
+                    dateValidite: quote.dateValidite ? new Date(quote.dateValidite) : null,
+                    itemsJSON: itemsJson,
+                    emailsJSON: JSON.stringify(quote.emails || []),
+                    societeId: targetSocieteId,
+                    clientId: quote.clientId,
+                    isLocked: quote.isLocked || false,
+                    config: JSON.stringify(quote.config || {}),
+                    items: {
+                        create: toItemRows(processedItems)
+                    }
                 }
-            }
+            });
         });
         revalidatePath('/devis', 'page');
-        return { success: true, id: res.id };
+        return { success: true, id: res.id, numero: res.numero };
     } catch (error: any) {
         return handleActionError(error);
     }
 }
 
-export async function updateQuote(quote: Devis) {
+async function updateQuoteImpl(quote: Devis) {
     if (!quote.id) return { success: false, error: "ID manquant" };
     try {
         let societeId = quote.societeId;
@@ -329,16 +326,7 @@ export async function updateQuote(quote: Devis) {
                 // @ts-ignore
                 items: {
                     deleteMany: {},
-                    create: processedItems.map((item: any) => ({
-                        produitId: item.produitId || undefined,
-                        description: item.nom || item.description || "Article",
-                        quantite: Number(item.quantite) || 0,
-                        prixUnitaire: Number(item.prixUnitaire) || 0,
-                        tva: Number(item.tva) || 0,
-                        remise: Number(item.remise) || 0,
-                        remiseType: item.remiseType || 'pourcentage',
-                        montantHT: Number(item.montantHT) || 0
-                    }))
+                    create: toItemRows(processedItems)
                 }
             }
         });
@@ -350,7 +338,7 @@ export async function updateQuote(quote: Devis) {
     }
 }
 
-export async function toggleQuoteLock(quoteId: string, isLocked: boolean) {
+async function toggleQuoteLockImpl(quoteId: string, isLocked: boolean) {
     if (!quoteId) return { success: false, error: "ID manquant" };
     try {
         const quote = await prisma.devis.findUnique({ where: { id: quoteId }, select: { societeId: true } });
@@ -375,10 +363,13 @@ export async function toggleQuoteLock(quoteId: string, isLocked: boolean) {
     }
 }
 
-export async function convertQuoteToInvoice(quoteId: string) {
+async function convertQuoteToInvoiceImpl(quoteId: string) {
     try {
         // 1. Fetch Quote
-        const quote = await prisma.devis.findUnique({ where: { id: quoteId } });
+        const quote = await prisma.devis.findUnique({
+            where: { id: quoteId },
+            include: { items: LINE_ITEMS_RELATION }
+        });
         if (!quote) return { success: false, error: "Devis introuvable" };
 
         const userRes = await getCurrentUser();
@@ -388,49 +379,43 @@ export async function convertQuoteToInvoice(quoteId: string) {
         const authorized = await canAccessSociete(userRes.data.id, quote.societeId, MembershipRole.EDITOR);
         if (!authorized) return { success: false, error: "Droit insuffisant" };
 
-        // 2. Fetch all invoices to determine next number correctly
-        // We need all numbers to find the Max.
-        const invoices = await prisma.facture.findMany({
-            where: { societeId: quote.societeId },
-            select: { numero: true }
-        });
-
-        const currentYearPrefix = new Date().getFullYear().toString().substring(2);
-        let nextNumber = `${currentYearPrefix}010001`;
-
-        const numericInvoices = invoices
-            .map((inv: { numero: string }) => inv.numero)
-            .filter((num: string) => /^\d{8}$/.test(num))
-            .map((num: string) => parseInt(num, 10))
-            .filter((num: number) => !isNaN(num));
-
-        if (numericInvoices.length > 0) {
-            const maxNumber = Math.max(...numericInvoices);
-            nextNumber = (maxNumber + 1).toString();
-        }
-
         const itemsJson = quote.itemsJSON || "[]";
+        // Lines of a quote not backfilled yet come from its itemsJSON, without
+        // product links (the products may have been deleted since)
+        const quoteItems = hasBackfilledItems(quote.items)
+            ? quote.items.map(fromItemRow)
+            : decodeJSON<any[]>(itemsJson, []).map((item: any) => ({ ...item, produitId: undefined }));
+
+        const res = await prisma.$transaction(async (tx) => {
+            // 2. Next invoice number from the société counter
+            const nextNumber = await allocateDocumentNumber(tx, quote.societeId, 'facture');
+
+            // 3. Create Invoice
+            const invoice = await tx.facture.create({
+                data: {
+                    numero: nextNumber,
+                    societeId: quote.societeId,
+                    clientId: quote.clientId,
+                    dateEmission: new Date(),
+                    dateEcheance: new Date(Date.now() + 30 * 24 * 60 * 60 * 1000),
+                    statut: "Brouillon",
+                    itemsJSON: itemsJson,
+                    totalHT: quote.totalHT,
+                    totalTTC: quote.totalTTC,
+                    config: quote.config || JSON.stringify({}),
+                    items: {
+                        create: toItemRows(quoteItems)
+                    }
+                }
+            });
 
-        // 3. Create Invoice
-        const res = await prisma.facture.create({
-            data: {
-                numero: nextNumber,
-                societeId: quote.societeId,
-                clientId: quote.clientId,
-                dateEmission: new Date(),
-                dateEcheance: new Date(Date.now() + 30 * 24 * 60 * 60 * 1000),
-                statut: "Brouillon",
-                itemsJSON: itemsJson,
-                totalHT: quote.totalHT,
-                totalTTC: quote.totalTTC,
-                config: quote.config || JSON.stringify({}),
-            }
-        });
+            // 4. Update Quote Status
+            await tx.devis.update({
+                where: { id: quoteId },
+                data: { statut: "Facturé" }
+            });
 
-        // 4. Update Quote Status
-        await prisma.devis.update({
-            where: { id: quoteId },
-            data: { statut: "Facturé" }
+            return invoice;
         });
 
         revalidatePath("/", "layout");
@@ -441,11 +426,11 @@ export async function convertQuoteToInvoice(quoteId: string) {
     }
 }
 
-export async function importQuote(quote: Devis, clientName: string) {
+async function importQuoteImpl(quote: Devis, clientName: string) {
     return createQuote(quote);
 }
 
-export async function updateQuoteStatus(id: string, statut: string) {
+async function updateQuoteStatusImpl(id: string, statut: string) {
     try {
         const quote = await prisma.devis.findUnique({ where: { id }, select: { societeId: true } });
         if (!quote) return { success: false, error: "Devis introuvable" };
@@ -469,7 +454,7 @@ export async function updateQuoteStatus(id: string, statut: string) {
     }
 }
 
-export async function fetchDeletedQuotes(societeId: string) {
+async function fetchDeletedQuotesImpl(societeId: string) {
     try {
         const userRes = await getCurrentUser();
         if (!userRes.success || !userRes.data) return { success: false, error: "Non authentifié" };
@@ -482,12 +467,9 @@ export async function fetchDeletedQuotes(societeId: string) {
             where: { societeId, deletedAt: { not: null } },
             // @ts-ignore
             orderBy: { deletedAt: 'desc' },
-            include: {
-                client: {
-                    select: { id: true, nom: true }
-                }
-            }
+            select: QUOTE_COLUMNS
         });
+        const itemsById = await resolveLineItems(quotes, loadLegacyQuoteItems);
         const mapped = quotes.map((q: any) => ({
             id: q.id,
             numero: q.numero,
@@ -499,7 +481,7 @@ export async function fetchDeletedQuotes(societeId: string) {
             statut: q.statut as any,
             totalHT: q.totalHT,
             totalTTC: q.totalTTC,
-            items: q.itemsJSON ? JSON.parse(q.itemsJSON) : [],
+            items: itemsById.get(q.id) || [],
             type: "Devis",
             createdAt: q.createdAt.toISOString(),
             updatedAt: q.updatedAt.toISOString(),
@@ -511,7 +493,7 @@ export async function fetchDeletedQuotes(societeId: string) {
     }
 }
 
-export async function fetchArchivedQuotes(societeId: string) {
+async function fetchArchivedQuotesImpl(societeId: string) {
     try {
         const userRes = await getCurrentUser();
         if (!userRes.success || !userRes.data) return { success: false, error: "Non authentifié" };
@@ -523,12 +505,9 @@ export async function fetchArchivedQuotes(societeId: string) {
             // @ts-ignore
             where: { societeId, statut: 'Archivé', deletedAt: null },
             orderBy: { dateEmission: 'desc' },
-            include: {
-                client: {
-                    select: { id: true, nom: true }
-                }
-            }
+            select: QUOTE_COLUMNS
         });
+        const itemsById = await resolveLineItems(quotes, loadLegacyQuoteItems);
         const mapped = quotes.map((q: any) => ({
             id: q.id,
             numero: q.numero,
@@ -540,7 +519,7 @@ export async function fetchArchivedQuotes(societeId: string) {
             statut: q.statut as any,
             totalHT: q.totalHT,
             totalTTC: q.totalTTC,
-            items: q.itemsJSON ? JSON.parse(q.itemsJSON) : [],
+            items: itemsById.get(q.id) || [],
             type: "Devis",
             createdAt: q.createdAt.toISOString(),
             updatedAt: q.updatedAt.toISOString(),
@@ -551,3 +530,16 @@ export async function fetchArchivedQuotes(societeId: string) {
         return { success: false, error: error.message };
     }
 }
+
+export const fetchQuotesLite = traced('fetchQuotesLite', fetchQuotesLiteImpl);
+export const listQuotes = traced('listQuotes', listQuotesImpl);
+export const fetchQuotes = traced('fetchQuotes', fetchQuotesImpl);
+export const fetchQuoteDetails = traced('fetchQuoteDetails', fetchQuoteDetailsImpl);
+export const createQuote = traced('createQuote', createQuoteImpl);
+export const updateQuote = traced('updateQuote', updateQuoteImpl);
+export const toggleQuoteLock = traced('toggleQuoteLock', toggleQuoteLockImpl);
+export const convertQuoteToInvoice = traced('convertQuoteToInvoice', convertQuoteToInvoiceImpl);
+export const importQuote = traced('importQuote', importQuoteImpl);
+export const updateQuoteStatus = traced('updateQuoteStatus', updateQuoteStatusImpl);
+export const fetchDeletedQuotes = traced('fetchDeletedQuotes', fetchDeletedQuotesImpl);
+export const fetchArchivedQuotes = traced('fetchArchivedQuotes', fetchArchivedQuotesImpl);
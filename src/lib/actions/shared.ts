@@ -13,7 +13,14 @@ export function handleActionError(error: any): ActionState {
 
     // Prisma Unique Constraint Error
     if (error.code === 'P2002') {
-        const field = error.meta?.target?.[0] || 'Unknown';
+        const target: string[] = error.meta?.target || [];
+        if (target.includes('numero')) {
+            return {
+                success: false,
+                error: "Ce numéro de document existe déjà."
+            };
+        }
+        const field = target[0] || 'Unknown';
         return {
             success: false,
             error: `La valeur pour ${field} existe déjà.`
@@ -3,9 +3,17 @@
 import { prisma } from '@/lib/prisma';
 import { getCurrentUser } from './auth';
 import { canAccessSociete } from './members';
-import { MembershipRole } from '@prisma/client';
+import { MembershipRole, Prisma } from '@prisma/client';
+import { invalidateUser, invalidateSocieteCatalog, invalidateSocieteCatalogs, loadSocieteCatalog, SocieteCatalogEntry } from '@/lib/session-cache';
+import { invalidateTransporters } from '@/lib/email';
+import { traced } from '@/lib/tracing';
 
-export async function checkDatabaseConnection() {
+// Columns a settings form may write: the client object also carries relations
+// and catalog fields (role) that are not Societe columns
+const READONLY_SOCIETE_COLUMNS = new Set<string>(['id', 'createdAt', 'updatedAt']);
+const EDITABLE_SOCIETE_COLUMNS = Object.values(Prisma.SocieteScalarFieldEnum).filter(column => !READONLY_SOCIETE_COLUMNS.has(column));
+
+async function checkDatabaseConnectionImpl() {
     console.log("Checking Database connection...");
     try {
         await prisma.$queryRaw`SELECT 1`;
@@ -16,37 +24,23 @@ export async function checkDatabaseConnection() {
     }
 }
 
-export async function fetchSocietes(): Promise<{ success: boolean, data?: any[], error?: string }> {
+/**
+ * Catalog of the user's sociétés: the fields of the app shell only (id, nom,
+ * logoUrl, isTemplate, role); full settings come from getSociete
+ */
+async function fetchSocietesImpl(): Promise<{ success: boolean, data?: SocieteCatalogEntry[], error?: string }> {
     try {
         const userRes = await getCurrentUser();
         if (!userRes.success || !userRes.data) return { success: false, error: "Non authentifié" };
 
-        const societes = await prisma.societe.findMany({
-            where: {
-                memberships: {
-                    some: {
-                        userId: userRes.data.id,
-                        status: 'active'
-                    }
-                }
-            },
-            orderBy: { createdAt: 'desc' },
-            include: {
-                memberships: {
-                    where: { userId: userRes.data.id },
-                    select: { role: true }
-                }
-            }
-        });
-
-        // Flatten logic if needed, but returning as is provides Role info
+        const societes = await loadSocieteCatalog(userRes.data.id);
         return { success: true, data: societes };
     } catch (error: any) {
         return { success: false, error: error.message };
     }
 }
 
-export async function getSociete(id: string) {
+async function getSocieteImpl(id: string) {
     try {
         const userRes = await getCurrentUser();
         if (!userRes.success || !userRes.data) return { success: false, error: "Non authentifié" };
@@ -57,13 +51,15 @@ export async function getSociete(id: string) {
         const societe = await prisma.societe.findUnique({ where: { id } });
         if (!societe) return { success: false, error: "Société introuvable" };
 
-        return { success: true, data: societe };
+        // Credentials stay on the server (EmailSettings never displays them)
+        const { smtpPass, googleRefreshToken, ...settings } = societe;
+        return { success: true, data: settings };
     } catch (error: any) {
         return { success: false, error: error.message };
     }
 }
 
-export async function createSociete(nom: string, details?: any) {
+async function createSocieteImpl(nom: string, details?: any) {
     try {
         const userRes = await getCurrentUser();
         if (!userRes.success || !userRes.data) return { success: false, error: "Utilisateur non authentifié" };
@@ -109,6 +105,8 @@ export async function createSociete(nom: string, details?: any) {
             where: { id: userId },
             data: { currentSocieteId: societe.id }
         });
+        invalidateUser(userId);
+        invalidateSocieteCatalog(userId);
 
         return { success: true, data: societe };
     } catch (error: any) {
@@ -116,7 +114,7 @@ export async function createSociete(nom: string, details?: any) {
     }
 }
 
-export async function updateSociete(societe: any) {
+async function updateSocieteImpl(societe: any) {
     if (!societe.id) return { success: false, error: "ID manquant" };
 
     const userRes = await getCurrentUser();
@@ -127,14 +125,23 @@ export async function updateSociete(societe: any) {
     if (!authorized) return { success: false, error: "Droit insuffisant" };
 
     try {
-        const { id, memberships, ...data } = societe; // Exclude memberships from update payload
+        const id = societe.id;
+        const data = Object.fromEntries(EDITABLE_SOCIETE_COLUMNS.filter(column => column in societe).map(column => [column, societe[column]]));
 
         await prisma.societe.update({
             where: { id },
-            data: data
+            data
         });
+        invalidateTransporters(id); // SMTP settings may be part of the payload
+        invalidateSocieteCatalogs(id); // nom / logoUrl shown by every member's shell
         return { success: true };
     } catch (error: any) {
         return { success: false, error: error.message };
     }
 }
+
+export const checkDatabaseConnection = traced('checkDatabaseConnection', checkDatabaseConnectionImpl);
+export const fetchSocietes = traced('fetchSocietes', fetchSocietesImpl);
+export const getSociete = traced('getSociete', getSocieteImpl);
+export const createSociete = traced('createSociete', createSocieteImpl);
+export const updateSociete = traced('updateSociete', updateSocieteImpl);
@@ -0,0 +1,29 @@
+"use server";
+
+import { MembershipRole } from '@prisma/client';
+import { getCurrentUser } from './auth';
+import { canAccessSociete } from './members';
+import { loadChanges, SyncDelta } from '@/lib/delta-sync';
+import { traced } from '@/lib/tracing';
+
+/**
+ * Clients, products, invoices and quotes changed since `since` (cursor of the
+ * previous call). since = null returns a fresh cursor with reset = true.
+ */
+async function fetchChangesImpl(societeId: string, since: string | null): Promise<{ success: boolean, data?: SyncDelta, error?: string }> {
+    try {
+        const userRes = await getCurrentUser();
+        if (!userRes.success || !userRes.data) return { success: false, error: "Non authentifié" };
+
+        const authorized = await canAccessSociete(userRes.data.id, societeId, MembershipRole.VIEWER);
+        if (!authorized) return { success: false, error: "Accès refusé" };
+
+        const data = await loadChanges(societeId, since);
+        return { success: true, data };
+    } catch (error: any) {
+        console.error('[ERROR] fetchChanges:', error);
+        return { success: false, error: error.message };
+    }
+}
+
+export const fetchChanges = traced('fetchChanges', fetchChangesImpl);
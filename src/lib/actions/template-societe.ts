@@ -3,13 +3,15 @@
 import { prisma } from "@/lib/prisma";
 import { MembershipRole } from "@prisma/client";
 import { revalidatePath } from 'next/cache';
+import { invalidateUser, invalidateSocieteCatalog, invalidateSocieteMemberships } from '@/lib/session-cache';
+import { traced } from '@/lib/tracing';
 
 /**
  * Creates a "Template" (Demo) society for the user if they don't have one.
  * Uses a fixed "Ma Société (Démo)" name and dummy data.
  * Idempotent: returns existing template if found.
  */
-export async function createTemplateSociete(userId: string) {
+async function createTemplateSocieteImpl(userId: string) {
     if (!userId) return null;
 
     // Check if user already has a template society
@@ -28,6 +30,7 @@ export async function createTemplateSociete(userId: string) {
             where: { id: userId },
             data: { currentSocieteId: existingTemplate.id }
         });
+        invalidateUser(userId);
         revalidatePath('/');
         return existingTemplate;
     }
@@ -61,6 +64,8 @@ export async function createTemplateSociete(userId: string) {
         where: { id: userId },
         data: { currentSocieteId: template.id }
     });
+    invalidateUser(userId);
+    invalidateSocieteCatalog(userId);
 
     revalidatePath('/');
     return template;
@@ -71,7 +76,7 @@ export async function createTemplateSociete(userId: string) {
  * - If keepData is true: Moves all data to new society, deletes template.
  * - If keepData is false: Deletes template and all data, creates fresh society.
  */
-export async function migrateTemplateToReal(
+async function migrateTemplateToRealImpl(
     userId: string,
     newSocieteData: any,
     keepData: boolean
@@ -179,6 +184,7 @@ export async function migrateTemplateToReal(
 
             return real;
         });
+        invalidateSocieteMemberships(template.id);
 
         return { success: true, data: realSociete };
 
@@ -187,3 +193,6 @@ export async function migrateTemplateToReal(
         return { success: false, error: error.message || "Erreur lors de la migration" };
     }
 }
+
+export const createTemplateSociete = traced('createTemplateSociete', createTemplateSocieteImpl);
+export const migrateTemplateToReal = traced('migrateTemplateToReal', migrateTemplateToRealImpl);
@@ -0,0 +1,144 @@
+/**
+ * 📝 Buffered history (audit) writer
+ *
+ * History entries are queued in the process and written with one createMany
+ * per batch instead of one awaited insert per mutation. Callers pass the
+ * société they already know: no lookup of the audited row.
+ *
+ * The queue is flushed at the end of the request with after(): a serverless
+ * instance may be frozen once the response is sent, and a self-hosted server
+ * restarted by a redeploy (SIGTERM) would lose what is still queued.
+ * Outside of a request (scripts, cron internals), or with AUDIT_FLUSH=timer,
+ * it is flushed when AUDIT_MAX_BATCH entries are waiting, AUDIT_FLUSH_MS after
+ * the first one, and before the process exits.
+ * Timestamps are taken when the entry is queued, so a delayed write keeps the
+ * order of the history.
+ */
+
+import crypto from 'crypto';
+import { after } from 'next/server';
+import { prisma } from '@/lib/prisma';
+
+export interface AuditEntry {
+    userId: string;
+    action: string;
+    entityType: string;
+    description: string;
+    entityId?: string | null;
+    societeId?: string | null;
+}
+
+export interface QueuedAuditEntry extends AuditEntry {
+    id: string;
+    timestamp: Date;
+}
+
+const AUDIT_MAX_BATCH = 100;
+const AUDIT_FLUSH_MS = 2000;
+const FLUSH_AT_REQUEST_END = process.env.AUDIT_FLUSH !== 'timer';
+
+const globalForAudit = globalThis as unknown as {
+    auditQueue: { entries: QueuedAuditEntry[], timer: ReturnType<typeof setTimeout> | null } | undefined;
+    auditExitHook: boolean | undefined;
+};
+
+const queue = globalForAudit.auditQueue ?? { entries: [], timer: null };
+
+if (process.env.NODE_ENV !== 'production') {
+    globalForAudit.auditQueue = queue;
+}
+
+// Timer path: the event loop drains before exit, write what is left (once per process)
+if (!globalForAudit.auditExitHook) {
+    globalForAudit.auditExitHook = true;
+    process.on('beforeExit', () => {
+        if (queue.entries.length > 0) flushAudit();
+    });
+}
+
+function toRow(entry: QueuedAuditEntry) {
+    return {
+        id: entry.id,
+        userId: entry.userId,
+        action: entry.action,
+        entityType: entry.entityType,
+        description: entry.description,
+        entityId: entry.entityId || null,
+        societeId: entry.societeId || null,
+        timestamp: entry.timestamp
+    };
+}
+
+// A stale société id (deleted, or a local placeholder) fails the whole batch:
+// keep those entries, unattached, rather than losing the others
+async function writeBatch(batch: QueuedAuditEntry[]) {
+    try {
+        await prisma.historyEntry.createMany({ data: batch.map(toRow), skipDuplicates: true });
+    } catch (error) {
+        const societeIds = [...new Set(batch.map(e => e.societeId).filter((id): id is string => !!id))];
+        const known = new Set((await prisma.societe.findMany({
+            where: { id: { in: societeIds } },
+            select: { id: true }
+        })).map(s => s.id));
+
+        console.warn("[AUDIT] Batch insert failed, retrying without unknown sociétés", error);
+        await prisma.historyEntry.createMany({
+            data: batch.map(e => toRow({ ...e, societeId: e.societeId && known.has(e.societeId) ? e.societeId : null })),
+            skipDuplicates: true
+        });
+    }
+}
+
+/**
+ * Write every queued entry now
+ */
+export async function flushAudit(): Promise<void> {
+    if (queue.timer) {
+        clearTimeout(queue.timer);
+        queue.timer = null;
+    }
+
+    while (queue.entries.length > 0) {
+        const batch = queue.entries.splice(0, AUDIT_MAX_BATCH);
+        try {
+            await writeBatch(batch);
+        } catch (error) {
+            console.error(`[AUDIT] Dropped ${batch.length} history entries`, error);
+        }
+    }
+}
+
+function scheduleFlush() {
+    if (queue.entries.length >= AUDIT_MAX_BATCH) {
+        flushAudit();
+        return;
+    }
+
+    if (FLUSH_AT_REQUEST_END) {
+        try {
+            after(flushAudit);
+            return;
+        } catch {
+            // Outside of a request scope (script, cron internals): use the timer
+        }
+    }
+
+    if (!queue.timer) {
+        queue.timer = setTimeout(() => { flushAudit(); }, AUDIT_FLUSH_MS);
+    }
+}
+
+/**
+ * Queue history entries (one batched insert for all of them)
+ * @returns The queued entries, with the id and timestamp they will be stored with
+ */
+export function recordAudit(entries: AuditEntry | AuditEntry[]): QueuedAuditEntry[] {
+    const list = Array.isArray(entries) ? entries : [entries];
+    if (list.length === 0) return [];
+
+    const timestamp = new Date();
+    const queued = list.map(entry => ({ ...entry, id: crypto.randomUUID(), timestamp }));
+    queue.entries.push(...queued);
+    scheduleFlush();
+    return queued;
+}
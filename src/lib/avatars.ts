@@ -0,0 +1,108 @@
+/**
+ * 👤 User avatars (variants stored in UserAvatarVariant)
+ *
+ * saveAvatar renders the AVATAR_SIZES variants once per upload; loadAvatar
+ * serves them from a process LRU keyed by user + size, so a warm instance
+ * answers without touching the blob columns. Cache entries carry the avatar
+ * hash: a request for another version (new upload) goes back to the DB.
+ *
+ * Avatars uploaded before the variants existed are rendered on first request
+ * and stored, once.
+ */
+
+import { prisma } from '@/lib/prisma';
+import { LRUCache } from '@/lib/lru-cache';
+import { AVATAR_SIZES, contentHash, pickVariantSize, renderVariants } from '@/lib/image-variants';
+
+const AVATAR_TTL_MS = 60 * 60 * 1000;
+const MAX_AVATARS = 500;
+
+export interface AvatarVariant {
+    hash: string;
+    size: number;
+    bytes: Buffer;
+}
+
+const globalForAvatars = globalThis as unknown as {
+    avatarVariants: LRUCache<string, AvatarVariant> | undefined;
+};
+
+const variantCache = globalForAvatars.avatarVariants ?? new LRUCache<string, AvatarVariant>(MAX_AVATARS, AVATAR_TTL_MS);
+
+if (process.env.NODE_ENV !== 'production') {
+    globalForAvatars.avatarVariants = variantCache;
+}
+
+function cacheKey(userId: string, size: number) {
+    return `${userId}:${size}`;
+}
+
+/**
+ * Store a new avatar (original + variants)
+ * @returns The avatar hash, to version the avatar URLs
+ */
+export async function saveAvatar(userId: string, buffer: Buffer, mime: string): Promise<string> {
+    const hash = contentHash(buffer);
+    const variants = await renderVariants(buffer, AVATAR_SIZES, 'cover');
+
+    await prisma.$transaction([
+        prisma.userAvatarVariant.deleteMany({ where: { userId } }),
+        prisma.userAvatarVariant.createMany({
+            data: variants.map(v => ({ userId, size: v.size, bytes: v.bytes }))
+        }),
+        prisma.user.update({
+            where: { id: userId },
+            data: { avatarBytes: buffer, avatarMime: mime, avatarHash: hash, hasAvatar: true }
+        })
+    ]);
+
+    for (const v of variants) variantCache.set(cacheKey(userId, v.size), { hash, size: v.size, bytes: v.bytes });
+    return hash;
+}
+
+// Avatar stored before the variants (or before avatarHash): render them once
+async function backfillVariants(userId: string): Promise<string | null> {
+    const user = await prisma.user.findUnique({
+        where: { id: userId },
+        select: { avatarBytes: true, avatarMime: true }
+    });
+    if (!user?.avatarBytes || !user.avatarMime) return null;
+
+    console.log(`[AVATAR] Rendering variants of ${userId}`);
+    return saveAvatar(userId, Buffer.from(user.avatarBytes), user.avatarMime);
+}
+
+/**
+ * Variant of a user's avatar, or null when the user has none
+ * @param version - Avatar hash from the URL, if any: a cached variant with this hash is served as is
+ */
+export async function loadAvatar(userId: string, requestedSize: number | null, version: string | null): Promise<AvatarVariant | null> {
+    const size = pickVariantSize(AVATAR_SIZES, requestedSize);
+    const key = cacheKey(userId, size);
+
+    const cached = variantCache.get(key);
+    if (cached && version && cached.hash === version) return cached;
+
+    const user = await prisma.user.findUnique({
+        where: { id: userId },
+        select: {
+            avatarHash: true,
+            avatarVariants: { where: { size }, select: { bytes: true } }
+        }
+    });
+    if (!user) return null;
+
+    let hash = user.avatarHash;
+    if (cached && cached.hash === hash) return cached;
+
+    const bytes = user.avatarVariants[0]?.bytes;
+    if (!hash || !bytes) {
+        hash = await backfillVariants(userId);
+        if (!hash) return null;
+        return variantCache.get(key) ?? null;
+    }
+
+    const variant = { hash, size, bytes: Buffer.from(bytes) };
+    variantCache.set(key, variant);
+    return variant;
+}
@@ -1,39 +1,42 @@
 export const FRENCH_BANKS: Record<string, { name: string, bic: string }> = {
     // Grands Réseaux
-    "30004": { name: "BNP PARIBAS", bic: "BNPARIPP" },
+    "30004": { name: "BNP PARIBAS", bic: "BNPAFRPP" },
     "13135": { name: "BNP PARIBAS", bic: "BNPARIPP" },
     "30003": { name: "SOCIETE GENERALE", bic: "SOGEFRPP" },
-    "30002": { name: "PROCL", bic: "CRLYPEWW" }, // LCL
+    "30002": { name: "LCL", bic: "CRLYFRPP" },
     "16155": { name: "LCL", bic: "CRLYPEWW" },
     "30066": { name: "CIC", bic: "CMCIFRPP" },
-    "20041": { name: "LA BANQUE POSTALE", bic: "LBPPFRPP" },
+    "20041": { name: "LA BANQUE POSTALE", bic: "PSSTFRPP" },
     "16255": { name: "LA BANQUE POSTALE", bic: "LBPPFRPP" },
 
     // Banques en Ligne / Neobanks
-    "10907": { name: "BOURSORAMA", bic: "SOGEFRPP" },
+    "10907": { name: "BOURSORAMA", bic: "BOUSFRPP" },
     "16107": { name: "BOURSORAMA", bic: "SOGEFRPP" },
-    "16006": { name: "FORTUNEO", bic: "ARKAFRPP" },
-    "14505": { name: "ING DIRECT", bic: "INGBFRPP" },
-    "11195": { name: "HELLO BANK", bic: "BNPARIPP" },
+    "16006": { name: "FORTUNEO", bic: "FTNOFRP1" },
+    "14505": { name: "ING", bic: "INGBFRPP" },
+    "11195": { name: "HELLO BANK", bic: "BNPAFRPP" },
     "23605": { name: "AXA BANQUE", bic: "AXABFRPP" },
-    "19499": { name: "QONTO", bic: "QONTFRPP" },
-    "16598": { name: "SHINE", bic: "SOGEFRPP" },
+    "19499": { name: "QONTO", bic: "QNTOFRP1" },
+    "16958": { name: "QONTO", bic: "QNTOFRP1" },
+    "16598": { name: "SHINE", bic: "SABOROPP" },
     "21112": { name: "N26", bic: "N26GFRPP" },
     "21999": { name: "REVOLUT", bic: "REVOFRPP" },
+    "28233": { name: "REVOLUT", bic: "REVOFRPP" },
     "13805": { name: "MONABANQ", bic: "CMCIFRPP" },
     "17515": { name: "CREDIT DU NORD", bic: "NORDJAPP" },
 
     // Credit Mutuel (Plage 1xxxx souvent partagée, BICs variés selon fédération)
     // On met un BIC générique ou le plus courant, l'utilisateur pourra corriger
-    "10278": { name: "CREDIT MUTUEL", bic: "CMCIFRPP" },
+    "10278": { name: "CREDIT MUTUEL", bic: "CMCIFR2A" },
     "10096": { name: "CREDIT MUTUEL", bic: "CMCIFRPP" },
     "15589": { name: "CREDIT MUTUEL", bic: "CMCIFRPP" },
 
     // Banques Populaires (Souvent 1xxxx)
-    "11315": { name: "BANQUE POPULAIRE", bic: "POPUFRPP" },
+    "11315": { name: "BANQUE POPULAIRE", bic: "CCBPFRPP" },
     "12548": { name: "BANQUE POPULAIRE", bic: "POPUFRPP" },
     "10107": { name: "BANQUE POPULAIRE", bic: "POPUFRPP" },
     "17805": { name: "BANQUE POPULAIRE", bic: "POPUFRPP" },
+    "10207": { name: "BANQUE POPULAIRE", bic: "CCBPFRPP" },
 
     // Caisses d'Epargne (1xxxx)
     "11706": { name: "CAISSE D'EPARGNE", bic: "CEPAFRPP" },
@@ -55,17 +58,58 @@ export const FRENCH_BANKS: Record<string, { name: string, bic: string }> = {
     "30076": { name: "CREDIT INDUSTRIEL DE L'OUEST", bic: "CIOOFRPP" },
 };
 
-export function getBankDetails(iban: string) {
-    // Strip spaces
-    const clean = iban.replace(/\s/g, '').toUpperCase();
+// Bank code position per country (IBAN characters after "CCkk")
+const BANK_CODE_SLICES: Record<string, { start: number, length: number }> = {
+    FR: { start: 4, length: 5 },
+    MC: { start: 4, length: 5 } // Monaco uses the French bank codes
+};
+
+// Expected IBAN length per country (others: 15 to 34)
+const IBAN_LENGTHS: Record<string, number> = {
+    FR: 27, MC: 27, BE: 16, DE: 22, ES: 24, IT: 27, LU: 20, NL: 18, PT: 25, CH: 21, GB: 22
+};
+
+// Prefix index: "FR30004" -> bank, built once from FRENCH_BANKS
+const BANK_INDEX = new Map<string, { name: string, bic: string }>(
+    Object.entries(FRENCH_BANKS).flatMap(([code, bank]) => [[`FR${code}`, bank], [`MC${code}`, bank]] as const)
+);
+
+export function normalizeIban(iban: string): string {
+    return iban.replace(/[^a-zA-Z0-9]/g, '').toUpperCase();
+}
+
+/**
+ * ISO 13616 check: country length and mod 97 of the rearranged IBAN
+ */
+export function isValidIban(iban: string): boolean {
+    const clean = normalizeIban(iban);
+    if (!/^[A-Z]{2}\d{2}[A-Z0-9]+$/.test(clean)) return false;
+
+    const expected = IBAN_LENGTHS[clean.substring(0, 2)];
+    if (expected ? clean.length !== expected : clean.length < 15 || clean.length > 34) return false;
 
-    // Check if French IBAN
-    if (!clean.startsWith('FR') || clean.length < 10) return null;
+    // Letters become 10..35; mod 97 computed digit by digit (the number is too large for JS)
+    const rearranged = clean.substring(4) + clean.substring(0, 4);
+    let remainder = 0;
+    for (const char of rearranged) {
+        const value = char >= 'A' ? String(char.charCodeAt(0) - 55) : char;
+        for (const digit of value) remainder = (remainder * 10 + Number(digit)) % 97;
+    }
+    return remainder === 1;
+}
 
-    // Extract bank code (positions 5 to 10 in 1-based index -> 4 to 9 in 0-based)
-    // FRkk bbbb b
-    // 0123 4567 8
-    const bankCode = clean.substring(4, 9);
+/**
+ * Country + bank identifier of an IBAN ("FR30004"), or null when the country
+ * has no known layout or the IBAN is too short
+ */
+export function bankKey(iban: string): string | null {
+    const clean = normalizeIban(iban);
+    const slice = BANK_CODE_SLICES[clean.substring(0, 2)];
+    if (!slice || clean.length < slice.start + slice.length) return null;
+    return clean.substring(0, 2) + clean.substring(slice.start, slice.start + slice.length);
+}
 
-    return FRENCH_BANKS[bankCode] || null;
+export function getBankDetails(iban: string) {
+    const key = bankKey(iban);
+    return key ? BANK_INDEX.get(key) || null : null;
 }
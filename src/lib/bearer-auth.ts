@@ -0,0 +1,32 @@
+/**
+ * 🔑 Bearer token check for machine endpoints (cron jobs, metrics)
+ */
+
+import crypto from 'crypto';
+
+/**
+ * True when the request carries "Authorization: Bearer <secret>"
+ * Always false when the secret is not configured.
+ */
+export function hasBearerToken(request: Request, secret: string | undefined): boolean {
+    const header = request.headers.get('authorization') || '';
+    if (!secret || !header.startsWith('Bearer ')) return false;
+
+    const expected = Buffer.from(secret);
+    const given = Buffer.from(header.slice('Bearer '.length));
+    return expected.length === given.length && crypto.timingSafeEqual(expected, given);
+}
+
+/**
+ * Cron routes: token required (Vercel sends "Bearer $CRON_SECRET" with every
+ * cron invocation). Left open without CRON_SECRET in local development
+ * only: a deployment without the secret refuses every call.
+ */
+export function isCronRequest(request: Request): boolean {
+    if (!process.env.CRON_SECRET) {
+        const deployed = process.env.NODE_ENV === 'production' || !!process.env.VERCEL;
+        if (deployed) console.error('[CRON] CRON_SECRET is not set: cron request refused');
+        return !deployed;
+    }
+    return hasBearerToken(request, process.env.CRON_SECRET);
+}
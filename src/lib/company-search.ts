@@ -0,0 +1,41 @@
+/**
+ * 🏢 Company search (browser side)
+ *
+ * Memo of /api/company-search responses for the page session: going back to
+ * a previous search term (typing, deleting) is answered without a request,
+ * and two forms searching the same term share one. The server keeps its own
+ * shared cache (lib/lookup-cache).
+ */
+
+import { LRUCache } from '@/lib/lru-cache';
+
+const MAX_ENTRIES = 100;
+const TTL_MS = 10 * 60 * 1000;
+
+export interface CompanySearchResponse {
+    success?: boolean;
+    results?: any[];
+    error?: string;
+}
+
+const responses = new LRUCache<string, Promise<CompanySearchResponse>>(MAX_ENTRIES, TTL_MS);
+
+export function searchCompanies(term: string): Promise<CompanySearchResponse> {
+    const key = term.trim().replace(/\s+/g, ' ').toLowerCase();
+
+    const cached = responses.get(key);
+    if (cached) return cached;
+
+    const request = fetch(`/api/company-search?q=${encodeURIComponent(key)}`)
+        .then(response => response.json() as Promise<CompanySearchResponse>)
+        .then(data => {
+            // Upstream errors are retried on the next search
+            if (!data.success && data.error !== 'Aucun résultat') responses.delete(key);
+            return data;
+        }, error => {
+            responses.delete(key);
+            throw error;
+        });
+    responses.set(key, request);
+    return request;
+}
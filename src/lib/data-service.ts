@@ -631,11 +631,8 @@ class DataService {
         entityType: 'facture' | 'devis' | 'client' | 'produit' | 'societe' | 'settings',
         description: string,
         entityId?: string
-    ) {
-        if (typeof window === 'undefined') return;
-
-        // Optimistic UI update (optional, skipping for now to rely on DB)
-        // const newEntry: HistoryEntry = { ... };
+    ): Promise<HistoryEntry | null> {
+        if (typeof window === 'undefined') return null;
 
         // Sanitize Societe ID to avoid Foreign Key errors
         let societeId = user.currentSocieteId || this.getActiveSocieteId();
@@ -658,7 +655,6 @@ class DataService {
         }
 
         const res = await createHistoryEntry({
-            userId: user.id,
             action,
             entityType,
             description,
@@ -666,22 +662,22 @@ class DataService {
             societeId: societeId
         });
 
-        if (!res.success) {
+        if (!res.success || !res.data) {
             console.error("Failed to log history (Server Action):", res.error);
-            // If error is related to Foreign Key, maybe retry without societeId?
-            // "FOREIGN KEY constraint failed"
-            if (res.error?.includes("Foreign key constraint failed") || res.error?.includes("constraint")) {
-                console.warn("Retrying log without societeId due to constraint error");
-                await createHistoryEntry({
-                    userId: user.id,
-                    action,
-                    entityType,
-                    description,
-                    entityId,
-                    societeId: undefined
-                });
-            }
+            return null;
         }
+
+        // Unknown société ids are detached server-side when the batch is written (lib/audit-log)
+        return {
+            id: res.data.id,
+            userId: user.id,
+            userName: user.fullName || "Utilisateur Inconnu",
+            action,
+            entityType,
+            entityId,
+            description,
+            timestamp: res.data.timestamp
+        } as HistoryEntry;
     }
 }
 
@@ -0,0 +1,152 @@
+/**
+ * 🔄 Delta sync of the DataProvider lists
+ *
+ * The browser keeps a cursor per société (server time of its last sync) and
+ * asks for what changed since then instead of reloading every list:
+ * - rows with updatedAt > cursor (soft deletes and archiving included, since
+ *   they update the row);
+ * - clients / products whose totals depend on a changed invoice;
+ * - SyncTombstone rows for hard deletes (clients, products, purged quotes).
+ *
+ * The cursor handed back is taken before the reads, minus SYNC_OVERLAP_MS, so
+ * a write committed while the delta was being read is sent again next time
+ * rather than missed (merging is idempotent). When the cursor is older than
+ * the tombstone retention or too much changed, the caller reloads in full.
+ */
+
+import type { Client, Produit, Facture, Devis } from '@/types';
+import { prisma } from '@/lib/prisma';
+import { resolveLineItems } from '@/lib/line-items';
+import {
+    ARCHIVED_INVOICE_STATUS, ARCHIVED_QUOTE_STATUS,
+    CLIENT_LIST_INCLUDE, PRODUCT_LIST_INCLUDE, INVOICE_LIST_SELECT, QUOTE_LIST_SELECT,
+    toListClient, toListProduct, toListInvoice, toListQuote
+} from '@/lib/list-rows';
+
+export type SyncEntity = 'clients' | 'products' | 'invoices' | 'quotes';
+
+export interface SyncDelta {
+    cursor: string;
+    reset: boolean; // Cursor unknown or too old: reload the lists in full
+    clients: Client[];
+    products: Produit[];
+    invoices: Facture[];
+    quotes: Devis[];
+    removed: Record<SyncEntity, string[]>;
+    cleared: SyncEntity[]; // Every row of these lists was deleted
+}
+
+const SYNC_OVERLAP_MS = 5 * 1000;
+const TOMBSTONE_RETENTION_MS = 30 * 24 * 60 * 60 * 1000;
+const MAX_DELTA_ROWS = 500;
+const PRUNE_PROBABILITY = 0.01;
+
+function emptyDelta(cursor: string, reset: boolean): SyncDelta {
+    return {
+        cursor,
+        reset,
+        clients: [],
+        products: [],
+        invoices: [],
+        quotes: [],
+        removed: { clients: [], products: [], invoices: [], quotes: [] },
+        cleared: []
+    };
+}
+
+/**
+ * Record hard deletes for the delta sync
+ * @param entityIds - Deleted ids, or null when every row of the type was deleted
+ */
+export async function recordDeletions(societeId: string, entityType: SyncEntity, entityIds: string[] | null) {
+    const data = entityIds === null
+        ? [{ societeId, entityType, entityId: null }]
+        : entityIds.map(entityId => ({ societeId, entityType, entityId }));
+    await prisma.syncTombstone.createMany({ data });
+
+    if (Math.random() < PRUNE_PROBABILITY) {
+        prisma.syncTombstone.deleteMany({ where: { deletedAt: { lt: new Date(Date.now() - TOMBSTONE_RETENTION_MS) } } })
+            .catch(e => console.error("[SYNC] Tombstone pruning failed", e));
+    }
+}
+
+/**
+ * Changes of a société since a cursor returned by a previous call
+ * (since = null only returns a cursor, to pair with a full load)
+ */
+export async function loadChanges(societeId: string, since: string | null): Promise<SyncDelta> {
+    const startedAt = Date.now();
+    const cursor = new Date(startedAt - SYNC_OVERLAP_MS).toISOString();
+
+    const sinceDate = since ? new Date(since) : null;
+    if (!sinceDate || isNaN(sinceDate.getTime()) || startedAt - sinceDate.getTime() > TOMBSTONE_RETENTION_MS) {
+        return emptyDelta(cursor, true);
+    }
+
+    const changed = { gt: sinceDate };
+    const [invoices, quotes, clients, products, tombstones] = await Promise.all([
+        prisma.facture.findMany({
+            where: { societeId, updatedAt: changed },
+            select: { ...INVOICE_LIST_SELECT, deletedAt: true },
+            take: MAX_DELTA_ROWS + 1
+        }),
+        prisma.devis.findMany({
+            where: { societeId, updatedAt: changed },
+            select: { ...QUOTE_LIST_SELECT, deletedAt: true },
+            take: MAX_DELTA_ROWS + 1
+        }),
+        // totalPurchases / soldCount move with the invoices
+        prisma.client.findMany({
+            where: { societeId, OR: [{ updatedAt: changed }, { factures: { some: { updatedAt: changed } } }] },
+            include: CLIENT_LIST_INCLUDE,
+            take: MAX_DELTA_ROWS + 1
+        }),
+        prisma.produit.findMany({
+            where: { societeId, OR: [{ updatedAt: changed }, { factureItems: { some: { facture: { updatedAt: changed } } } }] },
+            include: PRODUCT_LIST_INCLUDE,
+            take: MAX_DELTA_ROWS + 1
+        }),
+        prisma.syncTombstone.findMany({
+            where: { societeId, deletedAt: changed },
+            select: { entityType: true, entityId: true }
+        })
+    ]);
+
+    if ([invoices, quotes, clients, products].some(rows => rows.length > MAX_DELTA_ROWS)) {
+        return emptyDelta(cursor, true);
+    }
+
+    const delta = emptyDelta(cursor, false);
+
+    const liveInvoices = invoices.filter(inv => !inv.deletedAt && inv.statut !== ARCHIVED_INVOICE_STATUS);
+    const liveQuotes = quotes.filter(q => !q.deletedAt && q.statut !== ARCHIVED_QUOTE_STATUS);
+    delta.removed.invoices = invoices.filter(inv => !liveInvoices.includes(inv)).map(inv => inv.id);
+    delta.removed.quotes = quotes.filter(q => !liveQuotes.includes(q)).map(q => q.id);
+
+    const [invoiceItems, quoteItems] = await Promise.all([
+        resolveLineItems(liveInvoices, ids => prisma.facture.findMany({
+            where: { id: { in: ids } },
+            select: { id: true, itemsJSON: true }
+        })),
+        resolveLineItems(liveQuotes, ids => prisma.devis.findMany({
+            where: { id: { in: ids } },
+            select: { id: true, itemsJSON: true }
+        }))
+    ]);
+    delta.invoices = liveInvoices.map(inv => toListInvoice(inv, invoiceItems.get(inv.id) || [])) as unknown as Facture[];
+    delta.quotes = liveQuotes.map(q => toListQuote(q, quoteItems.get(q.id) || [])) as unknown as Devis[];
+    delta.clients = clients.map(toListClient);
+    delta.products = products.map(toListProduct);
+
+    for (const tombstone of tombstones) {
+        const entity = tombstone.entityType as SyncEntity;
+        if (!(entity in delta.removed)) continue;
+        if (tombstone.entityId === null) {
+            if (!delta.cleared.includes(entity)) delta.cleared.push(entity);
+        } else {
+            delta.removed[entity].push(tombstone.entityId);
+        }
+    }
+
+    return delta;
+}
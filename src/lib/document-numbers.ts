@@ -0,0 +1,81 @@
+/**
+ * 🔢 Document numbering (per société counter)
+ *
+ * Invoice and quote numbers come from one DocumentSequence row per société and
+ * document type, incremented by a single UPDATE inside the transaction that
+ * creates the document. The row lock serializes concurrent creations, so two
+ * parallel imports can never get the same number, at O(1) per creation.
+ *
+ * The number proposed by the editor (max + 1 of the documents it has loaded)
+ * is kept when it is ahead of the counter; otherwise the next free number is
+ * used. Custom, non 8-digit numbers are kept as typed and only guarded by the
+ * unique (societeId, numero) index.
+ *
+ * A société without a counter row is seeded from its current highest number
+ * on first use; scripts/seed-document-sequences.ts does it for all at once.
+ */
+
+import { Prisma } from '@prisma/client';
+
+export type NumberedDocument = 'facture' | 'devis';
+
+const NUMERIC_NUMERO = /^\d{8}$/;
+
+const DOCUMENT_TABLES: Record<NumberedDocument, Prisma.Sql> = {
+    facture: Prisma.raw('"Facture"'),
+    devis: Prisma.raw('"Devis"')
+};
+
+/**
+ * First number of a société without any numeric document
+ * (same starting points as generateNextInvoiceNumber / generateNextQuoteNumber)
+ */
+function firstNumber(type: NumberedDocument): number {
+    if (type === 'facture') return 20180258;
+    return parseInt(`${new Date().getFullYear().toString().substring(2)}010001`, 10);
+}
+
+async function incrementSequence(tx: Prisma.TransactionClient, societeId: string, type: NumberedDocument, requested: number) {
+    const rows = await tx.$queryRaw<{ lastValue: number }[]>`
+        UPDATE "DocumentSequence"
+        SET "lastValue" = GREATEST("lastValue" + 1, ${requested}), "updatedAt" = NOW()
+        WHERE "societeId" = ${societeId} AND "documentType" = ${type}
+        RETURNING "lastValue"
+    `;
+    return rows.length > 0 ? rows[0].lastValue : null;
+}
+
+async function seedSequence(tx: Prisma.TransactionClient, societeId: string, type: NumberedDocument) {
+    await tx.$executeRaw`
+        INSERT INTO "DocumentSequence" ("societeId", "documentType", "lastValue", "updatedAt")
+        SELECT ${societeId}, ${type}, COALESCE(MAX("numero"::int), ${firstNumber(type) - 1}), NOW()
+        FROM ${DOCUMENT_TABLES[type]}
+        WHERE "societeId" = ${societeId} AND "numero" ~ '^[0-9]{8}$'
+        ON CONFLICT ("societeId", "documentType") DO NOTHING
+    `;
+}
+
+/**
+ * Numero of a new document, to be called inside the transaction that creates it
+ * @param requested - Number proposed by the editor, if any
+ */
+export async function allocateDocumentNumber(
+    tx: Prisma.TransactionClient,
+    societeId: string,
+    type: NumberedDocument,
+    requested?: string
+): Promise<string> {
+    const proposed = requested?.trim();
+    if (proposed && !NUMERIC_NUMERO.test(proposed)) return proposed;
+
+    const requestedValue = proposed ? parseInt(proposed, 10) : 0;
+
+    let value = await incrementSequence(tx, societeId, type, requestedValue);
+    if (value === null) {
+        await seedSequence(tx, societeId, type);
+        value = await incrementSequence(tx, societeId, type, requestedValue);
+    }
+    if (value === null) throw new Error("Séquence de numérotation introuvable");
+
+    return value.toString().padStart(8, '0');
+}
@@ -1,8 +1,10 @@
 
 import nodemailer from 'nodemailer';
+import crypto from 'crypto';
 import { decrypt } from './encryption';
 
 interface EmailConfig {
+    societeId?: string; // Owner of the config, used to drop its pooled transporter on change
     provider: "SMTP" | "GMAIL";
     host?: string;
     port?: number;
@@ -21,6 +23,8 @@ export async function createTransporter(config?: EmailConfig) {
             // Gmail OAuth
             return nodemailer.createTransport({
                 service: 'gmail',
+                pool: true,
+                maxConnections: POOL_MAX_CONNECTIONS,
                 auth: {
                     type: 'OAuth2',
                     user: config.fromEmail,
@@ -34,6 +38,8 @@ export async function createTransporter(config?: EmailConfig) {
         // SMTP
         if (config.host && config.user) {
             return nodemailer.createTransport({
+                pool: true,
+                maxConnections: POOL_MAX_CONNECTIONS,
                 host: config.host,
                 port: config.port || 587,
                 secure: config.secure || false,
@@ -49,6 +55,8 @@ export async function createTransporter(config?: EmailConfig) {
     // 2. Env Fallback (Global SMTP)
     if (process.env.SMTP_HOST && process.env.SMTP_USER) {
         return nodemailer.createTransport({
+            pool: true,
+            maxConnections: POOL_MAX_CONNECTIONS,
             host: process.env.SMTP_HOST,
             port: Number(process.env.SMTP_PORT) || 587,
             secure: process.env.SMTP_SECURE === 'true',
@@ -74,12 +82,96 @@ export async function createTransporter(config?: EmailConfig) {
     });
 }
 
+/**
+ * Transporter pool
+ *
+ * One pooled transporter per société and email config (hash of the stored,
+ * still encrypted, settings), shared by every send of the process:
+ * - SMTP connections are kept open and reused (pool: true);
+ * - Gmail OAuth2 access tokens are cached by the transporter until expiry;
+ * - secrets are decrypted only when a transporter is built.
+ * A config change produces a new key; saveEmailConfiguration / the Gmail
+ * OAuth callback also drop the old transporter (invalidateTransporters).
+ * Transporters idle for IDLE_MS are closed on the next lookup, and after a
+ * connection / authentication error (TRANSPORT_ERROR_CODES); a rejected
+ * recipient or message leaves the pooled transporter to concurrent sends.
+ */
+const POOL_MAX_CONNECTIONS = 3;
+const IDLE_MS = 5 * 60 * 1000;
+const TRANSPORT_ERROR_CODES = new Set(['EAUTH', 'ECONNECTION', 'ETIMEDOUT', 'ESOCKET', 'EDNS', 'ETLS']);
+
+type Transporter = Awaited<ReturnType<typeof createTransporter>>;
+
+interface PooledTransporter {
+    transporter: Promise<Transporter>;
+    societeId?: string;
+    lastUsed: number;
+}
+
+const globalForTransporters = globalThis as unknown as {
+    emailTransporters: Map<string, PooledTransporter> | undefined;
+};
+
+const transporters = globalForTransporters.emailTransporters ?? new Map<string, PooledTransporter>();
+
+if (process.env.NODE_ENV !== 'production') {
+    globalForTransporters.emailTransporters = transporters;
+}
+
+// Per société: invalidateTransporters never leaves one behind shared with another société
+function transporterKey(config?: EmailConfig): string {
+    if (!config) return 'default';
+    const { societeId, fromName, ...settings } = config; // fromName is not part of the transport itself
+    return `${societeId ?? ''}:${crypto.createHash('sha256').update(JSON.stringify(settings)).digest('hex')}`;
+}
+
+function closeEntry(key: string) {
+    const entry = transporters.get(key);
+    if (!entry) return;
+    transporters.delete(key);
+    entry.transporter.then(t => t.close()).catch(() => { });
+}
+
+function evictIdle(now: number) {
+    for (const [key, entry] of Array.from(transporters.entries())) {
+        if (now - entry.lastUsed > IDLE_MS) closeEntry(key);
+    }
+}
+
+export function getTransporter(config?: EmailConfig): Promise<Transporter> {
+    const now = Date.now();
+    evictIdle(now);
+
+    const key = transporterKey(config);
+    let entry = transporters.get(key);
+    if (!entry) {
+        entry = { transporter: createTransporter(config), societeId: config?.societeId, lastUsed: now };
+        transporters.set(key, entry);
+        // A failed build is not cached
+        const created = entry;
+        created.transporter.catch(() => {
+            if (transporters.get(key) === created) transporters.delete(key);
+        });
+    }
+    entry.lastUsed = now;
+    return entry.transporter;
+}
+
+/**
+ * Close the pooled transporters of a société (call after its email settings change)
+ */
+export function invalidateTransporters(societeId: string): void {
+    for (const [key, entry] of Array.from(transporters.entries())) {
+        if (entry.societeId === societeId) closeEntry(key);
+    }
+}
+
 export async function sendEmail(
     { to, subject, html, text, attachments = [] }: { to: string, subject: string, html: string, text: string, attachments?: any[] },
     config?: EmailConfig
 ) {
     try {
-        const transporter = await createTransporter(config);
+        const transporter = await getTransporter(config);
 
         // Determine 'From' field
         let from = process.env.SMTP_FROM || '"Facturation App" <no-reply@example.com>';
@@ -129,6 +221,9 @@ export async function sendEmail(
         };
 
     } catch (error: any) {
+        // Revoked token, broken connection...: the next send rebuilds the transporter
+        if (TRANSPORT_ERROR_CODES.has(error.code)) closeEntry(transporterKey(config));
+
         console.error('[EMAIL] ❌ Send failed:', {
             to,
             subject,
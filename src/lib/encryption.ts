@@ -5,10 +5,11 @@ const ALGORITHM = 'aes-256-cbc';
 const ENCRYPTION_KEY = process.env.ENCRYPTION_KEY || process.env.NEXTAUTH_SECRET || 'default-secret-key-change-it-32chars'; // Must be 32 chars
 const IV_LENGTH = 16;
 
-// Ensure key is 32 bytes
+// Ensure key is 32 bytes (scrypt is deliberately slow: derive once per process)
+let derivedKey: Buffer | undefined;
 const getKey = () => {
-    const key = String(ENCRYPTION_KEY);
-    return crypto.scryptSync(key, 'salt', 32);
+    if (!derivedKey) derivedKey = crypto.scryptSync(String(ENCRYPTION_KEY), 'salt', 32);
+    return derivedKey;
 };
 
 export function encrypt(text: string): string {
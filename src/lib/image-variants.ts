@@ -0,0 +1,98 @@
+/**
+ * 🖼️ Avatar / logo size variants
+ *
+ * Uploaded images are resized and encoded to WebP once, at upload time, into a
+ * fixed set of square sizes. Every variant is named by the content hash of the
+ * original, so its URL never changes meaning: responses carry an ETag and
+ * `immutable` caching, and serving a variant never runs sharp.
+ * - avatars: UserAvatarVariant rows (+ User.avatarHash), see api/users/avatar;
+ * - logos: files next to the original in public/uploads/logos.
+ */
+
+import crypto from 'crypto';
+import path from 'path';
+import { writeFile, mkdir } from 'fs/promises';
+import sharp from 'sharp';
+
+export const AVATAR_SIZES = [48, 96, 256];
+export const LOGO_SIZES = [64, 256];
+
+export const IMMUTABLE_CACHE_CONTROL = 'public, max-age=31536000, immutable';
+// Unversioned URLs: cached, but revalidated (cheap 304 through the ETag)
+export const REVALIDATE_CACHE_CONTROL = 'public, max-age=0, must-revalidate';
+
+export interface ImageVariant {
+    size: number;
+    bytes: Buffer;
+}
+
+export function contentHash(buffer: Buffer): string {
+    return crypto.createHash('sha256').update(buffer).digest('hex').slice(0, 16);
+}
+
+/**
+ * Smallest variant covering the requested size (largest one when not given)
+ */
+export function pickVariantSize(sizes: number[], requested?: number | null): number {
+    if (!requested || requested <= 0) return sizes[sizes.length - 1];
+    return sizes.find(size => size >= requested) ?? sizes[sizes.length - 1];
+}
+
+export function variantETag(hash: string, size: number): string {
+    return `"${hash}-${size}"`;
+}
+
+/**
+ * True when the If-None-Match header of the request already names this ETag
+ */
+export function isNotModified(request: Request, etag: string): boolean {
+    const header = request.headers.get('if-none-match');
+    if (!header) return false;
+    return header.split(',').some(tag => tag.trim().replace(/^W\//, '') === etag);
+}
+
+/**
+ * @param fit - 'cover' crops to a square (avatars), 'inside' keeps the ratio (logos)
+ */
+export async function renderVariants(buffer: Buffer, sizes: number[], fit: 'cover' | 'inside'): Promise<ImageVariant[]> {
+    return Promise.all(sizes.map(async size => ({
+        size,
+        bytes: await sharp(buffer)
+            .rotate() // Apply EXIF orientation before stripping metadata
+            .resize(size, size, { fit, withoutEnlargement: fit === 'inside' })
+            .webp({ quality: 80 })
+            .toBuffer()
+    })));
+}
+
+/**
+ * Write an uploaded file and its variants under public/<dir>:
+ * `<prefix>-<hash>.<ext>` and `<prefix>-<hash>-<size>.webp`
+ * @returns Public URLs of the original and of each variant
+ */
+export async function writePublicVariants(
+    dir: string,
+    prefix: string,
+    buffer: Buffer,
+    extension: string,
+    sizes: number[],
+    fit: 'cover' | 'inside'
+) {
+    const publicDir = path.join(process.cwd(), 'public', dir);
+    await mkdir(publicDir, { recursive: true });
+
+    const hash = contentHash(buffer);
+    const base = `${prefix}-${hash}`;
+    const variants = await renderVariants(buffer, sizes, fit);
+
+    await Promise.all([
+        writeFile(path.join(publicDir, `${base}.${extension}`), buffer),
+        ...variants.map(v => writeFile(path.join(publicDir, `${base}-${v.size}.webp`), v.bytes))
+    ]);
+
+    return {
+        hash,
+        url: `/${dir}/${base}.${extension}`,
+        variants: Object.fromEntries(variants.map(v => [v.size, `/${dir}/${base}-${v.size}.webp`])) as Record<number, string>
+    };
+}
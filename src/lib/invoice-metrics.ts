@@ -0,0 +1,121 @@
+/**
+ * 📊 Invoice metrics aggregation (dashboard)
+ *
+ * All metrics of a period come from ONE SQL statement:
+ * - per-statut counts/amounts: whole months inside the range are read from
+ *   "InvoiceMonthlyRollup" (kept up to date by triggers on "Facture"), only the
+ *   partial months at both ends scan "Facture" rows;
+ * - overdue / due soon: FILTER aggregates over the open invoices of the range.
+ *
+ * Cost therefore depends on the number of months and open invoices, not on
+ * the total number of invoices of the société.
+ */
+
+import { prisma } from '@/lib/prisma';
+
+export interface InvoiceMetrics {
+    revenue: number;
+    counts: Record<string, number>;
+    amounts: Record<string, number>;
+    overdueAmount: number;
+    overdueCount: number;
+    dueSoonAmount: number;
+    dueSoonCount: number;
+}
+
+// CA = toutes les factures sauf Brouillon et Annulée (CA engagé)
+const EXCLUDED_FROM_REVENUE = ['Brouillon', 'Annulée'];
+const DUE_SOON_DAYS = 7;
+
+interface MetricsRow {
+    kind: 'statut' | 'open';
+    statut: string | null;
+    count: number;
+    amount: number;
+    overdue_count: number;
+    overdue_amount: number;
+    due_soon_count: number;
+    due_soon_amount: number;
+}
+
+/**
+ * Whole UTC months contained in [start, end]: [from, to) month starts.
+ * Returns an empty span (from === to) when the range holds no whole month.
+ */
+export function wholeMonthSpan(start: Date, end: Date): { from: Date, to: Date } {
+    const firstOfMonth = (year: number, month: number) => new Date(Date.UTC(year, month, 1));
+
+    const startMonth = firstOfMonth(start.getUTCFullYear(), start.getUTCMonth());
+    const from = startMonth.getTime() === start.getTime()
+        ? startMonth
+        : firstOfMonth(start.getUTCFullYear(), start.getUTCMonth() + 1);
+
+    // A month is whole if it ends before `end` (inclusive bound)
+    const afterEnd = new Date(end.getTime() + 1);
+    const to = firstOfMonth(afterEnd.getUTCFullYear(), afterEnd.getUTCMonth());
+
+    return from < to ? { from, to } : { from: start, to: start };
+}
+
+export async function aggregateInvoiceMetrics(societeId: string, start: Date, end: Date, now: Date = new Date()): Promise<InvoiceMetrics> {
+    const { from, to } = wholeMonthSpan(start, end);
+    const dueSoonLimit = new Date(now.getTime() + DUE_SOON_DAYS * 24 * 60 * 60 * 1000);
+
+    const rows = await prisma.$queryRaw<MetricsRow[]>`
+        WITH period AS (
+            SELECT "statut", "invoiceCount" AS cnt, "totalTTC" AS amount
+            FROM "InvoiceMonthlyRollup"
+            WHERE "societeId" = ${societeId}
+              AND "month" >= ${from} AND "month" < ${to}
+            UNION ALL
+            SELECT "statut", 1 AS cnt, "totalTTC" AS amount
+            FROM "Facture"
+            WHERE "societeId" = ${societeId}
+              AND "deletedAt" IS NULL
+              AND "dateEmission" >= ${start} AND "dateEmission" <= ${end}
+              AND NOT ("dateEmission" >= ${from} AND "dateEmission" < ${to})
+        )
+        SELECT 'statut' AS kind, "statut",
+               SUM(cnt)::int AS count, COALESCE(SUM(amount), 0)::float8 AS amount,
+               0 AS overdue_count, 0::float8 AS overdue_amount, 0 AS due_soon_count, 0::float8 AS due_soon_amount
+        FROM period
+        GROUP BY "statut"
+        UNION ALL
+        SELECT 'open' AS kind, NULL AS "statut", 0 AS count, 0::float8 AS amount,
+               (COUNT(*) FILTER (WHERE "dateEcheance" < ${now}))::int,
+               COALESCE(SUM("totalTTC") FILTER (WHERE "dateEcheance" < ${now}), 0)::float8,
+               (COUNT(*) FILTER (WHERE "dateEcheance" >= ${now}))::int,
+               COALESCE(SUM("totalTTC") FILTER (WHERE "dateEcheance" >= ${now}), 0)::float8
+        FROM "Facture"
+        WHERE "societeId" = ${societeId}
+          AND "deletedAt" IS NULL
+          AND "statut" NOT IN ('Payée', 'Annulée')
+          AND "dateEcheance" <= ${dueSoonLimit}
+          AND "dateEmission" >= ${start} AND "dateEmission" <= ${end}
+    `;
+
+    const metrics: InvoiceMetrics = {
+        revenue: 0,
+        counts: {},
+        amounts: {},
+        overdueAmount: 0,
+        overdueCount: 0,
+        dueSoonAmount: 0,
+        dueSoonCount: 0
+    };
+
+    for (const row of rows) {
+        if (row.kind === 'open') {
+            metrics.overdueCount = Number(row.overdue_count);
+            metrics.overdueAmount = Number(row.overdue_amount);
+            metrics.dueSoonCount = Number(row.due_soon_count);
+            metrics.dueSoonAmount = Number(row.due_soon_amount);
+        } else if (row.statut !== null) {
+            metrics.counts[row.statut] = Number(row.count);
+            metrics.amounts[row.statut] = Number(row.amount);
+            if (!EXCLUDED_FROM_REVENUE.includes(row.statut)) metrics.revenue += Number(row.amount);
+        }
+    }
+
+    return metrics;
+}
@@ -0,0 +1,157 @@
+/**
+ * 📑 Keyset pagination for invoice / quote / history listings
+ *
+ * Documents are ordered by (dateEmission, numero, id) descending, history by
+ * (timestamp, id) descending. The next page starts strictly after the last
+ * row of the previous one, so a page costs the same at row 50 and at row
+ * 50 000 (no OFFSET). The cursor is opaque to the client: the sort key of the
+ * last row, base64url encoded. The OR of the keyset comes with a redundant
+ * bound on the leading column, which PostgreSQL uses as the index range start
+ * (it cannot derive one from the OR alone).
+ *
+ * Search uses ILIKE (Prisma `contains` + insensitive) on numero and client nom
+ * (history: description and user name), backed by the pg_trgm GIN indexes of
+ * prisma/performance_indexes.sql.
+ */
+
+export interface ListingFilters {
+    statut?: string | string[];
+    clientId?: string;
+    from?: string; // dateEmission >= from (ISO)
+    to?: string;   // dateEmission <= to (ISO)
+    search?: string;
+}
+
+export interface ListingPage<T> {
+    items: T[];
+    nextCursor: string | null;
+}
+
+export const DEFAULT_PAGE_SIZE = 50;
+const MAX_PAGE_SIZE = 200;
+const MIN_SEARCH_LENGTH = 2;
+
+export function pageSize(limit?: number): number {
+    if (!limit || limit < 1) return DEFAULT_PAGE_SIZE;
+    return Math.min(Math.floor(limit), MAX_PAGE_SIZE);
+}
+
+export function encodeCursor(values: string[]): string {
+    return Buffer.from(JSON.stringify(values)).toString('base64url');
+}
+
+export function decodeCursor(cursor: string | null | undefined, length: number): string[] | null {
+    if (!cursor) return null;
+    try {
+        const values = JSON.parse(Buffer.from(cursor, 'base64url').toString('utf8'));
+        if (Array.isArray(values) && values.length === length && values.every(v => typeof v === 'string')) {
+            return values;
+        }
+    } catch { }
+    throw new Error("Curseur de pagination invalide");
+}
+
+export const DOCUMENT_PAGE_ORDER = [
+    { dateEmission: 'desc' as const },
+    { numero: 'desc' as const },
+    { id: 'desc' as const }
+];
+
+/**
+ * Rows strictly after the cursor in DOCUMENT_PAGE_ORDER
+ */
+export function documentKeysetWhere(cursor: string | null | undefined) {
+    const values = decodeCursor(cursor, 3);
+    if (!values) return {};
+
+    const [date, numero, id] = values;
+    const dateEmission = new Date(date);
+    return {
+        dateEmission: { lte: dateEmission },
+        OR: [
+            { dateEmission: { lt: dateEmission } },
+            { dateEmission, numero: { lt: numero } },
+            { dateEmission, numero, id: { lt: id } }
+        ]
+    };
+}
+
+export function documentCursor(row: { dateEmission: Date, numero: string, id: string }): string {
+    return encodeCursor([row.dateEmission.toISOString(), row.numero, row.id]);
+}
+
+export const HISTORY_PAGE_ORDER = [
+    { timestamp: 'desc' as const },
+    { id: 'desc' as const }
+];
+
+/**
+ * History entries strictly after the cursor in HISTORY_PAGE_ORDER
+ */
+export function historyKeysetWhere(cursor: string | null | undefined) {
+    const values = decodeCursor(cursor, 2);
+    if (!values) return {};
+
+    const timestamp = new Date(values[0]);
+    return {
+        timestamp: { lte: timestamp },
+        OR: [
+            { timestamp: { lt: timestamp } },
+            { timestamp, id: { lt: values[1] } }
+        ]
+    };
+}
+
+export function historyCursor(row: { timestamp: Date, id: string }): string {
+    return encodeCursor([row.timestamp.toISOString(), row.id]);
+}
+
+/**
+ * Listing filters of a facture / devis query. Archived documents are left out
+ * unless the status filter asks for them, like the unpaginated lists.
+ */
+export function documentFilterWhere(filters: ListingFilters, archivedStatus: string) {
+    const where: any[] = [];
+
+    const statuts = typeof filters.statut === 'string' ? [filters.statut] : filters.statut;
+    where.push(statuts && statuts.length > 0 ? { statut: { in: statuts } } : { statut: { not: archivedStatus } });
+
+    if (filters.clientId) where.push({ clientId: filters.clientId });
+    if (filters.from) where.push({ dateEmission: { gte: new Date(filters.from) } });
+    if (filters.to) where.push({ dateEmission: { lte: new Date(filters.to) } });
+
+    const search = filters.search?.trim();
+    if (search && search.length >= MIN_SEARCH_LENGTH) {
+        where.push({
+            OR: [
+                { numero: { contains: search, mode: 'insensitive' } },
+                { client: { nom: { contains: search, mode: 'insensitive' } } }
+            ]
+        });
+    }
+
+    return where;
+}
+
+export function historySearchWhere(search: string | undefined) {
+    const term = search?.trim();
+    if (!term || term.length < MIN_SEARCH_LENGTH) return {};
+    return {
+        OR: [
+            { description: { contains: term, mode: 'insensitive' as const } },
+            { user: { fullName: { contains: term, mode: 'insensitive' as const } } }
+        ]
+    };
+}
+
+/**
+ * Split a `take: size + 1` result into the page and the cursor of the next one
+ */
+export function toPage<R, T>(rows: R[], size: number, cursorOf: (row: R) => string, map: (row: R) => T): ListingPage<T> {
+    const hasMore = rows.length > size;
+    const pageRows = hasMore ? rows.slice(0, size) : rows;
+    return {
+        items: pageRows.map(map),
+        nextCursor: hasMore ? cursorOf(pageRows[pageRows.length - 1]) : null
+    };
+}
@@ -0,0 +1,140 @@
+/**
+ * 🧾 Line items (FactureItem / DevisItem)
+ *
+ * Document lines are read from the item relations with a fixed column
+ * projection instead of decoding "itemsJSON" on every read:
+ * - LINE_ITEMS_RELATION goes in the `select` of the facture/devis query;
+ * - fromItemRow maps a row to the LigneItem shape used by the UI;
+ * - toItemRows builds the rows written on create/update.
+ *
+ * itemsJSON is still written alongside (double write) and is only decoded for
+ * documents not backfilled by scripts/migrate-json-to-relations.ts: no item
+ * rows, or rows written before the position / date / type columns existed
+ * (flagged backfilled = false by their migration, listed in arbitrary order).
+ *
+ * Only type imports from "@/": the backfill script imports this file directly.
+ */
+
+import type { LigneItem } from '@/types';
+
+export const LINE_ITEM_SELECT = {
+    id: true,
+    produitId: true,
+    description: true,
+    quantite: true,
+    prixUnitaire: true,
+    tva: true,
+    remise: true,
+    remiseType: true,
+    montantHT: true,
+    date: true,
+    type: true,
+    backfilled: true
+} as const;
+
+export const LINE_ITEMS_RELATION = {
+    select: LINE_ITEM_SELECT,
+    orderBy: { position: 'asc' as const }
+};
+
+export interface LineItemRow {
+    id: string;
+    produitId: string | null;
+    description: string;
+    quantite: number;
+    prixUnitaire: number;
+    tva: number;
+    remise: number | null;
+    remiseType: string | null;
+    montantHT: number;
+    date: string | null;
+    type: string | null;
+    backfilled: boolean;
+}
+
+/**
+ * JSON.parse that also undoes double-encoded values (stored as a JSON string
+ * of a JSON string) and falls back on empty / invalid input.
+ */
+export function decodeJSON<T>(value: string | null | undefined, fallback: T): T {
+    if (!value) return fallback;
+    try {
+        let parsed = JSON.parse(value);
+        if (typeof parsed === 'string') parsed = JSON.parse(parsed);
+        return (parsed ?? fallback) as T;
+    } catch {
+        return fallback;
+    }
+}
+
+export function fromItemRow(row: LineItemRow): LigneItem {
+    return {
+        id: row.id,
+        description: row.description,
+        quantite: row.quantite,
+        prixUnitaire: row.prixUnitaire,
+        tva: row.tva,
+        remise: row.remise ?? 0,
+        remiseType: (row.remiseType ?? 'pourcentage') as LigneItem['remiseType'],
+        produitId: row.produitId ?? undefined,
+        type: row.type ?? undefined,
+        date: row.date ?? undefined,
+        totalLigne: row.montantHT
+    };
+}
+
+/**
+ * Rows for `items.create` / `createMany` from the items sent by the editor
+ * (or decoded from itemsJSON). The array index becomes the line position.
+ */
+export function toItemRows(items: any[]) {
+    return items.map((item: any, index: number) => ({
+        produitId: item.produitId || undefined,
+        description: item.nom || item.description || "Article",
+        quantite: Number(item.quantite) || 0,
+        prixUnitaire: Number(item.prixUnitaire) || 0,
+        tva: Number(item.tva) || 0,
+        remise: Number(item.remise) || 0,
+        remiseType: item.remiseType || 'pourcentage',
+        montantHT: Number(item.montantHT || item.totalLigne) || 0,
+        position: index,
+        date: item.date ? String(item.date) : null,
+        type: item.type ? String(item.type) : null
+    }));
+}
+
+/**
+ * True when the item rows of a document can be read instead of its itemsJSON
+ */
+export function hasBackfilledItems(rows: { backfilled: boolean }[]): boolean {
+    return rows.length > 0 && rows.every(row => row.backfilled);
+}
+
+/**
+ * Items of a list of documents selected with LINE_ITEMS_RELATION.
+ * Documents not backfilled fall back on their itemsJSON, read with ONE
+ * extra query (only the itemsJSON column, only for those ids).
+ */
+export async function resolveLineItems(
+    docs: { id: string, items: LineItemRow[] }[],
+    loadLegacyJSON: (ids: string[]) => Promise<{ id: string, itemsJSON: string | null }[]>
+): Promise<Map<string, LigneItem[]>> {
+    const result = new Map<string, LigneItem[]>();
+    const legacyIds: string[] = [];
+
+    for (const doc of docs) {
+        // Unflagged rows stay the answer when itemsJSON has nothing better
+        result.set(doc.id, doc.items.map(fromItemRow));
+        if (!hasBackfilledItems(doc.items)) legacyIds.push(doc.id);
+    }
+
+    if (legacyIds.length > 0) {
+        const legacy = await loadLegacyJSON(legacyIds);
+        for (const row of legacy) {
+            const items = decodeJSON<LigneItem[]>(row.itemsJSON, []);
+            if (Array.isArray(items) && items.length > 0) result.set(row.id, items);
+        }
+    }
+
+    return result;
+}
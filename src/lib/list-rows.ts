@@ -0,0 +1,143 @@
+/**
+ * 📋 List rows loaded by the DataProvider
+ *
+ * Projection + mapping of the clients, products, invoices and quotes held in
+ * the client state. Shared by the full loads (fetchClients, fetchProducts,
+ * fetchDashboardData) and the delta sync (lib/delta-sync.ts), so a row looks
+ * the same whichever way it reached the browser.
+ */
+
+import type { Client, Produit, LigneItem } from '@/types';
+import { LINE_ITEMS_RELATION, decodeJSON } from '@/lib/line-items';
+
+// Statuses left out of the dashboard lists (still reachable from the archive)
+export const ARCHIVED_INVOICE_STATUS = 'Archivée';
+export const ARCHIVED_QUOTE_STATUS = 'Archivé';
+
+export const CLIENT_LIST_INCLUDE = {
+    factures: {
+        where: { deletedAt: null, statut: { not: 'Annulée' as any } },
+        select: { totalTTC: true }
+    }
+};
+
+export function toListClient(c: any): Client {
+    return {
+        id: c.id,
+        societeId: c.societeId,
+        nom: c.nom,
+        email: c.email || undefined,
+        telephone: c.telephone || undefined,
+        adresse: c.adresse || undefined,
+        ville: c.ville || undefined,
+        codePostal: c.codePostal || undefined,
+        pays: c.pays || undefined,
+        siret: c.siret || undefined,
+        tvaIntra: c.tvaIntra || undefined,
+        totalPurchases: c.factures.reduce((sum: number, f: any) => sum + (f.totalTTC || 0), 0)
+    };
+}
+
+export const PRODUCT_LIST_INCLUDE = {
+    factureItems: {
+        where: {
+            facture: {
+                deletedAt: null,
+                statut: { in: ['Payée', 'Envoyée', 'Téléchargée', 'Retard', 'Archivée'] }
+            }
+        },
+        select: { quantite: true }
+    }
+};
+
+export function toListProduct(p: any): Produit {
+    return {
+        id: p.id,
+        societeId: p.societeId,
+        nom: p.nom,
+        description: p.description || "",
+        prixUnitaire: p.prixUnitaire,
+        tva: p.tva,
+        soldCount: p.factureItems.reduce((sum: number, item: any) => sum + (item.quantite || 0), 0)
+    };
+}
+
+export const INVOICE_LIST_SELECT = {
+    id: true,
+    numero: true,
+    clientId: true,
+    societeId: true,
+    dateEmission: true,
+    dateEcheance: true,
+    datePaiement: true,
+    statut: true,
+    totalHT: true,
+    totalTTC: true,
+    createdAt: true,
+    updatedAt: true,
+    client: {
+        select: { nom: true }
+    },
+    items: LINE_ITEMS_RELATION,
+    config: true,
+    isLocked: true
+} as const;
+
+export function toListInvoice(inv: any, items: LigneItem[]) {
+    return {
+        id: inv.id,
+        numero: inv.numero,
+        clientId: inv.clientId,
+        societeId: inv.societeId,
+        dateEmission: inv.dateEmission.toISOString(),
+        echeance: inv.dateEcheance ? inv.dateEcheance.toISOString() : "",
+        statut: inv.statut,
+        isLocked: inv.isLocked,
+        totalHT: inv.totalHT,
+        totalTTC: inv.totalTTC,
+        datePaiement: inv.datePaiement ? inv.datePaiement.toISOString() : undefined,
+        type: "Facture" as const,
+        items,
+        emails: [],
+        config: decodeJSON(inv.config, {})
+    };
+}
+
+export const QUOTE_LIST_SELECT = {
+    id: true,
+    numero: true,
+    clientId: true,
+    societeId: true,
+    dateEmission: true,
+    dateValidite: true,
+    statut: true,
+    totalHT: true,
+    totalTTC: true,
+    createdAt: true,
+    updatedAt: true,
+    client: {
+        select: { nom: true }
+    },
+    items: LINE_ITEMS_RELATION,
+    config: true,
+    isLocked: true
+} as const;
+
+export function toListQuote(q: any, items: LigneItem[]) {
+    return {
+        id: q.id,
+        numero: q.numero,
+        clientId: q.clientId,
+        societeId: q.societeId,
+        dateEmission: q.dateEmission.toISOString(),
+        dateValidite: q.dateValidite ? q.dateValidite.toISOString() : "",
+        statut: q.statut,
+        isLocked: q.isLocked,
+        totalHT: q.totalHT,
+        totalTTC: q.totalTTC,
+        type: "Devis" as const,
+        items,
+        emails: [],
+        config: decodeJSON(q.config, {})
+    };
+}
@@ -0,0 +1,136 @@
+/**
+ * 🔎 Lookup cache for the external APIs (company search, IBAN bank details)
+ *
+ * The same SIREN / bank codes are searched over and over (typing pauses in
+ * the client editor, onboarding, bank forms); each miss used to cost a
+ * round-trip to a third-party API with no timeout. Two layers in front of it:
+ * - process-level LRU, checked first;
+ * - "LookupCache" table, shared by all instances and surviving restarts.
+ *
+ * Concurrent lookups of the same key share one upstream call. A `null`
+ * result ("nothing found") is cached too, with a shorter TTL. When the
+ * upstream call fails (error, timeout), an expired entry is served if there
+ * is one; failures themselves are never cached.
+ */
+
+import { prisma } from '@/lib/prisma';
+import { LRUCache } from '@/lib/lru-cache';
+
+const MAX_ENTRIES = 2000;
+// Expired entries are kept this long as a fallback for upstream failures
+const STALE_MS = 7 * 24 * 60 * 60 * 1000;
+const SWEEP_PROBABILITY = 0.01;
+
+export interface LookupOptions {
+    ttlMs: number;
+    negativeTtlMs: number;
+}
+
+interface CachedLookup {
+    value: unknown;
+    found: boolean;
+    expiresAt: number;
+}
+
+const globalForLookupCache = globalThis as unknown as {
+    lookupEntries: LRUCache<string, CachedLookup> | undefined;
+    lookupsInFlight: Map<string, Promise<unknown>> | undefined;
+};
+
+const entries = globalForLookupCache.lookupEntries ?? new LRUCache<string, CachedLookup>(MAX_ENTRIES, STALE_MS);
+const inFlight = globalForLookupCache.lookupsInFlight ?? new Map<string, Promise<unknown>>();
+
+if (process.env.NODE_ENV !== 'production') {
+    globalForLookupCache.lookupEntries = entries;
+    globalForLookupCache.lookupsInFlight = inFlight;
+}
+
+async function readStored(namespace: string, key: string): Promise<CachedLookup | null> {
+    try {
+        const row = await prisma.lookupCache.findUnique({ where: { namespace_key: { namespace, key } } });
+        if (!row) return null;
+        return {
+            value: row.value === null ? null : JSON.parse(row.value),
+            found: row.found,
+            expiresAt: row.expiresAt.getTime()
+        };
+    } catch (error) {
+        console.error('[LOOKUP_CACHE] Read failed', error);
+        return null;
+    }
+}
+
+async function store(namespace: string, key: string, entry: CachedLookup) {
+    const data = {
+        value: entry.found ? JSON.stringify(entry.value) : null,
+        found: entry.found,
+        expiresAt: new Date(entry.expiresAt)
+    };
+    try {
+        await prisma.lookupCache.upsert({
+            where: { namespace_key: { namespace, key } },
+            create: { namespace, key, ...data },
+            update: data
+        });
+    } catch (error) {
+        // The lookup itself succeeded: only the shared layer is missed
+        console.error('[LOOKUP_CACHE] Write failed', error);
+    }
+
+    if (Math.random() < SWEEP_PROBABILITY) {
+        prisma.lookupCache.deleteMany({ where: { expiresAt: { lt: new Date(Date.now() - STALE_MS) } } })
+            .catch(e => console.error('[LOOKUP_CACHE] Sweep failed', e));
+    }
+}
+
+async function resolve<T>(namespace: string, key: string, fetcher: () => Promise<T | null>, options: LookupOptions, stale: CachedLookup | undefined): Promise<T | null> {
+    const cacheKey = `${namespace}:${key}`;
+
+    const stored = await readStored(namespace, key);
+    if (stored && stored.expiresAt > Date.now()) {
+        entries.set(cacheKey, stored);
+        return stored.value as T | null;
+    }
+    const fallback = stored ?? stale;
+
+    let value: T | null;
+    try {
+        value = await fetcher();
+    } catch (error) {
+        if (fallback) {
+            console.warn(`[LOOKUP_CACHE] ${namespace} unavailable, serving an expired entry`, error);
+            return fallback.value as T | null;
+        }
+        throw error;
+    }
+
+    const found = value !== null;
+    const entry: CachedLookup = {
+        value,
+        found,
+        expiresAt: Date.now() + (found ? options.ttlMs : options.negativeTtlMs)
+    };
+    entries.set(cacheKey, entry);
+    await store(namespace, key, entry);
+    return value;
+}
+
+/**
+ * Cached result of `fetcher` for (namespace, key)
+ * @param fetcher - Upstream call: resolves to null when nothing is found,
+ * throws when the upstream is unavailable
+ */
+export async function cachedLookup<T>(namespace: string, key: string, fetcher: () => Promise<T | null>, options: LookupOptions): Promise<T | null> {
+    const cacheKey = `${namespace}:${key}`;
+
+    const cached = entries.get(cacheKey);
+    if (cached && cached.expiresAt > Date.now()) return cached.value as T | null;
+
+    const pending = inFlight.get(cacheKey);
+    if (pending) return pending as Promise<T | null>;
+
+    const lookup = resolve(namespace, key, fetcher, options, cached)
+        .finally(() => inFlight.delete(cacheKey));
+    inFlight.set(cacheKey, lookup);
+    return lookup;
+}
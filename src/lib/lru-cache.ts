@@ -0,0 +1,69 @@
+/**
+ * Small in-process LRU cache with per-entry TTL
+ * Map iteration order is insertion order: re-inserting on read keeps the
+ * most recently used entries at the end, the oldest one is evicted first.
+ */
+
+interface CacheEntry<V> {
+    value: V;
+    expiresAt: number;
+}
+
+export class LRUCache<K, V> {
+    private entries = new Map<K, CacheEntry<V>>();
+
+    /**
+     * @param maxEntries - Entries kept before the least recently used one is evicted
+     * @param ttlMs - Lifetime of an entry in milliseconds
+     */
+    constructor(
+        private readonly maxEntries: number,
+        private readonly ttlMs: number
+    ) { }
+
+    get(key: K): V | undefined {
+        const entry = this.entries.get(key);
+        if (!entry) return undefined;
+
+        if (Date.now() > entry.expiresAt) {
+            this.entries.delete(key);
+            return undefined;
+        }
+
+        // Refresh recency
+        this.entries.delete(key);
+        this.entries.set(key, entry);
+        return entry.value;
+    }
+
+    set(key: K, value: V, ttlMs: number = this.ttlMs): void {
+        this.entries.delete(key);
+        this.entries.set(key, { value, expiresAt: Date.now() + ttlMs });
+
+        while (this.entries.size > this.maxEntries) {
+            const oldest = this.entries.keys().next().value as K;
+            this.entries.delete(oldest);
+        }
+    }
+
+    delete(key: K): void {
+        this.entries.delete(key);
+    }
+
+    /**
+     * Delete every entry matching the predicate (e.g. all keys of a société)
+     */
+    deleteWhere(predicate: (key: K, value: V) => boolean): void {
+        for (const [key, entry] of Array.from(this.entries.entries())) {
+            if (predicate(key, entry.value)) this.entries.delete(key);
+        }
+    }
+
+    clear(): void {
+        this.entries.clear();
+    }
+
+    get size(): number {
+        return this.entries.size;
+    }
+}
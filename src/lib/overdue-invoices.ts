@@ -0,0 +1,172 @@
+/**
+ * ⏰ Overdue invoice engine
+ *
+ * Run by /api/cron/update-overdue-invoices instead of an updateMany over the
+ * user's sociétés on every app load:
+ * - only invoices whose dateEcheance passed since the last run are read
+ *   ("JobWatermark"), through the ("statut", "dateEcheance") index, plus
+ *   open invoices written since then with a due date already behind the
+ *   watermark (created, imported, edited or reopened late);
+ * - they are switched to "Retard" in batches (FOR UPDATE SKIP LOCKED), so
+ *   runs are bounded and two runs never update the same row;
+ * - each transition is written to the history of its société, and only the
+ *   invoice pages concerned are revalidated. updatedAt is bumped, so the
+ *   delta sync (lib/delta-sync.ts) brings the new status to open clients.
+ *
+ * The watermark only moves once every due invoice has been processed: a run
+ * stopped by MAX_BATCHES is resumed by the next one. A `full` run ignores the
+ * watermark (weekly, see vercel.json, as a safety net); it still only reads
+ * open invoices through the index.
+ */
+
+import { MembershipRole, Prisma } from '@prisma/client';
+import { revalidatePath } from 'next/cache';
+import { prisma } from '@/lib/prisma';
+import { flushAudit, recordAudit } from '@/lib/audit-log';
+
+const JOB_NAME = 'overdue-invoices';
+const BATCH_SIZE = 500;
+const MAX_BATCHES = 40;
+// Invoice pages revalidated one by one below this count, as a route above it
+const MAX_REVALIDATED_PAGES = 50;
+
+// Statuses that become "Retard" once the due date has passed
+export const OPEN_INVOICE_STATUSES = ['Brouillon', 'Envoyée', 'Téléchargée'];
+export const OVERDUE_INVOICE_STATUS = 'Retard';
+
+interface OverdueRow {
+    id: string;
+    societeId: string;
+    numero: string;
+    dateEcheance: Date;
+    previousStatut: string;
+}
+
+export interface OverdueRunSummary {
+    updated: number;
+    batches: number;
+    societes: number;
+    from: Date;
+    watermark: Date;
+    complete: boolean;
+}
+
+async function readWatermark(): Promise<Date | null> {
+    const job = await prisma.jobWatermark.findUnique({ where: { name: JOB_NAME }, select: { watermark: true } });
+    return job?.watermark ?? null;
+}
+
+// Never moves backwards (a slower concurrent run finishing last)
+async function advanceWatermark(watermark: Date) {
+    await prisma.$executeRaw`
+        INSERT INTO "JobWatermark" ("name", "watermark", "updatedAt")
+        VALUES (${JOB_NAME}, ${watermark}, NOW())
+        ON CONFLICT ("name") DO UPDATE
+        SET "watermark" = GREATEST("JobWatermark"."watermark", EXCLUDED."watermark"), "updatedAt" = NOW()
+    `;
+}
+
+async function markBatchOverdue(from: Date, now: Date): Promise<OverdueRow[]> {
+    return prisma.$queryRaw<OverdueRow[]>`
+        WITH due AS (
+            SELECT "id", "statut"
+            FROM "Facture"
+            WHERE "statut" IN (${Prisma.join(OPEN_INVOICE_STATUSES)})
+              AND "dateEcheance" < ${now}
+              AND ("dateEcheance" >= ${from} OR "updatedAt" >= ${from})
+              AND "deletedAt" IS NULL
+              AND "archivedAt" IS NULL
+            ORDER BY "dateEcheance"
+            LIMIT ${BATCH_SIZE}
+            FOR UPDATE SKIP LOCKED
+        )
+        UPDATE "Facture" f
+        SET "statut" = ${OVERDUE_INVOICE_STATUS}, "updatedAt" = ${now}
+        FROM due
+        WHERE f."id" = due."id"
+        RETURNING f."id", f."societeId", f."numero", f."dateEcheance", due."statut" AS "previousStatut"
+    `;
+}
+
+/**
+ * History entries are attributed to the owner of each société (the job has
+ * no user); sociétés without an owner get no entry
+ */
+async function recordTransitions(rows: OverdueRow[]) {
+    const societeIds = [...new Set(rows.map(r => r.societeId))];
+    const owners = await prisma.membership.findMany({
+        where: { societeId: { in: societeIds }, role: MembershipRole.OWNER },
+        select: { societeId: true, userId: true },
+        orderBy: { createdAt: 'asc' }
+    });
+    const ownerOf = new Map<string, string>();
+    for (const owner of owners) {
+        if (!ownerOf.has(owner.societeId)) ownerOf.set(owner.societeId, owner.userId);
+    }
+
+    recordAudit(rows
+        .filter(row => ownerOf.has(row.societeId))
+        .map(row => ({
+            userId: ownerOf.get(row.societeId)!,
+            societeId: row.societeId,
+            action: 'update',
+            entityType: 'facture',
+            entityId: row.id,
+            description: `Facture ${row.numero} passée en retard (${row.previousStatut} → ${OVERDUE_INVOICE_STATUS}, échéance du ${row.dateEcheance.toLocaleDateString('fr-FR')})`
+        })));
+}
+
+function revalidateInvoices(ids: string[]) {
+    try {
+        revalidatePath('/', 'page');
+        revalidatePath('/factures', 'page');
+        if (ids.length > MAX_REVALIDATED_PAGES) {
+            revalidatePath('/factures/[id]', 'page');
+        } else {
+            ids.forEach(id => revalidatePath(`/factures/${id}`, 'page'));
+        }
+    } catch {
+        // Outside of a request (scripts): no page cache to invalidate
+    }
+}
+
+/**
+ * Switches the invoices that became overdue to "Retard"
+ */
+export async function processOverdueInvoices(now: Date = new Date(), options: { full?: boolean } = {}): Promise<OverdueRunSummary> {
+    const from = (!options.full && await readWatermark()) || new Date(0);
+    const updatedIds: string[] = [];
+    const societes = new Set<string>();
+    let batches = 0;
+    let complete = false;
+
+    while (batches < MAX_BATCHES) {
+        const rows = await markBatchOverdue(from, now);
+        batches++;
+
+        if (rows.length > 0) {
+            await recordTransitions(rows);
+            rows.forEach(row => {
+                updatedIds.push(row.id);
+                societes.add(row.societeId);
+            });
+        }
+        if (rows.length < BATCH_SIZE) {
+            complete = true;
+            break;
+        }
+    }
+
+    await flushAudit();
+    if (complete) await advanceWatermark(now);
+    if (updatedIds.length > 0) revalidateInvoices(updatedIds);
+
+    return {
+        updated: updatedIds.length,
+        batches,
+        societes: societes.size,
+        from,
+        watermark: complete ? now : from,
+        complete
+    };
+}
@@ -0,0 +1,220 @@
+/**
+ * 🖨️ Server-side PDF rendering (api/pdf routes)
+ *
+ * Same layout as the browser (renderInvoicePDF from pdf-generator.ts), with the
+ * société assets prepared once and cached per société + version:
+ * - logo decoded from its data URL / uploaded file, flattened to JPEG and measured once;
+ * - static blocks (société name, CGV) split into lines once per font/width.
+ * The cache key includes Societe.updatedAt and PDF_TEMPLATE_VERSION, so a new
+ * logo or a layout change never reuses stale assets.
+ */
+
+import path from 'path';
+import { readFile, stat } from 'fs/promises';
+import sharp from 'sharp';
+import type { jsPDF } from 'jspdf';
+import { Prisma } from '@prisma/client';
+import { prisma } from '@/lib/prisma';
+import { LRUCache } from '@/lib/lru-cache';
+import { LINE_ITEMS_RELATION, decodeJSON, resolveLineItems } from '@/lib/line-items';
+import { PDF_TEMPLATE_VERSION, PdfAssets, renderInvoicePDF } from '@/lib/pdf-generator';
+import type { Client, Devis, Facture, Societe } from '@/types';
+
+export type PdfDocumentType = 'factures' | 'devis';
+
+const ASSET_TTL_MS = 30 * 60 * 1000;
+const MAX_SOCIETES = 100;
+
+const globalForPdfAssets = globalThis as unknown as {
+    pdfAssets: LRUCache<string, Promise<PdfAssets>> | undefined;
+};
+
+const assetCache = globalForPdfAssets.pdfAssets ?? new LRUCache<string, Promise<PdfAssets>>(MAX_SOCIETES, ASSET_TTL_MS);
+
+if (process.env.NODE_ENV !== 'production') {
+    globalForPdfAssets.pdfAssets = assetCache;
+}
+
+// Larger logos are not worth decoding for a PDF header
+const MAX_LOGO_BYTES = 5 * 1024 * 1024;
+
+/**
+ * Logo bytes from a data URL or an uploaded file (public/uploads). Remote
+ * URLs are never fetched: logoUrl is user input and the request would be
+ * sent from the server
+ */
+async function readLogo(logoUrl: string): Promise<Buffer> {
+    if (logoUrl.startsWith('data:')) {
+        const data = Buffer.from(logoUrl.slice(logoUrl.indexOf(',') + 1), 'base64');
+        if (data.length > MAX_LOGO_BYTES) throw new Error("Logo trop volumineux");
+        return data;
+    }
+    if (logoUrl.startsWith('/uploads/')) {
+        // Uploaded files (/uploads/logos/...) are served from public/
+        const uploadsDir = path.join(process.cwd(), 'public', 'uploads');
+        const file = path.join(process.cwd(), 'public', path.normalize(decodeURIComponent(logoUrl.split(/[?#]/)[0])));
+        if (!file.startsWith(uploadsDir + path.sep)) throw new Error("Chemin de logo invalide");
+        if ((await stat(file)).size > MAX_LOGO_BYTES) throw new Error("Logo trop volumineux");
+        return readFile(file);
+    }
+    throw new Error("Logo non pris en charge (data: ou /uploads/ uniquement)");
+}
+
+async function decodeLogo(logoUrl: string | null): Promise<PdfAssets['logo']> {
+    if (!logoUrl) return null;
+    try {
+        // JPEG on white: what the browser renderer embeds (transparent PNGs included)
+        const { data, info } = await sharp(await readLogo(logoUrl))
+            .flatten({ background: '#ffffff' })
+            .jpeg({ quality: 90 })
+            .toBuffer({ resolveWithObject: true });
+        return { data: new Uint8Array(data), format: 'JPEG', width: info.width, height: info.height };
+    } catch (e) {
+        console.error("[PDF] Logo decoding failed, rendering without logo", e);
+        return null;
+    }
+}
+
+function memoizedSplit(): PdfAssets['splitStatic'] {
+    const lines = new Map<string, string[]>();
+    return (doc: jsPDF, text: string, width: number) => {
+        const font = doc.getFont();
+        const key = `${font.fontName}|${font.fontStyle}|${doc.getFontSize()}|${width}|${text}`;
+        let split = lines.get(key);
+        if (!split) {
+            split = doc.splitTextToSize(text, width) as string[];
+            lines.set(key, split);
+        }
+        return split;
+    };
+}
+
+export function getPdfAssets(societe: { id: string, updatedAt: Date, logoUrl: string | null }): Promise<PdfAssets> {
+    const key = `${societe.id}:${societe.updatedAt.getTime()}:v${PDF_TEMPLATE_VERSION}`;
+    let assets = assetCache.get(key);
+    if (!assets) {
+        assets = decodeLogo(societe.logoUrl).then(logo => ({ logo, splitStatic: memoizedSplit() }));
+        assetCache.set(key, assets);
+    }
+    return assets;
+}
+
+export async function loadPdfSociete(societeId: string) {
+    return prisma.societe.findUnique({ where: { id: societeId } });
+}
+
+const documentColumns = {
+    id: true,
+    numero: true,
+    clientId: true,
+    societeId: true,
+    dateEmission: true,
+    statut: true,
+    totalHT: true,
+    totalTTC: true,
+    conditions: true,
+    notes: true,
+    config: true,
+    updatedAt: true,
+    client: true,
+    items: LINE_ITEMS_RELATION
+} as const;
+
+export interface PdfSource {
+    document: Facture | Devis;
+    client: Client;
+    updatedAt: Date;
+}
+
+/**
+ * Documents ready to render, in keyset pages of (dateEmission, id).
+ * Lines come from the item relations (itemsJSON only for non-backfilled rows).
+ */
+export async function loadPdfSources(
+    type: PdfDocumentType,
+    where: { societeId: string, ids?: string[], from?: Date, to?: Date },
+    page: { take: number, after?: { dateEmission: Date, id: string } }
+): Promise<PdfSource[]> {
+    const filters = {
+        societeId: where.societeId,
+        deletedAt: null,
+        ...(where.ids ? { id: { in: where.ids } } : {}),
+        ...(where.from && where.to ? { dateEmission: { gte: where.from, lt: where.to } } : {}),
+        ...(page.after ? {
+            // Redundant bound first: the index range start of the keyset (lib/keyset.ts)
+            AND: [
+                { dateEmission: { gte: page.after.dateEmission } },
+                {
+                    OR: [
+                        { dateEmission: { gt: page.after.dateEmission } },
+                        { dateEmission: page.after.dateEmission, id: { gt: page.after.id } }
+                    ]
+                }
+            ]
+        } : {})
+    };
+    const orderBy = [{ dateEmission: 'asc' as const }, { id: 'asc' as const }];
+
+    if (type === 'factures') {
+        const rows = await prisma.facture.findMany({
+            where: filters as Prisma.FactureWhereInput,
+            select: { ...documentColumns, dateEcheance: true },
+            orderBy,
+            take: page.take
+        });
+        const items = await resolveLineItems(rows, ids => prisma.facture.findMany({
+            where: { id: { in: ids } },
+            select: { id: true, itemsJSON: true }
+        }));
+        return rows.map(row => ({
+            document: {
+                ...row,
+                type: "Facture",
+                dateEmission: row.dateEmission.toISOString(),
+                echeance: row.dateEcheance ? row.dateEcheance.toISOString() : "",
+                items: items.get(row.id) || [],
+                emails: [],
+                config: decodeJSON(row.config, {}),
+                conditions: row.conditions || undefined,
+                notes: row.notes || undefined
+            } as unknown as Facture,
+            client: row.client as unknown as Client,
+            updatedAt: row.updatedAt
+        }));
+    }
+
+    const rows = await prisma.devis.findMany({
+        where: filters as Prisma.DevisWhereInput,
+        select: { ...documentColumns, dateValidite: true },
+        orderBy,
+        take: page.take
+    });
+    const items = await resolveLineItems(rows, ids => prisma.devis.findMany({
+        where: { id: { in: ids } },
+        select: { id: true, itemsJSON: true }
+    }));
+    return rows.map(row => ({
+        document: {
+            ...row,
+            type: "Devis",
+            dateEmission: row.dateEmission.toISOString(),
+            dateValidite: row.dateValidite ? row.dateValidite.toISOString() : "",
+            items: items.get(row.id) || [],
+            emails: [],
+            config: decodeJSON(row.config, {}),
+            conditions: row.conditions || undefined,
+            notes: row.notes || undefined
+        } as unknown as Devis,
+        client: row.client as unknown as Client,
+        updatedAt: row.updatedAt
+    }));
+}
+
+export function pdfFilename(type: PdfDocumentType, numero: string): string {
+    // Same name as the browser download (generateInvoicePDF), without path separators
+    return `${type === 'factures' ? 'FACTURE' : 'DEVIS'}_${numero.replace(/[\\/:*?"<>|]/g, '-')}.pdf`;
+}
+
+export function renderPdfSource(source: PdfSource, societe: Societe, assets: PdfAssets): Uint8Array {
+    return new Uint8Array(renderInvoicePDF(source.document, societe, source.client, assets));
+}
@@ -1,18 +1,55 @@
+import { appendFileSync } from 'fs';
+import { performance } from 'perf_hooks';
 import { PrismaClient } from '@prisma/client';
+import { recordQuery } from '@/lib/tracing';
 
 const globalForPrisma = globalThis as unknown as {
-    prisma: PrismaClient | undefined;
+    prisma: ReturnType<typeof createPrismaClient> | undefined;
 };
 
-export const prisma =
-    globalForPrisma.prisma ??
-    new PrismaClient({
-        log: process.env.NODE_ENV === 'development'
-            ? ['error', 'warn']
-            : ['error'], // [AUDIT] Reverted to safe defaults
+// PRISMA_QUERY_LOG=<file>: append every SQL statement (+ params, duration) as
+// JSON lines, for scripts/explain_queries.py. Diagnostic runs only.
+const QUERY_LOG_FILE = process.env.PRISMA_QUERY_LOG;
+
+function createPrismaClient() {
+    const client = new PrismaClient({
+        log: [
+            ...(QUERY_LOG_FILE ? [{ emit: 'event' as const, level: 'query' as const }] : []),
+            ...(process.env.NODE_ENV === 'development'
+                ? (['error', 'warn'] as const)
+                : (['error'] as const)) // [AUDIT] Reverted to safe defaults
+        ],
         // Optionnel: configurer ici si .env ne suffit pas
     });
 
+    if (QUERY_LOG_FILE) {
+        (client as any).$on('query', (e: { query: string, params: string, duration: number, timestamp: Date }) => {
+            appendFileSync(QUERY_LOG_FILE, JSON.stringify({
+                query: e.query,
+                params: e.params,
+                durationMs: e.duration,
+                at: e.timestamp
+            }) + '\n');
+        });
+    }
+
+    // Query count and DB time of the traced server action running this query
+    return client.$extends({
+        query: {
+            async $allOperations({ args, query }) {
+                const start = performance.now();
+                try {
+                    return await query(args);
+                } finally {
+                    recordQuery(performance.now() - start);
+                }
+            }
+        }
+    });
+}
+
+export const prisma = globalForPrisma.prisma ?? createPrismaClient();
+
 if (process.env.NODE_ENV !== 'production') {
     globalForPrisma.prisma = prisma;
 }
@@ -20,4 +57,3 @@ if (process.env.NODE_ENV !== 'production') {
 // Cleanup automatique des connexions (pour éviter les zombies)
 
 // Cleanup logic removed to prevent MaxListenersExceededWarning in dev
-
@@ -1,14 +1,186 @@
 /**
- * Simple in-memory rate limiter
- * In production, use Redis or a proper rate limiting service
+ * Rate limiter with a shared store (sliding window counter)
+ *
+ * Each key keeps the hit count of the current fixed window and of the one
+ * before; a hit is allowed while
+ *   previous * (share of the previous window still covered) + current < max.
+ * This smooths the burst a fixed window allows at its boundary, with two
+ * integers per key.
+ *
+ * Counters live in the RateLimitBucket table so the limit holds across
+ * serverless instances and cold starts. One upsert checks and counts several
+ * keys at once (e.g. IP + email on login). Refused hits are not counted.
+ * Expiry is lazy: a stale row is rolled over by the next hit on its key, and
+ * leftover rows are swept now and then by the request that checks them.
  */
 
-interface RateLimitRecord {
-    count: number;
-    resetAt: number;
+import { Prisma } from '@prisma/client';
+import { prisma } from '@/lib/prisma';
+
+export interface RateLimitRule {
+    key: string;
+    max: number;
+    windowMs: number;
+}
+
+export interface RateLimitStore {
+    /**
+     * Count one hit on every key that is within its limit
+     * @returns the keys that were allowed
+     */
+    hit(rules: RateLimitRule[], now: number): Promise<Set<string>>;
+    clear(key: string): Promise<void>;
+}
+
+const SWEEP_PROBABILITY = 0.01;
+
+function windowStartOf(now: number, windowMs: number): number {
+    return Math.floor(now / windowMs) * windowMs;
+}
+
+// Old row values rolled to the window of EXCLUDED (the incoming hit)
+const ROLLED_CURRENT = Prisma.raw(`CASE
+    WHEN "RateLimitBucket"."windowStart" = EXCLUDED."windowStart" THEN "RateLimitBucket"."current"
+    ELSE 0 END`);
+const ROLLED_PREVIOUS = Prisma.raw(`CASE
+    WHEN "RateLimitBucket"."windowStart" = EXCLUDED."windowStart" THEN "RateLimitBucket"."previous"
+    WHEN "RateLimitBucket"."windowStart" = EXCLUDED."windowStart" - EXCLUDED."windowMs" THEN "RateLimitBucket"."current"
+    ELSE 0 END`);
+
+export class PostgresRateLimitStore implements RateLimitStore {
+    async hit(rules: RateLimitRule[], now: number): Promise<Set<string>> {
+        const nowDate = new Date(now);
+        const starts = rules.map(rule => BigInt(windowStartOf(now, rule.windowMs)));
+
+        // Rows refused by the WHERE are left as they are and not returned
+        const rows = await prisma.$queryRaw<{ key: string }[]>`
+            INSERT INTO "RateLimitBucket" ("key", "windowStart", "current", "previous", "maxHits", "windowMs", "expiresAt")
+            SELECT input."key", input."windowStart", 1, 0, input."maxHits", input."windowMs",
+                   ${nowDate} + input."windowMs" * 2 * INTERVAL '1 millisecond'
+            FROM unnest(
+                ${rules.map(rule => rule.key)}::text[],
+                ${starts}::bigint[],
+                ${rules.map(rule => rule.max)}::int[],
+                ${rules.map(rule => rule.windowMs)}::int[]
+            ) AS input("key", "windowStart", "maxHits", "windowMs")
+            ON CONFLICT ("key") DO UPDATE SET
+                "current" = ${ROLLED_CURRENT} + 1,
+                "previous" = ${ROLLED_PREVIOUS},
+                "windowStart" = EXCLUDED."windowStart",
+                "maxHits" = EXCLUDED."maxHits",
+                "windowMs" = EXCLUDED."windowMs",
+                "expiresAt" = EXCLUDED."expiresAt"
+            WHERE ${ROLLED_PREVIOUS} * (1 - (${BigInt(now)} - EXCLUDED."windowStart")::float8 / EXCLUDED."windowMs")
+                + ${ROLLED_CURRENT} < EXCLUDED."maxHits"
+            RETURNING "key"
+        `;
+
+        if (Math.random() < SWEEP_PROBABILITY) {
+            prisma.rateLimitBucket.deleteMany({ where: { expiresAt: { lt: nowDate } } })
+                .catch(e => console.error("[RATE_LIMIT] Sweep failed", e));
+        }
+
+        return new Set(rows.map(row => row.key));
+    }
+
+    async clear(key: string): Promise<void> {
+        await prisma.rateLimitBucket.deleteMany({ where: { key } });
+    }
+}
+
+interface MemoryBucket {
+    windowStart: number;
+    current: number;
+    previous: number;
+    expiresAt: number;
+}
+
+/**
+ * Same algorithm in process memory (tests, local scripts)
+ */
+export class MemoryRateLimitStore implements RateLimitStore {
+    private buckets = new Map<string, MemoryBucket>();
+
+    async hit(rules: RateLimitRule[], now: number): Promise<Set<string>> {
+        const allowed = new Set<string>();
+
+        for (const rule of rules) {
+            const windowStart = windowStartOf(now, rule.windowMs);
+            const bucket = this.buckets.get(rule.key);
+
+            let current = 0;
+            let previous = 0;
+            if (bucket && bucket.windowStart === windowStart) {
+                current = bucket.current;
+                previous = bucket.previous;
+            } else if (bucket && bucket.windowStart === windowStart - rule.windowMs) {
+                previous = bucket.current;
+            }
+
+            const weight = 1 - (now - windowStart) / rule.windowMs;
+            if (previous * weight + current < rule.max) {
+                this.buckets.set(rule.key, {
+                    windowStart,
+                    current: current + 1,
+                    previous,
+                    expiresAt: windowStart + 2 * rule.windowMs
+                });
+                allowed.add(rule.key);
+            }
+        }
+
+        if (Math.random() < SWEEP_PROBABILITY) {
+            for (const [key, bucket] of this.buckets) {
+                if (bucket.expiresAt < now) this.buckets.delete(key);
+            }
+        }
+
+        return allowed;
+    }
+
+    async clear(key: string): Promise<void> {
+        this.buckets.delete(key);
+    }
 }
 
-const attempts = new Map<string, RateLimitRecord>();
+const globalForRateLimit = globalThis as unknown as {
+    rateLimitStore: RateLimitStore | undefined;
+};
+
+let store: RateLimitStore = globalForRateLimit.rateLimitStore
+    ?? (process.env.RATE_LIMIT_STORE === 'memory' ? new MemoryRateLimitStore() : new PostgresRateLimitStore());
+
+if (process.env.NODE_ENV !== 'production') {
+    globalForRateLimit.rateLimitStore = store;
+}
+
+/**
+ * Replace the backend (e.g. MemoryRateLimitStore in tests)
+ */
+export function setRateLimitStore(next: RateLimitStore): void {
+    store = next;
+    globalForRateLimit.rateLimitStore = next;
+}
+
+/**
+ * Check several keys in one round-trip; a hit is counted on every key still
+ * within its limit
+ * @returns true if all keys are within their limit, false if one is exceeded
+ */
+export async function checkRateLimits(rules: RateLimitRule[]): Promise<boolean> {
+    // One row per key in the upsert (ON CONFLICT cannot touch a row twice)
+    const unique = [...new Map(rules.map(rule => [rule.key, rule])).values()];
+    if (unique.length === 0) return true;
+
+    try {
+        const allowed = await store.hit(unique, Date.now());
+        return unique.every(rule => allowed.has(rule.key));
+    } catch (error) {
+        // Fail open: an unavailable store must not lock everyone out
+        console.error("[RATE_LIMIT] Store unavailable, request allowed", error);
+        return true;
+    }
+}
 
 /**
  * Check if a key has exceeded the rate limit
@@ -17,50 +189,30 @@ const attempts = new Map<string, RateLimitRecord>();
  * @param windowMs - Time window in milliseconds
  * @returns true if within limit, false if exceeded
  */
-export function checkRateLimit(
+export async function checkRateLimit(
     key: string,
     maxAttempts: number = 5,
     windowMs: number = 15 * 60 * 1000 // 15 minutes
-): boolean {
-    const now = Date.now();
-    const record = attempts.get(key);
-
-    // No record or window expired - allow and create new record
-    if (!record || now > record.resetAt) {
-        attempts.set(key, { count: 1, resetAt: now + windowMs });
-        return true;
-    }
-
-    // Exceeded limit
-    if (record.count >= maxAttempts) {
-        return false;
-    }
-
-    // Within limit - increment count
-    record.count++;
-    return true;
+): Promise<boolean> {
+    return checkRateLimits([{ key, max: maxAttempts, windowMs }]);
 }
 
 /**
  * Clear rate limit for a key (e.g., after successful action)
  */
-export function clearRateLimit(key: string): void {
-    attempts.delete(key);
+export async function clearRateLimit(key: string): Promise<void> {
+    try {
+        await store.clear(key);
+    } catch (error) {
+        console.error("[RATE_LIMIT] Clear failed", error);
+    }
 }
 
 /**
- * Clean up expired records (call periodically)
+ * Client IP as seen by the first proxy (x-forwarded-for may list several hops)
  */
-export function cleanupExpiredRecords(): void {
-    const now = Date.now();
-    for (const [key, record] of attempts.entries()) {
-        if (now > record.resetAt) {
-            attempts.delete(key);
-        }
-    }
-}
-
-// Auto-cleanup every 5 minutes
-if (typeof setInterval !== 'undefined') {
-    setInterval(cleanupExpiredRecords, 5 * 60 * 1000);
+export function getClientIp(request: Request): string {
+    const forwarded = request.headers.get('x-forwarded-for');
+    if (forwarded) return forwarded.split(',')[0].trim();
+    return request.headers.get('x-real-ip') || 'unknown';
 }
@@ -0,0 +1,369 @@
+/**
+ * 📬 Scheduled email queue
+ *
+ * Deferred emails live in "ScheduledEmail", indexed on (status, scheduledAt):
+ * - enqueueScheduledEmails: called when the email history of a document is
+ *   saved. Pending entries are queued; their attachments leave emailsJSON.
+ * - processScheduledEmails: claims due rows (FOR UPDATE SKIP LOCKED + lease)
+ *   so several cron runs can drain the queue at the same time, sends with a
+ *   bounded concurrency, then records the result on each row and in the
+ *   history (emailsJSON) of the documents concerned.
+ *
+ * A cron run costs O(due emails), whatever the size of Facture / Devis.
+ */
+
+import { Prisma } from '@prisma/client';
+import { prisma } from '@/lib/prisma';
+import { sendEmail } from '@/lib/email';
+import { decodeJSON } from '@/lib/line-items';
+import type { EmailLog } from '@/types';
+
+export type EmailDocumentType = 'facture' | 'devis';
+
+const BATCH_SIZE = 25;
+const CONCURRENCY = 4;
+const MAX_BATCHES = 20;
+const LEASE_MS = 5 * 60 * 1000; // A claimed row is retried if its run died before recording a result
+const MAX_ATTEMPTS = 3;
+
+interface QueuedEmail {
+    id: string;
+    emailLogId: string;
+    societeId: string;
+    documentType: EmailDocumentType;
+    documentId: string;
+    to: string;
+    subject: string;
+    message: string;
+    attachmentsJSON: string;
+    attempts: number;
+}
+
+export interface DeliveryResult {
+    id: string;
+    emailLogId: string;
+    documentType: EmailDocumentType;
+    documentId: string;
+    to: string;
+    status: 'sent' | 'failed' | 'cancelled';
+    sentAt?: Date;
+    messageId?: string;
+    error?: string;
+}
+
+export interface QueueRunSummary {
+    processed: number;
+    errors: number;
+    cancelled: number;
+    details: string[];
+}
+
+const QUEUED_COLUMNS = Prisma.raw(`"id", "emailLogId", "societeId", "documentType", "documentId", "to", "subject", "message", "attachmentsJSON", "attempts"`);
+
+// History entries keep attachment names / types only
+function withoutAttachmentContent(email: EmailLog): EmailLog {
+    return {
+        ...email,
+        attachments: (email.attachments || []).map(({ content, ...att }) => att)
+    };
+}
+
+function applyQueueState(email: EmailLog, state: { status: string, sentAt: Date | null, messageId: string | null, error: string | null }): EmailLog {
+    const log = withoutAttachmentContent(email);
+    if (state.status === 'sent') {
+        return { ...log, status: 'sent', sentAt: state.sentAt?.toISOString(), messageId: state.messageId || undefined };
+    }
+    if (state.status === 'failed' || state.status === 'cancelled') {
+        return { ...log, status: 'failed', error: state.error || undefined };
+    }
+    return log;
+}
+
+/**
+ * Queue the scheduled entries of a document history (already queued ones
+ * still waiting get the new send time) and return the history to store:
+ * attachments stripped from queued entries, and entries already delivered by
+ * the queue reported as such (a client saving a stale history cannot put
+ * them back to "scheduled").
+ */
+export async function enqueueScheduledEmails(
+    documentType: EmailDocumentType,
+    documentId: string,
+    societeId: string,
+    emails: EmailLog[]
+): Promise<EmailLog[]> {
+    const pending = emails.filter(e => e && e.status === 'scheduled' && e.id && e.scheduledAt);
+    if (pending.length === 0) return emails;
+
+    await prisma.scheduledEmail.createMany({
+        data: pending.map(e => ({
+            emailLogId: e.id,
+            societeId,
+            documentType,
+            documentId,
+            to: e.to,
+            subject: e.subject || '',
+            message: e.message || '',
+            attachmentsJSON: JSON.stringify(e.attachments || []),
+            scheduledAt: new Date(e.scheduledAt!)
+        })),
+        skipDuplicates: true
+    });
+
+    const queued = await prisma.scheduledEmail.findMany({
+        where: { emailLogId: { in: pending.map(e => e.id) } },
+        select: { id: true, emailLogId: true, status: true, scheduledAt: true, sentAt: true, messageId: true, error: true }
+    });
+    const byLogId = new Map(queued.map(q => [q.emailLogId, q]));
+
+    // Rescheduled entries: only rows not claimed yet (status guarded in the update)
+    const moved = pending.filter(e => {
+        const row = byLogId.get(e.id);
+        return row && row.status === 'scheduled' && row.scheduledAt.getTime() !== new Date(e.scheduledAt!).getTime();
+    });
+    if (moved.length > 0) {
+        await prisma.$transaction(moved.map(e => prisma.scheduledEmail.updateMany({
+            where: { id: byLogId.get(e.id)!.id, status: 'scheduled' },
+            data: { scheduledAt: new Date(e.scheduledAt!) }
+        })));
+    }
+
+    return emails.map(e => {
+        const state = e && e.status === 'scheduled' ? byLogId.get(e.id) : undefined;
+        return state ? applyQueueState(e, state) : e;
+    });
+}
+
+async function claimDueEmails(now: Date, limit: number): Promise<QueuedEmail[]> {
+    const leaseUntil = new Date(now.getTime() + LEASE_MS);
+    return prisma.$queryRaw<QueuedEmail[]>`
+        UPDATE "ScheduledEmail"
+        SET "status" = 'sending', "lockedUntil" = ${leaseUntil}, "attempts" = "attempts" + 1, "updatedAt" = ${now}
+        WHERE "id" IN (
+            SELECT "id" FROM "ScheduledEmail"
+            WHERE ("status" = 'scheduled' AND "scheduledAt" <= ${now})
+               OR ("status" = 'sending' AND "lockedUntil" < ${now} AND "attempts" < ${MAX_ATTEMPTS})
+            ORDER BY "scheduledAt"
+            LIMIT ${limit}
+            FOR UPDATE SKIP LOCKED
+        )
+        RETURNING ${QUEUED_COLUMNS}
+    `;
+}
+
+// Rows whose lease expired MAX_ATTEMPTS times: give up
+async function failAbandonedEmails(now: Date): Promise<DeliveryResult[]> {
+    const error = `Abandonné après ${MAX_ATTEMPTS} tentatives`;
+    const rows = await prisma.$queryRaw<QueuedEmail[]>`
+        UPDATE "ScheduledEmail"
+        SET "status" = 'failed', "lockedUntil" = NULL, "error" = ${error}, "updatedAt" = ${now}
+        WHERE "status" = 'sending' AND "lockedUntil" < ${now} AND "attempts" >= ${MAX_ATTEMPTS}
+        RETURNING ${QUEUED_COLUMNS}
+    `;
+    return rows.map(row => ({
+        id: row.id,
+        emailLogId: row.emailLogId,
+        documentType: row.documentType,
+        documentId: row.documentId,
+        to: row.to,
+        status: 'failed',
+        error
+    }));
+}
+
+async function mapWithConcurrency<T, R>(items: T[], limit: number, fn: (item: T) => Promise<R>): Promise<R[]> {
+    const results: R[] = new Array(items.length);
+    let next = 0;
+    const workers = Array.from({ length: Math.min(limit, items.length) }, async () => {
+        while (next < items.length) {
+            const index = next++;
+            results[index] = await fn(items[index]);
+        }
+    });
+    await Promise.all(workers);
+    return results;
+}
+
+/**
+ * SMTP settings of the sociétés of a batch, and the documents that are still
+ * live (not deleted, invoice not archived): narrow queries, once per batch.
+ */
+async function loadBatchContext(batch: QueuedEmail[]) {
+    const societeIds = Array.from(new Set(batch.map(e => e.societeId)));
+    const factureIds = batch.filter(e => e.documentType === 'facture').map(e => e.documentId);
+    const devisIds = batch.filter(e => e.documentType === 'devis').map(e => e.documentId);
+
+    const [societes, factures, devis] = await Promise.all([
+        prisma.societe.findMany({
+            where: { id: { in: societeIds } },
+            select: {
+                id: true,
+                nom: true,
+                email: true,
+                emailProvider: true,
+                smtpHost: true,
+                smtpPort: true,
+                smtpUser: true,
+                smtpPass: true,
+                smtpSecure: true,
+                smtpFrom: true,
+                googleRefreshToken: true
+            }
+        }),
+        factureIds.length > 0 ? prisma.facture.findMany({
+            where: { id: { in: factureIds }, deletedAt: null, statut: { not: 'Archivée' } },
+            select: { id: true }
+        }) : Promise.resolve([]),
+        devisIds.length > 0 ? prisma.devis.findMany({
+            where: { id: { in: devisIds }, deletedAt: null },
+            select: { id: true }
+        }) : Promise.resolve([])
+    ]);
+
+    const configs = new Map(societes.map(societe => [societe.id, {
+        societeId: societe.id,
+        provider: (societe.emailProvider || "SMTP") as "SMTP" | "GMAIL",
+        host: societe.smtpHost || undefined,
+        port: societe.smtpPort || undefined,
+        user: societe.smtpUser || undefined,
+        pass: societe.smtpPass || undefined,
+        secure: societe.smtpSecure,
+        fromName: societe.nom,
+        fromEmail: societe.smtpFrom || societe.email || undefined,
+        googleRefreshToken: societe.googleRefreshToken || undefined
+    }]));
+    const liveDocuments = new Set([...factures, ...devis].map(d => d.id));
+
+    return { configs, liveDocuments };
+}
+
+async function deliverBatch(batch: QueuedEmail[]): Promise<DeliveryResult[]> {
+    const { configs, liveDocuments } = await loadBatchContext(batch);
+
+    return mapWithConcurrency(batch, CONCURRENCY, async (email): Promise<DeliveryResult> => {
+        const base = {
+            id: email.id,
+            emailLogId: email.emailLogId,
+            documentType: email.documentType,
+            documentId: email.documentId,
+            to: email.to
+        };
+
+        if (!liveDocuments.has(email.documentId)) {
+            return { ...base, status: 'cancelled', error: "Document supprimé ou archivé" };
+        }
+
+        const attachments = decodeJSON<EmailLog['attachments']>(email.attachmentsJSON, []);
+        const result = await sendEmail({
+            to: email.to,
+            subject: email.subject,
+            html: email.message.replace(/\n/g, '<br>'),
+            text: email.message,
+            attachments: attachments
+                .filter(att => att.content)
+                .map(att => ({
+                    filename: att.name,
+                    content: att.content,
+                    contentType: att.type
+                }))
+        }, configs.get(email.societeId));
+
+        if (result.success) {
+            return { ...base, status: 'sent', sentAt: new Date(), messageId: result.messageId };
+        }
+        return { ...base, status: 'failed', error: result.error || "Erreur d'envoi" };
+    });
+}
+
+async function recordResults(results: DeliveryResult[]) {
+    await prisma.$transaction(results.map(r => prisma.scheduledEmail.update({
+        where: { id: r.id },
+        data: {
+            status: r.status,
+            lockedUntil: null,
+            sentAt: r.sentAt ?? null,
+            messageId: r.messageId ?? null,
+            error: r.error ?? null
+        }
+    })));
+}
+
+/**
+ * Report the results in the history of each document concerned (one
+ * read + write per document, not per message). The row is locked between the
+ * read and the write, so a history saved at the same time is not overwritten.
+ */
+async function syncDocumentHistories(results: DeliveryResult[]) {
+    const byDocument = new Map<string, DeliveryResult[]>();
+    for (const r of results) {
+        const key = `${r.documentType}:${r.documentId}`;
+        byDocument.set(key, [...(byDocument.get(key) || []), r]);
+    }
+
+    await mapWithConcurrency(Array.from(byDocument.values()), CONCURRENCY, async (docResults) => {
+        const { documentType, documentId } = docResults[0];
+        const byLogId = new Map(docResults.map(r => [r.emailLogId, r]));
+
+        const table = Prisma.raw(documentType === 'facture' ? '"Facture"' : '"Devis"');
+
+        await prisma.$transaction(async (tx) => {
+            const [doc] = await tx.$queryRaw<{ emailsJSON: string | null }[]>`
+                SELECT "emailsJSON" FROM ${table} WHERE "id" = ${documentId} FOR UPDATE
+            `;
+            if (!doc) return;
+
+            const emails = decodeJSON<EmailLog[]>(doc.emailsJSON, []).map(e => {
+                const r = byLogId.get(e.id);
+                return r ? applyQueueState(e, { status: r.status, sentAt: r.sentAt ?? null, messageId: r.messageId ?? null, error: r.error ?? null }) : e;
+            });
+            const data = { emailsJSON: JSON.stringify(emails) };
+
+            if (documentType === 'facture') {
+                await tx.facture.update({ where: { id: documentId }, data });
+            } else {
+                await tx.devis.update({ where: { id: documentId }, data });
+            }
+        });
+    });
+}
+
+/**
+ * Drain the due part of the queue (bounded by MAX_BATCHES per run).
+ */
+export async function processScheduledEmails(now: Date = new Date()): Promise<QueueRunSummary> {
+    const summary: QueueRunSummary = { processed: 0, errors: 0, cancelled: 0, details: [] };
+
+    const collect = (results: DeliveryResult[]) => {
+        for (const r of results) {
+            if (r.status === 'sent') {
+                summary.processed++;
+                summary.details.push(`${r.documentType} ${r.documentId}: Sent to ${r.to}`);
+            } else if (r.status === 'cancelled') {
+                summary.cancelled++;
+            } else {
+                summary.errors++;
+                summary.details.push(`${r.documentType} ${r.documentId}: Failed (${r.error})`);
+            }
+        }
+    };
+
+    const abandoned = await failAbandonedEmails(now);
+    if (abandoned.length > 0) {
+        await syncDocumentHistories(abandoned);
+        collect(abandoned);
+    }
+
+    for (let i = 0; i < MAX_BATCHES; i++) {
+        const batch = await claimDueEmails(now, BATCH_SIZE);
+        if (batch.length === 0) break;
+
+        const results = await deliverBatch(batch);
+        await recordResults(results);
+        await syncDocumentHistories(results);
+        collect(results);
+
+        if (batch.length < BATCH_SIZE) break;
+    }
+
+    return summary;
+}
@@ -6,7 +6,7 @@
  */
 
 import { getCurrentUser } from "@/app/actions";
-import { prisma } from "@/lib/prisma";
+import { canAccessSociete } from "@/lib/actions/members";
 
 /**
  * Executes a callback ONLY if user has access to the société
@@ -27,13 +27,8 @@ export async function withSocieteAccessWrapper<T>(
 
         const userId = userRes.data.id;
 
-        // 2. Check membership
-        const hasAccess = await prisma.societe.findFirst({
-            where: {
-                id: societeId,
-                members: { some: { id: userId } }
-            }
-        });
+        // 2. Check membership (Membership table, served by the session cache)
+        const hasAccess = await canAccessSociete(userId, societeId);
 
         if (!hasAccess) {
             return { success: false, error: "Accès refusé à cette société" };
@@ -0,0 +1,161 @@
+/**
+ * Session & membership cache
+ *
+ * Two layers in front of the user / membership lookups done by every action:
+ * - React `cache()`: one query per request, however many actions of the same
+ *   render call getCurrentUser / canAccessSociete.
+ * - Process-level LRU with a short TTL, shared across requests. Entries are
+ *   dropped by the user and membership mutations (invalidateUser /
+ *   invalidateMembership); on other instances they expire with the TTL.
+ *
+ * The société catalog of a user (id, nom, logoUrl, isTemplate and role for
+ * each active membership) feeds the app shell and the société switcher. It
+ * is dropped with the user's memberships, and for every member when a
+ * société is renamed or gets a new logo (invalidateSocieteCatalogs).
+ *
+ * Only found rows are kept in the LRU: a missing membership (or an empty
+ * catalog) is re-read, so a freshly created one is visible immediately.
+ */
+
+import { cache } from 'react';
+import { Membership, MembershipRole } from '@prisma/client';
+import { prisma } from '@/lib/prisma';
+import { LRUCache } from '@/lib/lru-cache';
+
+const USER_TTL_MS = 30 * 1000;
+const MEMBERSHIP_TTL_MS = 30 * 1000;
+const CATALOG_TTL_MS = 30 * 1000;
+const MAX_ENTRIES = 1000;
+
+const userInclude = {
+    societes: {
+        select: {
+            id: true,
+            nom: true,
+            logoUrl: true
+        }
+    }
+} as const;
+
+async function queryUser(userId: string) {
+    return prisma.user.findUnique({
+        where: { id: userId },
+        include: userInclude
+    });
+}
+
+export type CachedUser = NonNullable<Awaited<ReturnType<typeof queryUser>>>;
+
+export interface SocieteCatalogEntry {
+    id: string;
+    nom: string;
+    logoUrl: string | null;
+    isTemplate: boolean;
+    role: MembershipRole;
+}
+
+const globalForSessionCache = globalThis as unknown as {
+    sessionUsers: LRUCache<string, CachedUser> | undefined;
+    sessionMemberships: LRUCache<string, Membership> | undefined;
+    societeCatalogs: LRUCache<string, SocieteCatalogEntry[]> | undefined;
+};
+
+const users = globalForSessionCache.sessionUsers ?? new LRUCache<string, CachedUser>(MAX_ENTRIES, USER_TTL_MS);
+const memberships = globalForSessionCache.sessionMemberships ?? new LRUCache<string, Membership>(MAX_ENTRIES, MEMBERSHIP_TTL_MS);
+const catalogs = globalForSessionCache.societeCatalogs ?? new LRUCache<string, SocieteCatalogEntry[]>(MAX_ENTRIES, CATALOG_TTL_MS);
+
+if (process.env.NODE_ENV !== 'production') {
+    globalForSessionCache.sessionUsers = users;
+    globalForSessionCache.sessionMemberships = memberships;
+    globalForSessionCache.societeCatalogs = catalogs;
+}
+
+function membershipKey(userId: string, societeId: string) {
+    return `${userId}:${societeId}`;
+}
+
+/**
+ * User row (with societes id/nom/logoUrl) or null
+ */
+export const loadUser = cache(async (userId: string): Promise<CachedUser | null> => {
+    const cached = users.get(userId);
+    if (cached) return cached;
+
+    const user = await queryUser(userId);
+    if (user) users.set(userId, user);
+    return user;
+});
+
+/**
+ * Membership of a user in a société (any status) or null
+ */
+export const loadMembership = cache(async (userId: string, societeId: string): Promise<Membership | null> => {
+    const key = membershipKey(userId, societeId);
+    const cached = memberships.get(key);
+    if (cached) return cached;
+
+    const membership = await prisma.membership.findUnique({
+        where: {
+            userId_societeId: { userId, societeId }
+        }
+    });
+    if (membership) memberships.set(key, membership);
+    return membership;
+});
+
+/**
+ * Sociétés the user is an active member of, newest first
+ */
+export const loadSocieteCatalog = cache(async (userId: string): Promise<SocieteCatalogEntry[]> => {
+    const cached = catalogs.get(userId);
+    if (cached) return cached;
+
+    const rows = await prisma.membership.findMany({
+        where: { userId, status: 'active' },
+        select: {
+            role: true,
+            societe: { select: { id: true, nom: true, logoUrl: true, isTemplate: true } }
+        },
+        orderBy: { societe: { createdAt: 'desc' } }
+    });
+    const catalog = rows.map(row => ({ ...row.societe, role: row.role }));
+    if (catalog.length > 0) catalogs.set(userId, catalog);
+    return catalog;
+});
+
+/**
+ * Call after any write to a user row (profile, avatar, password, current société...)
+ */
+export function invalidateUser(userId: string): void {
+    users.delete(userId);
+}
+
+/**
+ * Call after a membership creation, role/status change or removal
+ */
+export function invalidateMembership(userId: string, societeId: string): void {
+    memberships.delete(membershipKey(userId, societeId));
+    catalogs.delete(userId);
+}
+
+/**
+ * Call after a société is created for the user (new OWNER membership)
+ */
+export function invalidateSocieteCatalog(userId: string): void {
+    catalogs.delete(userId);
+}
+
+/**
+ * Call after a write to the catalog fields of a société (nom, logoUrl...)
+ */
+export function invalidateSocieteCatalogs(societeId: string): void {
+    catalogs.deleteWhere((_, catalog) => catalog.some(entry => entry.id === societeId));
+}
+
+/**
+ * Call when every membership of a société goes away (société deleted)
+ */
+export function invalidateSocieteMemberships(societeId: string): void {
+    memberships.deleteWhere(key => key.endsWith(`:${societeId}`));
+    invalidateSocieteCatalogs(societeId);
+}
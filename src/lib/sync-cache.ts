@@ -0,0 +1,187 @@
+/**
+ * 💾 Browser cache of the DataProvider lists (IndexedDB)
+ *
+ * One record per row, keyed [societeId, list, id], plus the delta-sync cursor
+ * of each société. A delta only writes the rows it touches; writes are
+ * asynchronous and scheduled when the browser is idle, instead of
+ * JSON.stringify + localStorage.setItem of every list on the main thread.
+ *
+ * Every function degrades to a no-op (or null) when IndexedDB is unavailable
+ * (SSR, private browsing): the provider then simply loads from the server.
+ */
+
+import type { Client, Produit, Facture, Devis } from '@/types';
+import type { SyncDelta, SyncEntity } from '@/lib/delta-sync';
+
+export interface SyncSnapshot {
+    cursor: string;
+    clients: Client[];
+    products: Produit[];
+    invoices: Facture[];
+    quotes: Devis[];
+}
+
+const DB_NAME = 'glassy_sync';
+const DB_VERSION = 1;
+const ROWS = 'rows';
+const CURSORS = 'cursors';
+const ENTITIES: SyncEntity[] = ['clients', 'products', 'invoices', 'quotes'];
+
+let dbPromise: Promise<IDBDatabase | null> | null = null;
+
+function openDb(): Promise<IDBDatabase | null> {
+    if (typeof indexedDB === 'undefined') return Promise.resolve(null);
+    if (!dbPromise) {
+        dbPromise = new Promise(resolve => {
+            const request = indexedDB.open(DB_NAME, DB_VERSION);
+            request.onupgradeneeded = () => {
+                const db = request.result;
+                db.createObjectStore(ROWS, { keyPath: ['societeId', 'entity', 'id'] });
+                db.createObjectStore(CURSORS, { keyPath: 'societeId' });
+            };
+            request.onsuccess = () => resolve(request.result);
+            request.onerror = () => {
+                console.error("[SYNC_CACHE] IndexedDB unavailable", request.error);
+                resolve(null);
+            };
+        });
+    }
+    return dbPromise;
+}
+
+function done(tx: IDBTransaction): Promise<void> {
+    return new Promise((resolve, reject) => {
+        tx.oncomplete = () => resolve();
+        tx.onerror = () => reject(tx.error);
+        tx.onabort = () => reject(tx.error);
+    });
+}
+
+function result<T>(request: IDBRequest<T>): Promise<T> {
+    return new Promise((resolve, reject) => {
+        request.onsuccess = () => resolve(request.result);
+        request.onerror = () => reject(request.error);
+    });
+}
+
+// Every key of one list of one société ([] sorts after any string id)
+function listRange(societeId: string, entity: SyncEntity): IDBKeyRange {
+    return IDBKeyRange.bound([societeId, entity], [societeId, entity, []]);
+}
+
+function whenIdle(task: () => Promise<void>): Promise<void> {
+    return new Promise(resolve => {
+        const run = () => task().catch(e => console.error("[SYNC_CACHE] Write failed", e)).finally(resolve);
+        if (typeof window !== 'undefined' && 'requestIdleCallback' in window) {
+            (window as any).requestIdleCallback(run, { timeout: 2000 });
+        } else {
+            setTimeout(run, 1);
+        }
+    });
+}
+
+/**
+ * Newest first, like fetchDashboardData
+ */
+export function byDocumentDateDesc(a: { dateEmission?: string, numero?: string }, b: { dateEmission?: string, numero?: string }): number {
+    return (b.dateEmission || '').localeCompare(a.dateEmission || '') || (b.numero || '').localeCompare(a.numero || '');
+}
+
+export async function loadSnapshot(societeId: string): Promise<SyncSnapshot | null> {
+    const db = await openDb();
+    if (!db) return null;
+
+    try {
+        const tx = db.transaction([ROWS, CURSORS], 'readonly');
+        const rows = tx.objectStore(ROWS);
+        const [cursor, ...lists] = await Promise.all([
+            result(tx.objectStore(CURSORS).get(societeId)),
+            ...ENTITIES.map(entity => result(rows.getAll(listRange(societeId, entity))))
+        ]);
+        if (!cursor) return null;
+
+        const [clients, products, invoices, quotes] = lists.map(records => (records as any[]).map(record => record.row));
+        return {
+            cursor: cursor.cursor,
+            clients,
+            products,
+            invoices: invoices.sort(byDocumentDateDesc),
+            quotes: quotes.sort(byDocumentDateDesc)
+        };
+    } catch (e) {
+        console.error("[SYNC_CACHE] Read failed", e);
+        return null;
+    }
+}
+
+/**
+ * Replace the cached lists of a société (after a full load)
+ */
+export function saveSnapshot(societeId: string, snapshot: SyncSnapshot): Promise<void> {
+    return whenIdle(async () => {
+        const db = await openDb();
+        if (!db) return;
+
+        const tx = db.transaction([ROWS, CURSORS], 'readwrite');
+        const rows = tx.objectStore(ROWS);
+        for (const entity of ENTITIES) {
+            rows.delete(listRange(societeId, entity));
+            for (const row of snapshot[entity] as { id: string }[]) {
+                rows.put({ societeId, entity, id: row.id, row });
+            }
+        }
+        tx.objectStore(CURSORS).put({ societeId, cursor: snapshot.cursor });
+        await done(tx);
+    });
+}
+
+/**
+ * Write only what a delta touched
+ */
+export function applyDeltaToSnapshot(societeId: string, delta: SyncDelta): Promise<void> {
+    return whenIdle(async () => {
+        const db = await openDb();
+        if (!db) return;
+
+        const tx = db.transaction([ROWS, CURSORS], 'readwrite');
+        const rows = tx.objectStore(ROWS);
+        for (const entity of ENTITIES) {
+            if (delta.cleared.includes(entity)) rows.delete(listRange(societeId, entity));
+            for (const id of delta.removed[entity]) rows.delete([societeId, entity, id]);
+            for (const row of delta[entity] as { id: string }[]) {
+                rows.put({ societeId, entity, id: row.id, row });
+            }
+        }
+        tx.objectStore(CURSORS).put({ societeId, cursor: delta.cursor });
+        await done(tx);
+    });
+}
+
+/**
+ * Apply a delta to an in-memory list: clear, drop removed ids, then replace
+ * changed rows in place and add new ones
+ */
+export function mergeDelta<T extends { id: string }>(
+    list: T[],
+    entity: SyncEntity,
+    delta: SyncDelta,
+    compare?: (a: T, b: T) => number
+): T[] {
+    const changed = delta[entity] as unknown as T[];
+    const removed = new Set(delta.removed[entity]);
+    if (changed.length === 0 && removed.size === 0 && !delta.cleared.includes(entity)) return list;
+
+    const updates = new Map(changed.map(row => [row.id, row]));
+    const base = delta.cleared.includes(entity) ? [] : list;
+
+    const merged: T[] = [];
+    for (const row of base) {
+        if (removed.has(row.id) && !updates.has(row.id)) continue;
+        const update = updates.get(row.id);
+        merged.push(update || row);
+        updates.delete(row.id);
+    }
+    merged.push(...updates.values());
+
+    return compare ? merged.sort(compare) : merged;
+}
@@ -0,0 +1,162 @@
+/**
+ * ⏱️ Server action tracing
+ *
+ * traceAction() runs an action inside its own span (AsyncLocalStorage), so
+ * concurrent calls never share a timer or a label. The Prisma query extension
+ * (lib/prisma.ts) adds every query to the spans of the calls that issued it:
+ * each call records wall time, query count and DB time.
+ *
+ * Server actions are traced where they are exported, bodies untouched
+ * (scripts/apply_action_tracing.py):
+ *   export const fetchClients = traced('fetchClients', fetchClientsImpl);
+ *
+ * Calls feed in-process histograms (GET /api/metrics, Bearer METRICS_SECRET)
+ * and, when ACTION_TRACE_LOG=<file> is set, one JSON line per call for
+ * scripts/analyze_traces.py.
+ */
+
+import { AsyncLocalStorage } from 'async_hooks';
+import { appendFile } from 'fs';
+import { performance } from 'perf_hooks';
+
+interface Span {
+    name: string;
+    queries: number;
+    dbMs: number;
+    parent: Span | null;
+}
+
+export interface ActionStats {
+    calls: number;
+    errors: number;
+    totalMs: number;
+    maxMs: number;
+    queries: number;
+    dbMs: number;
+    // Calls per latency bucket: buckets[i] <= LATENCY_BUCKETS_MS[i], last one above
+    buckets: number[];
+}
+
+// Upper bounds (ms) of the latency histogram
+export const LATENCY_BUCKETS_MS = [5, 10, 25, 50, 100, 250, 500, 1000, 2500, 5000, 10000];
+
+const TRACE_LOG_FILE = process.env.ACTION_TRACE_LOG;
+
+let metricsSince = new Date().toISOString();
+
+const globalForTracing = globalThis as unknown as {
+    actionSpans: AsyncLocalStorage<Span> | undefined;
+    actionStats: Map<string, ActionStats> | undefined;
+};
+
+const spans = globalForTracing.actionSpans ?? new AsyncLocalStorage<Span>();
+const stats = globalForTracing.actionStats ?? new Map<string, ActionStats>();
+
+// Kept across hot reloads and shared by every module copy of this file
+globalForTracing.actionSpans = spans;
+globalForTracing.actionStats = stats;
+
+function record(span: Span, durationMs: number, failed: boolean) {
+    let entry = stats.get(span.name);
+    if (!entry) {
+        entry = { calls: 0, errors: 0, totalMs: 0, maxMs: 0, queries: 0, dbMs: 0, buckets: new Array(LATENCY_BUCKETS_MS.length + 1).fill(0) };
+        stats.set(span.name, entry);
+    }
+
+    entry.calls++;
+    if (failed) entry.errors++;
+    entry.totalMs += durationMs;
+    entry.maxMs = Math.max(entry.maxMs, durationMs);
+    entry.queries += span.queries;
+    entry.dbMs += span.dbMs;
+
+    const bucket = LATENCY_BUCKETS_MS.findIndex(bound => durationMs <= bound);
+    entry.buckets[bucket === -1 ? LATENCY_BUCKETS_MS.length : bucket]++;
+
+    if (TRACE_LOG_FILE) {
+        appendFile(TRACE_LOG_FILE, JSON.stringify({
+            action: span.name,
+            parent: span.parent?.name ?? null,
+            at: new Date().toISOString(),
+            durationMs: Math.round(durationMs * 100) / 100,
+            queries: span.queries,
+            dbMs: Math.round(span.dbMs * 100) / 100,
+            ok: !failed
+        }) + '\n', (error) => {
+            if (error) console.warn("[TRACE] Could not write trace log", error.message);
+        });
+    }
+}
+
+/**
+ * Runs `fn` as the action `name`: times it, counts its queries
+ * A call counts as failed when it throws or returns { success: false }.
+ */
+export async function traceAction<T>(name: string, fn: () => Promise<T>): Promise<T> {
+    const span: Span = { name, queries: 0, dbMs: 0, parent: spans.getStore() ?? null };
+    const start = performance.now();
+    let failed = true;
+
+    try {
+        const result = await spans.run(span, fn);
+        failed = (result as { success?: unknown } | null)?.success === false;
+        return result;
+    } finally {
+        record(span, performance.now() - start, failed);
+    }
+}
+
+/**
+ * `fn` with every call traced as the action `name`
+ */
+export function traced<A extends unknown[], T>(name: string, fn: (...args: A) => Promise<T>): (...args: A) => Promise<T> {
+    return async (...args: A) => traceAction(name, () => fn(...args));
+}
+
+/**
+ * Adds one query to the current span and its parents (no-op outside an action)
+ */
+export function recordQuery(durationMs: number) {
+    for (let span = spans.getStore() ?? null; span; span = span.parent) {
+        span.queries++;
+        span.dbMs += durationMs;
+    }
+}
+
+/**
+ * Latency bucket upper bound below which `q` percent of the calls fall
+ */
+function bucketPercentile(entry: ActionStats, q: number): number | null {
+    const rank = Math.ceil(entry.calls * q / 100);
+    let seen = 0;
+    for (let i = 0; i < entry.buckets.length; i++) {
+        seen += entry.buckets[i];
+        if (seen >= rank) return LATENCY_BUCKETS_MS[i] ?? null; // null: above the last bound
+    }
+    return null;
+}
+
+export function metricsSnapshot() {
+    const actions = [...stats.entries()]
+        .map(([name, entry]) => ({
+            name,
+            calls: entry.calls,
+            errors: entry.errors,
+            meanMs: Math.round(entry.totalMs / entry.calls * 10) / 10,
+            maxMs: Math.round(entry.maxMs * 10) / 10,
+            p50Ms: bucketPercentile(entry, 50),
+            p95Ms: bucketPercentile(entry, 95),
+            p99Ms: bucketPercentile(entry, 99),
+            queriesPerCall: Math.round(entry.queries / entry.calls * 10) / 10,
+            dbMsPerCall: Math.round(entry.dbMs / entry.calls * 10) / 10,
+            buckets: Object.fromEntries(entry.buckets.map((count, i) => [String(LATENCY_BUCKETS_MS[i] ?? '+Inf'), count]))
+        }))
+        .sort((a, b) => b.meanMs * b.calls - a.meanMs * a.calls);
+
+    return { since: metricsSince, actions };
+}
+
+export function resetMetrics() {
+    stats.clear();
+    metricsSince = new Date().toISOString();
+}
@@ -0,0 +1,110 @@
+/**
+ * Minimal streaming ZIP writer (store only, no compression)
+ *
+ * PDFs are already compressed: storing them keeps the archive as small as a
+ * deflated one at no CPU cost. Each file is emitted as soon as it is added,
+ * so an archive never has to be held in memory. No ZIP64: up to 65535 files
+ * and 4 GB, which is far above a year of invoices.
+ */
+
+const CRC_TABLE = (() => {
+    const table = new Uint32Array(256);
+    for (let n = 0; n < 256; n++) {
+        let c = n;
+        for (let k = 0; k < 8; k++) c = c & 1 ? 0xEDB88320 ^ (c >>> 1) : c >>> 1;
+        table[n] = c >>> 0;
+    }
+    return table;
+})();
+
+function crc32(data: Uint8Array): number {
+    let crc = 0xFFFFFFFF;
+    for (let i = 0; i < data.length; i++) crc = CRC_TABLE[(crc ^ data[i]) & 0xFF] ^ (crc >>> 8);
+    return (crc ^ 0xFFFFFFFF) >>> 0;
+}
+
+function dosDateTime(date: Date): { time: number, date: number } {
+    return {
+        time: (date.getHours() << 11) | (date.getMinutes() << 5) | Math.floor(date.getSeconds() / 2),
+        date: ((Math.max(date.getFullYear(), 1980) - 1980) << 9) | ((date.getMonth() + 1) << 5) | date.getDate()
+    };
+}
+
+interface CentralEntry {
+    name: Buffer;
+    crc: number;
+    size: number;
+    offset: number;
+    time: number;
+    date: number;
+}
+
+const UTF8_FLAG = 0x0800;
+
+export class ZipWriter {
+    private entries: CentralEntry[] = [];
+    private offset = 0;
+
+    /**
+     * Local header + data of one file, to be written to the output right away
+     */
+    addFile(filename: string, data: Uint8Array, modified: Date = new Date()): Uint8Array {
+        if (this.entries.length >= 0xFFFF) throw new Error("Archive trop volumineuse (65535 fichiers max)");
+
+        const name = Buffer.from(filename, 'utf8');
+        const crc = crc32(data);
+        const { time, date } = dosDateTime(modified);
+
+        const header = Buffer.alloc(30);
+        header.writeUInt32LE(0x04034B50, 0);
+        header.writeUInt16LE(20, 4); // Version needed
+        header.writeUInt16LE(UTF8_FLAG, 6);
+        header.writeUInt16LE(0, 8); // Stored
+        header.writeUInt16LE(time, 10);
+        header.writeUInt16LE(date, 12);
+        header.writeUInt32LE(crc, 14);
+        header.writeUInt32LE(data.length, 18);
+        header.writeUInt32LE(data.length, 22);
+        header.writeUInt16LE(name.length, 26);
+        header.writeUInt16LE(0, 28);
+
+        this.entries.push({ name, crc, size: data.length, offset: this.offset, time, date });
+        const chunk = Buffer.concat([header, name, data]);
+        this.offset += chunk.length;
+        if (this.offset > 0xFFFFFFFF) throw new Error("Archive trop volumineuse (4 Go max)");
+        return chunk;
+    }
+
+    /**
+     * Central directory + end record, written once after the last file
+     */
+    finish(): Uint8Array {
+        const records = this.entries.map(entry => {
+            const record = Buffer.alloc(46);
+            record.writeUInt32LE(0x02014B50, 0);
+            record.writeUInt16LE(20, 4); // Version made by
+            record.writeUInt16LE(20, 6); // Version needed
+            record.writeUInt16LE(UTF8_FLAG, 8);
+            record.writeUInt16LE(0, 10);
+            record.writeUInt16LE(entry.time, 12);
+            record.writeUInt16LE(entry.date, 14);
+            record.writeUInt32LE(entry.crc, 16);
+            record.writeUInt32LE(entry.size, 20);
+            record.writeUInt32LE(entry.size, 24);
+            record.writeUInt16LE(entry.name.length, 28);
+            // Extra, comment, disk, attributes: 0
+            record.writeUInt32LE(entry.offset, 42);
+            return Buffer.concat([record, entry.name]);
+        });
+        const directory = Buffer.concat(records);
+
+        const end = Buffer.alloc(22);
+        end.writeUInt32LE(0x06054B50, 0);
+        end.writeUInt16LE(this.entries.length, 8);
+        end.writeUInt16LE(this.entries.length, 10);
+        end.writeUInt32LE(directory.length, 12);
+        end.writeUInt32LE(this.offset, 16);
+
+        return Buffer.concat([directory, end]);
+    }
+}
@@ -42,11 +42,12 @@ export const config = {
         /*
          * Match all request paths except for the ones starting with:
          * - api/auth (auth endpoints)
+         * - api/metrics, api/cron (check their own Bearer token)
          * - _next/static (static files)
          * - _next/image (image optimization files)
          * - favicon.ico (favicon file)
          * - public images/assets (if any generic pattern)
          */
-        '/((?!api/auth|api/users/avatar|_next/static|_next/image|favicon.ico|.*\\.(?:svg|png|jpg|jpeg|gif|webp)$).*)',
+        '/((?!api/auth|api/metrics|api/cron|api/users/avatar|_next/static|_next/image|favicon.ico|.*\\.(?:svg|png|jpg|jpeg|gif|webp)$).*)',
     ],
 };
@@ -128,6 +128,7 @@ export interface User {
     lastReadHistory?: string; // ISO Date of last check
     avatarUrl?: string | null;
     hasAvatar?: boolean;
+    avatarHash?: string | null; // Version of the avatar, for /api/users/avatar URLs
     updatedAt?: string;
 }
 